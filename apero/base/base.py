@@ -295,6 +295,12 @@ def create_yamls(allparams: Any):
     sqlite3['USER'] = sdict.get('USER', 'NULL')
     sqlite3['PASSWD'] = sdict.get('PASSWD', 'NULL')
     sqlite3['DATABASE'] = sdict.get('DATABASE', 'NULL')
+    # keep one persistent connection per process (instead of one per query)
+    sqlite3['USE_POOL'] = sdict.get('USE_POOL', True)
+    # use write-ahead logging (readers do not block behind writers)
+    sqlite3['WAL'] = sdict.get('WAL', False)
+    # seconds a connection waits for a lock before retrying with backoff
+    sqlite3['BUSY_TIMEOUT'] = sdict.get('BUSY_TIMEOUT', 20.0)
     # add calib database
     calibdb = dict()
     calibdb['PATH'] = sdict.get('CALIB_PATH', 'DRS_CALIB_DB')
@@ -358,6 +364,9 @@ def create_yamls(allparams: Any):
     mysql['USER'] = mdict.get('USER', 'None')
     mysql['PASSWD'] = mdict.get('PASSWD', 'None')
     mysql['DATABASE'] = mdict.get('DATABASE', 'None')
+    # keep a bounded pool of persistent connections per process
+    mysql['USE_POOL'] = mdict.get('USE_POOL', True)
+    mysql['POOL_SIZE'] = mdict.get('POOL_SIZE', 5)
     # add calib database
     calibdb = dict()
     calibdb['PATH'] = mdict.get('CALIB_PATH', 'NULL')
@@ -16,13 +16,24 @@ only from:
     - apero.base.drs_base
 
 """
+import json
+import multiprocessing
 import os
+import random
+import re
+import shutil
 import sqlite3
+import sys
+import tempfile
+import threading
 import time
 import warnings
+from collections import OrderedDict
 from contextlib import closing
+from multiprocessing import connection as mp_connection
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple, Type, Union
+from typing import (Any, Dict, Iterator, List, Optional, Tuple, Type,
+                    Union)
 
 import numpy as np
 import pandas
@@ -53,12 +64,79 @@ __release__ = base.__release__
 Time = base.AstropyTime
 # timeout parameter in seconds
 TIMEOUT = 20.0
+# maximum time in seconds to keep retrying a locked sqlite database
 MAXWAIT = 1000
+# sqlite locked database: first and maximum wait in seconds between retries
+#   (the wait doubles after every retry)
+BUSY_BACKOFF_START = 0.05
+BUSY_BACKOFF_MAX = 2.0
 # mysql timeout
 MYSQL_WAIT = 30  # 5
 
 # unique hash column
 UHASH_COL = 'UHASH'
+# connection pool: number of idle connections kept per pool (sqlite is always
+#   one persistent connection per process and thread)
+POOL_SIZE = 5
+# connection pool: idle time in seconds after which a pooled connection is
+#   health checked before it is reused
+POOL_PING = 30.0
+# connection pool: age in seconds after which a pooled connection is closed
+#   and replaced (avoids hitting server side timeouts)
+POOL_RECYCLE = 3600.0
+# bulk insert: default number of rows sent per executemany (one transaction)
+BULK_CHUNK_SIZE = 1000
+# query results: default number of rows fetched at once (per fetchmany)
+FETCH_CHUNK_SIZE = 10000
+# query results: the text width numpy gives bool, int and float values in a
+#   row with text (see _columns_to_array)
+TEXT_WIDTHS = dict(b=5, i=21, f=32)
+# storage for the connection pools of this process (key = database key)
+CONNECTION_POOLS = dict()
+# storage for the sqlalchemy engines of this process (key = url)
+SQLALCHEMY_ENGINES = dict()
+# query cache: default maximum memory (in bytes) of cached query results per
+#   database
+QUERY_CACHE_SIZE = 256 * 1024 ** 2
+# storage for the query caches of this process (key = database key)
+QUERY_CACHES = dict()
+# slow query log: maximum number of characters of a command written
+SLOW_QUERY_MAX_CHARS = 2000
+# modules skipped when finding the caller of a query (for the slow query log)
+QUERY_CALLER_SKIP = ('drs_db.py', 'drs_database.py')
+# sql commands that do not change any data (never bump a table generation)
+READ_SQL = re.compile(r'^\s*(SELECT|PRAGMA|SHOW|EXPLAIN|CHECKSUM|DESCRIBE|'
+                      r'BEGIN|COMMIT)\b', re.IGNORECASE)
+# sql commands that change the data of a single table (group 1 = the table)
+WRITE_SQL = re.compile(r'^\s*(?:INSERT\s+(?:OR\s+\w+\s+)?INTO|REPLACE\s+INTO|'
+                       r'UPDATE|DELETE\s+FROM|ALTER\s+TABLE|'
+                       r'DROP\s+TABLE(?:\s+IF\s+EXISTS)?|'
+                       r'CREATE\s+TABLE(?:\s+IF\s+NOT\s+EXISTS)?)'
+                       r'\s+[`"]?(\w+)', re.IGNORECASE)
+# sql commands that only change rows (these can go through the writer process)
+DML_SQL = re.compile(r'^\s*(INSERT|REPLACE|UPDATE|DELETE)\b', re.IGNORECASE)
+# inserts that raise a UniqueEntryException when the row already exists
+#   (callers catch this - so the writer process must apply these at once)
+PLAIN_INSERT_SQL = re.compile(r'^\s*INSERT\s+INTO\b', re.IGNORECASE)
+# environment variable telling worker processes how to reach the writer
+#   process (set by DatabaseWriter.start, inherited by the workers)
+WRITER_ENV = 'APERO_DB_WRITER'
+# how long the writer process waits for new messages before checking again
+WRITER_POLL = 0.5
+# how long to wait for the writer process to start or stop
+WRITER_TIMEOUT = 60.0
+# the client of the writer process for this process (None if not used)
+WRITER_CLIENT = None
+# the kinds of database this process has written to (a process that has
+#   written to a database never reads it from a snapshot)
+WRITTEN_KINDS = set()
+# environment variable telling worker processes where the read-only database
+#   snapshots are (set by DatabaseSnapshot.update, inherited by the workers)
+SNAPSHOT_ENV = 'APERO_DB_SNAPSHOT'
+# the snapshot databases opened by this process (by path)
+SNAPSHOT_DATABASES = dict()
+# memory map size used to read snapshot databases (bytes)
+SNAPSHOT_MMAP_SIZE = 1024 ** 3
 
 
 # =============================================================================
@@ -130,6 +208,800 @@ class DatabaseError(DatabaseException):
         return emsg.format(self.message, self.path, self.func_name)
 
 
+class ConnectionPool:
+    def __init__(self, key: Tuple[Any, ...], size: int = 1,
+                 thread_bound: bool = False):
+        """
+        A pool of persistent (idle) database connections owned by a single
+        process (and a single thread if thread_bound is True)
+
+        Connections are never shared between processes - a pool created in
+        a parent process is discarded (not closed) in a forked child
+
+        :param key: tuple, the unique key for the database this pool serves
+        :param size: int, the maximum number of idle connections to keep,
+                     connections released when the pool is full are closed
+        :param thread_bound: bool, if True the pool belongs to the thread that
+                             created it (required for sqlite3 connections)
+        """
+        self.key = key
+        self.size = max(int(size), 1)
+        self.pid = os.getpid()
+        if thread_bound:
+            self.tid = threading.get_ident()
+        else:
+            self.tid = None
+        # idle connections: list of [connection, time created, time used]
+        self.idle = []
+        # storage of when connections were created (by id)
+        self.created = dict()
+        # lock for multi-threaded access
+        self.lock = threading.Lock()
+        # counters (for profiling)
+        self.opened = 0
+        self.reused = 0
+        self.discarded = 0
+
+    def __str__(self):
+        """
+        Standard string return
+        :return:
+        """
+        return 'ConnectionPool[{0}]'.format(self.key)
+
+    def __repr__(self):
+        """
+        Standard string representation
+        :return:
+        """
+        return self.__str__()
+
+    def owned(self) -> bool:
+        """
+        Check whether this pool belongs to the current process (and thread)
+
+        :return: bool, True if the pool can be used here
+        """
+        if self.pid != os.getpid():
+            return False
+        if self.tid is not None and self.tid != threading.get_ident():
+            return False
+        return True
+
+    def get(self, ping: Any) -> Any:
+        """
+        Get a healthy idle connection from the pool (or None if there are
+        no idle connections)
+
+        :param ping: function, takes a connection and returns True if the
+                     connection is still alive
+
+        :return: the connection or None
+        """
+        now = time.time()
+        while True:
+            with self.lock:
+                if len(self.idle) == 0:
+                    return None
+                conn, created, used = self.idle.pop()
+            # recycle connections that are too old
+            if now - created > POOL_RECYCLE:
+                self.discard(conn)
+                continue
+            # health check connections that have been idle for a while
+            if now - used > POOL_PING and not ping(conn):
+                self.discard(conn)
+                continue
+            self.reused += 1
+            return conn
+
+    def put(self, conn: Any) -> bool:
+        """
+        Return a connection to the pool
+
+        :param conn: the connection to return
+
+        :return: bool, True if the pool kept the connection, False if the
+                 caller should close it
+        """
+        if not self.owned():
+            return False
+        with self.lock:
+            if len(self.idle) >= self.size:
+                self.created.pop(id(conn), None)
+                return False
+            created = self.created.setdefault(id(conn), time.time())
+            self.idle.append([conn, created, time.time()])
+        return True
+
+    def register(self, conn: Any):
+        """
+        Register a newly opened connection with the pool
+
+        :param conn: the new connection
+
+        :return: None
+        """
+        self.created[id(conn)] = time.time()
+        self.opened += 1
+
+    def discard(self, conn: Any):
+        """
+        Close a connection that should not be reused
+
+        :param conn: the connection to close
+
+        :return: None
+        """
+        self.created.pop(id(conn), None)
+        self.discarded += 1
+        # noinspection PyBroadException
+        try:
+            conn.close()
+        except Exception as _:
+            pass
+
+    def close(self):
+        """
+        Close all idle connections in the pool (only if owned by this process)
+
+        :return: None
+        """
+        if not self.owned():
+            self.idle = []
+            return
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for conn, _, _ in idle:
+            self.discard(conn)
+
+
+class QueryCache:
+    def __init__(self, key: Tuple[Any, ...],
+                 max_bytes: int = QUERY_CACHE_SIZE):
+        """
+        A least recently used cache of query results for a single database
+        owned by a single process
+
+        Every cached result is stored with the generation of the tables it
+        was read from - every write to a table bumps its generation so
+        results read before the write are never returned again
+
+        :param key: tuple, the unique key for the database this cache serves
+        :param max_bytes: int, the maximum (estimated) memory in bytes of
+                          all cached results, the least recently used results
+                          are evicted when this is exceeded
+        """
+        self.key = key
+        self.max_bytes = max(int(max_bytes), 0)
+        self.pid = os.getpid()
+        # cached results: key = query key, value = [stamp, result, nbytes]
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        # the generation of each table (key = lower case table name), the
+        #   '*' entry is bumped by writes that could touch any table
+        self.generations = dict()
+        # lock for multi-threaded access
+        self.lock = threading.Lock()
+        # counters (for profiling)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __str__(self):
+        """
+        Standard string return
+        :return:
+        """
+        return 'QueryCache[{0}]'.format(self.key)
+
+    def __repr__(self):
+        """
+        Standard string representation
+        :return:
+        """
+        return self.__str__()
+
+    def owned(self) -> bool:
+        """
+        Check whether this cache belongs to the current process
+
+        :return: bool, True if the cache can be used here
+        """
+        return self.pid == os.getpid()
+
+    def stamp(self, tables: List[str]) -> Tuple[int, ...]:
+        """
+        Get the current generation of a set of tables
+
+        :param tables: list of strings, the (lower case) table names
+
+        :return: tuple, the generation of each table (and of '*')
+        """
+        with self.lock:
+            stamp = [self.generations.get('*', 0)]
+            for table in tables:
+                stamp.append(self.generations.get(table, 0))
+        return tuple(stamp)
+
+    def bump(self, table: Optional[str] = None):
+        """
+        Bump the generation of a table (all tables if table is None)
+        invalidating all results read from it
+
+        :param table: str or None, the (lower case) table name
+
+        :return: None
+        """
+        if table is None:
+            table = '*'
+        with self.lock:
+            self.generations[table] = self.generations.get(table, 0) + 1
+
+    def get(self, key: Tuple[Any, ...], stamp: Any) -> Tuple[bool, Any]:
+        """
+        Get a cached result (only if it was stored with the same stamp)
+
+        :param key: tuple, the query key
+        :param stamp: the current stamp of the tables the query reads
+
+        :return: tuple, 1. whether the result was found, 2. a copy of the
+                 result (None if not found)
+        """
+        with self.lock:
+            entry = self.entries.get(key, None)
+            # deal with no entry
+            if entry is None:
+                self.misses += 1
+                return False, None
+            # deal with an entry from before a write
+            if entry[0] != stamp:
+                self.entries.pop(key)
+                self.nbytes -= entry[2]
+                self.misses += 1
+                self.invalidations += 1
+                return False, None
+            # mark as most recently used
+            self.entries.move_to_end(key)
+            self.hits += 1
+            result = entry[1]
+        # return a copy (the caller may modify the result)
+        return True, _copy_result(result)
+
+    def put(self, key: Tuple[Any, ...], stamp: Any, result: Any):
+        """
+        Store a query result (a copy is stored), evicting the least recently
+        used results if the cache is full
+
+        :param key: tuple, the query key
+        :param stamp: the stamp of the tables the query read (taken before
+                      the query was run)
+        :param result: the query result
+
+        :return: None
+        """
+        nbytes = _result_nbytes(result)
+        # results larger than the cache are never stored
+        if nbytes > self.max_bytes:
+            return
+        result = _copy_result(result)
+        with self.lock:
+            # remove any previous entry
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.nbytes -= entry[2]
+            # evict least recently used entries until the result fits
+            while self.nbytes + nbytes > self.max_bytes and self.entries:
+                _, entry = self.entries.popitem(last=False)
+                self.nbytes -= entry[2]
+                self.evictions += 1
+            self.entries[key] = [stamp, result, nbytes]
+            self.nbytes += nbytes
+
+    def clear(self):
+        """
+        Remove all cached results (the counters are kept)
+
+        :return: None
+        """
+        with self.lock:
+            self.entries = OrderedDict()
+            self.nbytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the cache counters (for profiling)
+
+        :return: dict, the counters
+        """
+        with self.lock:
+            nqueries = self.hits + self.misses
+            if nqueries > 0:
+                hit_rate = self.hits / nqueries
+            else:
+                hit_rate = 0.0
+            return dict(hits=self.hits, misses=self.misses,
+                        hit_rate=hit_rate, evictions=self.evictions,
+                        invalidations=self.invalidations,
+                        entries=len(self.entries), nbytes=self.nbytes,
+                        max_bytes=self.max_bytes)
+
+
+class QueryStats:
+    def __init__(self):
+        """
+        Records the wall time, number of rows and caller of every query run
+        by this process (for all databases)
+
+        Timings are summed in every active run (see start) - a run is
+        normally a recipe - and queries slower than slow_time are appended
+        to the slow query log file (if set)
+        """
+        self.pid = os.getpid()
+        # the active runs (each a dict, key = (database kind, func, kind),
+        #   value = [number of queries, total time, max time, number of rows])
+        self.runs = []
+        # totals for this process (same format as a run)
+        self.totals = dict()
+        # slow query log settings
+        self.slow_time = None
+        self.slow_path = None
+        self.label = ''
+        # lock for multi-threaded access
+        self.lock = threading.Lock()
+
+    def __str__(self):
+        """
+        Standard string return
+        :return:
+        """
+        return 'QueryStats[{0}]'.format(self.pid)
+
+    def __repr__(self):
+        """
+        Standard string representation
+        :return:
+        """
+        return self.__str__()
+
+    def _check_owned(self):
+        """
+        Forget runs and totals inherited from the parent process (after a
+        fork)
+
+        :return: None
+        """
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.runs = []
+            self.totals = dict()
+
+    def configure(self, slow_time: Optional[float] = None,
+                  slow_path: Optional[str] = None, label: str = ''):
+        """
+        Set up the slow query log
+
+        :param slow_time: float or None, queries that take longer than this
+                          (in seconds) are written to the slow query log (if
+                          None no queries are written)
+        :param slow_path: str or None, the slow query log file (appended to)
+        :param label: str, written with each slow query (i.e. the recipe and
+                      pid)
+
+        :return: None
+        """
+        self.slow_time = slow_time
+        self.slow_path = slow_path
+        self.label = label
+
+    def start(self) -> Dict[Tuple[str, str, str], List[float]]:
+        """
+        Start recording a run (runs may be nested)
+
+        :return: dict, the run storage (pass to stop)
+        """
+        run = dict()
+        with self.lock:
+            self._check_owned()
+            self.runs.append(run)
+        return run
+
+    def stop(self, run: Dict[Tuple[str, str, str], List[float]]
+             ) -> List[List[Any]]:
+        """
+        Stop recording a run
+
+        :param run: dict, the run storage (from start)
+
+        :return: list of lists, the summary rows (database kind, func, kind,
+                 number of queries, total time, max time, number of rows)
+        """
+        with self.lock:
+            if run in self.runs:
+                self.runs.remove(run)
+        return _query_summary(run)
+
+    def summary(self) -> List[List[Any]]:
+        """
+        The summary of all queries run by this process
+
+        :return: list of lists, the summary rows (database kind, func, kind,
+                 number of queries, total time, max time, number of rows)
+        """
+        with self.lock:
+            self._check_owned()
+            return _query_summary(self.totals)
+
+    def record(self, dbkind: str, func: str, kind: str, command: str,
+               duration: float, nrows: int):
+        """
+        Record a query
+
+        :param dbkind: str, the database kind (CALIB/TELLU/FINDEX etc)
+        :param func: str, the function that ran the query (the func passed
+                     to Database.connection)
+        :param kind: str, the kind of query (the kind passed to
+                     Database.connection)
+        :param command: str, the sql command
+        :param duration: float, the wall time of the query in seconds
+        :param nrows: int, the number of rows returned (or written)
+
+        :return: None
+        """
+        key = (str(dbkind), str(func), str(kind))
+        with self.lock:
+            self._check_owned()
+            for storage in [self.totals] + self.runs:
+                entry = storage.get(key, None)
+                if entry is None:
+                    storage[key] = [1, duration, duration, nrows]
+                else:
+                    entry[0] += 1
+                    entry[1] += duration
+                    entry[2] = max(entry[2], duration)
+                    entry[3] += nrows
+        # write slow queries to the slow query log
+        if self.slow_time is not None and duration >= self.slow_time:
+            self._log_slow(key, command, duration, nrows)
+
+    def _log_slow(self, key: Tuple[str, str, str], command: str,
+                  duration: float, nrows: int):
+        """
+        Append a slow query to the slow query log
+
+        :param key: tuple, the database kind, func and kind of the query
+        :param command: str, the sql command
+        :param duration: float, the wall time of the query in seconds
+        :param nrows: int, the number of rows returned (or written)
+
+        :return: None
+        """
+        # deal with no slow query log
+        if self.slow_path is None:
+            return
+        # the command on a single line
+        command = ' '.join(str(command).split())[:SLOW_QUERY_MAX_CHARS]
+        # construct the line
+        values = [Time.now().iso, self.label, key[0], '{0:.3f}s'.format(
+                  duration), '{0} rows'.format(nrows),
+                  '{0}:{1}'.format(key[1], key[2]), _query_caller(), command]
+        line = '\t'.join(map(str, values)) + '\n'
+        # append to the log (a slow query log must never stop a recipe)
+        # noinspection PyBroadException
+        try:
+            with self.lock:
+                with open(self.slow_path, 'a') as logfile:
+                    logfile.write(line)
+        except Exception as _:
+            pass
+
+
+class DatabaseWriterClient:
+    """
+    The connection from a worker process to the writer process
+
+    Writes are sent to the writer process without waiting (unless the
+    database kind is one where ordering matters - then we wait for the
+    writer to apply the write). Any read from this process first waits
+    for all of its queued writes to be applied (so a process always
+    reads its own writes)
+    """
+
+    def __init__(self, address: Any, authkey: bytes, sync_kinds: List[str]):
+        """
+        Connect to the writer process
+
+        :param address: the address of the writer process listener
+        :param authkey: bytes, the authentication key of the listener
+        :param sync_kinds: list of str, the database kinds where we wait for
+                           every write to be applied
+        """
+        # the process this client belongs to (never share between processes)
+        self.pid = os.getpid()
+        # the database kinds where we wait for every write
+        self.sync_kinds = set(sync_kinds)
+        # the address of the writer process
+        self.address = address
+        # connect to the writer
+        self.conn = mp_connection.Client(address, authkey=authkey)
+        # the databases the writer has already been sent
+        self.sent = set()
+        # whether we have writes that may not have been applied yet
+        self.pending = False
+        # message counter (used to match replies to messages)
+        self.count = 0
+
+    def write(self, database: 'Database',
+              commands: List[Tuple[str, Any]]):
+        """
+        Send a set of commands (one transaction) to the writer process
+
+        :param database: Database, the database to write to
+        :param commands: list of tuples, the sql command and its parameter
+                         rows (see Database.transaction)
+
+        :return: None
+        """
+        # the key the writer uses to identify this database
+        key = (database.dbkind,) + tuple(database._pool_key())
+        # only send the database itself the first time
+        dbobj = None if key in self.sent else database
+        # wait for the write when ordering matters for this database kind
+        sync = str(database.dbkind).lower() in self.sync_kinds
+        # or when the caller may need to deal with a duplicate row
+        for command, _ in commands:
+            if PLAIN_INSERT_SQL.match(command) and UHASH_COL in command:
+                sync = True
+        # send the message
+        self.count += 1
+        msgid = self.count if sync else None
+        self.conn.send(('write', key, dbobj, commands, msgid))
+        self.sent.add(key)
+        # either wait for the write or flag that we have pending writes
+        if sync:
+            self._wait(msgid)
+        else:
+            self.pending = True
+
+    def flush(self):
+        """
+        Wait for all writes sent from this process to be applied
+
+        :return: None
+        """
+        # nothing to do if we have no pending writes
+        if not self.pending:
+            return
+        # send the flush message and wait for the reply
+        self.count += 1
+        self.conn.send(('flush', None, None, None, self.count))
+        self._wait(self.count)
+
+    def _wait(self, msgid: int):
+        """
+        Wait for the reply to message msgid (the writer applies messages
+        in order so all earlier writes have also been applied)
+
+        :param msgid: int, the message to wait for
+
+        :raises UniqueEntryException: if a write broke a unique constraint
+        :raises DatabaseError: if a write failed
+        :return: None
+        """
+        # set function name
+        func_name = __NAME__ + '.DatabaseWriterClient._wait()'
+        # wait for the reply to our message
+        while True:
+            try:
+                replyid, errors = self.conn.recv()
+            except (EOFError, OSError) as e:
+                errors = [(type(e).__name__, 'Lost writer process',
+                           'None', 'None')]
+                break
+            if replyid == msgid:
+                break
+        # all our writes have been applied
+        self.pending = False
+        # deal with no errors
+        if len(errors) == 0:
+            return
+        # raise the first error
+        errtype, errmsg, command, path = errors[0]
+        if errtype == UniqueEntryException.__name__:
+            raise UniqueEntryException(errmsg)
+        # log error: Error Type: Error message \n\t Command:
+        ecode = '00-002-00032'
+        emsg = drs_base.BETEXT[ecode]
+        eargs = [errtype, errmsg, command, path, func_name]
+        # log base error
+        raise drs_base.base_error(ecode, emsg, 'error', args=eargs,
+                                  exceptionname='DatabaseError',
+                                  exception=DatabaseError)
+
+    def close(self):
+        """
+        Wait for pending writes and close the connection to the writer
+
+        :return: None
+        """
+        try:
+            self.flush()
+        finally:
+            self.conn.close()
+
+
+class DatabaseWriter:
+    """
+    A single process that applies all database inserts/updates sent by
+    parallel worker processes (in batched transactions) - so workers never
+    compete for database locks. Started by the process that starts the
+    workers, workers find it via the WRITER_ENV environment variable
+    """
+
+    def __init__(self, sync_kinds: Optional[List[str]] = None):
+        """
+        Set up the writer (the process is started with DatabaseWriter.start)
+
+        :param sync_kinds: list of str, the database kinds where workers wait
+                           for every write to be applied
+        """
+        # the database kinds where workers wait for every write
+        if sync_kinds is None:
+            sync_kinds = []
+        self.sync_kinds = [str(kind).strip().lower() for kind in sync_kinds]
+        # the writer process and the pipe used to control it
+        self.process = None
+        self.control = None
+
+    def start(self):
+        """
+        Start the writer process and tell child processes how to reach it
+
+        :return: None
+        """
+        # set function name
+        func_name = __NAME__ + '.DatabaseWriter.start()'
+        # a random key so only our workers can connect
+        authkey = os.urandom(16)
+        # start the writer (spawned so it holds no copies of our connections)
+        context = multiprocessing.get_context('spawn')
+        self.control, child = context.Pipe()
+        self.process = context.Process(target=_writer_main,
+                                       args=(child, authkey), daemon=True)
+        self.process.start()
+        # wait for the writer to tell us where it is listening
+        if not self.control.poll(WRITER_TIMEOUT):
+            self.process.terminate()
+            ecode = '00-002-00032'
+            emsg = drs_base.BETEXT[ecode]
+            eargs = ['TimeoutError', 'Writer process did not start', 'None',
+                     'None', func_name]
+            # log base error
+            raise drs_base.base_error(ecode, emsg, 'error', args=eargs,
+                                      exceptionname='DatabaseError',
+                                      exception=DatabaseError)
+        address = self.control.recv()
+        # child processes inherit this (this process keeps writing directly)
+        value = dict(address=address, authkey=authkey.hex(),
+                     sync_kinds=self.sync_kinds, owner=os.getpid())
+        os.environ[WRITER_ENV] = json.dumps(value)
+
+    def stop(self):
+        """
+        Apply all outstanding writes and stop the writer process
+
+        :return: None
+        """
+        # child processes started from now on write directly
+        if WRITER_ENV in os.environ:
+            del os.environ[WRITER_ENV]
+        # deal with writer not running
+        if self.process is None:
+            return
+        # tell the writer to stop (once all received writes are applied)
+        # noinspection PyBroadException
+        try:
+            self.control.send('stop')
+            self.control.poll(WRITER_TIMEOUT)
+        except Exception as _:
+            pass
+        # wait for the process to finish
+        self.process.join(WRITER_TIMEOUT)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.control.close()
+        self.process, self.control = None, None
+
+
+class DatabaseSnapshot:
+    """
+    Read-only copies of databases written once (per group of recipe runs)
+    by the process that starts the workers - workers read from these
+    (memory mapped, so the pages are shared between workers) instead of
+    every worker querying the databases. Writes always go to the real
+    databases
+    """
+
+    def __init__(self, databases: List['Database']):
+        """
+        Set up the snapshot storage (files are written with
+        DatabaseSnapshot.update)
+
+        :param databases: list of Database instances to snapshot
+        """
+        # the databases to snapshot
+        self.databases = list(databases)
+        # the directory holding the snapshot files
+        self.directory = None
+        # the snapshot file, the main table and the stamp of the database
+        #   it was made from (by database kind)
+        self.paths = dict()
+        self.tnames = dict()
+        self.stamps = dict()
+        # a counter to give each snapshot file a new name
+        self.count = 0
+
+    def update(self):
+        """
+        Write a snapshot of each database (if it changed since the last
+        snapshot) and tell child processes where the snapshots are (workers
+        started from now on use the new snapshot, workers that have not
+        opened the old snapshot yet read the databases)
+
+        :return: None
+        """
+        # use shared memory for the snapshot files if we can
+        if self.directory is None:
+            shm = '/dev/shm'
+            if os.path.isdir(shm) and os.access(shm, os.W_OK):
+                tmpdir = shm
+            else:
+                tmpdir = None
+            self.directory = tempfile.mkdtemp(prefix='apero_snapshot_',
+                                              dir=tmpdir)
+        # loop around databases
+        for database in self.databases:
+            kind = database.dbkind
+            # skip databases that did not change since the last snapshot
+            stamp = _snapshot_stamp(database)
+            if stamp is not None and self.stamps.get(kind, None) == stamp:
+                continue
+            # write the new snapshot (to a new file - the old one is removed)
+            self.count += 1
+            filename = '{0}_{1}.db'.format(kind, self.count)
+            path = os.path.join(self.directory, filename)
+            database.snapshot(path)
+            oldpath = self.paths.get(kind, None)
+            self.paths[kind], self.stamps[kind] = path, stamp
+            self.tnames[kind] = database.tname
+            if oldpath is not None and os.path.exists(oldpath):
+                # the file may still be open (i.e. on windows)
+                try:
+                    os.remove(oldpath)
+                except OSError:
+                    pass
+        # child processes inherit this (this process reads the databases)
+        value = dict(paths=self.paths, tnames=self.tnames,
+                     owner=os.getpid())
+        os.environ[SNAPSHOT_ENV] = json.dumps(value)
+
+    def stop(self):
+        """
+        Stop using the snapshots and remove the snapshot files
+
+        :return: None
+        """
+        # child processes started from now on read the databases
+        if SNAPSHOT_ENV in os.environ:
+            del os.environ[SNAPSHOT_ENV]
+        # remove the snapshot files
+        if self.directory is not None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+        self.directory = None
+        self.paths, self.tnames, self.stamps = dict(), dict(), dict()
+
+
 class Database:
     """
     Create an object for reading and writing to a database.
@@ -163,6 +1035,21 @@ class Database:
         self.backup_path = None
         # have a main table name
         self.tname = 'main'
+        # connection pool settings (pool itself is created per process)
+        self.use_pool = False
+        self.pool_size = 1
+        self.pool_thread_bound = False
+        self._pool = None
+        # the parameter placeholder used in parameterised sql commands
+        self.placeholder = '?'
+        # the NULL-safe equality operator (NULL matches NULL)
+        self.null_safe_equal = 'IS'
+        # the kind of database (CALIB/TELLU/FINDEX etc) used for query stats
+        self.dbkind = 'UNKNOWN'
+        # query result cache settings (the cache itself is shared by all
+        #   databases with the same cache key in a process)
+        self.use_cache = False
+        self.cache_size = QUERY_CACHE_SIZE
 
     def connection(self, host: Union[str, None] = None,
                    user: Union[str, None] = None,
@@ -196,8 +1083,8 @@ class Database:
         For when we have to pickle the class
         :return:
         """
-        # what to exclude from state
-        exclude = []
+        # what to exclude from state (connections cannot be pickled)
+        exclude = ['_pool']
         # need a dictionary for pickle
         state = dict()
         for key, item in self.__dict__.items():
@@ -217,28 +1104,350 @@ class Database:
         _ = __NAME__ + 'Database.__setstate__()'
         # update dict with state
         self.__dict__.update(state)
+        # connection pool is re-initialised in this process on first use
+        self._pool = None
+
+    def __str__(self):
+        """
+        Standard string return
+        :return:
+        """
+        return 'Database[{0}]'.format(self.path)
+
+    def __repr__(self):
+        """
+        Standard string representation
+        :return:
+        """
+        return self.__str__()
+
+    def cursor(self, conn):
+        """
+        Attempt to retrieve a database cursor
+
+        :return: The cursor
+        """
+        return conn.cursor()
+
+    def _stream_cursor(self, conn):
+        """
+        Get a cursor that reads rows from the database as they are fetched
+        (used by Database.iter_columns)
+
+        :return: The cursor
+        """
+        return self.cursor(conn)
+
+    # connection pool methods
+    def acquire(self, func: Union[str, None] = None,
+                kind: Union[str, None] = None) -> Any:
+        """
+        Get a connection to the database - from the connection pool if pooling
+        is switched on (reusing a persistent connection) otherwise a new
+        connection. Every acquired connection must be given back with
+        Database.release()
+
+        :param func: str, the function name that called the connection
+        :param kind: str, a description of the use of the connection
+
+        :return: the database connection
+        """
+        # make sure writes this process sent to the writer process are
+        #   applied before we use the database directly
+        client = writer_client()
+        if client is not None:
+            client.flush()
+        # get the pool for this process (None if not pooling)
+        pool = self._get_pool()
+        # try to get an idle connection from the pool
+        if pool is not None:
+            conn = pool.get(self._ping)
+            if conn is not None:
+                return conn
+        # else open a new connection
+        conn = self.connection(func=func, kind=kind)
+        # register the connection with the pool
+        if pool is not None:
+            pool.register(conn)
+        return conn
+
+    def release(self, conn: Any, discard: bool = False):
+        """
+        Give back a connection acquired with Database.acquire() - the
+        connection is kept open in the pool if pooling is switched on,
+        otherwise it is closed
+
+        :param conn: the database connection
+        :param discard: bool, if True the connection is not reused (i.e.
+                        after an error)
+
+        :return: None
+        """
+        # get the pool for this process (None if not pooling)
+        pool = self._get_pool()
+        # deal with not pooling
+        if pool is None:
+            conn.close()
+            return
+        # deal with connections we should not reuse
+        if discard:
+            # noinspection PyBroadException
+            try:
+                conn.rollback()
+            except Exception as _:
+                pass
+            pool.discard(conn)
+            return
+        # try to put connection back into the pool (if full close it)
+        if not pool.put(conn):
+            conn.close()
+
+    def close_pool(self):
+        """
+        Close all idle connections held by this databases connection pool
+
+        :return: None
+        """
+        if self._pool is not None:
+            self._pool.close()
+
+    def _pool_key(self) -> Tuple[Any, ...]:
+        """
+        The key that identifies which connection pool this database uses
+        (databases with the same key share connections)
+
+        :return: tuple, the pool key
+        """
+        return self.classname, str(self.path)
+
+    def _forward_writes(self, commands: List[Tuple[str, Any]]) -> bool:
+        """
+        Send a set of commands (one transaction) to the writer process if
+        one is running for this process (see DatabaseWriter) - only commands
+        that change rows are sent (changes to the tables themselves are
+        always run directly)
+
+        :param commands: list of tuples, the sql command and its parameter
+                         rows (see Database.transaction)
+
+        :return: bool, True if the commands were sent to the writer process
+        """
+        # get the writer client for this process
+        client = writer_client()
+        # deal with no writer process
+        if client is None:
+            return False
+        # only commands that change rows are sent to the writer
+        for command, _ in commands:
+            if not DML_SQL.match(command):
+                return False
+        # send the commands
+        client.write(self, commands)
+        # invalidate cached results read from the tables written to
+        for command, _ in commands:
+            self._bump_generation(command)
+        return True
+
+    def _get_pool(self) -> Union[ConnectionPool, None]:
+        """
+        Get the connection pool for this process (creating it if required)
+
+        :return: the ConnectionPool or None if not pooling
+        """
+        # deal with not pooling
+        if not self.use_pool:
+            return None
+        # if we have a pool owned by this process (and thread) use it
+        if self._pool is not None and self._pool.owned():
+            return self._pool
+        # else get the pool from the process wide storage
+        self._pool = get_connection_pool(self._pool_key(), self.pool_size,
+                                         thread_bound=self.pool_thread_bound)
+        return self._pool
+
+    def _ping(self, conn: Any) -> bool:
+        """
+        Health check for an idle pooled connection
+
+        :param conn: the database connection
+
+        :return: bool, True if the connection can be reused
+        """
+        _ = conn
+        return True
+
+    def _record_query(self, command: str, conargs: Dict[str, Any],
+                      start: float, nrows: int):
+        """
+        Record the wall time of a query in the query stats (QUERY_STATS)
+
+        :param command: str, the sql command
+        :param conargs: dict, the func and kind passed to the connection
+        :param start: float, the time.perf_counter() when the query started
+        :param nrows: int, the number of rows returned (or written)
+
+        :return: None
+        """
+        duration = time.perf_counter() - start
+        QUERY_STATS.record(self.dbkind, conargs.get('func', 'None'),
+                           conargs.get('kind', 'None'), command, duration,
+                           nrows)
+
+    # query cache methods
+    def _cache_key(self) -> Tuple[Any, ...]:
+        """
+        The key that identifies which query cache this database uses
+        (databases with the same key share cached results and generations)
+
+        :return: tuple, the cache key
+        """
+        return self.classname, str(self.path)
+
+    def enable_cache(self, max_bytes: Optional[int] = None):
+        """
+        Cache the results of Database.get and Database.count (opt-in) - a
+        cached result is only returned when no table it reads from has been
+        written to since it was cached
+
+        :param max_bytes: int or None, the maximum memory (in bytes) used by
+                          cached results (defaults to QUERY_CACHE_SIZE)
+
+        :return: None
+        """
+        if max_bytes is not None:
+            self.cache_size = max_bytes
+        self.use_cache = True
+        # make sure the cache exists (so writes from now on are tracked)
+        self._get_cache(create=True)
+
+    def disable_cache(self):
+        """
+        Stop caching the results of Database.get and Database.count
+        (writes still invalidate the shared cache)
+
+        :return: None
+        """
+        self.use_cache = False
+
+    def _get_cache(self, create: bool = False) -> Union[QueryCache, None]:
+        """
+        Get the query cache for this database from the process wide storage
+
+        :param create: bool, if True create the cache if there is none
+
+        :return: the QueryCache or None if there is no cache
+        """
+        key = self._cache_key()
+        cache = QUERY_CACHES.get(key, None)
+        # never use a cache inherited from the parent process (writes made
+        #   by the parent after the fork are not tracked)
+        if cache is not None and not cache.owned():
+            QUERY_CACHES.pop(key, None)
+            cache = None
+        # create a new cache if required
+        if cache is None and create:
+            cache = QueryCache(key, max_bytes=self.cache_size)
+            QUERY_CACHES[key] = cache
+        return cache
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Get the query cache counters for this database (for profiling)
 
-    def __str__(self):
+        :return: dict, the counters (hits, misses, hit_rate, evictions,
+                 invalidations, entries, nbytes, max_bytes) - empty if there
+                 is no cache
         """
-        Standard string return
-        :return:
+        cache = self._get_cache()
+        if cache is None:
+            return dict()
+        return cache.stats()
+
+    def clear_cache(self):
         """
-        return 'Database[{0}]'.format(self.path)
+        Remove all cached query results for this database
 
-    def __repr__(self):
+        :return: None
         """
-        Standard string representation
-        :return:
+        cache = self._get_cache()
+        if cache is not None:
+            cache.clear()
+
+    def _external_stamp(self) -> Any:
         """
-        return self.__str__()
+        A cheap stamp that changes when another process writes to the
+        database (overridden by SQLiteDatabase) - None when writes from
+        other processes cannot be detected cheaply
 
-    def cursor(self, conn):
+        :return: the stamp
         """
-        Attempt to retrieve a database cursor
+        return None
 
-        :return: The cursor
+    def _bump_generation(self, command: Optional[str] = None,
+                         table: Optional[str] = None):
         """
-        return conn.cursor()
+        Bump the generation of the table written to by command (or of table)
+        so that cached results read from it are no longer returned
+
+        :param command: str or None, the sql command that was run
+        :param table: str or None, the table written to (if known)
+
+        :return: None
+        """
+        # commands that do not change data
+        if table is None and command is not None and READ_SQL.match(command):
+            return
+        # remember this process has written to this kind of database
+        WRITTEN_KINDS.add(self.dbkind)
+        cache = self._get_cache()
+        # nothing to invalidate if there is no cache
+        if cache is None:
+            return
+        # work out the table from the command
+        if table is None and command is not None:
+            # commands that change a single table
+            match = WRITE_SQL.match(command)
+            if match is not None:
+                table = match.group(1)
+        # bump the table (or all tables if we do not know which table)
+        if table is None:
+            cache.bump()
+        else:
+            cache.bump(table.lower())
+
+    def _cached_query(self, command: str, kind: str, query: Any) -> Any:
+        """
+        Run a read only query through the query cache (if enabled)
+
+        :param command: str, the sql command (used as the cache key)
+        :param kind: str, the kind of result returned by query (part of the
+                     cache key)
+        :param query: function, runs the query and returns the result
+
+        :return: the query result
+        """
+        # deal with no cache
+        if not self.use_cache:
+            return query()
+        cache = self._get_cache(create=True)
+        # normalise the command (white space does not change the query)
+        key = (' '.join(command.split()), kind)
+        # the stamp must be taken before the query is run (so a write during
+        #   the query leaves a stale stamp rather than a stale result)
+        lcommand = key[0].lower()
+        tables = []
+        for table in self.tables:
+            if re.search(r'\b{0}\b'.format(re.escape(table)), lcommand):
+                tables.append(table)
+        stamp = (cache.stamp(tables), self._external_stamp())
+        # try to get the result from the cache
+        found, result = cache.get(key, stamp)
+        if found:
+            return result
+        # else run the query and cache the result
+        result = query()
+        cache.put(key, stamp, result)
+        return result
 
     # get / set / execute / add methods
     def execute(self, command: str, fetch: bool) -> Any:
@@ -253,31 +1462,36 @@ class Database:
         """
         # set function name
         func_name = __NAME__ + '.Database.execute()'
+        # send writes to the writer process (if one is running)
+        if not fetch and self._forward_writes([(command, None)]):
+            return None
         # print input if verbose
         if self._verbose_:
             print("SQL INPUT: ", command)
         # get cursor
         conargs = dict(func=func_name, kind='execute:_execute')
-        conn = self.connection(**conargs)
+        start = time.perf_counter()
+        conn = self.acquire(**conargs)
         cursor = self.cursor(conn)
         # try to execute SQL command
         try:
             result = self._execute(cursor, command)
             # commit and close
-            conn.commit()
+            self._commit(conn)
             cursor.close()
-            conn.close()
+            self.release(conn)
         # pass unique exception upwards
         except UniqueEntryException as e:
-            # close
+            # close (connection is still healthy so roll back and reuse it)
             cursor.close()
-            conn.close()
+            conn.rollback()
+            self.release(conn)
             raise UniqueEntryException(str(e))
         # catch all errors and pipe to database error
         except Exception as e:
             # close
             cursor.close()
-            conn.close()
+            self.release(conn, discard=True)
             # log error: Error Type: Error message \n\t Command:
             ecode = '00-002-00032'
             emsg = drs_base.BETEXT[ecode]
@@ -286,12 +1500,27 @@ class Database:
             raise drs_base.base_error(ecode, emsg, 'error', args=eargs,
                                       exceptionname='DatabaseError',
                                       exception=DatabaseError)
+        # record the query stats
+        self._record_query(command, conargs, start, _result_nrows(result))
+        # invalidate cached results read from the table written to
+        self._bump_generation(command)
         # print output of sql command if verbose
         if self._verbose_:
             print("SQL OUTPUT:", result)
         # return the sql result
         return result
 
+    def _commit(self, conn: Any):
+        """
+        Commit a transaction (overridden by SQLiteDatabase to deal with
+        locked databases)
+
+        :param conn: the database connection
+
+        :return: None
+        """
+        conn.commit()
+
     def _execute(self, cursor: sqlite3.Cursor, command: str,
                  fetch: bool = True):
         """
@@ -310,6 +1539,326 @@ class Database:
         # return result
         return result
 
+    def executemany(self, command: str, rows: List[Tuple[Any, ...]]):
+        """
+        Execute a parameterised SQL command once for every row in rows
+        (in a single transaction)
+
+        :param command: str, the SQL command to be run (with placeholders
+                        given by Database.placeholder)
+        :param rows: list of tuples, the parameters for each execution
+
+        :return: None
+        """
+        self.transaction([(command, rows)])
+
+    def transaction(self, commands: List[Tuple[str, List[Tuple[Any, ...]]]]):
+        """
+        Execute several parameterised SQL commands (each once for every row
+        of its parameters) in a single transaction - either all commands are
+        committed or none are
+
+        :param commands: list of tuples, each tuple is the SQL command (with
+                         placeholders given by Database.placeholder) and the
+                         list of parameter tuples to run it with (or None
+                         to run a command without placeholders once)
+
+        :return: None
+        """
+        # set function name
+        func_name = __NAME__ + '.Database.transaction()'
+        # send the commands to the writer process (if one is running)
+        if self._forward_writes(commands):
+            return
+        # print input if verbose
+        if self._verbose_:
+            for command, rows in commands:
+                print("SQL INPUT: ", command,
+                      '[{0} rows]'.format(_command_nrows(rows)))
+        # get cursor
+        conargs = dict(func=func_name, kind='transaction:_executemany')
+        start = time.perf_counter()
+        conn = self.acquire(**conargs)
+        cursor = self.cursor(conn)
+        # the command currently being run (for error reporting)
+        command = ''
+        # try to execute SQL commands
+        try:
+            # start the transaction (when there is more than one command)
+            if len(commands) > 1:
+                self._begin(cursor)
+            for command, rows in commands:
+                # commands without placeholders are run once
+                if rows is None:
+                    self._execute(cursor, command, fetch=False)
+                    continue
+                # skip commands without any rows
+                if len(rows) == 0:
+                    continue
+                self._executemany(cursor, command, rows)
+            # commit and close
+            self._commit(conn)
+            cursor.close()
+            self.release(conn)
+        # pass unique exception upwards (nothing in this transaction is added)
+        except UniqueEntryException as e:
+            cursor.close()
+            conn.rollback()
+            self.release(conn)
+            raise UniqueEntryException(str(e))
+        # catch all errors and pipe to database error
+        except Exception as e:
+            # close
+            cursor.close()
+            self.release(conn, discard=True)
+            # log error: Error Type: Error message \n\t Command:
+            ecode = '00-002-00032'
+            emsg = drs_base.BETEXT[ecode]
+            eargs = [type(e), str(e), command, self.path, func_name]
+            # log base error
+            raise drs_base.base_error(ecode, emsg, 'error', args=eargs,
+                                      exceptionname='DatabaseError',
+                                      exception=DatabaseError)
+        # record the query stats (one entry for the whole transaction)
+        nrows = sum(_command_nrows(rows) for _, rows in commands)
+        self._record_query(';'.join(command for command, _ in commands),
+                           conargs, start, nrows)
+        # invalidate cached results read from the tables written to
+        for command, rows in commands:
+            if rows is None or len(rows) > 0:
+                self._bump_generation(command)
+
+    def execute_columns(self, command: str,
+                        chunk_size: Optional[int] = None
+                        ) -> Tuple[List[str], List[np.ndarray]]:
+        """
+        Execute an SQL query and return the result column by column
+        (the rows are fetched in chunks of chunk_size rows and each chunk is
+        converted straight into column arrays - the full result is never
+        held as a list of row tuples)
+
+        :param command: str, The SQL command to be run.
+        :param chunk_size: int or None, the number of rows fetched at once
+                           (defaults to FETCH_CHUNK_SIZE)
+
+        :returns: tuple, 1. the list of column names, 2. the list of columns
+                  (numpy object arrays, see _typed_column)
+        """
+        # set function name
+        func_name = __NAME__ + '.Database.execute_columns()'
+        # print input if verbose
+        if self._verbose_:
+            print("SQL INPUT: ", command)
+        # deal with no chunk size
+        if chunk_size is None:
+            chunk_size = FETCH_CHUNK_SIZE
+        # get cursor
+        conargs = dict(func=func_name, kind='execute_columns:_execute')
+        start = time.perf_counter()
+        conn = self.acquire(**conargs)
+        cursor = self.cursor(conn)
+        # try to execute SQL command
+        try:
+            self._execute(cursor, command, fetch=False)
+            # get the column names from the cursor
+            colnames = [desc[0] for desc in cursor.description]
+            chunks = [[] for _ in colnames]
+            # fetch the rows in chunks and convert to columns
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if len(rows) == 0:
+                    break
+                for it, values in enumerate(zip(*rows)):
+                    chunks[it].append(np.array(values, dtype=object))
+                del rows
+            # join the chunks
+            columns = []
+            for chunk in chunks:
+                if len(chunk) == 0:
+                    columns.append(np.array([], dtype=object))
+                else:
+                    columns.append(np.concatenate(chunk))
+            del chunks
+            # commit and close
+            self._commit(conn)
+            cursor.close()
+            self.release(conn)
+        # catch all errors and pipe to database error
+        except Exception as e:
+            # close
+            cursor.close()
+            self.release(conn, discard=True)
+            # log error: Error Type: Error message \n\t Command:
+            ecode = '00-002-00032'
+            emsg = drs_base.BETEXT[ecode]
+            eargs = [type(e), str(e), command, self.path, func_name]
+            # log base error
+            raise drs_base.base_error(ecode, emsg, 'error', args=eargs,
+                                      exceptionname='DatabaseError',
+                                      exception=DatabaseError)
+        # record the query stats
+        if len(columns) > 0:
+            nrows = len(columns[0])
+        else:
+            nrows = 0
+        self._record_query(command, conargs, start, nrows)
+        # print output of sql command if verbose
+        if self._verbose_:
+            print("SQL OUTPUT: {0} rows".format(nrows))
+        # return the column names and columns
+        return colnames, columns
+
+    def iter_columns(self, command: str, chunk_size: Optional[int] = None
+                     ) -> Iterator[Tuple[List[str], List[np.ndarray]]]:
+        """
+        Execute an SQL query and stream the result in chunks of rows, each
+        chunk given column by column (the cursor stays open on its own
+        connection until the last chunk has been read, so the full result
+        is never held in memory)
+
+        :param command: str, The SQL command to be run.
+        :param chunk_size: int or None, the number of rows per chunk
+                           (defaults to FETCH_CHUNK_SIZE)
+
+        :returns: iterator of tuples, 1. the list of column names, 2. the
+                  list of columns for this chunk (numpy object arrays)
+        """
+        # set function name
+        func_name = __NAME__ + '.Database.iter_columns()'
+        # print input if verbose
+        if self._verbose_:
+            print("SQL INPUT: ", command)
+        # deal with no chunk size
+        if chunk_size is None:
+            chunk_size = FETCH_CHUNK_SIZE
+        chunk_size = max(int(chunk_size), 1)
+        # get cursor (on a connection only used by this iterator)
+        conargs = dict(func=func_name, kind='iter_columns:_execute')
+        start = time.perf_counter()
+        conn = self.acquire(**conargs)
+        cursor = self._stream_cursor(conn)
+        # the connection is only reused if all rows were read
+        discard = True
+        nrows = 0
+        try:
+            try:
+                self._execute(cursor, command, fetch=False)
+                # get the column names from the cursor
+                colnames = [desc[0] for desc in cursor.description]
+            # catch all errors and pipe to database error
+            except Exception as e:
+                # log error: Error Type: Error message \n\t Command:
+                ecode = '00-002-00032'
+                emsg = drs_base.BETEXT[ecode]
+                eargs = [type(e), str(e), command, self.path, func_name]
+                # log base error
+                raise drs_base.base_error(ecode, emsg, 'error', args=eargs,
+                                          exceptionname='DatabaseError',
+                                          exception=DatabaseError)
+            # fetch the rows in chunks and convert to columns
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if len(rows) == 0:
+                    break
+                nrows += len(rows)
+                columns = [np.array(values, dtype=object)
+                           for values in zip(*rows)]
+                del rows
+                yield colnames, columns
+            # all rows read - we can keep the connection
+            self._commit(conn)
+            discard = False
+        finally:
+            # closing a streaming cursor with unread rows may fail (the
+            #   connection is discarded in that case anyway)
+            # noinspection PyBroadException
+            try:
+                cursor.close()
+            except Exception as _:
+                pass
+            self.release(conn, discard=discard)
+        # record the query stats
+        self._record_query(command, conargs, start, nrows)
+        # print output of sql command if verbose
+        if self._verbose_:
+            print("SQL OUTPUT: {0} rows".format(nrows))
+
+    def iter_pandas(self, command: str, chunk_size: Optional[int] = None
+                    ) -> Iterator[pd.DataFrame]:
+        """
+        Execute an SQL query and stream the result as pandas dataframes of
+        at most chunk_size rows (see Database.iter_columns)
+
+        :param command: str, The SQL command to be run.
+        :param chunk_size: int or None, the number of rows per chunk
+                           (defaults to FETCH_CHUNK_SIZE)
+
+        :returns: iterator of pandas dataframes
+        """
+        for colnames, columns in self.iter_columns(command, chunk_size):
+            yield _columns_to_pandas(colnames, columns)
+
+    def _begin(self, cursor: Any):
+        """
+        Start a transaction of several commands (overridden by
+        SQLiteDatabase to take the write lock before the first command)
+
+        :param cursor: database cursor (self.cursor())
+
+        :return: None
+        """
+        _ = cursor
+
+    def _executemany(self, cursor: Any, command: str,
+                     rows: List[Tuple[Any, ...]]):
+        """
+        Dummy function to try to catch database errors during executemany
+
+        :param cursor: database cursor (self.cursor())
+        :param command: str, The parameterised SQL command to be run.
+        :param rows: list of tuples, the parameters for each execution
+
+        :return: None
+        """
+        cursor.executemany(command, rows)
+
+    def generation(self, table: Optional[str] = None) -> Union[str, None]:
+        """
+        A stamp that changes whenever the database (table) changes - used to
+        check whether something cached from the database is still valid
+
+        :param table: str, the name of the table (if required)
+
+        :return: str, the stamp (or None if this database cannot provide one)
+        """
+        _ = table
+        return None
+
+    def snapshot(self, path: str):
+        """
+        Copy all tables of the database into a new SQLite database file
+        (read by worker processes instead of this database - see
+        DatabaseSnapshot)
+
+        :param path: str, the path of the SQLite database file to create
+
+        :return: None
+        """
+        with closing(sqlite3.connect(path)) as conn:
+            for table in self.tables:
+                command = 'SELECT * FROM {0}'.format(table)
+                # stream the table into the snapshot
+                empty = True
+                for chunk in self.iter_pandas(command):
+                    chunk.to_sql(table, conn, if_exists='append', index=False)
+                    empty = False
+                # empty tables still need their columns
+                if empty:
+                    colnames = self.colnames('*', table=table)
+                    pd.DataFrame(columns=colnames).to_sql(table, conn,
+                                                          index=False)
+            conn.commit()
+
     def count(self, table: Optional[str] = None,
               condition: Optional[str] = None) -> int:
         """
@@ -347,8 +1896,9 @@ class Database:
                                           exception=DatabaseError)
 
             command += " WHERE {} ".format(condition)
-        # execute result
-        result = self.execute(command, fetch=True)[0][0]
+        # execute result (through the query cache if enabled)
+        result = self._cached_query(
+            command, 'count', lambda: self.execute(command, fetch=True)[0][0])
         # return result
         return int(result)
 
@@ -461,6 +2011,97 @@ class Database:
         """
         # set function name
         func_name = __NAME__ + '.Database.get()'
+        # construct the command
+        command = self._select_command(columns, table, condition, sort_by,
+                                       sort_descending, max_rows, groupby,
+                                       func_name)
+        # ---------------------------------------------------------------------
+        # if a pandas table, numpy array or astropy table is requested run
+        #   the query once and build the columns directly
+        if return_pandas or return_array or return_table:
+            # if pandas table requested return it as one
+            if return_pandas:
+                kind = 'pandas'
+            # if numpy array requested return it as one
+            elif return_array:
+                kind = 'array'
+            # else astropy table requested
+            else:
+                kind = 'table'
+            return self._cached_query(command, kind,
+                                      lambda: self._get_columns(command, kind))
+        # else we execute natively
+        else:
+            # just return the result as is (a tuple)
+            return self._cached_query(
+                command, 'tuple', lambda: self.execute(command, fetch=True))
+
+    def get_iter(self, columns: str, table: Optional[str] = None,
+                 condition: Optional[str] = None,
+                 sort_by: Optional[str] = None, sort_descending: bool = True,
+                 max_rows: Optional[int] = None, groupby: Optional[str] = None,
+                 chunk_size: Optional[int] = None, return_array: bool = False
+                 ) -> Iterator[Union[pd.DataFrame, np.ndarray]]:
+        """
+        Retrieves data from the database as Database.get does but streams it
+        in chunks of at most chunk_size rows (read from an unbuffered cursor
+        so the full result is never held in memory). The query cache is not
+        used.
+
+        :param columns: a string containing the comma-separated columns to
+                        retrieve from the database ("*" for all columns)
+        :param table: A str which specifies which table within the database to
+                      retrieve data from.  If there is only one table to pick
+                      from, this may be left as None to use it automatically.
+        :param condition: Filter results using a SQL conditions string
+                          (If None, no results will be filtered out)
+        :param sort_by: A str to sort the results by (If None, the results are
+                        not sorted)
+        :param sort_descending: Whether to sort the outputs ascending or
+                                descending
+        :param max_rows: The number of rows to truncate the output to.
+        :param groupby: str or None, if set sets the group by sql criteria
+        :param chunk_size: int or None, the number of rows per chunk
+                           (defaults to FETCH_CHUNK_SIZE)
+        :param return_array: bool, if True each chunk is a numpy array
+                             otherwise each chunk is a pandas table
+
+        :returns: iterator of pandas tables (or numpy arrays)
+        """
+        # set function name
+        func_name = __NAME__ + '.Database.get_iter()'
+        # construct the command
+        command = self._select_command(columns, table, condition, sort_by,
+                                       sort_descending, max_rows, groupby,
+                                       func_name)
+        # stream the chunks
+        for colnames, chunk in self.iter_columns(command, chunk_size):
+            if return_array:
+                yield _columns_to_array(chunk)
+            else:
+                yield _columns_to_pandas(colnames, chunk)
+
+    def _select_command(self, columns: str, table: Optional[str] = None,
+                        condition: Optional[str] = None,
+                        sort_by: Optional[str] = None,
+                        sort_descending: bool = True,
+                        max_rows: Optional[int] = None,
+                        groupby: Optional[str] = None,
+                        func_name: Optional[str] = None) -> str:
+        """
+        Construct the SELECT command for Database.get and Database.get_iter
+
+        :param columns: str, the comma-separated columns to retrieve
+        :param table: str or None, the table (inferred if None)
+        :param condition: str or None, the SQL WHERE condition
+        :param sort_by: str or None, the column(s) to sort by
+        :param sort_descending: bool, whether to sort descending
+        :param max_rows: int or None, the number of rows to truncate to
+        :param groupby: str or None, the SQL group by criteria
+        :param func_name: str or None, the function name for errors
+
+        :return: str, the sql command
+        """
         # infer table name
         table = self._infer_table_(table)
         # construct basic command SELECT {COLUMNS} FROM {TABLE}
@@ -508,23 +2149,29 @@ class Database:
                                           exception=DatabaseError)
             # add LIMIT command
             command += " LIMIT {}".format(max_rows)
-        # ---------------------------------------------------------------------
-        # if a pandas table is requested use the _to_pandas method to
-        #  execute the command
-        if return_pandas:
-            return self._to_pandas(command)
-        # else we execute natively
-        else:
-            result = self.execute(command, fetch=True)
-            # if numpy array requested return it as one
-            if return_array:
-                return np.asarray(result)
-            # if astropy table request return it as one (need the cursor for
-            #    columns)
-            if return_table:
-                return self._to_astropy_table(self._to_pandas(command))
-            # else just return the result as is (a tuple)
-            return result
+        # return the command
+        return command
+
+    def _get_columns(self, command: str, kind: str
+                     ) -> Union[pd.DataFrame, np.ndarray, Table]:
+        """
+        Run a query once and build the requested result directly from the
+        columns
+
+        :param command: str, the sql command to run
+        :param kind: str, 'pandas', 'array' or 'table'
+
+        :return: the pandas table, numpy array or astropy table
+        """
+        colnames, columns = self.execute_columns(command)
+        # if pandas table requested return it as one
+        if kind == 'pandas':
+            return _columns_to_pandas(colnames, columns)
+        # if numpy array requested return it as one
+        if kind == 'array':
+            return _columns_to_array(columns)
+        # else astropy table requested
+        return self._to_astropy_table(_columns_to_pandas(colnames, columns))
 
     def set(self, columns: Union[str, List[str]], values: Union[str, List[str]],
             table: Optional[str] = None, condition: Optional[str] = None,
@@ -678,6 +2325,271 @@ class Database:
         # execute the sql command
         self.execute(command, fetch=False)
 
+    def add_rows(self, rows: List[List[object]], table: Optional[str] = None,
+                 columns: Union[str, List[str]] = "*",
+                 unique_cols: Optional[List[str]] = None,
+                 on_duplicate: str = 'error',
+                 chunk_size: Optional[int] = None,
+                 clean_strings: bool = True):
+        """
+        Adds many rows to the specified table using a parameterised
+        executemany (one transaction per chunk of rows)
+
+        Values are stored as Database.add_row would store them, and the
+        UHASH column is generated in the same way (from unique_cols)
+
+        :param rows: list of iterables, the values of each row to add
+        :param table: A str which specifies which table within the database
+                      to retrieve data from.  If there is only one table to
+                      pick from, this may be left as None to use it
+                      automatically.
+        :param columns: If you only want to initialize some of the columns,
+                        you may list them here.  Otherwise, '*' indicates that
+                        all columns will be initialized.
+        :param unique_cols: list of strings or None, if set this is columns that
+                            are used to form the unique hash for specifying
+                            unique rows
+        :param on_duplicate: str, what to do when a row has the same unique
+                             hash as a row already in the table:
+                             * error: raise a UniqueEntryException (rows in
+                                      the chunk are not added)
+                             * ignore: keep the existing row
+                             * replace: replace the existing row
+        :param chunk_size: int or None, the number of rows per executemany
+                           (if None uses BULK_CHUNK_SIZE)
+        :param clean_strings: bool, if True strings are cleaned as in
+                              Database.add_row (None/NULL strings become NULL
+                              and quotes are removed)
+
+        :return: None
+        """
+        # set function name
+        func_name = __NAME__ + '.Database.add_rows()'
+        # deal with no rows
+        if len(rows) == 0:
+            return
+        # infer table name
+        table = self._infer_table_(table)
+        # deal with chunk size
+        if chunk_size is None:
+            chunk_size = BULK_CHUNK_SIZE
+        chunk_size = max(int(chunk_size), 1)
+        # check on_duplicate criteria
+        if on_duplicate not in ['error', 'ignore', 'replace']:
+            # log error: Error Type: Error message \n\t Command:
+            ecode = '00-002-00032'
+            emsg = drs_base.BETEXT[ecode]
+            eargs = ['DatabaseError', 'on_duplicate must be error/ignore/replace',
+                     on_duplicate, self.path, func_name]
+            # log base error
+            raise drs_base.base_error(ecode, emsg, 'error', args=eargs,
+                                      exceptionname='DatabaseError',
+                                      exception=DatabaseError)
+        # deal with empty unique column list
+        if unique_cols is not None and len(unique_cols) == 0:
+            unique_cols = None
+        # get the columns (need them to hash and for the placeholders)
+        if columns == '*':
+            columns = self.colnames('*', table=table)
+        elif isinstance(columns, str):
+            columns = columns.strip('()').split(',')
+        columns = list(map(lambda x: x.strip(), columns))
+        # number of columns we expect values for (without the hash column)
+        ncols = len(columns)
+        if unique_cols is not None:
+            if UHASH_COL in columns:
+                ncols -= 1
+            else:
+                columns = columns + [UHASH_COL]
+        # construct the command
+        placeholders = ', '.join([self.placeholder] * len(columns))
+        cargs = [self._insert_prefix(on_duplicate), table,
+                 ', '.join(columns), placeholders]
+        command = "{0} {1}({2}) VALUES({3})".format(*cargs)
+        # loop around chunks of rows
+        for start in range(0, len(rows), chunk_size):
+            params = []
+            for row in rows[start:start + chunk_size]:
+                # copy values
+                values = list(row)[:ncols]
+                # add the hash value (calculated as in add_row)
+                if unique_cols is not None:
+                    hash_value = _hash_col(columns, values, unique_cols,
+                                           return_string=True)
+                    values.append(hash_value)
+                # push values into sql parameters
+                params.append(tuple(_param_value(value, clean_strings)
+                                    for value in values))
+            # execute the chunk (one transaction)
+            self.executemany(command, params)
+
+    def set_rows(self, columns: List[str], rows: List[List[object]],
+                 key_columns: List[str], table: Optional[str] = None,
+                 chunk_size: Optional[int] = None,
+                 clean_strings: bool = True):
+        """
+        Changes the data in many existing rows using a parameterised
+        executemany UPDATE (one transaction per chunk of rows)
+
+        Each row gives the new values for "columns" followed by the values
+        of "key_columns" that identify the row(s) to update, i.e.
+            UPDATE table SET col1=?, col2=? WHERE key1=? AND key2=?
+
+        :param columns: list of strings, the columns to change
+        :param rows: list of iterables, for each update the values of columns
+                     followed by the values of key_columns
+        :param key_columns: list of strings, the columns used to identify the
+                            rows to update (should be indexed)
+        :param table: A str which specifies which table within the database
+                      to retrieve data from.  If there is only one table to
+                      pick from, this may be left as None to use it
+                      automatically.
+        :param chunk_size: int or None, the number of rows per executemany
+                           (if None uses BULK_CHUNK_SIZE)
+        :param clean_strings: bool, if True strings are cleaned as in
+                              Database.set (None/NULL strings become NULL
+                              and quotes are removed)
+
+        :return: None
+        """
+        # set function name
+        func_name = __NAME__ + '.Database.set_rows()'
+        # deal with no rows
+        if len(rows) == 0:
+            return
+        # infer table name
+        table = self._infer_table_(table)
+        # deal with chunk size
+        if chunk_size is None:
+            chunk_size = BULK_CHUNK_SIZE
+        chunk_size = max(int(chunk_size), 1)
+        # need columns to set and columns to identify rows
+        if len(columns) == 0 or len(key_columns) == 0:
+            # log error: Error Type: Error message \n\t Command:
+            ecode = '00-002-00032'
+            emsg = drs_base.BETEXT[ecode]
+            eargs = ['DatabaseError', 'columns and key_columns must be set',
+                     'UPDATE {0}'.format(table), self.path, func_name]
+            # log base error
+            raise drs_base.base_error(ecode, emsg, 'error', args=eargs,
+                                      exceptionname='DatabaseError',
+                                      exception=DatabaseError)
+        # construct the command
+        set_str = ['{0} = {1}'.format(col, self.placeholder)
+                   for col in columns]
+        key_str = ['{0} = {1}'.format(col, self.placeholder)
+                   for col in key_columns]
+        command = "UPDATE {0} SET {1} WHERE {2}".format(table,
+                                                        ', '.join(set_str),
+                                                        ' AND '.join(key_str))
+        # number of values expected per row
+        nvalues = len(columns) + len(key_columns)
+        # loop around chunks of rows
+        for start in range(0, len(rows), chunk_size):
+            params = []
+            for row in rows[start:start + chunk_size]:
+                # push values into sql parameters
+                params.append(tuple(_param_value(value, clean_strings)
+                                    for value in list(row)[:nvalues]))
+            # execute the chunk (one transaction)
+            self.executemany(command, params)
+
+    def upsert_rows(self, rows: List[List[object]], key_columns: List[str],
+                    table: Optional[str] = None,
+                    columns: Union[str, List[str]] = '*',
+                    delete_rows: Optional[List[List[object]]] = None):
+        """
+        Replace (or add) rows identified by the values of key_columns, for
+        tables without a unique column - any existing row with the same key
+        values is deleted and the new row is added, all in one transaction
+
+            DELETE FROM table WHERE key1 IS ? AND key2 IS ?
+            INSERT INTO table(col1, col2, ...) VALUES(?, ?, ...)
+
+        Values are stored as Database.add_row would store them
+
+        :param rows: list of iterables, the values of each row to add
+        :param key_columns: list of strings, the columns that identify a row
+                            (these must be in columns)
+        :param table: A str which specifies which table within the database
+                      to retrieve data from.  If there is only one table to
+                      pick from, this may be left as None to use it
+                      automatically.
+        :param columns: If you only want to initialize some of the columns,
+                        you may list them here.  Otherwise, '*' indicates that
+                        all columns will be initialized.
+        :param delete_rows: list of iterables or None, rows (in the same form
+                            as rows) that should only be deleted
+
+        :return: None
+        """
+        # set function name
+        func_name = __NAME__ + '.Database.upsert_rows()'
+        # deal with no delete rows
+        if delete_rows is None:
+            delete_rows = []
+        # deal with nothing to do
+        if len(rows) == 0 and len(delete_rows) == 0:
+            return
+        # infer table name
+        table = self._infer_table_(table)
+        # get the columns (need them for the keys and the placeholders)
+        if columns == '*':
+            columns = self.colnames('*', table=table)
+        elif isinstance(columns, str):
+            columns = columns.strip('()').split(',')
+        columns = list(map(lambda x: x.strip(), columns))
+        # key columns must be in columns
+        if len(key_columns) == 0 or not set(key_columns).issubset(columns):
+            # log error: Error Type: Error message \n\t Command:
+            ecode = '00-002-00032'
+            emsg = drs_base.BETEXT[ecode]
+            eargs = ['DatabaseError', 'key_columns must be in columns',
+                     ', '.join(key_columns), self.path, func_name]
+            # log base error
+            raise drs_base.base_error(ecode, emsg, 'error', args=eargs,
+                                      exceptionname='DatabaseError',
+                                      exception=DatabaseError)
+        # get the position of the keys in each row
+        key_pos = [columns.index(col) for col in key_columns]
+        # construct the commands (keys compared NULL-safe)
+        key_str = ['{0} {1} {2}'.format(col, self.null_safe_equal,
+                                        self.placeholder)
+                   for col in key_columns]
+        delete_cmd = 'DELETE FROM {0} WHERE {1}'.format(table,
+                                                        ' AND '.join(key_str))
+        placeholders = ', '.join([self.placeholder] * len(columns))
+        insert_cmd = 'INSERT INTO {0}({1}) VALUES({2})'.format(
+            table, ', '.join(columns), placeholders)
+        # push values into sql parameters
+        insert_params, delete_params = [], []
+        for row in rows:
+            values = tuple(_param_value(value) for value in
+                           list(row)[:len(columns)])
+            insert_params.append(values)
+            delete_params.append(tuple(values[pos] for pos in key_pos))
+        for row in delete_rows:
+            values = list(row)
+            delete_params.append(tuple(_param_value(values[pos])
+                                       for pos in key_pos))
+        # delete and insert in a single transaction
+        self.transaction([(delete_cmd, delete_params),
+                          (insert_cmd, insert_params)])
+
+    def _insert_prefix(self, on_duplicate: str = 'error') -> str:
+        """
+        The start of an INSERT command for a given duplicate behaviour
+
+        :param on_duplicate: str, error, ignore or replace
+
+        :return: str, the sql insert prefix
+        """
+        if on_duplicate == 'ignore':
+            return 'INSERT OR IGNORE INTO'
+        if on_duplicate == 'replace':
+            return 'INSERT OR REPLACE INTO'
+        return 'INSERT INTO'
+
     def delete_rows(self, table: Optional[str] = None,
                     condition: Optional[str] = None):
         """
@@ -705,6 +2617,58 @@ class Database:
         # execute the sql command
         self.execute(command, fetch=False)
 
+    def delete_keys(self, columns: List[str], keys: List[Tuple[Any, ...]],
+                    table: Optional[str] = None,
+                    condition: Optional[str] = None,
+                    chunk_size: Optional[int] = None):
+        """
+        Delete the rows matching many keys (i.e. OBS_DIR and FILENAME) using
+        a parameterised executemany (one transaction per chunk of keys) -
+        use instead of a long chain of OR conditions
+
+        :param columns: list of str, the columns that make up a key
+        :param keys: list of tuples, the values of the columns for each key
+        :param table: A str which specifies which table within the database
+                      to delete from.  If there is only one table to
+                      pick from, this may be left as None to use it
+                      automatically
+        :param condition: str or None, if set an extra SQL condition every
+                          deleted row must also match
+        :param chunk_size: int or None, the number of keys per executemany
+                           (if None uses BULK_CHUNK_SIZE)
+
+        :return: None removes row(s) from table
+        """
+        # deal with no keys
+        if len(keys) == 0:
+            return
+        # infer table name
+        table = self._infer_table_(table)
+        # deal with chunk size
+        if chunk_size is None:
+            chunk_size = BULK_CHUNK_SIZE
+        chunk_size = max(int(chunk_size), 1)
+        # one (NULL-safe) equality per key column
+        subconditions = []
+        for column in columns:
+            subcondition = '{0} {1} {2}'.format(column, self.null_safe_equal,
+                                                self.placeholder)
+            subconditions.append(subcondition)
+        # add the extra condition
+        if condition is not None:
+            subconditions.insert(0, '({0})'.format(condition))
+        # construct the command
+        command = 'DELETE FROM {0} WHERE {1}'.format(
+            table, ' AND '.join(subconditions))
+        # push the keys into sql parameters (values are matched as stored
+        #   by Database.add_row)
+        params = []
+        for key in keys:
+            params.append(tuple(_param_value(value) for value in key))
+        # loop around chunks of keys (one transaction each)
+        for start in range(0, len(params), chunk_size):
+            self.executemany(command, params[start:start + chunk_size])
+
     # table methods
     def add_table(self, name: str, field_names: List[str],
                   field_types: List[Union[str, type]],
@@ -925,6 +2889,96 @@ class Database:
         NotImplemented(emsg)
         return [], []
 
+    def explain(self, command: str) -> List[Tuple[str, bool]]:
+        """
+        Get the query plan of an SQL query
+
+        :param command: str, the SQL query (not run)
+
+        :return: list of tuples, each tuple is a step of the query plan (the
+                 description and whether it is a full table scan or a sort
+                 without an index)
+        """
+        _ = command
+        emsg = 'Please abstract method with SQLiteDatabase or MySQLDatabase'
+        NotImplemented(emsg)
+        return []
+
+    def indexes(self, table: Optional[str] = None) -> Dict[str, List[str]]:
+        """
+        Get the indexes of a table
+
+        :param table: str, the name of the Table
+
+        :return: dict, for each index name the list of indexed columns (in
+                 index order)
+        """
+        _ = table
+        emsg = 'Please abstract method with SQLiteDatabase or MySQLDatabase'
+        NotImplemented(emsg)
+        return dict()
+
+    def missing_indexes(self, index_groups: List[List[str]],
+                        table: Optional[str] = None) -> List[List[str]]:
+        """
+        Find the index groups that are not covered by an existing index
+        (an index covers a group if the group is its leading columns)
+
+        Groups with columns that are not in the table are ignored
+
+        :param index_groups: list of lists of strings, the column groups
+        :param table: str, the name of the Table
+
+        :return: list of lists of strings, the groups without an index
+        """
+        # infer table name
+        table = self._infer_table_(table)
+        # get the columns and existing indexes (case insensitive)
+        colnames = set(map(str.upper, self.table_info(table)[0]))
+        existing = []
+        for icols in self.indexes(table).values():
+            existing.append(list(map(str.upper, icols)))
+        # find the groups that are not covered
+        missing = []
+        for index_group in index_groups:
+            group = list(map(str.upper, index_group))
+            # skip groups with columns not in the table
+            if not set(group).issubset(colnames):
+                continue
+            # skip groups covered by an existing index
+            if any(icols[:len(group)] == group for icols in existing):
+                continue
+            # skip duplicated groups
+            if group in missing:
+                continue
+            missing.append(group)
+        return missing
+
+    def add_index(self, columns: List[str], table: Optional[str] = None,
+                  name: Optional[str] = None) -> str:
+        """
+        Add an index (a composite index if more than one column) to a table
+
+        :param columns: list of strings, the columns to index (in order)
+        :param table: str, the name of the Table
+        :param name: str or None, the index name (defaults to
+                     idx_{table}_{columns})
+
+        :return: str, the index name
+        """
+        # infer table name
+        table = self._infer_table_(table)
+        # construct the index name
+        if name is None:
+            name = _index_name(table, columns)
+        # construct command
+        cargs = [name, table, ', '.join(columns)]
+        command = 'CREATE INDEX {0} ON {1} ({2});'.format(*cargs)
+        # execute command
+        self.execute(command, fetch=False)
+        # return the index name
+        return name
+
     def colnames(self, columns: str, table: Optional[str] = None) -> List[str]:
         """
         Get the column names from table (i.e. deal with * or columns separated
@@ -999,6 +3053,9 @@ class Database:
         # set function name
         func_name = '{0}.{1}.{2}()'.format(__NAME__, self.classname,
                                            '_infer_table_')
+        # an explicitly given table is used as is
+        if table is not None:
+            return table
         # infer table name from tname
         if self.tname is not None:
             if self.tname.lower() in self.tables:
@@ -1077,7 +3134,8 @@ class Database:
 
     def add_from_pandas(self, df: pd.DataFrame, table: Optional[str] = None,
                         if_exists: str = 'append', index: bool = False,
-                        unique_cols: Optional[List[str]] = None):
+                        unique_cols: Optional[List[str]] = None,
+                        chunk_size: Optional[int] = None):
         """
         Use pandas to add rows to database
 
@@ -1095,12 +3153,37 @@ class Database:
         :param unique_cols: list of strings or None, if set this is columns that
                             are used to form the unique hash for specifying
                             unique rows
+        :param chunk_size: int or None, the number of rows per transaction
+                           when appending to an existing table (if None uses
+                           BULK_CHUNK_SIZE)
 
         :return:
         """
         emsg = 'Please abstract method with SQLiteDatabase or MySQLDatabase'
         NotImplemented(emsg)
 
+    def _add_rows_from_pandas(self, df: pd.DataFrame, table: str,
+                              chunk_size: Optional[int] = None):
+        """
+        Append a pandas dataframe to an existing table using the bulk insert
+        path (Database.add_rows) - values are stored as pandas would store
+        them (strings are not cleaned)
+
+        :param df: pandas dataframe, the rows to add (columns must be in the
+                   table)
+        :param table: str, the table name
+        :param chunk_size: int or None, the number of rows per executemany
+
+        :return: None
+        """
+        # get the column names
+        columns = list(map(str, df.columns))
+        # get the rows as tuples
+        rows = list(df.itertuples(index=False, name=None))
+        # add the rows
+        self.add_rows(rows, table=table, columns=columns,
+                      chunk_size=chunk_size, clean_strings=False)
+
     def _to_pandas(self, command: str) -> Any:
         """
         Use pandas to get sql command
@@ -1222,16 +3305,36 @@ class DatabaseColumns:
 
 class SQLiteDatabase(Database):
     # A wrapper for an SQLite database.
-    def __init__(self, path: str, verbose: bool = False):
+    def __init__(self, path: str, verbose: bool = False,
+                 use_pool: bool = False, wal: bool = False,
+                 busy_timeout: float = TIMEOUT, read_only: bool = False,
+                 mmap_size: int = 0):
         """
         Create an object for reading and writing to a SQLite database.
 
         :param path: the location on disk of the database.
                      This may be :memory: to create a temporary in-memory
                      database which will not be saved when the program closes.
+        :param verbose: bool, whether to verbosely print out database
+                        functionality
+        :param use_pool: bool, if True keeps one persistent connection per
+                         process (and thread) instead of connecting for every
+                         query
+        :param wal: bool, if True switches the database to write-ahead
+                    logging (readers are not blocked by writers)
+        :param busy_timeout: float, the time in seconds a connection waits
+                             for a lock before the query is retried (with
+                             exponential backoff)
+        :param read_only: bool, if True connects in read-only mode (for
+                          managers that never write)
+        :param mmap_size: int, if non-zero the database file is read through
+                          a memory map of up to this many bytes (pages are
+                          shared with other processes reading the same file)
         """
         # call to super class
         super().__init__(verbose=verbose)
+        # set class name
+        self.classname = 'SQLiteDatabase'
         # storage for database path
         self.host = None
         self.user = None
@@ -1240,6 +3343,16 @@ class SQLiteDatabase(Database):
         self.passwd = None
         self.dbname = None
         self.tname = 'main'
+        # sqlite3 connections cannot be shared between threads - so we keep
+        #   one persistent connection per process and thread
+        self.use_pool = use_pool
+        self.pool_size = 1
+        self.pool_thread_bound = True
+        # locking settings
+        self.wal = wal
+        self.busy_timeout = busy_timeout
+        self.read_only = read_only
+        self.mmap_size = mmap_size
         # update table list
         self._update_table_list_()
 
@@ -1272,7 +3385,7 @@ class SQLiteDatabase(Database):
         # try to connect
         try:
             if connect_kind == 'sqlite':
-                return sqlite3.connect(self.path, timeout=TIMEOUT)
+                return self._connect()
         except Exception as e:
             # log error: {0}: {1} \n\t Command: {2} \n\t Function: {3}
             ecode = '00-002-00043'
@@ -1290,13 +3403,64 @@ class SQLiteDatabase(Database):
         """
         return 'SQLiteDatabase[{0}]'.format(self.path)
 
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Open a new sqlite connection (read-only or with the journal mode
+        requested)
+
+        :return: the sqlite connection
+        """
+        # read-only connections use a URI (not possible for in-memory)
+        if self.read_only and str(self.path) != ':memory:':
+            uri = '{0}?mode=ro'.format(Path(self.path).absolute().as_uri())
+            conn = sqlite3.connect(uri, uri=True, timeout=self.busy_timeout)
+            # read the file through a memory map
+            if getattr(self, 'mmap_size', 0) > 0:
+                conn.execute('PRAGMA mmap_size={0}'.format(self.mmap_size))
+            return conn
+        # connect
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout)
+        # switch to write-ahead logging (stored in the database file so only
+        #    needs to be done once)
+        if self.wal:
+            mode = conn.execute('PRAGMA journal_mode').fetchone()[0]
+            if str(mode).lower() != 'wal':
+                conn.execute('PRAGMA journal_mode=WAL')
+            # safe with WAL and avoids a sync on every commit
+            conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _pool_key(self) -> Tuple[Any, ...]:
+        """
+        The key that identifies which connection pool this database uses
+        (read-only and read-write connections are never shared)
+
+        :return: tuple, the pool key
+        """
+        return self.classname, str(self.path), self.read_only
+
+    def _ping(self, conn: sqlite3.Connection) -> bool:
+        """
+        Health check for an idle pooled sqlite connection
+
+        :param conn: the sqlite connection
+
+        :return: bool, True if the connection can be reused
+        """
+        # noinspection PyBroadException
+        try:
+            conn.execute('SELECT 1').fetchall()
+            return True
+        except Exception as _:
+            return False
+
     def __getstate__(self) -> dict:
         """
         For when we have to pickle the class
         :return:
         """
-        # what to exclude from state
-        exclude = []
+        # what to exclude from state (connections cannot be pickled)
+        exclude = ['_pool']
         # need a dictionary for pickle
         state = dict()
         for key, item in self.__dict__.items():
@@ -1314,6 +3478,9 @@ class SQLiteDatabase(Database):
         """
         # update dict with state
         self.__dict__.update(state)
+        # connection pool is re-initialised in this process on first use
+        #   (never reuse connections from another process)
+        self._pool = None
         # update table list
         self._update_table_list_()
 
@@ -1436,6 +3603,24 @@ class SQLiteDatabase(Database):
         # execute extra commands
         for extra_command in extra_commands:
             self.execute(extra_command, fetch=False)
+        # ---------------------------------------------------------------------
+        # deal with index groups (if given)
+        if index_groups is not None:
+            for index_group in index_groups:
+                # construct index group name
+                group_name = '_'.join(index_group)
+                # check that all columns are in database
+                for col in index_group:
+                    if col not in field_names:
+                        ecode = '00-002-00052'
+                        emsg = ('Index group error. Column {0} not in {1} '
+                                '(Group={2})')
+                        eargs = [col, name, group_name, self.path, func_name]
+                        raise drs_base.base_error(ecode, emsg, args=eargs,
+                                                  exceptionname='DatabaseError',
+                                                  exception=DatabaseError)
+                # add the index
+                self.add_index(index_group, table=name)
         # update the table list
         self._update_table_list_()
 
@@ -1477,10 +3662,10 @@ class SQLiteDatabase(Database):
         :param command: str, The SQL command to be run.
         :return:
         """
-        # start a counter
-        time_count = 0
-        # while counter is less than maximum wait time
-        while time_count < MAXWAIT:
+        # start the clock and count the retries
+        start, attempt = time.time(), 0
+        # while we have waited less than the maximum wait time
+        while time.time() - start < MAXWAIT:
             try:
                 cursor.execute(command)
                 if fetch:
@@ -1491,10 +3676,10 @@ class SQLiteDatabase(Database):
             # catch operational error
             except sqlite3.OperationalError as e:
                 # catch the operational error: database is locked
-                if 'database is locked' in str(e):
-                    time_count += 1
-                    # sleep 1 second before trying to execute command against
-                    time.sleep(1)
+                if _sqlite_locked(e):
+                    # wait (a little longer each time) before trying again
+                    time.sleep(_busy_backoff(attempt))
+                    attempt += 1
                 else:
                     raise e
             # deal with unique error on INSERT
@@ -1510,9 +3695,91 @@ class SQLiteDatabase(Database):
         emsg = 'database locked for > {0} s'.format(MAXWAIT)
         raise sqlite3.OperationalError(emsg)
 
+    def _commit(self, conn: sqlite3.Connection):
+        """
+        Commit a transaction retrying (with backoff) while the database is
+        locked by another writer
+
+        :param conn: the sqlite connection
+
+        :return: None
+        """
+        # start the clock and count the retries
+        start, attempt = time.time(), 0
+        # while we have waited less than the maximum wait time
+        while time.time() - start < MAXWAIT:
+            try:
+                conn.commit()
+                return
+            except sqlite3.OperationalError as e:
+                if _sqlite_locked(e):
+                    time.sleep(_busy_backoff(attempt))
+                    attempt += 1
+                else:
+                    raise e
+        # if we get to this point raise operational error
+        emsg = 'database locked for > {0} s'.format(MAXWAIT)
+        raise sqlite3.OperationalError(emsg)
+
+    def _begin(self, cursor: sqlite3.Cursor):
+        """
+        Start a transaction of several commands - the write lock is taken
+        straight away (waiting while the database is locked) so that later
+        commands in the transaction cannot hit a locked database and force
+        a rollback of the earlier ones
+
+        :param cursor: sqlite cursor (self.cursor())
+
+        :return: None
+        """
+        self._execute(cursor, 'BEGIN IMMEDIATE', fetch=False)
+
+    def _executemany(self, cursor: sqlite3.Cursor, command: str,
+                     rows: List[Tuple[Any, ...]]):
+        """
+        Dummy function to try to catch database UNIQUE(col) error and
+        catch locked errors (up to a max wait time) during executemany
+
+        :param cursor: sqlite cursor (self.cursor())
+        :param command: str, The parameterised SQL command to be run.
+        :param rows: list of tuples, the parameters for each execution
+
+        :return: None
+        """
+        # start the clock and count the retries
+        start, attempt = time.time(), 0
+        # while we have waited less than the maximum wait time
+        while time.time() - start < MAXWAIT:
+            try:
+                cursor.executemany(command, rows)
+                return
+            # catch operational error
+            except sqlite3.OperationalError as e:
+                # catch the operational error: database is locked
+                if _sqlite_locked(e):
+                    # roll back anything done so far before trying again
+                    cursor.connection.rollback()
+                    # wait (a little longer each time) before trying again
+                    time.sleep(_busy_backoff(attempt))
+                    attempt += 1
+                else:
+                    raise e
+            # deal with unique error on INSERT
+            except sqlite3.IntegrityError as e:
+                # look for word 'unique' in exception
+                if 'unique' in str(e).lower():
+                    raise UniqueEntryException(str(e))
+                # else raise exception
+                else:
+                    raise sqlite3.IntegrityError(str(e))
+        # if we get to this point raise operational error
+        emsg = 'database locked for > {0} s'.format(MAXWAIT)
+        raise sqlite3.OperationalError(emsg)
+
     def add_from_pandas(self, df: pd.DataFrame, table: Optional[str] = None,
                         if_exists: str = 'append', index: bool = False,
-                        unique_cols: Optional[List[str]] = None):
+                        unique_cols: Optional[List[str]] = None,
+                        chunk_size: Optional[int] = None):
         """
         Use pandas to add rows to database
 
@@ -1530,6 +3797,9 @@ class SQLiteDatabase(Database):
         :param unique_cols: list of strings or None, if set this is columns that
                             are used to form the unique hash for specifying
                             unique rows
+        :param chunk_size: int or None, the number of rows per transaction
+                           when appending to an existing table (if None uses
+                           BULK_CHUNK_SIZE)
 
         :return:
         """
@@ -1554,12 +3824,35 @@ class SQLiteDatabase(Database):
             raise drs_base.base_error(ecode, emsg, 'error', args=eargs,
                                       exceptionname='DatabaseError',
                                       exception=DatabaseError)
+        # appending to an existing table uses the bulk insert path (the
+        #   unique constraint is kept so it does not need to be re-added)
+        if if_exists == 'append' and not index and table in self.tables:
+            try:
+                self._add_rows_from_pandas(df, table, chunk_size)
+            except Exception as e:
+                # log error: Pandas.to_sql
+                ecode = '00-002-00047'
+                emsg = drs_base.BETEXT[ecode]
+                eargs = [type(e), str(e), func_name, self.path, table,
+                         func_name]
+                # log base error
+                raise drs_base.base_error(ecode, emsg, 'error', args=eargs,
+                                          exceptionname='DatabaseError',
+                                          exception=DatabaseError)
+            return
         # try to add pandas dataframe to table
         try:
             conargs = dict(func=func_name, kind='_TO_SQL:SQLiteDatabase')
-            with closing(self.connection(**conargs)) as tmpconn:
+            tmpconn = self.acquire(**conargs)
+            try:
                 df.to_sql(table, tmpconn, if_exists=if_exists, index=index)
-                tmpconn.close()
+                self._commit(tmpconn)
+            except Exception as e:
+                self.release(tmpconn, discard=True)
+                raise e
+            self.release(tmpconn)
+            # invalidate cached results read from this table
+            self._bump_generation(table=table)
             # pandas removes uniqueness of columns - need to readd this
             #   constraint if unique_cols is not None
             if unique_cols is not None:
@@ -1587,9 +3880,16 @@ class SQLiteDatabase(Database):
         # noinspection PyBroadException
         try:
             conargs = dict(func=func_name, kind='_READ_SQL:sqlite3')
-            with closing(self.connection(**conargs)) as tmpconn:
+            start = time.perf_counter()
+            tmpconn = self.acquire(**conargs)
+            try:
                 df = pd.read_sql(command, tmpconn)
-                tmpconn.close()
+            except Exception as e:
+                self.release(tmpconn, discard=True)
+                raise e
+            self.release(tmpconn)
+            # record the query stats
+            self._record_query(command, conargs, start, len(df))
         except Exception as _:
             # log error: Could not read SQL command as pandas table
             ecode = '00-002-00048'
@@ -1617,7 +3917,7 @@ class SQLiteDatabase(Database):
         command = "PRAGMA table_info({})".format(table)
         # get cursor
         conargs = dict(func=func_name, kind='_execute:colnames')
-        conn = self.connection(**conargs)
+        conn = self.acquire(**conargs)
         cursor = self.cursor(conn)
         # try to execute SQL command
         try:
@@ -1627,14 +3927,14 @@ class SQLiteDatabase(Database):
             colnames = list(map(lambda x: x[1], result))
             coltypes = list(map(lambda x: x[2], result))
             # commit and close
-            conn.commit()
+            self._commit(conn)
             cursor.close()
-            conn.close()
+            self.release(conn)
         # catch all errors and pipe to database error
         except Exception as e:
             # close connection
             cursor.close()
-            conn.close()
+            self.release(conn, discard=True)
             # log error: {0}: {1} \n\t Command: {2} \n\t Function: {3}
             ecode = '00-002-00040'
             emsg = drs_base.BETEXT[ecode]
@@ -1646,6 +3946,52 @@ class SQLiteDatabase(Database):
         # return a list of columns
         return colnames, coltypes
 
+    def explain(self, command: str) -> List[Tuple[str, bool]]:
+        """
+        Get the query plan of an SQL query (EXPLAIN QUERY PLAN)
+
+        :param command: str, the SQL query (not run)
+
+        :return: list of tuples, each tuple is a step of the query plan (the
+                 description and whether it is a full table scan or a sort
+                 without an index)
+        """
+        # get the query plan (the last column is the description)
+        rows = self.execute('EXPLAIN QUERY PLAN {0}'.format(command),
+                            fetch=True)
+        plan = []
+        for row in rows:
+            detail = str(row[-1])
+            # a scan that does not use an index reads every row
+            full_scan = detail.startswith('SCAN') and 'USING' not in detail
+            # a sort that does not use an index
+            full_scan |= detail.startswith('USE TEMP B-TREE')
+            plan.append((detail, full_scan))
+        return plan
+
+    def indexes(self, table: Optional[str] = None) -> Dict[str, List[str]]:
+        """
+        Get the indexes of a table
+
+        :param table: str, the name of the Table
+
+        :return: dict, for each index name the list of indexed columns (in
+                 index order)
+        """
+        # infer table name
+        table = self._infer_table_(table)
+        # get the index names
+        rows = self.execute('PRAGMA index_list({0})'.format(table),
+                            fetch=True)
+        indexes = dict()
+        for row in rows:
+            name = str(row[1])
+            # get the indexed columns (seqno, cid, name)
+            icols = self.execute('PRAGMA index_info("{0}")'.format(name),
+                                 fetch=True)
+            indexes[name] = [str(icol[2]) for icol in sorted(icols)]
+        return indexes
+
     # admin methods
     def backup(self):
         """
@@ -1716,6 +4062,58 @@ class SQLiteDatabase(Database):
         """
         self.execute('COMMIT;', fetch=False)
 
+    def generation(self, table: Optional[str] = None) -> Union[str, None]:
+        """
+        A stamp that changes whenever the database changes (the modification
+        time and size of the database file and its write-ahead log)
+
+        :param table: str, not used (the stamp is for the whole file)
+
+        :return: str, the stamp (None for in-memory databases)
+        """
+        _ = table
+        # in-memory databases cannot be stamped
+        if str(self.path) == ':memory:':
+            return None
+        # stamp the database file and write-ahead log (if present)
+        stamps = []
+        for path in [str(self.path), str(self.path) + '-wal']:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            stamps.append('{0}:{1}'.format(stat.st_mtime_ns, stat.st_size))
+        return '|'.join(stamps)
+
+    def snapshot(self, path: str):
+        """
+        Copy the database into a new SQLite database file with the sqlite
+        backup api (read by worker processes instead of this database - see
+        DatabaseSnapshot)
+
+        :param path: str, the path of the SQLite database file to create
+
+        :return: None
+        """
+        # set function name
+        func_name = __NAME__ + '.SQLiteDatabase.snapshot()'
+        # copy the database page by page
+        conn = self.acquire(func=func_name, kind='snapshot')
+        try:
+            with closing(sqlite3.connect(path)) as target:
+                conn.backup(target)
+        finally:
+            self.release(conn)
+
+    def _external_stamp(self) -> Any:
+        """
+        A cheap stamp that changes when another process writes to the
+        database (the database file stamp)
+
+        :return: str, the stamp (None for in-memory databases)
+        """
+        return self.generation()
+
     def _update_table_list_(self):
         """
         Reads the database for tables and updates the class members
@@ -1738,7 +4136,8 @@ class MySQLDatabase(Database):
     def __init__(self, path: str, host: str, user: str, passwd: str,
                  database: str, tablename: str, verbose: bool = False,
                  absolute_table_name: bool = False,
-                 tries: int = 20):
+                 tries: int = 20, use_pool: bool = False,
+                 pool_size: int = POOL_SIZE):
         """
         Create an object for reading and writing to a SQLite database.
 
@@ -1754,6 +4153,12 @@ class MySQLDatabase(Database):
         :param absolute_table_name: bool, if True does not change the tablename
                                     used when you need to specific a specific
                                     table
+        :param tries: int, number of tries to connect before failing
+        :param use_pool: bool, if True keeps a bounded pool of persistent
+                         connections per process instead of connecting for
+                         every query
+        :param pool_size: int, the maximum number of idle connections kept
+                          in the pool
         """
         # set class name
         self.classname = 'MySQLDatabase'
@@ -1782,6 +4187,12 @@ class MySQLDatabase(Database):
         super().__init__(verbose=verbose)
         # set a tries criteria
         self.tries = tries
+        # connection pool settings
+        self.use_pool = use_pool
+        self.pool_size = pool_size
+        # mysql connector uses the format parameter style
+        self.placeholder = '%s'
+        self.null_safe_equal = '<=>'
         # storage for database path
         self.host = host
         self.user = user
@@ -1854,7 +4265,9 @@ class MySQLDatabase(Database):
                     return conn
 
                 else:
-                    conn = _mysql_sqlalchemy_connect(host, user, passwd, dbname)
+                    conn = _mysql_sqlalchemy_connect(host, user, passwd, dbname,
+                                                     use_pool=self.use_pool,
+                                                     pool_size=self.pool_size)
                     return conn
 
             except Exception as e:
@@ -1896,13 +4309,46 @@ class MySQLDatabase(Database):
         """
         return 'MySQLDatabase[{0}]'.format(self.path)
 
+    def _pool_key(self) -> Tuple[Any, ...]:
+        """
+        The key that identifies which connection pool this database uses
+        (all tables in the same mysql database share connections)
+
+        :return: tuple, the pool key
+        """
+        return self.classname, self.host, self.user, self.dbname
+
+    def _cache_key(self) -> Tuple[Any, ...]:
+        """
+        The key that identifies which query cache this database uses (all
+        tables in the same mysql database share a cache - only writes made
+        by this process invalidate cached results)
+
+        :return: tuple, the cache key
+        """
+        return self.classname, self.host, self.dbname
+
+    def _ping(self, conn: Any) -> bool:
+        """
+        Health check for an idle pooled mysql connection
+
+        :param conn: the mysql connection
+
+        :return: bool, True if the connection can be reused
+        """
+        # noinspection PyBroadException
+        try:
+            return conn.is_connected()
+        except Exception as _:
+            return False
+
     def __getstate__(self) -> dict:
         """
         For when we have to pickle the class
         :return:
         """
-        # what to exclude from state
-        exclude = []
+        # what to exclude from state (connections cannot be pickled)
+        exclude = ['_pool']
         # need a dictionary for pickle
         state = dict()
         for key, item in self.__dict__.items():
@@ -1920,6 +4366,9 @@ class MySQLDatabase(Database):
         """
         # update dict with state
         self.__dict__.update(state)
+        # connection pool is re-initialised in this process on first use
+        #   (never reuse connections from another process)
+        self._pool = None
         # update table list
         self._update_table_list_()
 
@@ -1936,39 +4385,48 @@ class MySQLDatabase(Database):
         """
         # set function name
         func_name = __NAME__ + '.Database.execute()'
+        # send writes to the writer process (if one is running)
+        if not fetch and self._forward_writes([(command, None)]):
+            return None
         # print input if verbose
         if self._verbose_:
             print("SQL INPUT: ", command)
         # get cursor
         conargs = dict(func=func_name, kind='execute:_execute')
-        with closing(self.connection(**conargs)) as conn:
-            with closing(self.cursor(conn)) as cursor:
-                # try to execute SQL command
-                try:
-                    result = self._execute(cursor, command, fetch=fetch)
-                    # commit and close
-                    conn.commit()
-                    cursor.close()
-                    conn.close()
-                # pass unique exception upwards
-                except UniqueEntryException as e:
-                    # close
-                    cursor.close()
-                    conn.close()
-                    raise UniqueEntryException(str(e))
-                # catch all errors and pipe to database error
-                except Exception as e:
-                    # close
-                    cursor.close()
-                    conn.close()
-                    ecode = '00-002-00032'
-                    emsg = drs_base.BETEXT[ecode]
-                    eargs = [type(e), str(e), command, self.path, func_name]
-                    # log base error
-                    raise drs_base.base_error(ecode, emsg, 'error', args=eargs,
-                                              exceptionname='DatabaseError',
-                                              exception=DatabaseError)
+        start = time.perf_counter()
+        conn = self.acquire(**conargs)
+        with closing(self.cursor(conn)) as cursor:
+            # try to execute SQL command
+            try:
+                result = self._execute(cursor, command, fetch=fetch)
+                # commit and close
+                conn.commit()
+                cursor.close()
+                self.release(conn)
+            # pass unique exception upwards
+            except UniqueEntryException as e:
+                # close (connection is still healthy so roll back and reuse)
+                cursor.close()
+                conn.rollback()
+                self.release(conn)
+                raise UniqueEntryException(str(e))
+            # catch all errors and pipe to database error
+            except Exception as e:
+                # close
+                cursor.close()
+                self.release(conn, discard=True)
+                ecode = '00-002-00032'
+                emsg = drs_base.BETEXT[ecode]
+                eargs = [type(e), str(e), command, self.path, func_name]
+                # log base error
+                raise drs_base.base_error(ecode, emsg, 'error', args=eargs,
+                                          exceptionname='DatabaseError',
+                                          exception=DatabaseError)
 
+        # record the query stats
+        self._record_query(command, conargs, start, _result_nrows(result))
+        # invalidate cached results read from the table written to
+        self._bump_generation(command)
         # print output of sql command if verbose
         if self._verbose_:
             print("SQL OUTPUT:", result)
@@ -2052,6 +4510,16 @@ class MySQLDatabase(Database):
         """
         return conn.cursor()
 
+    def _stream_cursor(self, conn):
+        """
+        Get an unbuffered cursor - rows are sent by the server as they are
+        fetched instead of all being read into client memory on execute
+        (used by Database.iter_columns)
+
+        :return: The cursor
+        """
+        return conn.cursor(buffered=False)
+
     def _execute(self, cursor: mysql.connection.MySQLCursor, command: str,
                  fetch: bool = True):
         """
@@ -2078,6 +4546,52 @@ class MySQLDatabase(Database):
             else:
                 raise mysql.IntegrityError(str(e))
 
+    def _executemany(self, cursor: Any, command: str,
+                     rows: List[Tuple[Any, ...]]):
+        """
+        Dummy function to try to catch database UNIQUE(col) error during
+        executemany (mysql connector batches INSERT rows into one statement)
+
+        :param cursor: mysql cursor (self.cursor())
+        :param command: str, The parameterised SQL command to be run.
+        :param rows: list of tuples, the parameters for each execution
+
+        :return: None
+        """
+        try:
+            # catch all warnings at this point
+            with warnings.catch_warnings():
+                # ignore all warnings
+                _ignore_warnings()
+                # execute command on connection cursor
+                cursor.executemany(command, rows)
+            # turn all warnings back on
+            _unignore_warnings()
+        # deal with unique error on INSERT
+        except mysql.IntegrityError as e:
+            # turn all warnings back on
+            _unignore_warnings()
+            # look for word 'unique' in exception
+            if 'duplicate' in str(e).lower():
+                raise UniqueEntryException(str(e))
+            # else raise exception
+            else:
+                raise mysql.IntegrityError(str(e))
+
+    def _insert_prefix(self, on_duplicate: str = 'error') -> str:
+        """
+        The start of an INSERT command for a given duplicate behaviour
+
+        :param on_duplicate: str, error, ignore or replace
+
+        :return: str, the sql insert prefix
+        """
+        if on_duplicate == 'ignore':
+            return 'INSERT IGNORE INTO'
+        if on_duplicate == 'replace':
+            return 'REPLACE INTO'
+        return 'INSERT INTO'
+
     # table methods
     def add_table(self, name: str, field_names: List[str],
                   field_types: List[Union[str, type]],
@@ -2228,7 +4742,8 @@ class MySQLDatabase(Database):
 
     def add_from_pandas(self, df: pd.DataFrame, table: Optional[str] = None,
                         if_exists: str = 'append', index: bool = False,
-                        unique_cols: Optional[List[str]] = None):
+                        unique_cols: Optional[List[str]] = None,
+                        chunk_size: Optional[int] = None):
         """
         Use pandas to add rows to database
 
@@ -2246,6 +4761,9 @@ class MySQLDatabase(Database):
         :param unique_cols: list of strings or None, if set this is columns that
                             are used to form the unique hash for specifying
                             unique rows
+        :param chunk_size: int or None, the number of rows per transaction
+                           when appending to an existing table (if None uses
+                           BULK_CHUNK_SIZE)
 
         :return:
         """
@@ -2270,12 +4788,30 @@ class MySQLDatabase(Database):
             raise drs_base.base_error(ecode, emsg, 'error', args=eargs,
                                       exceptionname='DatabaseError',
                                       exception=DatabaseError)
+        # appending to an existing table uses the bulk insert path (the
+        #   unique constraint is kept so it does not need to be re-added)
+        if if_exists == 'append' and not index and table in self.tables:
+            try:
+                self._add_rows_from_pandas(df, table, chunk_size)
+            except Exception as e:
+                # log error: Pandas.to_sql
+                ecode = '00-002-00047'
+                emsg = drs_base.BETEXT[ecode]
+                eargs = [type(e), str(e), func_name, self.path, table,
+                         func_name]
+                # log base error
+                raise drs_base.base_error(ecode, emsg, 'error', args=eargs,
+                                          exceptionname='DatabaseError',
+                                          exception=DatabaseError)
+            return
         # try to add pandas dataframe to table
         try:
             conargs = dict(func=func_name, kind='TO_SQL:SQLALCHEMY')
             with closing(self.connection(connect_kind='sqlalchemy', **conargs)) as dconn:
                 df.to_sql(table, dconn, if_exists=if_exists, index=index)
                 dconn.close()
+                # invalidate cached results read from this table
+                self._bump_generation(table=table)
                 # pandas removes uniqueness of columns - need to readd this
                 #   constraint if unique_cols is not None
                 if unique_cols is not None and len(unique_cols) > 0:
@@ -2302,9 +4838,14 @@ class MySQLDatabase(Database):
         # try to read sql using pandas
         # noinspection PyBroadException
         try:
-            with closing(self.connection(connect_kind='sqlalchemy')) as dconn:
+            conargs = dict(func=func_name, kind='_READ_SQL:sqlalchemy')
+            start = time.perf_counter()
+            with closing(self.connection(connect_kind='sqlalchemy',
+                                         **conargs)) as dconn:
                 df = _read_sql(command, dconn)
                 dconn.close()
+            # record the query stats
+            self._record_query(command, conargs, start, len(df))
         except Exception as _:
             # log error: Could not read SQL command as pandas table
             ecode = '00-002-00048'
@@ -2317,6 +4858,56 @@ class MySQLDatabase(Database):
         # return dataframe
         return df
 
+    def generation(self, table: Optional[str] = None) -> Union[str, None]:
+        """
+        A stamp that changes whenever the table changes (the table statistics
+        from information_schema - last update time, number of rows, next
+        auto increment and data size - these do not read the table)
+
+        :param table: str, the name of the table
+
+        :return: str, the stamp
+        """
+        # set function name
+        func_name = __NAME__ + '.MySQLDatabase.generation()'
+        # infer table name
+        table = self._infer_table_(table)
+        # the table statistics (and how many seconds ago it was updated)
+        command = ('SELECT UPDATE_TIME, TABLE_ROWS, AUTO_INCREMENT, '
+                   'DATA_LENGTH, TIMESTAMPDIFF(SECOND, UPDATE_TIME, NOW()) '
+                   'FROM information_schema.TABLES WHERE TABLE_SCHEMA = '
+                   '"{0}" AND TABLE_NAME = "{1}"')
+        command = command.format(self.dbname, table)
+        conn = self.acquire(func=func_name, kind='generation')
+        try:
+            with closing(conn.cursor()) as cursor:
+                # mysql 8 caches table statistics for a day by default - ask
+                #   for current values on this connection (mariadb does not
+                #   cache them and does not have this variable)
+                # noinspection PyBroadException
+                try:
+                    self._execute(cursor, 'SET SESSION '
+                                          'information_schema_stats_expiry '
+                                          '= 0', fetch=False)
+                except Exception as _:
+                    pass
+                result = self._execute(cursor, command, fetch=True)
+                conn.commit()
+        except Exception as _:
+            self.release(conn, discard=True)
+            raise
+        self.release(conn)
+        # deal with no table
+        if len(result) == 0:
+            return None
+        # the update time only has a resolution of a second - a table
+        #   updated in the last couple of seconds may be updated again with
+        #   the same stamp so give a stamp that matches nothing
+        if result[0][4] is not None and result[0][4] < 2:
+            return 'updating:{0}'.format(time.time_ns())
+        # return the stamp
+        return ':'.join(map(str, result[0][:4]))
+
     def _update_table_list_(self):
         """
         Reads the database for tables and updates the class members
@@ -2349,35 +4940,88 @@ class MySQLDatabase(Database):
         command = "SHOW columns FROM {}".format(table)
         # get cursor
         conargs = dict(func=func_name, kind='_execute:table_info')
-        with closing(self.connection(**conargs)) as conn:
-            with closing(conn.cursor()) as cursor:
+        conn = self.acquire(**conargs)
+        with closing(conn.cursor()) as cursor:
+            # try to execute SQL command
+            try:
                 # try to execute SQL command
-                try:
-                    # try to execute SQL command
-                    result = self._execute(cursor, command, fetch=True)
-                    # get columns
-                    colnames = list(map(lambda x: x[0], result))
-                    coltypes = list(map(lambda x: x[1], result))
-                    # commit and close
-                    conn.commit()
-                    cursor.close()
-                    conn.close()
-                # catch all errors and pipe to database error
-                except Exception as e:
-                    # close connection
-                    cursor.close()
-                    conn.close()
-                    # log error: {0}: {1} \n\t Command: {2} \n\t Function: {3}
-                    ecode = '00-002-00040'
-                    emsg = drs_base.BETEXT[ecode]
-                    eargs = [type(e), str(e), self.path, table, func_name]
-                    # log base error
-                    raise drs_base.base_error(ecode, emsg, 'error', args=eargs,
-                                              exceptionname='DatabaseError',
-                                              exception=DatabaseError)
+                result = self._execute(cursor, command, fetch=True)
+                # get columns
+                colnames = list(map(lambda x: x[0], result))
+                coltypes = list(map(lambda x: x[1], result))
+                # commit and close
+                conn.commit()
+                cursor.close()
+                self.release(conn)
+            # catch all errors and pipe to database error
+            except Exception as e:
+                # close connection
+                cursor.close()
+                self.release(conn, discard=True)
+                # log error: {0}: {1} \n\t Command: {2} \n\t Function: {3}
+                ecode = '00-002-00040'
+                emsg = drs_base.BETEXT[ecode]
+                eargs = [type(e), str(e), self.path, table, func_name]
+                # log base error
+                raise drs_base.base_error(ecode, emsg, 'error', args=eargs,
+                                          exceptionname='DatabaseError',
+                                          exception=DatabaseError)
         # return a list of columns
         return colnames, coltypes
 
+    def explain(self, command: str) -> List[Tuple[str, bool]]:
+        """
+        Get the query plan of an SQL query (EXPLAIN)
+
+        :param command: str, the SQL query (not run)
+
+        :return: list of tuples, each tuple is a step of the query plan (the
+                 description and whether it is a full table scan or a sort
+                 without an index)
+        """
+        # get the query plan (columns differ between mysql versions)
+        colnames, columns = self.execute_columns('EXPLAIN {0}'.format(command))
+        plan = []
+        # loop around the steps of the plan (rows)
+        for values in zip(*columns):
+            row = dict(zip(colnames, values))
+            extra = str(row.get('Extra', ''))
+            # construct the description
+            dargs = [row.get('table', ''), row.get('type', ''),
+                     row.get('key', ''), row.get('rows', ''), extra]
+            detail = '{0}: type={1} key={2} rows={3} {4}'.format(*dargs)
+            # type=ALL reads every row, filesort is a sort without an index
+            full_scan = str(row.get('type', '')).upper() == 'ALL'
+            full_scan |= 'filesort' in extra
+            plan.append((detail.strip(), full_scan))
+        return plan
+
+    def indexes(self, table: Optional[str] = None) -> Dict[str, List[str]]:
+        """
+        Get the indexes of a table
+
+        :param table: str, the name of the Table
+
+        :return: dict, for each index name the list of indexed columns (in
+                 index order)
+        """
+        # infer table name
+        table = self._infer_table_(table)
+        # get the index columns
+        colnames, columns = self.execute_columns(
+            'SHOW INDEX FROM {0}'.format(table))
+        rows = dict(zip(colnames, columns))
+        # group the columns by index (in index order)
+        storage = dict()
+        for it in range(len(rows.get('Key_name', []))):
+            name = str(rows['Key_name'][it])
+            seq = int(rows['Seq_in_index'][it])
+            storage.setdefault(name, []).append((seq, rows['Column_name'][it]))
+        indexes = dict()
+        for name in storage:
+            indexes[name] = [str(col) for _, col in sorted(storage[name])]
+        return indexes
+
     # admin methods
     def backup(self):
         """
@@ -2438,11 +5082,16 @@ class MySQLDatabase(Database):
         self.add_from_pandas(df, if_exists='replace', unique_cols=ucols)
 
 
+# query stats for this process (all databases)
+QUERY_STATS = QueryStats()
+
+
 # =============================================================================
 # Define functions
 # =============================================================================
 def database_wrapper(kind: str, path: Union[Path, str, None],
-                     verbose: bool = False, tries: int = 20) -> Database:
+                     verbose: bool = False, tries: int = 20,
+                     read_only: bool = False) -> Database:
     """
     Database wrapper - takes the database parameter yaml file
     Either uses MySQL or SQLite3
@@ -2454,6 +5103,8 @@ def database_wrapper(kind: str, path: Union[Path, str, None],
     :param verbose: bool - if True the database prints out debug messages
                     verbosely
     :param tries: int, number of tries before failing
+    :param read_only: bool, if True the database is opened read-only (SQLite3
+                      only - for managers that never write)
 
     :return: Database instance (either SQLiteDatabase or MySQLDatabase)
     """
@@ -2474,15 +5125,19 @@ def database_wrapper(kind: str, path: Union[Path, str, None],
         else:
             tablename = '{0}_{1}'.format(kind, sparams[kind]['PROFILE'])
             abs_tname = False
-        # return the MySQLDatabase instance
-        return MySQLDatabase(path=path,
-                             host=sparams['HOST'],
-                             user=sparams['USER'],
-                             passwd=sparams['PASSWD'],
-                             database=sparams['DATABASE'],
-                             tablename=tablename,
-                             verbose=verbose, absolute_table_name=abs_tname,
-                             tries=tries)
+        # get the MySQLDatabase instance
+        database = MySQLDatabase(path=path,
+                                 host=sparams['HOST'],
+                                 user=sparams['USER'],
+                                 passwd=sparams['PASSWD'],
+                                 database=sparams['DATABASE'],
+                                 tablename=tablename,
+                                 verbose=verbose,
+                                 absolute_table_name=abs_tname,
+                                 tries=tries,
+                                 use_pool=sparams.get('USE_POOL', False),
+                                 pool_size=sparams.get('POOL_SIZE',
+                                                       POOL_SIZE))
     # else default to sqlite3
     else:
         sparams = dparams['SQLITE3']
@@ -2496,8 +5151,340 @@ def database_wrapper(kind: str, path: Union[Path, str, None],
             raise drs_base.base_error(ecode, emsg, 'error', args=eargs,
                                       exceptionname='DatabaseError',
                                       exception=DatabaseError)
-        # return the SQLiteDatabase instance
-        return SQLiteDatabase(path, verbose)
+        # get the SQLiteDatabase instance
+        database = SQLiteDatabase(path, verbose,
+                                  use_pool=sparams.get('USE_POOL', False),
+                                  wal=sparams.get('WAL', False),
+                                  busy_timeout=sparams.get('BUSY_TIMEOUT',
+                                                           TIMEOUT),
+                                  read_only=read_only)
+    # set the database kind (for the query stats)
+    database.dbkind = kind
+    # return the database instance
+    return database
+
+
+def writer_client() -> Optional[DatabaseWriterClient]:
+    """
+    Get the writer process client for this process - only worker processes
+    started while a DatabaseWriter is running have one (the process that
+    started the writer and the writer itself write directly)
+
+    :return: DatabaseWriterClient or None if there is no writer process
+    """
+    global WRITER_CLIENT
+    # get this process id
+    pid = os.getpid()
+    # deal with no writer process
+    value = os.environ.get(WRITER_ENV, None)
+    if value is None:
+        return None
+    # load the writer settings
+    settings = json.loads(value)
+    # the process that started the writer writes directly
+    if settings['owner'] == pid:
+        return None
+    # reuse the client made by this process (if it is for the same writer -
+    #   persistent workers may see more than one writer process)
+    if WRITER_CLIENT is not None and WRITER_CLIENT.pid == pid:
+        if WRITER_CLIENT.address == settings['address']:
+            return WRITER_CLIENT
+        # the old writer process has stopped - just drop the connection
+        # noinspection PyBroadException
+        try:
+            WRITER_CLIENT.conn.close()
+        except Exception as _:
+            pass
+    # connect to the writer
+    WRITER_CLIENT = DatabaseWriterClient(settings['address'],
+                                         bytes.fromhex(settings['authkey']),
+                                         settings['sync_kinds'])
+    return WRITER_CLIENT
+
+
+def flush_writes():
+    """
+    Wait for all writes this process sent to the writer process to be
+    applied (does nothing when there is no writer process)
+
+    :return: None
+    """
+    client = writer_client()
+    if client is not None:
+        client.flush()
+
+
+def snapshot_database(kind: str) -> Optional['Database']:
+    """
+    Get the read-only snapshot of a kind of database for this process - only
+    worker processes started while a DatabaseSnapshot is active have
+    snapshots (the process that made the snapshots reads the databases)
+
+    :param kind: str, the database kind (calib/tellu etc)
+
+    :return: SQLiteDatabase (read-only) or None if there is no snapshot
+    """
+    # deal with no snapshots
+    value = os.environ.get(SNAPSHOT_ENV, None)
+    if value is None:
+        return None
+    # load the snapshot settings
+    settings = json.loads(value)
+    # the process that made the snapshots reads the databases
+    if settings['owner'] == os.getpid():
+        return None
+    # deal with no snapshot for this kind of database
+    path = settings['paths'].get(kind, None)
+    if path is None or not os.path.exists(path):
+        return None
+    # open the snapshot once per process
+    if path not in SNAPSHOT_DATABASES:
+        # close older snapshots of this kind (persistent workers see a new
+        #   snapshot file every time the snapshots are updated)
+        for old_path in list(SNAPSHOT_DATABASES.keys()):
+            if SNAPSHOT_DATABASES[old_path].dbkind == kind:
+                SNAPSHOT_DATABASES.pop(old_path).close_pool()
+        database = SQLiteDatabase(path, use_pool=True, read_only=True,
+                                  mmap_size=SNAPSHOT_MMAP_SIZE)
+        database.dbkind = kind
+        database.tname = settings['tnames'].get(kind, database.tname)
+        SNAPSHOT_DATABASES[path] = database
+    return SNAPSHOT_DATABASES[path]
+
+
+def worker_environment() -> Dict[str, Union[str, None]]:
+    """
+    Get the database writer and snapshot settings of this process (to send
+    to persistent worker processes with each run - they were started before
+    the current writer or snapshots existed)
+
+    :return: dict, the environment variables (None if not set)
+    """
+    return {key: os.environ.get(key, None)
+            for key in [WRITER_ENV, SNAPSHOT_ENV]}
+
+
+def set_worker_environment(environment: Dict[str, Union[str, None]]):
+    """
+    Use the database writer and snapshot settings from the process that
+    started this worker (from worker_environment) for the next run
+
+    :param environment: dict, the environment variables (None to unset)
+
+    :return: None
+    """
+    for key in environment:
+        if environment[key] is None:
+            os.environ.pop(key, None)
+        else:
+            os.environ[key] = environment[key]
+    # writes from the previous run have been applied - the next run may
+    #   read from the snapshots again
+    WRITTEN_KINDS.clear()
+
+
+def _snapshot_stamp(database: 'Database') -> Union[str, None]:
+    """
+    A stamp that changes whenever any table of the database changes
+
+    :param database: Database, the database to stamp
+
+    :return: str, the stamp (None if the database cannot be stamped)
+    """
+    stamps = []
+    for table in database.tables:
+        stamp = database.generation(table)
+        if stamp is None:
+            return None
+        stamps.append(str(stamp))
+    return '|'.join(stamps)
+
+
+def _writer_main(control: Any, authkey: bytes):
+    """
+    The writer process: receive writes from worker processes and apply them
+    in one transaction per database per batch of messages, then reply to
+    the workers waiting for their writes
+
+    :param control: Connection, the pipe to the process that started us
+    :param authkey: bytes, the key workers use to connect
+
+    :return: None
+    """
+    # the writer always writes directly
+    if WRITER_ENV in os.environ:
+        del os.environ[WRITER_ENV]
+    # listen for workers
+    listener = mp_connection.Listener(authkey=authkey)
+    clients, lock = [], threading.Lock()
+
+    def _accept():
+        while True:
+            try:
+                conn = listener.accept()
+            except multiprocessing.AuthenticationError:
+                continue
+            except OSError:
+                return
+            with lock:
+                clients.append(conn)
+
+    threading.Thread(target=_accept, daemon=True).start()
+    # tell the starting process where we are listening
+    control.send(listener.address)
+    # storage for databases (by key) and errors (by worker connection)
+    databases, errors = dict(), dict()
+    running = True
+    # loop until told to stop
+    while running:
+        with lock:
+            current = list(clients)
+        ready = mp_connection.wait(current + [control], timeout=WRITER_POLL)
+        # stop once all messages received so far are applied
+        if control in ready:
+            running = False
+            ready = current
+        # get all waiting messages
+        messages = []
+        for conn in ready:
+            if conn is not control:
+                _writer_receive(conn, messages, clients, lock)
+        # apply the writes and reply
+        _writer_apply(messages, databases, errors)
+    # close the listener and database connections
+    listener.close()
+    for database in databases.values():
+        database.close_pool()
+    control.send('stopped')
+
+
+def _writer_receive(conn: Any, messages: List[Tuple[Any, tuple]],
+                    clients: List[Any], lock: threading.Lock):
+    """
+    Read all waiting messages from a worker connection (removing the
+    connection when the worker has gone)
+
+    :param conn: Connection, the worker connection
+    :param messages: list, the messages (appended to)
+    :param clients: list, the worker connections
+    :param lock: Lock, the lock for the list of worker connections
+
+    :return: None
+    """
+    try:
+        while conn.poll():
+            messages.append((conn, conn.recv()))
+    except (EOFError, OSError):
+        with lock:
+            if conn in clients:
+                clients.remove(conn)
+        conn.close()
+
+
+def _writer_apply(messages: List[Tuple[Any, tuple]],
+                  databases: Dict[Tuple[Any, ...], 'Database'],
+                  errors: Dict[Any, List[Tuple[str, str, str, str]]]):
+    """
+    Apply a batch of messages (one transaction per database) and reply to
+    the messages that wait for a reply
+
+    :param messages: list of tuples, the worker connection and the message
+    :param databases: dict, the databases (by key)
+    :param errors: dict, errors not yet sent to each worker connection
+
+    :return: None
+    """
+    # group the writes by database (keeping the order they arrived in)
+    batches = OrderedDict()
+    for conn, (kind, key, dbobj, commands, _) in messages:
+        if kind != 'write':
+            continue
+        if key not in databases:
+            databases[key] = dbobj
+        batches.setdefault(key, []).append((conn, commands))
+    # apply each batch
+    for key, batch in batches.items():
+        database = databases[key]
+        # join all commands into one transaction (consecutive commands that
+        #   are the same are run as one executemany)
+        commands = []
+        for _, mcommands in batch:
+            for command, rows in mcommands:
+                if (len(commands) > 0 and rows is not None
+                        and commands[-1][0] == command
+                        and commands[-1][1] is not None):
+                    commands[-1][1].extend(rows)
+                else:
+                    commands.append((command, None if rows is None
+                                     else list(rows)))
+        # noinspection PyBroadException
+        try:
+            database.transaction(commands)
+        except Exception as _:
+            # one bad write must not lose the others - apply each message
+            #   on its own and keep the errors for the worker that sent it
+            for conn, mcommands in batch:
+                try:
+                    database.transaction(mcommands)
+                except Exception as e:
+                    command = ';'.join(command for command, _ in mcommands)
+                    error = (type(e).__name__, str(e), command,
+                             str(database.path))
+                    errors.setdefault(conn, []).append(error)
+    # reply to the messages waiting for a reply
+    for conn, message in messages:
+        msgid = message[4]
+        if msgid is None:
+            continue
+        try:
+            conn.send((msgid, errors.pop(conn, [])))
+        except (EOFError, OSError):
+            errors.pop(conn, None)
+
+
+def get_connection_pool(key: Tuple[Any, ...], size: int = 1,
+                        thread_bound: bool = False) -> ConnectionPool:
+    """
+    Get the connection pool for a database key from the process wide storage
+    (creating a new pool if there is none, or if the stored pool was created
+    in another process i.e. before a fork, or in another thread for thread
+    bound pools)
+
+    :param key: tuple, the unique key for the database
+    :param size: int, the maximum number of idle connections to keep
+    :param thread_bound: bool, if True the pool belongs to the current thread
+
+    :return: ConnectionPool, the pool for this process (and thread)
+    """
+    # thread bound pools are stored per thread
+    if thread_bound:
+        key = tuple(key) + (threading.get_ident(),)
+    # get the stored pool
+    pool = CONNECTION_POOLS.get(key, None)
+    # deal with no pool or a pool inherited from the parent process
+    #   (we never close or reuse connections from the parent process)
+    if pool is None or not pool.owned():
+        pool = ConnectionPool(key, size=size, thread_bound=thread_bound)
+        CONNECTION_POOLS[key] = pool
+    # return the pool
+    return pool
+
+
+def close_connection_pools():
+    """
+    Close all idle pooled connections (and sqlalchemy engines) opened by
+    this process
+
+    :return: None
+    """
+    # close all connection pools
+    for key in list(CONNECTION_POOLS.keys()):
+        CONNECTION_POOLS.pop(key).close()
+    # dispose of all sqlalchemy engines created by this process
+    for key in list(SQLALCHEMY_ENGINES.keys()):
+        pid, engine = SQLALCHEMY_ENGINES.pop(key)
+        if pid == os.getpid():
+            engine.dispose()
 
 
 def _decode_value(value: Any) -> str:
@@ -2545,6 +5532,345 @@ def _decode_value(value: Any) -> str:
         return '"{0}"'.format(value)
 
 
+def _param_value(value: Any, clean_strings: bool = True
+                 ) -> Union[str, int, float, None]:
+    """
+    Convert a value into a sql parameter (for parameterised commands) - the
+    stored value matches what _decode_value would store for the same value
+
+    :param value: Any value to convert
+    :param clean_strings: bool, if True null strings become None and quotes
+                          are removed from strings (as in _decode_value)
+
+    :return: str, int, float or None, the sql parameter
+    """
+    # deal with numpy scalars
+    if isinstance(value, np.generic):
+        value = value.item()
+    # deal with value being None
+    if value is None:
+        return None
+    # deal with bytes (decode to string)
+    if isinstance(value, bytes):
+        value = value.decode('utf-8')
+    # deal with strings
+    if isinstance(value, str):
+        if not clean_strings:
+            return value
+        # Convert None to NULL
+        if value.upper() in ['NONE', 'NULL', '"NULL"', "'NULL'"]:
+            return None
+        # need to remove speechmarks at this point
+        return value.replace('\'', '').replace('\"', '')
+    # deal with booleans (stored as integers)
+    if isinstance(value, bool):
+        return int(value)
+    # deal with nan and inf
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    # deal with ints and floats
+    if isinstance(value, (int, float)):
+        return value
+    # anything else is pushed to a string
+    return str(value)
+
+
+def _sqlite_locked(error: Exception) -> bool:
+    """
+    Whether an sqlite error means the database (or a table) is locked by
+    another connection (and the query should be retried)
+
+    :param error: Exception, the sqlite error
+
+    :return: bool, True if locked
+    """
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+
+def _busy_backoff(attempt: int) -> float:
+    """
+    The time to wait before retrying a locked sqlite database
+
+    Doubles with every attempt (from BUSY_BACKOFF_START up to
+    BUSY_BACKOFF_MAX) with random jitter so that waiting processes do not
+    all retry at the same time
+
+    :param attempt: int, the number of retries so far
+
+    :return: float, the time to wait in seconds
+    """
+    delay = min(BUSY_BACKOFF_MAX, BUSY_BACKOFF_START * 2 ** min(attempt, 16))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _typed_column(column: np.ndarray, null_as_nan: bool = False
+                  ) -> np.ndarray:
+    """
+    Convert a column of python values (object array) to a typed numpy array
+
+    - only ints                  --> int64
+    - only ints/floats           --> float64
+    - only bools                 --> bool
+    - only strings               --> unicode (numpy_like) or object
+    - numbers with NULL (None)   --> float64 with NaN (if null_as_nan)
+    - anything else              --> object (unchanged)
+
+    :param column: np.ndarray, the object array of values
+    :param null_as_nan: bool, if True numeric columns with NULLs become
+                        float arrays with NaN (as pandas does), if False
+                        the column is typed as numpy.asarray would type it
+
+    :return: np.ndarray, the typed column
+    """
+    # get the python types present in the column
+    kinds = set(map(type, column))
+    has_null = type(None) in kinds
+    kinds.discard(type(None))
+    # deal with no values (or only NULLs)
+    if len(kinds) == 0:
+        return column
+    # deal with NULLs (numpy keeps these as objects)
+    if has_null:
+        if null_as_nan and kinds <= {int, float, bool}:
+            mask = np.equal(column, None)
+            values = np.array(column, copy=True)
+            values[mask] = np.nan
+            return values.astype(float)
+        return column
+    # numpy types bools, ints and floats separately
+    try:
+        if kinds == {bool}:
+            return column.astype(bool)
+        if kinds <= {int, bool}:
+            return column.astype(np.int64)
+        if kinds <= {int, float, bool}:
+            return column.astype(float)
+    except OverflowError:
+        return column
+    # strings (numpy.asarray would give a unicode array, pandas objects)
+    if kinds == {str}:
+        if null_as_nan:
+            return column
+        return column.astype(str)
+    # anything else stays as python objects
+    return column
+
+
+def _columns_to_array(columns: List[np.ndarray]) -> np.ndarray:
+    """
+    Convert the result of Database.execute_columns to a 2D numpy array
+    (the same as numpy.asarray of the list of row tuples)
+
+    :param columns: list of np.ndarrays, the columns
+
+    :return: np.ndarray, the rows x columns array
+    """
+    # deal with no rows (numpy.asarray of an empty list)
+    if len(columns) == 0 or len(columns[0]) == 0:
+        return np.asarray([])
+    # type each column
+    typed = [_typed_column(column) for column in columns]
+    # all numeric columns can be stacked directly
+    if all(col.dtype.kind in 'bif' for col in typed):
+        return np.column_stack(typed)
+    # otherwise fill the array column by column with the type numpy gives
+    #   the rows: objects if any column holds objects, else text wide enough
+    #   for every column (numbers are converted to text)
+    widths = [_text_width(col) for col in typed]
+    if None in widths:
+        dtype = object
+    else:
+        dtype = 'U{0}'.format(max(widths))
+    array = np.empty((len(typed[0]), len(typed)), dtype=dtype)
+    for it, column in enumerate(typed):
+        array[:, it] = column
+    return array
+
+
+def _text_width(column: np.ndarray) -> Optional[int]:
+    """
+    The width of the text numpy gives the values of a column in a row with
+    text (see _columns_to_array)
+
+    :param column: np.ndarray, the typed column (see _typed_column)
+
+    :return: int or None, the text width (None if numpy keeps the values as
+             objects i.e. NULLs)
+    """
+    # typed columns
+    if column.dtype.kind in TEXT_WIDTHS:
+        return TEXT_WIDTHS[column.dtype.kind]
+    if column.dtype.kind == 'U':
+        return column.itemsize // 4
+    # columns of mixed python values
+    width = 0
+    for value in column:
+        if isinstance(value, str):
+            width = max(width, len(value))
+        elif isinstance(value, bool):
+            width = max(width, TEXT_WIDTHS['b'])
+        elif isinstance(value, int) and -2 ** 63 <= value < 2 ** 63:
+            width = max(width, TEXT_WIDTHS['i'])
+        elif isinstance(value, float):
+            width = max(width, TEXT_WIDTHS['f'])
+        else:
+            return None
+    return width
+
+
+def _columns_to_pandas(colnames: List[str], columns: List[np.ndarray]
+                       ) -> pd.DataFrame:
+    """
+    Convert the result of Database.execute_columns to a pandas dataframe
+
+    :param colnames: list of strings, the column names
+    :param columns: list of np.ndarrays, the columns
+
+    :return: pd.DataFrame, the table
+    """
+    # use positions as keys (column names may be repeated)
+    data = dict()
+    for it, column in enumerate(columns):
+        data[it] = _typed_column(column, null_as_nan=True)
+    df = pd.DataFrame(data, copy=False)
+    df.columns = list(colnames)
+    return df
+
+
+def _query_summary(storage: Dict[Tuple[str, str, str], List[float]]
+                   ) -> List[List[Any]]:
+    """
+    Convert query stats storage into summary rows (slowest total first)
+
+    :param storage: dict, key = (database kind, func, kind), value = [number
+                    of queries, total time, max time, number of rows]
+
+    :return: list of lists, the summary rows (database kind, func, kind,
+             number of queries, total time, max time, number of rows)
+    """
+    rows = []
+    for key, entry in storage.items():
+        rows.append(list(key) + [int(entry[0]), float(entry[1]),
+                                 float(entry[2]), int(entry[3])])
+    # sort by total time (slowest first)
+    rows.sort(key=lambda row: row[4], reverse=True)
+    return rows
+
+
+def _index_name(table: str, columns: List[str]) -> str:
+    """
+    Construct the name of an index (index names must be unique in a sqlite
+    database and at most 64 characters in mysql)
+
+    :param table: str, the table name
+    :param columns: list of strings, the indexed columns
+
+    :return: str, the index name
+    """
+    name = 'idx_{0}_{1}'.format(table, '_'.join(columns)).lower()
+    # long names are shortened with a hash of the full name
+    if len(name) > 64:
+        name = '{0}_{1}'.format(name[:55], drs_base.generate_hash(name, 8))
+    return name
+
+
+def _result_nrows(result: Any) -> int:
+    """
+    The number of rows in a query result (0 if there are no rows)
+
+    :param result: the query result
+
+    :return: int, the number of rows
+    """
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return 0
+
+
+def _command_nrows(rows: Optional[List[Tuple[Any, ...]]]) -> int:
+    """
+    The number of parameter rows of a transaction command (a command without
+    placeholders - rows=None - is run once)
+
+    :param rows: list of tuples or None, the parameter rows
+
+    :return: int, the number of rows
+    """
+    if rows is None:
+        return 1
+    return len(rows)
+
+
+def _query_caller() -> str:
+    """
+    Find the code that ran a query (the first frame outside the database
+    modules)
+
+    :return: str, the caller as module:line function
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not filename.endswith(QUERY_CALLER_SKIP):
+            return '{0}:{1} {2}'.format(os.path.basename(filename),
+                                        frame.f_lineno, frame.f_code.co_name)
+        frame = frame.f_back
+    return 'Unknown'
+
+
+def _copy_result(result: Any) -> Any:
+    """
+    Copy a query result (so a cached result is never modified by the caller)
+
+    :param result: the query result (list of tuples, numpy array, pandas
+                   table, astropy table or a single value)
+
+    :return: the copy of the result
+    """
+    if isinstance(result, pd.DataFrame):
+        return result.copy(deep=True)
+    if isinstance(result, Table):
+        return result.copy(copy_data=True)
+    if isinstance(result, np.ndarray):
+        return result.copy()
+    # rows are tuples (immutable) so only the list needs copying
+    if isinstance(result, list):
+        return list(result)
+    return result
+
+
+def _result_nbytes(result: Any) -> int:
+    """
+    Estimate the memory used by a query result in bytes
+
+    :param result: the query result (list of tuples, numpy array, pandas
+                   table, astropy table or a single value)
+
+    :return: int, the estimated size in bytes
+    """
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(index=True, deep=True).sum())
+    if isinstance(result, Table):
+        return sum(_result_nbytes(np.asarray(result[col]))
+                   for col in result.colnames)
+    if isinstance(result, np.ndarray):
+        nbytes = result.nbytes
+        # object arrays only store pointers - add the size of the objects
+        if result.dtype == object:
+            nbytes += sum(map(sys.getsizeof, result.ravel()))
+        return int(nbytes)
+    if isinstance(result, (list, tuple)):
+        nbytes = sys.getsizeof(result)
+        for row in result:
+            if isinstance(row, tuple):
+                nbytes += sys.getsizeof(row) + sum(map(sys.getsizeof, row))
+            else:
+                nbytes += sys.getsizeof(row)
+        return nbytes
+    return sys.getsizeof(result)
+
+
 def _encode_value(value: str, dtype: Type) -> Union[str, None, float]:
     """
     Convert an sql string into a python variable
@@ -3071,7 +6397,8 @@ def _mysql_connect(host: str, user: str, passwd: str,
 
 
 def _mysql_sqlalchemy_connect(host: str, user: str, passwd: str,
-                              dbname: str) -> Any:
+                              dbname: str, use_pool: bool = False,
+                              pool_size: int = POOL_SIZE) -> Any:
     """
     Connect to MySQL using sqlalchemy
 
@@ -3079,6 +6406,9 @@ def _mysql_sqlalchemy_connect(host: str, user: str, passwd: str,
     :param user: str, the username for the mysql database
     :param passwd: str, the password for the mysql database
     :param dbname: str, the database name for the mysql database
+    :param use_pool: bool, if True reuse one engine (and its connection pool)
+                     per process instead of creating an engine per call
+    :param pool_size: int, the size of the engine connection pool
 
     :return: mysql sqlalchemy connection
     """
@@ -3091,8 +6421,16 @@ def _mysql_sqlalchemy_connect(host: str, user: str, passwd: str,
         # create a database engine for sqlalchemy
         dpath = 'mysql+mysqlconnector://{0}:{1}@{2}/{3}'
         dargs = [user, passwd, host, dbname]
-        db = sqlalchemy.create_engine(dpath.format(*dargs),
-                                      pool_pre_ping=True)
+        url = dpath.format(*dargs)
+        # get a stored engine (only if created by this process)
+        pid, db = SQLALCHEMY_ENGINES.get(url, (None, None))
+        if not use_pool or pid != os.getpid():
+            db = sqlalchemy.create_engine(url, pool_pre_ping=True,
+                                          pool_size=pool_size,
+                                          pool_recycle=int(POOL_RECYCLE))
+            # store engine for reuse by this process
+            if use_pool:
+                SQLALCHEMY_ENGINES[url] = (os.getpid(), db)
         # create a connection to the database
         conn = db.connect()
     # turn all warnings back on
@@ -18,11 +18,13 @@ only from
 """
 import importlib
 import os
+import re
 import sys
 from collections import UserDict
-from typing import Any, List, Optional, Union
+from typing import Any, List, Optional, Tuple, Union
 
 import duckdb
+import numpy as np
 import pandas as pd
 from pandasql import sqldf
 
@@ -45,6 +47,13 @@ __release__ = base.__release__
 display_func = drs_misc.display_func
 # get exceptions
 DrsCodedException = drs_exceptions.DrsCodedException
+# regular expression for the tokens of SQL WHERE conditions
+SQL_TOKENS = re.compile(r"""\s*(?:
+    (?P<str>"[^"]*"|'[^']*')|
+    (?P<num>[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)|
+    (?P<op><>|!=|==|<=|>=|=|<|>)|
+    (?P<punc>[(),])|
+    (?P<word>[A-Za-z_][A-Za-z0-9_]*))""", re.VERBOSE)
 
 
 # =============================================================================
@@ -674,7 +683,380 @@ class ImportModule:
         return module
 
 
+class UnsupportedQuery(Exception):
+    """
+    Raised when PandasQuery cannot evaluate an SQL condition natively
+    """
+    pass
+
+
+class PandasQuery:
+    """
+    Evaluate the SQL WHERE conditions APERO uses (=, !=, <, >, IN, LIKE,
+    IS NULL, AND, OR, NOT and brackets) on a pandas dataframe using boolean
+    masks, with a hash index (value --> row positions) per column for
+    equality and IN conditions
+
+    Comparisons follow SQLite rules: numeric columns compare numerically
+    (string literals are converted to numbers), text columns compare as
+    text, NULL never matches and LIKE is case insensitive (unless
+    like_case=True, as in DuckDB). Anything else raises UnsupportedQuery
+    """
+    def __init__(self, data: pd.DataFrame, like_case: bool = False):
+        """
+        Construct the query engine
+
+        :param data: pandas.DataFrame, the table to query (must not change
+                     after construction - indexes are cached)
+        :param like_case: bool, if True LIKE is case sensitive (DuckDB) else
+                          case insensitive (SQLite)
+        """
+        self.data = data
+        self.nrows = len(data)
+        self.like_case = like_case
+        # storage of the hash indexes (built on first use)
+        self.indexes = dict()
+        # storage of the null masks, column types and non-null values
+        #   (built on first use)
+        self.nulls = dict()
+        self.numeric = dict()
+        self.values = dict()
+        # tokens of the condition being parsed
+        self.tokens = []
+        self.pos = 0
+
+    def select(self, columns: str, condition: Optional[str] = None
+               ) -> pd.DataFrame:
+        """
+        Get the rows matching a condition
+
+        :param columns: str, the columns to return ('*' for all or comma
+                        separated column names)
+        :param condition: str or None, the SQL WHERE condition
+
+        :return: pandas.DataFrame, the matching rows (new index)
+        """
+        if columns.strip() == '*':
+            colnames = list(self.data.columns)
+        else:
+            colnames = list(map(lambda x: x.strip(), columns.split(',')))
+            # we only deal with plain column names
+            for colname in colnames:
+                if colname not in self.data.columns:
+                    raise UnsupportedQuery(colname)
+        mask = self.mask(condition)
+        return self.data.loc[mask, colnames].reset_index(drop=True)
+
+    def mask(self, condition: Optional[str] = None) -> np.ndarray:
+        """
+        Get the boolean mask of rows matching a condition
+
+        :param condition: str or None, the SQL WHERE condition
+
+        :return: np.ndarray, boolean mask of matching rows
+        """
+        if condition is None or len(condition.strip()) == 0:
+            return np.ones(self.nrows, dtype=bool)
+        self.tokens = _sql_tokens(condition)
+        self.pos = 0
+        true, _ = self._or()
+        # all tokens must be used
+        if self.pos != len(self.tokens):
+            raise UnsupportedQuery(condition)
+        return true
+
+    # -------------------------------------------------------------------------
+    # parser (each level returns a (true, unknown) pair of masks as SQL
+    #    uses three-valued logic with NULL)
+    # -------------------------------------------------------------------------
+    def _peek(self) -> Tuple[str, str]:
+        """The current token (empty if no tokens are left)"""
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return '', ''
+
+    def _next(self) -> Tuple[str, str]:
+        """Consume and return the current token"""
+        token = self._peek()
+        if token[0] == '':
+            raise UnsupportedQuery('Unexpected end of condition')
+        self.pos += 1
+        return token
+
+    def _keyword(self, *words: str) -> bool:
+        """Consume the current token if it is one of the keywords"""
+        kind, text = self._peek()
+        if kind == 'word' and text.upper() in words:
+            self.pos += 1
+            return True
+        return False
+
+    def _or(self) -> Tuple[np.ndarray, np.ndarray]:
+        """condition [OR condition ...]"""
+        true, unknown = self._and()
+        while self._keyword('OR'):
+            true2, unknown2 = self._and()
+            true = true | true2
+            unknown = (unknown | unknown2) & ~true
+        return true, unknown
+
+    def _and(self) -> Tuple[np.ndarray, np.ndarray]:
+        """condition [AND condition ...]"""
+        true, unknown = self._not()
+        while self._keyword('AND'):
+            true2, unknown2 = self._not()
+            false = (~true & ~unknown) | (~true2 & ~unknown2)
+            true = true & true2
+            unknown = (unknown | unknown2) & ~false
+        return true, unknown
+
+    def _not(self) -> Tuple[np.ndarray, np.ndarray]:
+        """[NOT] condition"""
+        if self._keyword('NOT'):
+            true, unknown = self._not()
+            return ~true & ~unknown, unknown
+        return self._primary()
+
+    def _primary(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(condition) or column predicate"""
+        kind, text = self._next()
+        # deal with brackets
+        if kind == 'punc' and text == '(':
+            result = self._or()
+            if self._next() != ('punc', ')'):
+                raise UnsupportedQuery('Missing )')
+            return result
+        # otherwise we need a column
+        column = self._column(kind, text)
+        null = self._null(column)
+        # IS [NOT] NULL
+        if self._keyword('IS'):
+            negate = self._keyword('NOT')
+            if not self._keyword('NULL'):
+                raise UnsupportedQuery('IS without NULL')
+            if negate:
+                return ~null, np.zeros(self.nrows, dtype=bool)
+            return null.copy(), np.zeros(self.nrows, dtype=bool)
+        # [NOT] IN / [NOT] LIKE
+        negate = self._keyword('NOT')
+        if self._keyword('IN'):
+            true = self._in(column)
+        elif self._keyword('LIKE'):
+            true = self._like(column, self._literal())
+        elif negate:
+            raise UnsupportedQuery('NOT without IN or LIKE')
+        # comparison operators
+        else:
+            kind, operator = self._next()
+            if kind != 'op':
+                raise UnsupportedQuery(operator)
+            true = self._compare(column, operator, self._literal())
+        if negate:
+            true = ~true & ~null
+        return true, null.copy()
+
+    def _column(self, kind: str, text: str) -> str:
+        """Get the column name of a token"""
+        if kind == 'word' and text in self.data.columns:
+            return text
+        # SQLite allows double quoted column names
+        if kind == 'str' and text[0] == '"' and text[1:-1] in self.data.columns:
+            return text[1:-1]
+        raise UnsupportedQuery(text)
+
+    def _literal(self) -> Tuple[str, str]:
+        """Consume a literal value (kind, text without quotes)"""
+        kind, text = self._next()
+        if kind == 'num':
+            return kind, text
+        if kind == 'str':
+            # a double quoted column name is not a literal
+            if text[0] == '"' and text[1:-1] in self.data.columns:
+                raise UnsupportedQuery(text)
+            return kind, text[1:-1]
+        raise UnsupportedQuery(text)
+
+    # -------------------------------------------------------------------------
+    # predicates
+    # -------------------------------------------------------------------------
+    def _in(self, column: str) -> np.ndarray:
+        """column IN (value, value, ...)"""
+        if self._next() != ('punc', '('):
+            raise UnsupportedQuery('IN without (')
+        true = np.zeros(self.nrows, dtype=bool)
+        while True:
+            true |= self._equal(column, self._literal())
+            token = self._next()
+            if token == ('punc', ')'):
+                return true
+            if token != ('punc', ','):
+                raise UnsupportedQuery(token[1])
+
+    def _equal(self, column: str, literal: Tuple[str, str]) -> np.ndarray:
+        """column = value (using the hash index)"""
+        value = self._value(column, literal)
+        true = np.zeros(self.nrows, dtype=bool)
+        # a text literal that is not a number never equals a number
+        if value is None:
+            return true
+        rows = self._index(column).get(value)
+        if rows is not None:
+            true[rows] = True
+        return true
+
+    def _compare(self, column: str, operator: str,
+                 literal: Tuple[str, str]) -> np.ndarray:
+        """column operator value"""
+        if operator in ['=', '==']:
+            return self._equal(column, literal)
+        if operator in ['!=', '<>']:
+            return ~self._equal(column, literal) & ~self._null(column)
+        value = self._value(column, literal)
+        if value is None:
+            raise UnsupportedQuery(literal[1])
+        null = self._null(column)
+        values = self._values(column)
+        true = np.zeros(self.nrows, dtype=bool)
+        if operator == '<':
+            true[~null] = values < value
+        elif operator == '<=':
+            true[~null] = values <= value
+        elif operator == '>':
+            true[~null] = values > value
+        elif operator == '>=':
+            true[~null] = values >= value
+        else:
+            raise UnsupportedQuery(operator)
+        return true
+
+    def _like(self, column: str, literal: Tuple[str, str]) -> np.ndarray:
+        """column LIKE pattern (% and _ wildcards, see like_case)"""
+        # numbers would need converting to text exactly as SQLite does
+        if self._numeric(column):
+            raise UnsupportedQuery('LIKE on numeric column')
+        # convert the LIKE pattern to a regular expression
+        pattern = ''
+        for char in literal[1]:
+            if char == '%':
+                pattern += '.*'
+            elif char == '_':
+                pattern += '.'
+            else:
+                pattern += re.escape(char)
+        if self.like_case:
+            regex = re.compile(pattern, re.DOTALL)
+        else:
+            regex = re.compile(pattern, re.IGNORECASE | re.DOTALL)
+        # apply to the non-null values
+        null = self._null(column)
+        values = self._values(column)
+        true = np.zeros(self.nrows, dtype=bool)
+        true[~null] = [regex.fullmatch(value) is not None for value in values]
+        return true
+
+    # -------------------------------------------------------------------------
+    # column helpers
+    # -------------------------------------------------------------------------
+    def _numeric(self, column: str) -> bool:
+        """
+        Whether a column is stored as numbers (True) or text (False) - this
+        is the same type pandas uses when writing the column to SQL
+        """
+        if column not in self.numeric:
+            dtype = self.data[column].dtype
+            if pd.api.types.is_bool_dtype(dtype):
+                self.numeric[column] = True
+            elif pd.api.types.is_numeric_dtype(dtype):
+                self.numeric[column] = True
+            elif (pd.api.types.is_object_dtype(dtype) or
+                  pd.api.types.is_string_dtype(dtype)):
+                kind = pd.api.types.infer_dtype(self.data[column], skipna=True)
+                if kind in ['string', 'empty']:
+                    self.numeric[column] = False
+                elif kind in ['floating', 'integer', 'mixed-integer-float',
+                              'boolean']:
+                    self.numeric[column] = True
+                else:
+                    raise UnsupportedQuery('Column {0} kind={1}'
+                                           ''.format(column, kind))
+            # anything else (i.e. dates) is not stored like this in SQL
+            else:
+                raise UnsupportedQuery('Column {0} dtype={1}'
+                                       ''.format(column, dtype))
+        return self.numeric[column]
+
+    def _values(self, column: str) -> np.ndarray:
+        """
+        The non-null values of a column (as floats for numeric columns and
+        strings for text columns)
+        """
+        if column not in self.values:
+            values = self.data[column].values[~self._null(column)]
+            if self._numeric(column):
+                self.values[column] = values.astype(float)
+            else:
+                self.values[column] = values.astype(str)
+        return self.values[column]
+
+    def _value(self, column: str, literal: Tuple[str, str]
+               ) -> Union[float, str, None]:
+        """
+        Convert a literal the way SQLite would for the column affinity
+        (None if the literal can never equal a value in the column)
+        """
+        kind, text = literal
+        if not self._numeric(column):
+            return text
+        try:
+            return float(text)
+        except ValueError:
+            return None
+
+    def _null(self, column: str) -> np.ndarray:
+        """The mask of NULL values in a column"""
+        if column not in self.nulls:
+            self.nulls[column] = np.asarray(self.data[column].isna())
+        return self.nulls[column]
+
+    def _index(self, column: str) -> dict:
+        """
+        The hash index of a column: value --> array of row positions
+        (text columns are indexed by their string values)
+        """
+        if column not in self.indexes:
+            positions = np.flatnonzero(~self._null(column))
+            values = self._values(column)
+            groups = pd.Series(positions).groupby(values, sort=False).indices
+            self.indexes[column] = {key: positions[rows]
+                                    for key, rows in groups.items()}
+        return self.indexes[column]
+
+
+def _sql_tokens(condition: str) -> List[Tuple[str, str]]:
+    """
+    Split an SQL condition into (kind, text) tokens
+
+    :param condition: str, the SQL WHERE condition
+
+    :return: list of (kind, text) tuples where kind is 'str', 'num', 'op',
+             'punc' or 'word'
+    """
+    tokens = []
+    pos = 0
+    condition = condition.rstrip()
+    while pos < len(condition):
+        match = SQL_TOKENS.match(condition, pos)
+        if match is None or match.end() == pos:
+            raise UnsupportedQuery(condition[pos:])
+        tokens.append((match.lastgroup, match.group(match.lastgroup)))
+        pos = match.end()
+    return tokens
+
+
 class PandasLikeDatabase:
+    # whether LIKE is case sensitive in the SQL engine (execute)
+    like_case = False
+
     def __init__(self, data: pd.DataFrame):
         """
         Construct a database just using a pandas dataframe stored in the memory
@@ -683,11 +1065,18 @@ class PandasLikeDatabase:
         loading from a dataframe is more efficient and avoids extra reads of
         the database)
 
+        WHERE conditions are evaluated natively (with boolean masks and
+        per-column hash indexes, see PandasQuery) and only fall back to a
+        full SQL engine (execute) when a condition is not supported, so the
+        dataframe must not be changed after construction
+
         :param data: pandas.DataFrame, the pandas dataframe - usually taken
                      from a call to a database
         """
         self.namespace = dict(data=data)
         self.tablename = 'data'
+        # native query engine (with the LIKE case rule of execute)
+        self.query = PandasQuery(data, like_case=self.like_case)
 
     def execute(self, command: str) -> pd.DataFrame:
         """
@@ -714,6 +1103,11 @@ class PandasLikeDatabase:
 
         :return: int, the count
         """
+        # try the native query engine first
+        try:
+            return int(self.query.mask(condition).sum())
+        except UnsupportedQuery:
+            pass
         # construct basic command SELECT COUNT(*) FROM {TABLE}
         command = "SELECT COUNT(*) FROM {}".format(self.tablename)
         # deal with condition
@@ -737,6 +1131,11 @@ class PandasLikeDatabase:
         :param condition: str or None, if set the SQL query to add
         :return:
         """
+        # try the native query engine first
+        try:
+            return self.query.select(columns, condition)
+        except UnsupportedQuery:
+            pass
         # construct basic command SELECT {COLUMNS} FROM {TABLE}
         command = 'SELECT {0} FROM {1}'.format(columns, self.tablename)
         # deal with condition
@@ -773,6 +1172,8 @@ class PandasLikeDatabase:
 
 
 class PandasLikeDatabaseDuckDB(PandasLikeDatabase):
+    # LIKE is case sensitive in duckdb
+    like_case = True
 
     def execute(self, command: str) -> pd.DataFrame:
         """
@@ -18,24 +18,28 @@ only from
 - apero.core.math.*
 - apero.io.drs_fits
 """
+import json
 import os
 import shutil
 import time
 import warnings
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple, Type, Union
+from typing import (Any, Dict, Iterator, List, Optional, Set, Tuple, Type,
+                    Union)
 
 import numpy as np
 import pandas as pd
 import requests
 from astropy.io.ascii.core import InconsistentTableError
 from astropy.table import Table
-from pandasql import sqldf
 
 from apero import lang
 from apero.base import base
 from apero.base import drs_db
 from apero.core import constants
+from apero.core.core import drs_base_classes
 from apero.core.core import drs_exceptions
 from apero.core.core import drs_file
 from apero.core.core import drs_log
@@ -75,6 +79,8 @@ DrsInputFile = drs_file.DrsInputFile
 DrsFitsFile = drs_file.DrsFitsFile
 # Get the text types
 textentry = lang.textentry
+# in-memory (pandas) database proxy
+PandasLikeDatabase = drs_base_classes.PandasLikeDatabase
 # define drs files
 DrsFileTypes = Union[drs_file.DrsInputFile, drs_file.DrsFitsFile,
                      drs_file.DrsNpyFile]
@@ -87,9 +93,39 @@ DealFilenameReturn = Union[Tuple[str, str], Tuple[Path, str, str, str]]
 # globals to save time on multiple reads
 OBS_PATHS = dict()
 FILEDBS = dict()
+# resolved object names (objname --> [OBJNAME, found]) per astrometric
+#   database (valid as long as the alias index is)
 OBS_NAMES = dict()
+# alias index (objnames and cleaned alias --> OBJNAME) per astrometric
+#   database with the generation stamp of the database it was built from
+ALIAS_INDEXES = dict()
+# the columns that order calibration / telluric rows with the same UNIXTIME
+#   (with KEYNAME these are the unique columns so every row has its place)
+TIME_TIE_SORT = 'FILENAME ASC, FIBER ASC, REFCAL'
 # define reserved object names
 RESERVED_OBJ_NAMES = ['CALIB', 'SKY', 'TEST']
+# the suffix of the file index manifest table (added to the index table name)
+MANIFEST_SUFFIX = '_manifest'
+# directories (or files) modified within this many seconds of a scan are
+#   not trusted by the manifest (they may still have been changing)
+MANIFEST_MTIME_MARGIN = 2.0
+# the suffix of the log database timing table (added to the log table name)
+DBTIME_SUFFIX = '_dbtime'
+# the suffix of the log database archive table (added to the log table name)
+ARCHIVE_SUFFIX = '_archive'
+# the number of runs moved to the log archive per transaction
+ARCHIVE_CHUNK_SIZE = 500
+# the suffix of the log database memory table (added to the log table name)
+MEMORY_SUFFIX = '_memory'
+# the suffix of the log database fingerprint table (added to the log table
+#   name)
+FPRINT_SUFFIX = '_fprint'
+# the calibration and telluric queries (and the files they resolved) made
+#   by this process (cleared before each run by the processing - see
+#   drs_processing.run_fingerprint and resolve_query)
+RESOLVED_QUERIES = []
+# storage for the databases used to re-resolve queries (by kind)
+RESOLVE_DATABASES = dict()
 # define database names
 DATABASE_NAMES = ['calib', 'tellu', 'findex', 'log', 'astrom', 'lang',
                   'reject']
@@ -144,6 +180,12 @@ class DatabaseManager:
         self.path = None
         # set unloaded database
         self.database = None
+        # no timeline index by default (see TimelineIndex)
+        self.use_timeline = False
+        self.timeline = None
+        # no read-only snapshot of the database by default
+        #   (see drs_db.DatabaseSnapshot)
+        self.snapshot = None
 
     def set_path(self, kind: str, check: bool = True,
                  dparams: Union[dict, None] = None):
@@ -219,7 +261,8 @@ class DatabaseManager:
             emsg = 'Database type "{0}" invalid'
             WLOG(self.params, 'error', emsg.format(self.dbtype))
 
-    def load_db(self, check: bool = False, log: bool = False):
+    def load_db(self, check: bool = False, log: bool = False,
+                read_only: bool = False):
         """
         Load the database class and connect to SQL database
 
@@ -227,6 +270,8 @@ class DatabaseManager:
                       else if we Database.database is set this function does
                       nothing
         :param log: if True prints that we are loading database
+        :param read_only: if True connects read-only (only for managers that
+                          never write - SQLite3 only)
 
         :return:
         """
@@ -243,7 +288,32 @@ class DatabaseManager:
             margs = [self.name, self.path]
             WLOG(self.params, 'info', textentry('40-006-00005', args=margs))
         # load database
-        self.database = drs_db.database_wrapper(self.kind, self.path)
+        self.database = drs_db.database_wrapper(self.kind, self.path,
+                                                read_only=read_only)
+        # cache query results (opt-in - invalidated by any write)
+        if self.params['DB_QUERY_CACHE']:
+            cache_size = int(self.params['DB_QUERY_CACHE_SIZE'] * 1024 ** 2)
+            self.database.enable_cache(cache_size)
+        # any timeline index refers to the old database
+        if self.timeline is not None:
+            self.timeline.reset()
+        # use the read-only snapshot of this database (if the process that
+        #   started this process made one)
+        self.snapshot = drs_db.snapshot_database(self.kind)
+
+    @property
+    def reader(self) -> drs_db.Database:
+        """
+        The database to read from: the read-only snapshot (if there is one
+        and this process has not written to this kind of database) else
+        the database itself
+
+        :return: Database, the database to read from
+        """
+        if self.snapshot is not None:
+            if self.kind not in drs_db.WRITTEN_KINDS:
+                return self.snapshot
+        return self.database
 
     def __str__(self):
         """
@@ -354,7 +424,7 @@ class AstrometricDatabase(DatabaseManager):
         if self.database is None:
             self.load_db()
         # deal with having the possibility of more than one column
-        colnames = self.database.colnames(columns)
+        colnames = self.reader.colnames(columns)
         # ------------------------------------------------------------------
         # set up kwargs from database query
         sql = dict()
@@ -373,7 +443,7 @@ class AstrometricDatabase(DatabaseManager):
         # if we have one entry just get the tuple back
         if nentries == 1:
             # do sql query
-            entries = self.database.get(columns, **sql)
+            entries = self.reader.get(columns, **sql)
             # return filename
             if len(entries) == 1:
                 if len(colnames) == 1:
@@ -388,7 +458,7 @@ class AstrometricDatabase(DatabaseManager):
             # return array for ease
             sql['return_array'] = True
             # do sql query
-            entries = self.database.get(columns, **sql)
+            entries = self.reader.get(columns, **sql)
             # return one list
             if len(entries) == 0:
                 return []
@@ -399,7 +469,7 @@ class AstrometricDatabase(DatabaseManager):
             # return as pandas table
             sql['return_pandas'] = True
             # do sql query
-            entries = self.database.get(columns, **sql)
+            entries = self.reader.get(columns, **sql)
             # return pandas table
             return entries
 
@@ -488,12 +558,15 @@ class AstrometricDatabase(DatabaseManager):
             # update row in database
             self.database.set('*', values=values, condition=condition,
                               unique_cols=ucols)
+        # the alias index (and resolved names) are no longer valid
+        ALIAS_INDEXES.pop(self._alias_key(), None)
+        OBS_NAMES.pop(self._alias_key(), None)
 
     def count(self, condition: Union[str, None] = None) -> int:
         """
         Count the number of rows in the object database
         """
-        return self.database.count(condition=condition)
+        return self.reader.count(condition=condition)
 
     def find_objnames(self, pconst: constants.PseudoConstants,
                       objnames: Union[List[str], np.ndarray],
@@ -514,10 +587,12 @@ class AstrometricDatabase(DatabaseManager):
         # deal with objnames not being a list or a
         if not isinstance(objnames, (list, np.ndarray)):
             objnames = [objnames]
+        # get the alias index once for all objects
+        index = self.alias_index(pconst)
         # loop around objects
         out_objnames = []
         for objname in objnames:
-            out_objname, found = self.find_objname(pconst, objname)
+            out_objname, found = self._resolve_objname(pconst, objname, index)
             if found:
                 out_objnames.append(out_objname)
         # ---------------------------------------------------------------------
@@ -556,60 +631,442 @@ class AstrometricDatabase(DatabaseManager):
         :return: Tuple, 1. str, the "correct" object name to use for the DRS,
                  2. whether the object was found in the database
         """
-        # global to be updated so we don't do this more than once for the
-        #   same objname
-        global OBS_NAMES
-        # ---------------------------------------------------------------------
-        # check objname in global
-        if objname in OBS_NAMES:
-            return OBS_NAMES[objname]
-        # ---------------------------------------------------------------------
+        # resolve using the alias index
+        return self._resolve_objname(pconst, objname)
+
+    def _resolve_objname(self, pconst: constants.PseudoConstants,
+                         objname: str,
+                         index: Optional[Tuple[set, Dict[str, str]]] = None
+                         ) -> Tuple[str, bool]:
+        """
+        Find and clean the correct object name using the alias index
+        (see find_objname)
+
+        :param pconst: psuedo constants - used to clean the object name
+        :param objname: str, the object name to clean and fimd
+        :param index: tuple or None, the alias index (from alias_index) if
+                      None it is loaded (or checked against the database)
+
+        :return: Tuple, 1. str, the "correct" object name to use for the DRS,
+                 2. whether the object was found in the database
+        """
         # deal with calib / sky / test
         if objname in RESERVED_OBJ_NAMES:
             return objname, True
         # ---------------------------------------------------------------------
-        # assume we have not found our object name
-        found = False
+        # get the object names and aliases (this also clears the resolved
+        #   names if the database has changed)
+        if index is None:
+            index = self.alias_index(pconst)
+        # resolved names for this database (so we don't do this more than
+        #   once for the same objname)
+        names = OBS_NAMES.setdefault(self._alias_key(), dict())
+        # check objname in resolved names
+        if objname in names:
+            return names[objname]
+        # ---------------------------------------------------------------------
         # clean the input objname
         cobjname = pconst.DRS_OBJ_NAME(objname)
         # deal with a null object (should not continue)
         if cobjname == 'Null':
             return '', False
-        # sql obj condition
-        sql_obj_cond = 'OBJNAME="{0}" AND USED=1'.format(cobjname)
+        # get the object names and aliases
+        objnames, aliases = index
         # look for object name in database
-        count = self.count(condition=sql_obj_cond)
+        if cobjname in objnames:
+            found = True
         # if we have not found our object we must check aliases
-        if count == 0:
-            # condition - only use ones with USED
-            condition = 'USED=1'
-            # get the full database
-            full_table = self.get_entries('OBJNAME, ALIASES',
-                                          condition=condition)
-            aliases = full_table['ALIASES']
-            # set row to zero as a place holder
-            row = 0
-            # loop around each row in the table
-            for row in range(len(aliases)):
-                # loop around aliases until we find the alias
-                for alias in aliases[row].split('|'):
-                    if pconst.DRS_OBJ_NAME(alias) == cobjname:
-                        found = True
-                        break
-                # stop looping if we have found our object
-                if found:
-                    break
-            # get the cobjname for this target if found
-            if found:
-                cobjname = full_table['OBJNAME'][row]
-        # if there is an entry we found the object
-        else:
+        elif cobjname in aliases:
+            cobjname = aliases[cobjname]
             found = True
-        # store in global so we don't have to do this again
-        OBS_NAMES[objname] = [cobjname, found]
+        else:
+            found = False
+        # store in resolved names so we don't have to do this again
+        names[objname] = [cobjname, found]
         # return the correct object name
         return cobjname, found
 
+    def alias_index(self, pconst: constants.PseudoConstants
+                    ) -> Tuple[set, Dict[str, str]]:
+        """
+        Get the alias index of the database: the set of (USED) object names
+        and a dictionary of cleaned alias --> object name (the first row with
+        the alias wins)
+
+        The index is kept per process and saved alongside the database
+        (with a generation stamp) so other processes can load it - both are
+        only used as long as the generation stamp of the database has not
+        changed (e.g. a write by another process)
+
+        :param pconst: psuedo constants - used to clean the aliases
+
+        :return: tuple, 1. set of object names, 2. dict of alias --> objname
+        """
+        # deal with no database loaded
+        if self.database is None:
+            self.load_db()
+        # get the key for this database
+        key = self._alias_key()
+        # get the stamp of this database
+        generation = self.database.generation()
+        # check the process storage (built from this generation of the
+        #   database)
+        if key in ALIAS_INDEXES and ALIAS_INDEXES[key][0] == generation:
+            return ALIAS_INDEXES[key][1]
+        stamp = [generation, __version__, self.instrument]
+        # try to load the saved index
+        index = None
+        path = self._alias_index_path()
+        if generation is not None and path.exists():
+            # noinspection PyBroadException
+            try:
+                with open(path, 'r') as jfile:
+                    saved = json.load(jfile)
+                if saved['STAMP'] == stamp:
+                    index = set(saved['OBJNAMES']), dict(saved['ALIASES'])
+            except Exception as _:
+                index = None
+        # if we could not load it build it from the database
+        if index is None:
+            index = self._build_alias_index(pconst)
+            # save alongside the database (if the database can be stamped)
+            if generation is not None:
+                saved = dict(STAMP=stamp, OBJNAMES=sorted(index[0]),
+                             ALIASES=index[1])
+                tmppath = '{0}.{1}.tmp'.format(path, os.getpid())
+                # noinspection PyBroadException
+                try:
+                    with open(tmppath, 'w') as jfile:
+                        json.dump(saved, jfile)
+                    os.replace(tmppath, path)
+                except Exception as _:
+                    pass
+        # store in process storage (and reset the resolved names)
+        ALIAS_INDEXES[key] = (generation, index)
+        OBS_NAMES[key] = dict()
+        # return index
+        return index
+
+    def _build_alias_index(self, pconst: constants.PseudoConstants
+                           ) -> Tuple[set, Dict[str, str]]:
+        """
+        Build the alias index from the database (see alias_index)
+
+        :param pconst: psuedo constants - used to clean the aliases
+
+        :return: tuple, 1. set of object names, 2. dict of alias --> objname
+        """
+        # get the full database (only rows with USED=1)
+        full_table = self.get_entries('OBJNAME, ALIASES')
+        objnames = set()
+        aliases = dict()
+        # deal with no instrument (no database)
+        if full_table is None:
+            return objnames, aliases
+        # loop around each row in the table
+        for objname, row_aliases in zip(full_table['OBJNAME'],
+                                        full_table['ALIASES']):
+            objnames.add(objname)
+            # deal with no aliases
+            if not isinstance(row_aliases, str):
+                continue
+            # loop around aliases (the first row with an alias wins)
+            for alias in row_aliases.split('|'):
+                aliases.setdefault(pconst.DRS_OBJ_NAME(alias), objname)
+        # return the index
+        return objnames, aliases
+
+    def _alias_key(self) -> str:
+        """
+        The key for this database in the process storage (ALIAS_INDEXES
+        and OBS_NAMES)
+
+        :return: str, the key
+        """
+        return '{0}:{1}'.format(self.path, self.database.tname)
+
+    def _alias_index_path(self) -> Path:
+        """
+        The path the alias index is saved to (next to the sqlite database
+        file or in the assets directory for mysql)
+
+        :return: Path, the alias index path
+        """
+        if self.dbtype == 'SQLITE3':
+            return Path('{0}.aliases.json'.format(self.path))
+        filename = '{0}.{1}.aliases.json'.format(self.kind, self.database.tname)
+        return Path(self.params['DRS_DATA_ASSETS']).joinpath(filename)
+
+
+# =============================================================================
+# Define calibration/telluric timeline index
+# =============================================================================
+class TimelineIndex:
+    """
+    In-process index of the rows of a calibration or telluric database
+    grouped by their query condition (i.e. KEYNAME, FIBER, ...) and sorted
+    by UNIXTIME, so "older", "newer" and "closest" entries can be found
+    with a binary search instead of an SQL sort
+
+    Each group is loaded (with one SQL query) the first time it is asked
+    for, the whole index is reset whenever the database is changed (by this
+    process or when the generation stamp of the database changes)
+
+    Rows with the same UNIXTIME are ordered by TIME_TIE_SORT (in the SQL
+    queries and in the index) so the index gives exactly the SQL result
+    """
+    def __init__(self):
+        """
+        Construct the timeline index (empty - groups are loaded on demand)
+        """
+        # set class name
+        self.classname = 'TimelineIndex'
+        # storage of the table column names
+        self.colnames = None
+        # storage for each group [rows, unixtimes]
+        self.groups = dict()
+        # the generation stamp of the database the groups were loaded from
+        self.generation = None
+        # count the number of queries answered with and without the database
+        self.hits = 0
+        self.misses = 0
+
+    def reset(self):
+        """
+        Reset the index (must be done every time the database changes)
+
+        :return: None, resets the index
+        """
+        self.colnames = None
+        self.groups = dict()
+
+    def get_rows(self, database: drs_db.Database, columns: str,
+                 group: Tuple[Tuple[str, Any], ...],
+                 utime: Union[float, None] = None,
+                 timemode: str = 'older', nentries: Union[int, str] = '*'
+                 ) -> Union[List[tuple], None]:
+        """
+        Get the rows (of columns) for a group ordered exactly as the SQL
+        query would order them (via UNIXTIME then TIME_TIE_SORT)
+
+        :param database: Database, the database to load groups from
+        :param columns: str, the columns to return (comma separated or '*')
+        :param group: tuple of (column name, value) pairs, the equality
+                      conditions that define the group (USED = 1 is always
+                      added)
+        :param utime: float or None, the unix time to order the rows by
+                      (if None rows are ordered newest first)
+        :param timemode: str, 'older', 'newer' or 'closest'
+        :param nentries: int or str, the number of entries to return
+                         only valid string is '*' for all entries
+
+        :return: list of row tuples or None if the index cannot answer this
+                 query (and the SQL query should be used instead)
+        """
+        # reset if the database was changed (i.e. by another process)
+        generation = database.generation()
+        if generation != self.generation:
+            self.reset()
+            self.generation = generation
+        # get the table column names (once per reset)
+        if self.colnames is None:
+            self.colnames = list(database.colnames('*'))
+        # get the requested columns (in the requested order)
+        colnames = self.requested(columns)
+        # we can only deal with plain column names
+        for colname in colnames:
+            if colname not in self.colnames:
+                return None
+        # load the group if we do not have it already
+        if group not in self.groups:
+            self.groups[group] = self._load_group(database, group)
+        rows, utimes = self.groups[group]
+        # deal with a group we cannot order (i.e. NULL times)
+        if rows is None:
+            self.misses += 1
+            return None
+        # get the row order
+        order = _timeline_order(utimes, utime, timemode, nentries)
+        # get the positions of the requested columns
+        positions = [self.colnames.index(colname) for colname in colnames]
+        # count this as answered
+        self.hits += 1
+        # return the rows with the requested columns
+        return [tuple(rows[row][pos] for pos in positions) for row in order]
+
+    def requested(self, columns: str) -> List[str]:
+        """
+        Get the requested column names in the order requested (as SQL would
+        return them)
+
+        :param columns: str, the columns (comma separated or '*')
+
+        :return: list of strings, the column names
+        """
+        if columns.strip() == '*':
+            return list(self.colnames)
+        return list(map(lambda x: x.strip(), columns.split(',')))
+
+    def entries(self, rows: List[tuple], columns: str,
+                nentries: Union[int, str] = '*'
+                ) -> Union[None, list, tuple, np.ndarray, pd.DataFrame]:
+        """
+        Convert rows from get_rows into the same return as get_calib_entry /
+        get_tellu_entry gives for the SQL query
+
+        :param rows: list of row tuples (from get_rows)
+        :param columns: str, the columns requested (comma separated or '*')
+        :param nentries: int or str, the number of entries requested
+
+        :return: if nentries = 1 returns either that entry (as a tuple) or
+                 None, if len(columns) = 1, returns a np.ndarray, else returns
+                 a pandas table
+        """
+        colnames = self.requested(columns)
+        # if we have one entry just get the tuple back
+        if nentries == 1:
+            if len(rows) == 1:
+                if len(colnames) == 1:
+                    return rows[0][0]
+                else:
+                    return rows[0]
+            else:
+                return None
+        # if we have one column return a list
+        if len(colnames) == 1:
+            if len(rows) == 0:
+                return []
+            else:
+                return np.asarray(rows)[:, 0]
+        # else return a pandas table
+        return pd.DataFrame(rows, columns=colnames)
+
+    def _load_group(self, database: drs_db.Database,
+                    group: Tuple[Tuple[str, Any], ...]
+                    ) -> Tuple[Union[List[tuple], None], np.ndarray]:
+        """
+        Load all rows for a group from the database sorted by UNIXTIME
+
+        :param database: Database, the database to load from
+        :param group: tuple of (column name, value) pairs, the equality
+                      conditions that define the group
+
+        :return: tuple, 1. the list of row tuples (None if rows cannot be
+                 ordered), 2. the numpy array of unix times
+        """
+        # build the condition exactly as the SQL query does
+        condition = 'USED = 1'
+        for colname, value in group:
+            condition += ' AND {0} = "{1}"'.format(colname, value)
+        # get all rows of this group sorted by time (then TIME_TIE_SORT)
+        rows = database.get('*', condition=condition,
+                            sort_by='UNIXTIME ASC, ' + TIME_TIE_SORT,
+                            sort_descending=False)
+        rows = list(map(tuple, rows))
+        # get the unix times as a numpy array
+        upos = self.colnames.index('UNIXTIME')
+        utimes = np.array([row[upos] for row in rows], dtype=float)
+        # NULL times are sorted differently by SQL - do not index these
+        if not np.all(np.isfinite(utimes)):
+            return None, utimes
+        return rows, utimes
+
+
+def _time_sort(utime: Union[float, None]) -> str:
+    """
+    The ORDER BY of the calibration and telluric database time queries
+    (used with sort_descending=False). Rows with the same distance in time
+    are ordered older first and rows with the same time by TIME_TIE_SORT so
+    the order is fully defined (and matches TimelineIndex)
+
+    :param utime: float or None, the unix time to order by (None for newest
+                  first)
+
+    :return: str, the sort_by string
+    """
+    if utime is None:
+        return 'UNIXTIME DESC, ' + TIME_TIE_SORT
+    return 'abs(UNIXTIME - {0}) ASC, UNIXTIME ASC, {1}'.format(utime,
+                                                               TIME_TIE_SORT)
+
+
+def _timeline_order(utimes: np.ndarray, utime: Union[float, None],
+                    timemode: str, nentries: Union[int, str]) -> List[int]:
+    """
+    Get the order of rows (sorted by increasing unix time then TIME_TIE_SORT)
+    as given by the SQL queries in the calibration and telluric databases
+    (see _time_sort):
+
+        older:    UNIXTIME - utime < 0 sorted by abs(UNIXTIME - utime) ASC
+        newer:    UNIXTIME - utime > 0 sorted by abs(UNIXTIME - utime) ASC
+        closest:  sorted by abs(UNIXTIME - utime) ASC, UNIXTIME ASC
+        no utime: sorted by UNIXTIME DESC
+
+    rows with the same UNIXTIME are always kept in their (TIME_TIE_SORT)
+    order
+
+    :param utimes: np.ndarray, the sorted unix times of the rows
+    :param utime: float or None, the unix time to order by
+    :param timemode: str, 'older', 'newer' or 'closest'
+    :param nentries: int or str, the maximum number of rows ('*' for all)
+
+    :return: list of ints, the row positions in order
+    """
+    # get the number of rows
+    nrows = len(utimes)
+    # get the maximum number of rows to return
+    if isinstance(nentries, int):
+        nmax = max(min(nentries, nrows), 0)
+    else:
+        nmax = nrows
+
+    def block_before(end: int) -> int:
+        # the start of the rows with the same time as row end - 1
+        return int(np.searchsorted(utimes, utimes[end - 1], side='left'))
+
+    order = []
+    # no time: newest first
+    if utime is None:
+        end = nrows
+        while end > 0 and len(order) < nmax:
+            start = block_before(end)
+            order += list(range(start, end))
+            end = start
+        return order[:nmax]
+    # rows before low are older, rows from high onwards are newer, rows in
+    #   between have exactly the same time
+    low = int(np.searchsorted(utimes, utime, side='left'))
+    high = int(np.searchsorted(utimes, utime, side='right'))
+    # older: the newest of the older rows first
+    if timemode == 'older':
+        end = low
+        while end > 0 and len(order) < nmax:
+            start = block_before(end)
+            order += list(range(start, end))
+            end = start
+        return order[:nmax]
+    # newer: the oldest of the newer rows first
+    if timemode == 'newer':
+        return list(range(high, min(high + nmax, nrows)))
+    # closest: rows with the same time first then walk outwards
+    order = list(range(low, high))
+    end, newer = low, high
+    while len(order) < nmax:
+        # take the older rows if they are at least as close as the newer row
+        if newer >= nrows:
+            take_older = True
+        else:
+            take_older = end > 0 and (utime - utimes[end - 1] <=
+                                      utimes[newer] - utime)
+        if take_older:
+            start = block_before(end)
+            order += list(range(start, end))
+            end = start
+        else:
+            order.append(newer)
+            newer += 1
+    return order[:nmax]
+
 
 # =============================================================================
 # Define specific file databases
@@ -638,6 +1095,9 @@ class CalibrationDatabase(DatabaseManager):
         self.set_path(kind=self.kind, check=check)
         # set database directory
         self.filedir = Path(str(self.params['DRS_CALIB_DB']))
+        # in-memory timeline index (for get entry queries)
+        self.use_timeline = self.params['DB_TIMELINE_INDEX']
+        self.timeline = TimelineIndex()
 
     def add_calib_file(self, drsfile: DrsInputFile, verbose: bool = True,
                        copy_files=True):
@@ -708,6 +1168,8 @@ class CalibrationDatabase(DatabaseManager):
         # add entry to database
         values = [key, fiber, is_super, filename, human_time, unix_time, pid,
                   pdate, used]
+        # the timeline index is no longer valid
+        self.timeline.reset()
         # try to add a new row
         try:
             self.database.add_row(values, columns='*', unique_cols=ucols)
@@ -756,7 +1218,7 @@ class CalibrationDatabase(DatabaseManager):
         # set up kwargs from database query
         sql = dict()
         # deal with having the possibility of more than one column
-        colnames = self.database.colnames(columns)
+        colnames = self.reader.colnames(columns)
         # set up sql kwargs
         sql['sort_by'] = None
         sql['sort_descending'] = True
@@ -778,35 +1240,43 @@ class CalibrationDatabase(DatabaseManager):
             # condition:
             #       UNIXTIME - FILETIME < 0
             # sort by:
-            #       ABS(UNIXTIME - FILETIME)
+            #       ABS(UNIXTIME - FILETIME) (then UNIXTIME, TIME_TIE_SORT)
             sql['condition'] += ' AND UNIXTIME - {0} < 0'.format(utime)
-            sql['sort_by'] = 'abs(UNIXTIME - {0})'.format(utime)
+            sql['sort_by'] = _time_sort(utime)
             sql['sort_descending'] = False
         elif timemode == 'newer' and utime is not None:
             # condition:
             #       UNIXTIME - FILETIME > 0
             # sort by:
-            #       ABS(UNIXTIME - FILETIME)
+            #       ABS(UNIXTIME - FILETIME) (then UNIXTIME, TIME_TIE_SORT)
             sql['condition'] += ' AND UNIXTIME - {0} > 0'.format(utime)
-            sql['sort_by'] = 'abs(UNIXTIME - {0})'.format(utime)
+            sql['sort_by'] = _time_sort(utime)
             sql['sort_descending'] = False
         elif utime is not None:
             # sort by:
-            #       ABS(UNIXTIME - FILETIME)
-            sql['sort_by'] = 'abs(UNIXTIME - {0})'.format(utime)
+            #       ABS(UNIXTIME - FILETIME) (then UNIXTIME, TIME_TIE_SORT)
+            sql['sort_by'] = _time_sort(utime)
             sql['sort_descending'] = False
         else:
-            # sort by: UNIXTIME
-            sql['sort_by'] = 'UNIXTIME'
-            sql['sort_descending'] = True
-
+            # sort by: UNIXTIME (newest first, then TIME_TIE_SORT)
+            sql['sort_by'] = _time_sort(None)
+            sql['sort_descending'] = False
+        # use the timeline index instead of sql (gives the same result)
+        if self.use_timeline:
+            group = (('KEYNAME', key),)
+            if fiber is not None:
+                group += (('FIBER', fiber),)
+            rows = self.timeline.get_rows(self.reader, columns, group,
+                                          utime, timemode, nentries)
+            if rows is not None:
+                return self.timeline.entries(rows, columns, nentries)
         # add the number of entries to get
         if isinstance(nentries, int):
             sql['max_rows'] = nentries
         # if we have one entry just get the tuple back
         if nentries == 1:
             # do sql query
-            entries = self.database.get(columns, **sql)
+            entries = self.reader.get(columns, **sql)
             # return filename
             if len(entries) == 1:
                 if len(colnames) == 1:
@@ -820,7 +1290,7 @@ class CalibrationDatabase(DatabaseManager):
             # return array for ease
             sql['return_array'] = True
             # do sql query
-            entries = self.database.get(columns, **sql)
+            entries = self.reader.get(columns, **sql)
             # return one list
             if len(entries) == 0:
                 return []
@@ -831,7 +1301,7 @@ class CalibrationDatabase(DatabaseManager):
             # return as pandas table
             sql['return_pandas'] = True
             # do sql query
-            entries = self.database.get(columns, **sql)
+            entries = self.reader.get(columns, **sql)
             # return pandas table
             return entries
 
@@ -950,13 +1420,18 @@ class CalibrationDatabase(DatabaseManager):
         # ---------------------------------------------------------------------
         # return absolute paths
         # ---------------------------------------------------------------------
+        # record the query (and the files it resolved)
+        if filenames is not None and len(filenames) > 0 or not required:
+            _record_query('calibration', self.filedir, filenames, key=key,
+                          fiber=fiber, filetime=filetime, timemode=timemode,
+                          nentries=nentries)
         # deal with no filenames found and not required
         if (filenames is None or len(filenames) == 0) and not required:
             return None, np.nan, False
         # deal with no filenames found elsewise --> error
         if filenames is None or len(filenames) == 0:
             # get unique set of keys
-            keys = self.database.unique('KEYNAME')
+            keys = self.reader.unique('KEYNAME')
             # get file description
             if drsfile is not None:
                 if no_times:
@@ -1010,6 +1485,8 @@ class CalibrationDatabase(DatabaseManager):
             self.load_db()
         # remove entries
         self.database.delete_rows(condition=condition)
+        # the timeline index is no longer valid
+        self.timeline.reset()
 
 
 class TelluricDatabase(DatabaseManager):
@@ -1036,6 +1513,9 @@ class TelluricDatabase(DatabaseManager):
         self.set_path(kind=self.kind, check=check)
         # set database directory
         self.filedir = Path(str(self.params['DRS_TELLU_DB']))
+        # in-memory timeline index (for get entry queries)
+        self.use_timeline = self.params['DB_TIMELINE_INDEX']
+        self.timeline = TimelineIndex()
 
     def add_tellu_file(self, drsfile: DrsInputFile, verbose: bool = True,
                        copy_files: bool = True,
@@ -1140,6 +1620,8 @@ class TelluricDatabase(DatabaseManager):
         # add entry to database
         values = [key, fiber, is_super, filename, human_time, unix_time,
                   objname, airmass, tau_water, tau_others, pid, pdate, used]
+        # the timeline index is no longer valid
+        self.timeline.reset()
         # try to add a new row
         try:
             self.database.add_row(values, columns='*', unique_cols=ucols)
@@ -1198,7 +1680,7 @@ class TelluricDatabase(DatabaseManager):
         if self.instrument == 'None':
             return None
         # deal with having the possibility of more than one column
-        colnames = self.database.colnames(columns)
+        colnames = self.reader.colnames(columns)
         # set up kwargs from database query
         sql = dict()
         # set up sql kwargs
@@ -1230,34 +1712,50 @@ class TelluricDatabase(DatabaseManager):
             # condition:
             #       UNIXTIME - FILETIME < 0
             # sort by:
-            #       ABS(UNIXTIME - FILETIME)
+            #       ABS(UNIXTIME - FILETIME) (then UNIXTIME, TIME_TIE_SORT)
             sql['condition'] += ' AND UNIXTIME - {0} < 0'.format(filetime.unix)
-            sql['sort_by'] = 'abs(UNIXTIME - {0})'.format(filetime.unix)
+            sql['sort_by'] = _time_sort(filetime.unix)
             sql['sort_descending'] = False
         elif timemode == 'newer' and filetime is not None:
             # condition:
             #       UNIXTIME - FILETIME > 0
             # sort by:
-            #       ABS(UNIXTIME - FILETIME)
+            #       ABS(UNIXTIME - FILETIME) (then UNIXTIME, TIME_TIE_SORT)
             sql['condition'] += ' AND UNIXTIME - {0} > 0'.format(filetime.unix)
-            sql['sort_by'] = 'abs(UNIXTIME - {0})'.format(filetime.unix)
+            sql['sort_by'] = _time_sort(filetime.unix)
             sql['sort_descending'] = False
         elif filetime is not None:
             # sort by:
-            #       ABS(UNIXTIME - FILETIME)
-            sql['sort_by'] = 'abs(UNIXTIME - {0})'.format(filetime.unix)
+            #       ABS(UNIXTIME - FILETIME) (then UNIXTIME, TIME_TIE_SORT)
+            sql['sort_by'] = _time_sort(filetime.unix)
             sql['sort_descending'] = False
         else:
-            # sort by: UNIXTIME
-            sql['sort_by'] = 'UNIXTIME'
-            sql['sort_descending'] = True
+            # sort by: UNIXTIME (newest first, then TIME_TIE_SORT)
+            sql['sort_by'] = _time_sort(None)
+            sql['sort_descending'] = False
+        # use the timeline index instead of sql (gives the same result)
+        #   tau conditions are not indexed
+        if self.use_timeline and tau_water is None and tau_others is None:
+            group = (('KEYNAME', key),)
+            if fiber is not None:
+                group += (('FIBER', fiber),)
+            if objname is not None:
+                group += (('OBJECT', objname),)
+            if filetime is not None:
+                utime = filetime.unix
+            else:
+                utime = None
+            rows = self.timeline.get_rows(self.reader, columns, group,
+                                          utime, timemode, nentries)
+            if rows is not None:
+                return self.timeline.entries(rows, columns, nentries)
         # add the number of entries to get
         if isinstance(nentries, int):
             sql['max_rows'] = nentries
         # if we have one entry just get the tuple back
         if nentries == 1:
             # do sql query
-            entries = self.database.get(columns, **sql)
+            entries = self.reader.get(columns, **sql)
             # return filename
             if len(entries) == 1:
                 if len(colnames) == 1:
@@ -1272,7 +1770,7 @@ class TelluricDatabase(DatabaseManager):
             # return array for ease
             sql['return_array'] = True
             # do sql query
-            entries = self.database.get(columns, **sql)
+            entries = self.reader.get(columns, **sql)
             # return one list
             if len(entries) == 0:
                 return []
@@ -1283,7 +1781,7 @@ class TelluricDatabase(DatabaseManager):
             # return as pandas table
             sql['return_pandas'] = True
             # do sql query
-            entries = self.database.get(columns, **sql)
+            entries = self.reader.get(columns, **sql)
             # return pandas table
             return entries
 
@@ -1382,13 +1880,19 @@ class TelluricDatabase(DatabaseManager):
         # ---------------------------------------------------------------------
         # return absolute paths
         # ---------------------------------------------------------------------
+        # record the query (and the files it resolved)
+        if filenames is not None and len(filenames) > 0 or not required:
+            _record_query('telluric', self.filedir, filenames, key=key,
+                          fiber=fiber, filetime=filetime, timemode=timemode,
+                          nentries=nentries, objname=objname,
+                          tau_water=tau_water, tau_others=tau_others)
         # deal with no filenames found and not required
         if (filenames is None or len(filenames) == 0) and not required:
             return None
         # deal with no filenames found elsewise --> error
         if filenames is None or len(filenames) == 0:
             # get unique set of keys
-            keys = self.database.unique('KEYNAME')
+            keys = self.reader.unique('KEYNAME')
             # get file description
             if drsfile is not None:
                 if no_times:
@@ -1410,7 +1914,8 @@ class TelluricDatabase(DatabaseManager):
             WLOG(self.params, 'error', textentry('00-002-00015', args=eargs))
         # make all files absolute paths
         if isinstance(filenames, str):
-            return Path(self.filedir).joinpath(filenames).absolute()
+            outfilename = Path(self.filedir).joinpath(filenames).absolute()
+            return outfilename
         # else loop around them (assume they are iterable)
         else:
             # set output storage
@@ -1443,6 +1948,8 @@ class TelluricDatabase(DatabaseManager):
             self.load_db()
         # remove entries
         self.database.delete_rows(condition=condition)
+        # the timeline index is no longer valid
+        self.timeline.reset()
 
 
 # =============================================================================
@@ -1781,14 +2288,94 @@ class FileIndexDatabase(DatabaseManager):
         :return: None - adds entry to index database
         """
         # set function
-        func_name = display_func('add_entry', __NAME__,
-                                 self.classname)
+        _ = display_func('add_entry', __NAME__, self.classname)
+        # deal with no instrument set
+        if self.instrument == 'None':
+            return None
+        # deal with no database loaded
+        if self.database is None:
+            self.load_db()
+        # get the values for the database row
+        values = self.entry_values(basefile, block_kind, recipe, runstring,
+                                   infiles, hkeys, used, rawfix)
+        # get unique columns
+        idb_cols = self.pconst.FILEINDEX_DB_COLUMNS()
+        ucols = list(idb_cols.unique_cols)
+        # get values for database
+        obs_dir, basename = values[1], values[2]
+        # ------------------------------------------------------------------
+        # check for entry already in database
+        condition = '(OBS_DIR="{0}")'.format(obs_dir)
+        condition += ' AND (BLOCK_KIND="{0}")'.format(block_kind)
+        condition += ' AND (FILENAME="{0}")'.format(basename)
+        # count number of entries for this
+        num_rows = self.database.count(condition=condition)
+        # if we don't have an entry we add a row
+        if num_rows == 0:
+            # add row
+            try:
+                self.database.add_row(list(values), unique_cols=ucols)
+                return
+            # if this is called we need to set instead of adding
+            except drs_db.UniqueEntryException:
+                # if and only if this error we can pass and try using set
+                pass
+        # else we update the row using "set" instead of adding
+        # condition comes from uhash - so set to None here (to remember)
+        condition = None
+        # update row in database
+        self.database.set('*', values=list(values), condition=condition,
+                          unique_cols=ucols)
+
+    def add_entries(self, rows: List[List[Any]],
+                    chunk_size: Optional[int] = None):
+        """
+        Add many entries to the index database in bulk (one transaction per
+        chunk of rows) - entries with the same unique hash as an entry already
+        in the database replace it (as add_entry does)
+
+        :param rows: list of lists, the database rows (from
+                     FileIndexDatabase.entry_values)
+        :param chunk_size: int or None, the number of rows per chunk, if None
+                           uses DB_BULK_CHUNK_SIZE
+
+        :return: None - adds entries to index database
+        """
         # deal with no instrument set
         if self.instrument == 'None':
             return None
+        # deal with no rows
+        if len(rows) == 0:
+            return None
         # deal with no database loaded
         if self.database is None:
             self.load_db()
+        # get chunk size
+        if chunk_size is None:
+            chunk_size = self.params['DB_BULK_CHUNK_SIZE']
+        # get unique columns
+        idb_cols = self.pconst.FILEINDEX_DB_COLUMNS()
+        ucols = list(idb_cols.unique_cols)
+        # add rows (replacing any rows with the same unique hash)
+        self.database.add_rows(rows, unique_cols=ucols, on_duplicate='replace',
+                               chunk_size=chunk_size)
+
+    def entry_values(self, basefile: drs_file.DrsPath,
+                     block_kind: str, recipe: Union[str, None] = None,
+                     runstring: Union[str, None] = None,
+                     infiles: Union[str, None] = None,
+                     hkeys: Union[Dict[str, str], None] = None,
+                     used: Union[int, None] = None,
+                     rawfix: Union[int, None] = None) -> List[Any]:
+        """
+        Get the values of an index database row (in column order, without
+        the unique hash column) - see add_entry for the parameters
+
+        :return: list, the values for the database row
+        """
+        # set function
+        func_name = display_func('entry_values', __NAME__,
+                                 self.classname)
         # set used to 1
         if used is None:
             used = 1
@@ -1816,9 +2403,6 @@ class FileIndexDatabase(DatabaseManager):
         iheader_cols = self.pconst.FILEINDEX_HEADER_COLS()
         rkeys = list(iheader_cols.names)
         rtypes = list(iheader_cols.dtypes)
-        # get unique columns
-        idb_cols = self.pconst.FILEINDEX_DB_COLUMNS()
-        ucols = list(idb_cols.unique_cols)
         # store values in correct order for database.add_row
         hvalues = []
         # deal with no hkeys
@@ -1854,37 +2438,12 @@ class FileIndexDatabase(DatabaseManager):
         obs_dir = str(basefile.obs_dir)
         basename = str(basefile.basename)
         # ------------------------------------------------------------------
-        # check for entry already in database
-        condition = '(OBS_DIR="{0}")'.format(obs_dir)
-        condition += ' AND (BLOCK_KIND="{0}")'.format(block_kind)
-        condition += ' AND (FILENAME="{0}")'.format(basename)
-        # count number of entries for this
-        num_rows = self.database.count(condition=condition)
-        # if we don't have an entry we add a row
-        if num_rows == 0:
-            # add new entry to database
-            values = [path, obs_dir, basename, block_kind, float(last_modified),
-                      str(recipe), str(runstring), str(infiles)]
-            values += hvalues + [used, rawfix]
-            # add row
-            try:
-                self.database.add_row(values, unique_cols=ucols)
-                return
-            # if this is called we need to set instead of adding
-            except drs_db.UniqueEntryException:
-                # if and only if this error we can pass and try using set
-                pass
-
-        # else we update the row using "set" instead of adding
-        # add new entry to database
+        # construct the values for the database
         values = [path, obs_dir, basename, block_kind, float(last_modified),
                   str(recipe), str(runstring), str(infiles)]
         values += hvalues + [used, rawfix]
-        # condition comes from uhash - so set to None here (to remember)
-        condition = None
-        # update row in database
-        self.database.set('*', values=values, condition=condition,
-                          unique_cols=ucols)
+        # return the values
+        return values
 
     def remove_entries(self, condition: str):
         """
@@ -1906,6 +2465,9 @@ class FileIndexDatabase(DatabaseManager):
             self.load_db()
         # remove entries
         self.database.delete_rows(condition=condition)
+        # the manifest can no longer be trusted (files on disk may no longer
+        #   be in the index)
+        self.clear_manifest()
 
     def get_entries(self, columns: str = '*',
                     obs_dir: Union[str, None] = None,
@@ -1953,47 +2515,10 @@ class FileIndexDatabase(DatabaseManager):
         sql['sort_descending'] = True
         # sort by last modified
         sql['sort_by'] = 'LAST_MODIFIED'
-        # condition for used
-        sql['condition'] = 'USED = 1'
-        # ------------------------------------------------------------------
-        if condition is not None:
-            sql['condition'] += ' AND {0}'.format(condition)
-        # ------------------------------------------------------------------
-        # deal with kind set
-        if block_kind is not None:
-            sql['condition'] += ' AND BLOCK_KIND = "{0}"'.format(block_kind)
-        # ------------------------------------------------------------------
-        # deal with directory set
-        if obs_dir is not None:
-            sql['condition'] += ' AND OBS_DIR = "{0}"'.format(obs_dir)
-        # ------------------------------------------------------------------
-        # deal with filename set
-        if filename is not None:
-            sql['condition'] += ' AND FILENAME = "{0}"'.format(filename)
-        # ------------------------------------------------------------------
-        # get allowed header keys
-        iheader_cols = self.pconst.FILEINDEX_HEADER_COLS()
-        rkeys = list(iheader_cols.names)
-        rtypes = list(iheader_cols.dtypes)
-        # deal with filter by header keys
-        if hkeys is not None and isinstance(hkeys, dict):
-            # loop around each valid header key in index database
-            for h_it, hkey in enumerate(rkeys):
-                # if we have the key in our header keys
-                if hkey in hkeys:
-                    # noinspection PyBroadException
-                    try:
-                        # get data type
-                        dtype = rtypes[h_it]
-                        # try to case and add to condition
-                        hargs = [hkey, dtype, hkeys[hkey]]
-                        condition = drs_file.index_hkey_condition(*hargs)
-                        sql['condition'] += condition
-                    except Exception as _:
-                        wargs = [self.name, hkey, hkeys[hkey],
-                                 rtypes[h_it], func_name]
-                        wmsg = textentry('10-002-00003', args=wargs)
-                        WLOG(self.params, 'warning', wmsg)
+        # condition for used (and the filters)
+        sql['condition'] = self._entries_condition(obs_dir, filename,
+                                                   block_kind, hkeys,
+                                                   condition, func_name)
         # ------------------------------------------------------------------
         # add the number of entries to get
         if isinstance(nentries, int):
@@ -2033,35 +2558,156 @@ class FileIndexDatabase(DatabaseManager):
             # return pandas table
             return entries
 
-    # complex typing for filename(s) in update_entries
-    FileTypes = Union[List[Union[Path, str]], Path, str, None]
-
-    def update_entries(self, block_kind: str,
-                       include_directories: Union[List[str], None] = None,
-                       exclude_directories: Union[List[str], None] = None,
-                       filename: FileTypes = None, suffix: str = '',
-                       force_update: bool = False):
+    def _entries_condition(self, obs_dir: Union[str, None] = None,
+                           filename: Union[Path, str, None] = None,
+                           block_kind: Union[str, None] = None,
+                           hkeys: Union[Dict[str, str], None] = None,
+                           condition: Union[str, None] = None,
+                           func_name: Optional[str] = None) -> str:
         """
-        Update the index database for files of 'kind', deal with including
-        and excluding directories for files with 'suffix'
+        Construct the SQL condition for get_entries / iter_entries
 
-        :param block_kind: str, either 'raw', 'red', 'tmp', 'calib', 'tellu',
-                           'asset' this determines the path of the file i.e.
-                            path/directory/filename (unless filename is
-                            an absolute path) - note in this case directory
-                            should still be filled correctly (for database)
-        :param include_directories: list of strings or None, if set only
-                                    include these observation directories to
-                                    update index database
-        :param exclude_directories: list of strings or None, if set exclude
-                                    these observation directories from being
-                                    updated in the index database
-        :param filename: str, Path, list of strs/Paths or None, if set we only
-                         include this filename or these filenames
+        :param obs_dir: str or None, if set filters results by directory name
+        :param filename: str or None, if set filters results by filename
+        :param block_kind: str or None, if set filters results by kind
+        :param hkeys: dict or None, if set is a dictionary of strings
+                            where each string is one of the index database
+                            header keys (see pseudo_constants.INDEX_HEADER_KEYS)
+        :param condition: str or None, if set the SQL query to add
+        :param func_name: str or None, the calling function (for warnings)
+
+        :return: str, the SQL condition
+        """
+        # condition for used
+        econd = 'USED = 1'
+        # ------------------------------------------------------------------
+        if condition is not None:
+            econd += ' AND {0}'.format(condition)
+        # ------------------------------------------------------------------
+        # deal with kind set
+        if block_kind is not None:
+            econd += ' AND BLOCK_KIND = "{0}"'.format(block_kind)
+        # ------------------------------------------------------------------
+        # deal with directory set
+        if obs_dir is not None:
+            econd += ' AND OBS_DIR = "{0}"'.format(obs_dir)
+        # ------------------------------------------------------------------
+        # deal with filename set
+        if filename is not None:
+            econd += ' AND FILENAME = "{0}"'.format(filename)
+        # ------------------------------------------------------------------
+        # get allowed header keys
+        iheader_cols = self.pconst.FILEINDEX_HEADER_COLS()
+        rkeys = list(iheader_cols.names)
+        rtypes = list(iheader_cols.dtypes)
+        # deal with filter by header keys
+        if hkeys is not None and isinstance(hkeys, dict):
+            # loop around each valid header key in index database
+            for h_it, hkey in enumerate(rkeys):
+                # if we have the key in our header keys
+                if hkey in hkeys:
+                    # noinspection PyBroadException
+                    try:
+                        # get data type
+                        dtype = rtypes[h_it]
+                        # try to case and add to condition
+                        hargs = [hkey, dtype, hkeys[hkey]]
+                        hcondition = drs_file.index_hkey_condition(*hargs)
+                        econd += hcondition
+                    except Exception as _:
+                        wargs = [self.name, hkey, hkeys[hkey],
+                                 rtypes[h_it], func_name]
+                        wmsg = textentry('10-002-00003', args=wargs)
+                        WLOG(self.params, 'warning', wmsg)
+        # return the condition
+        return econd
+
+    def iter_entries(self, columns: str = '*',
+                     obs_dir: Union[str, None] = None,
+                     filename: Union[Path, str, None] = None,
+                     block_kind: Union[str, None] = None,
+                     hkeys: Union[Dict[str, str], None] = None,
+                     condition: Union[str, None] = None,
+                     sort_by: Union[str, None] = 'LAST_MODIFIED',
+                     chunk_size: Union[int, None] = None
+                     ) -> Iterator[pd.DataFrame]:
+        """
+        Get entries from the index database as get_entries does but streamed
+        as pandas tables of at most chunk_size rows (the full result is never
+        held in memory)
+
+        :param columns: str, the columns to return ('*' for all)
+        :param obs_dir: str or None, if set filters results by directory name
+        :param filename: str or None, if set filters results by filename
+        :param block_kind: str or None, if set filters results by kind
+        :param hkeys: dict or None, if set is a dictionary of strings
+                            where each string is one of the index database
+                            header keys (see pseudo_constants.INDEX_HEADER_KEYS)
+        :param condition: str or None, if set the SQL query to add
+        :param sort_by: str or None, the column(s) to sort by (descending)
+        :param chunk_size: int or None, the number of rows per chunk
+
+        :return: iterator of pandas tables
+        """
+        # set function
+        func_name = display_func('iter_entries', __NAME__,
+                                 self.classname)
+        # deal with no instrument set
+        if self.instrument == 'None':
+            return
+        # deal with no database loaded
+        if self.database is None:
+            self.load_db()
+        # get the condition
+        econd = self._entries_condition(obs_dir, filename, block_kind, hkeys,
+                                        condition, func_name)
+        # stream the entries
+        for chunk in self.database.get_iter(columns, condition=econd,
+                                            sort_by=sort_by,
+                                            chunk_size=chunk_size):
+            yield chunk
+
+    # complex typing for filename(s) in update_entries
+    FileTypes = Union[List[Union[Path, str]], Path, str, None]
+
+    def update_entries(self, block_kind: str,
+                       include_directories: Union[List[str], None] = None,
+                       exclude_directories: Union[List[str], None] = None,
+                       filename: FileTypes = None, suffix: str = '',
+                       force_update: bool = False,
+                       chunk_size: Optional[int] = None,
+                       full_rescan: bool = False):
+        """
+        Update the index database for files of 'kind', deal with including
+        and excluding directories for files with 'suffix'
+
+        Directories that have not changed since they were last scanned (see
+        the directory manifest, DB_INDEX_MANIFEST) are not listed again and
+        their indexed files are not checked on disk (except raw files which
+        are still checked for being re-written in place)
+
+        :param block_kind: str, either 'raw', 'red', 'tmp', 'calib', 'tellu',
+                           'asset' this determines the path of the file i.e.
+                            path/directory/filename (unless filename is
+                            an absolute path) - note in this case directory
+                            should still be filled correctly (for database)
+        :param include_directories: list of strings or None, if set only
+                                    include these observation directories to
+                                    update index database
+        :param exclude_directories: list of strings or None, if set exclude
+                                    these observation directories from being
+                                    updated in the index database
+        :param filename: str, Path, list of strs/Paths or None, if set we only
+                         include this filename or these filenames
         :param suffix: str, the suffix (i.e. extension of filenames) - filters
                        to only set these files
         :param force_update: bool, if True forces the update even if database
                              thinks it is up-to-date
+        :param chunk_size: int or None, the number of new entries added to
+                           the database at once (if None uses
+                           DB_BULK_CHUNK_SIZE)
+        :param full_rescan: bool, if True ignore the directory manifest and
+                            list / check every directory and file
 
         :return: None - updates the index database
         """
@@ -2102,71 +2748,84 @@ class FileIndexDatabase(DatabaseManager):
         else:
             include_files = []
         # ---------------------------------------------------------------------
-        # deal with files we don't need (already have)
-        etable = self.get_entries('ABSPATH, OBS_DIR, LAST_MODIFIED',
-                                  block_kind=block_kind)
-        raw_exclude_files = list(etable['ABSPATH'])
-        raw_exclude_obs_dirs = list(etable['OBS_DIR'])
-        # ---------------------------------------------------------------------
-        # only check last modified for raw files (we assume that any other
-        #   file has been correctly updated by the drs)
-        if block_kind.lower() == 'raw':
-            raw_last_mod = list(etable['LAST_MODIFIED'])
+        # use the directory manifest (only when listing all files)
+        use_manifest = self.params['DB_INDEX_MANIFEST'] and not full_rescan
+        use_manifest &= len(include_files) == 0 and suffix == ''
+        if use_manifest:
+            manifest = self.load_manifest(block_kind)
+            skip_out = self.unchanged_dirs(manifest)
+            skip_dirs, skip_dirnames, skip_nfiles = skip_out
+            manifest_rows = []
+            # log how many directories we are skipping
+            if len(skip_dirs) > 0:
+                msg = 'Skipping {0} unchanged directories ({1} files)'
+                WLOG(self.params, '', msg.format(len(skip_dirs), skip_nfiles))
         else:
-            raw_last_mod = None
+            skip_dirs, skip_dirnames, manifest_rows = set(), set(), None
         # ---------------------------------------------------------------------
         # must check exclude files are on disk unless we are in parellel mode
         parallel = False
         if 'PARALLEL' in self.params['INPUTS']:
             if self.params['INPUTS']['PARALLEL']:
                 parallel = True
-        # only check for deletions on disk if not in a parellel loop
-        if not parallel:
-            exclude_files, remove_files, remove_obs_dirs = [], [], []
-            # deal with updating last modified date
-            if raw_last_mod is not None:
-                elast_mod = []
-            else:
-                elast_mod = None
-            # loop around files to exclude
-            for r_it, raw_exclude_file in enumerate(raw_exclude_files):
-                if os.path.exists(raw_exclude_file):
-                    exclude_files.append(raw_exclude_file)
-                    if elast_mod is not None:
-                        elast_mod.append(raw_last_mod[r_it])
-                else:
-                    remove_files.append(raw_exclude_file)
-                    remove_obs_dirs.append(raw_exclude_obs_dirs[r_it])
-            # remove entries from database where file does not exist
-            rm_condition_all = 'BLOCK_KIND="{0}" AND '.format(block_kind)
-            rm_conditions = []
-            # loop around files to remove
-            for r_it, remove_file in enumerate(remove_files):
-                # add remove file condition with obs_dir + filename
-                rm_cond = '(OBS_DIR="{0}" AND FILENAME="{1}")'
-                rm_args = [remove_obs_dirs[r_it], os.path.basename(remove_file)]
-                rm_conditions.append(rm_cond.format(*rm_args))
-                # print removing file: File no longer on disk - removing from
-                #                file index database: {0}
-                wmsg = textentry('10-002-00008', args=[remove_file])
-                WLOG(self.params, 'warning', wmsg)
-
-            # remove entries which no longer exist on disk
-            if len(rm_conditions) > 0:
-                # add all remove conditions with the OR criteria
-                rm_condition_all += ' OR '.join(rm_conditions)
-                # use database to remove entries
-                self.remove_entries(condition=rm_condition_all)
-        # else we just use the raw list
+        # ---------------------------------------------------------------------
+        # deal with files we don't need (already have) - streamed and dealt
+        #   with chunk by chunk: we only keep the files in directories that
+        #   will be listed (absolute path --> last modified) and the keys
+        #   (obs_dir, filename) of files no longer on disk
+        #   - raw files in unchanged directories are not listed but are
+        #   still checked for being re-written in place (this does not
+        #   change the last modified time of the directory)
+        check_raw = block_kind.lower() == 'raw'
+        exclude, rm_keys, rewritten = dict(), [], []
+        for echunk in self.iter_entries('ABSPATH, OBS_DIR, LAST_MODIFIED',
+                                        block_kind=block_kind):
+            for abspath, obs_dir, last_mod in zip(echunk['ABSPATH'],
+                                                  echunk['OBS_DIR'],
+                                                  echunk['LAST_MODIFIED']):
+                # files in unchanged directories are not listed (and must
+                #   still exist)
+                if os.path.dirname(abspath) in skip_dirnames:
+                    if check_raw and _rewritten(abspath, last_mod):
+                        rewritten.append(Path(abspath))
+                    continue
+                # only check for deletions on disk if not in a parellel loop
+                if not parallel and not os.path.exists(abspath):
+                    rm_keys.append((obs_dir, os.path.basename(abspath)))
+                    # print removing file: File no longer on disk - removing
+                    #                from file index database: {0}
+                    wmsg = textentry('10-002-00008', args=[abspath])
+                    WLOG(self.params, 'warning', wmsg)
+                    continue
+                exclude[abspath] = last_mod
+        # remove entries which no longer exist on disk
+        if len(rm_keys) > 0:
+            # use database to remove entries (these directories have
+            #   changed so the manifest is still valid) - one
+            #   parameterised delete per key (not one long OR condition)
+            rm_condition = 'BLOCK_KIND="{0}"'.format(block_kind)
+            self.database.delete_keys(['OBS_DIR', 'FILENAME'], rm_keys,
+                                      condition=rm_condition)
+        # ---------------------------------------------------------------------
+        # only check last modified for raw files (we assume that any other
+        #   file has been correctly updated by the drs)
+        if check_raw:
+            elast_mod = exclude
         else:
-            exclude_files = list(raw_exclude_files)
-            elast_mod = raw_last_mod
+            elast_mod = None
 
         # ---------------------------------------------------------------------
         # locate all files within path
         reqfiles = _get_files(self.params, block_inst.abspath, block_kind,
                               include_directories, exclude_directories,
-                              include_files, exclude_files, suffix, elast_mod)
+                              include_files, exclude, suffix, elast_mod,
+                              skip_dirs=skip_dirs,
+                              manifest_rows=manifest_rows)
+        # add raw files re-written in place in unchanged directories
+        if len(rewritten) > 0:
+            msg = 'Found {0} re-written files in unchanged directories'
+            WLOG(self.params, '', msg.format(len(rewritten)))
+            reqfiles += rewritten
         # ---------------------------------------------------------------------
         # get allowed header keys
         iheader_cols = self.pconst.FILEINDEX_HEADER_COLS()
@@ -2195,8 +2854,9 @@ class FileIndexDatabase(DatabaseManager):
             userinput = input(str(textentry('10-002-00006')))
             # if yes delete table and recreate
             if 'Y' in userinput.upper():
-                # remove table
+                # remove table (and the manifest of the old table)
                 self.database.delete_table(self.database.tname)
+                self.clear_manifest(delete_table=True)
                 # add new empty table
                 self.database.add_table(self.database.tname, ikeys, itypes,
                                         unique_cols=ucols, index_cols=icols,
@@ -2219,40 +2879,193 @@ class FileIndexDatabase(DatabaseManager):
         # ---------------------------------------------------------------------
         # deal with no files
         if len(reqfiles) == 0:
+            # all scanned directories are up-to-date
+            if manifest_rows is not None:
+                self.save_manifest(manifest_rows)
             # return
             return
         # ---------------------------------------------------------------------
         # log: Reading headers of {0} files (to be updated)
         margs = [len(reqfiles)]
         WLOG(self.params, '', textentry('40-001-00032', args=margs))
+        # get chunk size
+        if chunk_size is None:
+            chunk_size = self.params['DB_BULK_CHUNK_SIZE']
+        # storage of rows waiting to be added to the database
+        rows = []
+        # storage of directories with files we could not add
+        failed_dirnames = set()
+        # get the header keys (drs key --> rkey) to read from the headers
+        drs_keys = dict()
+        for rkey in rkeys:
+            drs_keys[self.params[rkey][0]] = rkey
+        # read headers in parallel threads (in file order)
+        harvester = _harvest_headers(self.params, reqfiles, list(drs_keys),
+                                     self.params['DB_HEADER_THREADS'])
         # add required files to the database
-        for reqfile in tqdm(reqfiles):
+        for reqfile, values, error in tqdm(harvester, total=len(reqfiles)):
+            # deal with headers we could not read
+            if error is not None:
+                # print error message as warning:
+                #       Skipping file {0}\n\tError {1}: {2}'
+                wargs = [str(reqfile), type(error), str(error)]
+                wmsg = textentry('10-002-00009', args=wargs)
+                WLOG(self.params, 'warning', wmsg, sublevel=6)
+                # this directory must be scanned again next time
+                failed_dirnames.add(os.path.dirname(str(reqfile)))
+                continue
             # get a drs path for required file
             req_inst = drs_file.DrsPath(self.params, abspath=reqfile)
-            # get header keys
+            # get header keys (for keys in the header)
             hkeys = dict()
-            # load missing files
-            if str(reqfile).endswith('.fits'):
-                # load header
+            for drs_key in values:
+                hkeys[drs_keys[drs_key]] = values[drs_key]
+            # add to rows to add to the database
+            rows.append(self.entry_values(req_inst, block_kind, hkeys=hkeys))
+            # flush a full chunk to the database
+            if len(rows) >= chunk_size:
+                self.add_entries(rows, chunk_size=chunk_size)
+                rows = []
+        # add any remaining rows to the database
+        self.add_entries(rows, chunk_size=chunk_size)
+        # ---------------------------------------------------------------------
+        # update the manifest for the scanned directories (a scanned
+        #   directory with files that could not be added is not saved)
+        if manifest_rows is not None:
+            failed_tops = set()
+            for mrow in manifest_rows:
+                if mrow[2] in failed_dirnames:
+                    failed_tops.add(mrow[1])
+            manifest_rows = [mrow for mrow in manifest_rows
+                             if mrow[1] not in failed_tops]
+            self.save_manifest(manifest_rows)
+
+    def manifest_table(self) -> str:
+        """
+        The name of the directory manifest table (stored in the index
+        database next to the index table)
+
+        :return: str, the manifest table name
+        """
+        # deal with no database loaded
+        if self.database is None:
+            self.load_db()
+        return '{0}{1}'.format(self.database.tname, MANIFEST_SUFFIX).lower()
+
+    def load_manifest(self, block_kind: str) -> Dict[str, List[tuple]]:
+        """
+        Load the directory manifest for a block kind (creating the manifest
+        table if it does not exist)
+
+        :param block_kind: str, the block kind (raw/tmp/red etc)
+
+        :return: dict, for each top directory (the directory a scan started
+                 from) the list of (DIRNAME, DIR_MTIME, NFILES, MAX_MTIME,
+                 SCAN_TIME) for it and all directories below it
+        """
+        # get the manifest table
+        mtable = self.manifest_table()
+        # create the table if it does not exist
+        if mtable not in self.database.tables:
+            mcols = self.pconst.FILEINDEX_MANIFEST_COLUMNS()
+            self.database.add_table(mtable, list(mcols.names),
+                                    list(mcols.datatypes))
+        # get the manifest rows for this block kind
+        columns = 'TOP_DIR, DIRNAME, DIR_MTIME, NFILES, MAX_MTIME, SCAN_TIME'
+        condition = 'BLOCK_KIND="{0}"'.format(block_kind)
+        entries = self.database.get(columns, table=mtable,
+                                    condition=condition)
+        # group by top directory
+        manifest = dict()
+        for entry in entries:
+            manifest.setdefault(entry[0], []).append(tuple(entry[1:]))
+        # return the manifest
+        return manifest
+
+    @staticmethod
+    def unchanged_dirs(manifest: Dict[str, List[tuple]]
+                       ) -> Tuple[Set[str], Set[str], int]:
+        """
+        Find the top directories in the manifest that have not changed since
+        they were scanned (every directory below them still exists with the
+        same last modified time and nothing was modified just before the
+        scan)
+
+        :param manifest: dict, the manifest (from load_manifest)
+
+        :return: tuple, 1. set of unchanged top directories, 2. set of all
+                 directories below them, 3. the number of files in them
+        """
+        skip_dirs, skip_dirnames, nfiles = set(), set(), 0
+        # loop around top directories
+        for top_dir in manifest:
+            unchanged = True
+            for dirname, dir_mtime, dnfiles, max_mtime, scan_time in \
+                    manifest[top_dir]:
+                # modified just before the scan - may still have been changing
+                limit = scan_time - MANIFEST_MTIME_MARGIN
+                if dir_mtime >= limit or max_mtime >= limit:
+                    unchanged = False
+                    break
+                # directory removed or changed since the scan
                 try:
-                    header = drs_fits.read_header(self.params, str(reqfile),
-                                                  log=False)
-                except Exception as e:
-                    # print error message as warning:
-                    #       Skipping file {0}\n\tError {1}: {2}'
-                    wargs = [str(reqfile), type(e), str(e)]
-                    wmsg = textentry('10-002-00009', args=wargs)
-                    WLOG(self.params, 'warning', wmsg, sublevel=6)
-                    continue
-                # loop around required keys
-                for rkey in rkeys:
-                    # get drs key
-                    drs_key = self.params[rkey][0]
-                    # if key is in header then add to hkeys
-                    if drs_key in header:
-                        hkeys[rkey] = header[drs_key]
-            # add to database
-            self.add_entry(req_inst, block_kind, hkeys=hkeys)
+                    if os.stat(dirname).st_mtime != dir_mtime:
+                        unchanged = False
+                        break
+                except OSError:
+                    unchanged = False
+                    break
+            # store the unchanged top directory
+            if unchanged:
+                skip_dirs.add(top_dir)
+                for mrow in manifest[top_dir]:
+                    skip_dirnames.add(mrow[0])
+                    nfiles += int(mrow[2])
+        # return the unchanged directories
+        return skip_dirs, skip_dirnames, nfiles
+
+    def save_manifest(self, rows: List[list]):
+        """
+        Save manifest rows (see _scan_dir) - all previous rows of each top
+        directory are replaced
+
+        :param rows: list of lists, the manifest rows (BLOCK_KIND, TOP_DIR,
+                     DIRNAME, DIR_MTIME, NFILES, MAX_MTIME, SCAN_TIME)
+
+        :return: None - updates the manifest table
+        """
+        # deal with no rows
+        if len(rows) == 0:
+            return
+        # get columns
+        mcols = self.pconst.FILEINDEX_MANIFEST_COLUMNS()
+        # replace all rows of each top directory
+        self.database.upsert_rows(rows, ['BLOCK_KIND', 'TOP_DIR'],
+                                  table=self.manifest_table(),
+                                  columns=list(mcols.names))
+
+    def clear_manifest(self, delete_table: bool = False):
+        """
+        Remove all rows from the directory manifest (every directory is
+        scanned on the next update)
+
+        :param delete_table: bool, if True remove the manifest table
+
+        :return: None - updates the manifest table
+        """
+        # deal with no instrument set
+        if self.instrument == 'None':
+            return None
+        # get the manifest table
+        mtable = self.manifest_table()
+        # deal with no manifest table
+        if mtable not in self.database.tables:
+            return
+        # remove the table or all rows in it
+        if delete_table:
+            self.database.delete_table(mtable)
+        else:
+            self.database.delete_rows(table=mtable, condition='1=1')
 
     def update_header_fix(self, recipe: Any, objdbm: AstrometricDatabase):
         """
@@ -2278,29 +3091,49 @@ class FileIndexDatabase(DatabaseManager):
         iheader_cols = self.pconst.FILEINDEX_HEADER_COLS()
         rkeys = list(iheader_cols.names)
         # get columns
-        columns = ['BLOCK_KIND', 'ABSPATH', 'OBS_DIR', 'FILENAME', 'RAWFIX']
+        columns = ['BLOCK_KIND', 'OBS_DIR', 'FILENAME', 'RAWFIX']
         columns += rkeys
         # get data for columns
         table = self.get_entries(', '.join(columns), block_kind='raw')
         # if all rows have rawfix == 1 then just return now
         if np.sum(table['RAWFIX']) == len(table):
             return
-        # need to loop around each row
-        for row in tqdm(range(len(table))):
+        # get the columns as arrays (much faster than .iloc per row)
+        tcols = dict()
+        for col in columns:
+            tcols[col] = table[col].to_numpy()
+        # group rows by their header values (identical headers only need to
+        #   be fixed once) - storage is header key tuple --> row numbers
+        groups = dict()
+        # loop around each row
+        for row in range(len(table)):
             # do not re-fix is rawfix is 1
-            if table['RAWFIX'].iloc[row] == 1:
+            if tcols['RAWFIX'][row] == 1:
                 continue
             # do not fix headers of non-fits files
-            if not table['FILENAME'].iloc[row].endswith('.fits'):
+            if not tcols['FILENAME'][row].endswith('.fits'):
                 continue
+            # get the header values for this row (NaN cannot be a dict key)
+            hvalues = []
+            for rkey in rkeys:
+                value = tcols[rkey][row]
+                if isinstance(value, float) and np.isnan(value):
+                    value = None
+                hvalues.append(value)
+            # add row to the group of rows with this header
+            groups.setdefault(tuple(hvalues), []).append(row)
+        # storage of the rows to update (new values then key values)
+        rows = []
+        # loop around each unique header
+        for hvalues in tqdm(groups):
             # get new header to push keys into
             header = drs_fits.Header()
             # add keys to header
             for rkey in rkeys:
                 # get drs key
                 drs_key = self.params[rkey][0]
-                # get value from table for rkey
-                value = table[rkey].iloc[row]
+                # get value from table for rkey (first row with this header)
+                value = tcols[rkey][groups[hvalues][0]]
                 # populate header
                 if value is None:
                     header[drs_key] = 'Null'
@@ -2309,25 +3142,27 @@ class FileIndexDatabase(DatabaseManager):
             # fix header (with new keys in)
             header, _ = drs_file.fix_header(self.params, recipe, header=header,
                                             check_aliases=True, objdbm=objdbm)
-            # condition is that full path is the same
-            ctxt = 'BLOCK_KIND="{0}" AND OBS_DIR="{2}" AND FILENAME="{3}"'
-            # cargs must match "columns" above
-            cargs = [table['BLOCK_KIND'].iloc[row], table['ABSPATH'].iloc[row],
-                     table['OBS_DIR'].iloc[row], table['FILENAME'].iloc[row]]
-            condition = ctxt.format(*cargs)
-            # get values
-            values = cargs + ['1']
-            # add header keys in rkeys
+            # values are rawfix = 1 and the header keys in rkeys
+            values = [1]
             for rkey in rkeys:
                 # get drs key
                 drs_key = self.params[rkey][0]
-                # get value from table for rkey
+                # get value from header for rkey
                 if drs_key in header:
                     values.append(header[drs_key])
                 else:
                     values.append('Null')
-            # update this row (should only be one row based on condition)
-            self.database.set(columns, values=values, condition=condition)
+            # add every row with this header (identified by the same
+            #   condition as before: block kind + obs dir + filename)
+            for row in groups[hvalues]:
+                kvalues = [tcols['BLOCK_KIND'][row], tcols['OBS_DIR'][row],
+                           tcols['FILENAME'][row]]
+                rows.append(values + kvalues)
+        # update all rows (one executemany per chunk of rows)
+        self.database.set_rows(['RAWFIX'] + rkeys, rows,
+                               key_columns=['BLOCK_KIND', 'OBS_DIR',
+                                            'FILENAME'],
+                               chunk_size=self.params['DB_BULK_CHUNK_SIZE'])
 
     def _update_params(self, **kwargs) -> bool:
         """
@@ -2383,9 +3218,11 @@ def _get_files(params: ParamDict, path: Union[Path, str], block_kind: str,
                incdirs: Union[List[Union[str, Path]], None] = None,
                excdirs: Union[List[Union[str, Path]], None] = None,
                incfiles: Union[List[Union[str, Path]], None] = None,
-               excfiles: Union[List[Union[str, Path]], None] = None,
+               excfiles: Union[Set[str], Dict[str, Any], None] = None,
                suffix: str = '',
-               last_modified: Union[List[float], None] = None) -> List[Path]:
+               last_modified: Optional[Dict[str, float]] = None,
+               skip_dirs: Optional[Set[str]] = None,
+               manifest_rows: Optional[List[list]] = None) -> List[Path]:
     """
     Get files in 'path'. If kind in ['raw' 'tmp' 'red'] then look through
     subdirectories including 'incdirs' directories and excluding 'excdirs'
@@ -2399,15 +3236,21 @@ def _get_files(params: ParamDict, path: Union[Path, str], block_kind: str,
                     file list should exclude
     :param incfiles: list of files to include - if set only these files should
                      be included in the returned file list
-    :param excfiles: list of files to exclude - if set none of these files
-                     should be included in the returned file list
+    :param excfiles: set (or dict keys) of absolute paths of files to
+                     exclude - if set none of these files should be included
+                     in the returned file list
     :param suffix: str, the suffix which all files returns must have
                    (i.e. the extension)
-    :param last_modified: list of floats - the last modified times for the
-                          excfiles (if given, checks the last modified date
-                          and doesn't exclude files if last modified date is
-                          different from this list) - must be same length as
-                          excfiles
+    :param last_modified: dict - the last modified times of the excfiles (by
+                          absolute path) if given, checks the last modified
+                          date and doesn't exclude files if last modified
+                          date is different from this
+    :param skip_dirs: set of strings or None, if set directories (sub
+                      directories of path, or path itself) that are not
+                      listed (unchanged since they were last scanned)
+    :param manifest_rows: list or None, if set the manifest rows of all
+                          directories listed are added to this list
+                          (see _scan_dir)
 
     :return: list of paths, the file list (absolute file list) as Path instances
     """
@@ -2424,6 +3267,11 @@ def _get_files(params: ParamDict, path: Union[Path, str], block_kind: str,
     # get conditions (so we don't repeat them)
     incdircond = incdirs is not None
     excdircond = excdirs is not None
+    # deal with no skip directories
+    if skip_dirs is None:
+        skip_dirs = set()
+    # the time of this scan (for the manifest)
+    scan_time = time.time()
     # -------------------------------------------------------------------------
     # get absolute path for all included dirs
     incdirs1 = []
@@ -2461,6 +3309,9 @@ def _get_files(params: ParamDict, path: Union[Path, str], block_kind: str,
             if excdircond:
                 if item in excdirs1:
                     continue
+            # skip directories that have not changed since the last scan
+            if item in skip_dirs:
+                continue
             # if we have reached here then append subdirs
             subdirs.append(item)
             # clear loading message
@@ -2471,9 +3322,19 @@ def _get_files(params: ParamDict, path: Union[Path, str], block_kind: str,
     # -------------------------------------------------------------------------
     # deal with no subdirs
     if subdirs is None:
+        # the path has not changed since the last scan
+        if str(path) in skip_dirs:
+            allfiles = []
+        # get all files in path (and the manifest of path)
+        elif manifest_rows is not None:
+            allfiles, mrows = _scan_dir(block_kind, str(path), suffix,
+                                        scan_time)
+            manifest_rows += mrows
         # get all files in path
         # allfiles = list(path.rglob('*{0}'.format(suffix)))
-        allfiles = drs_path.recursive_path_glob(params, path, suffix=suffix)
+        else:
+            allfiles = drs_path.recursive_path_glob(params, path,
+                                                    suffix=suffix)
     # else we have subdirs
     else:
         allfiles = []
@@ -2481,10 +3342,17 @@ def _get_files(params: ParamDict, path: Union[Path, str], block_kind: str,
         for subdir in subdirs:
             # processing sub-directories
             TLOG(params, '', 'Analysing {0}...'.format(subdir))
+            # append to filenames (and the manifest of subdir)
+            if manifest_rows is not None:
+                files, mrows = _scan_dir(block_kind, str(subdir), suffix,
+                                         scan_time)
+                allfiles += files
+                manifest_rows += mrows
             # append to filenames
             # allfiles += list(Path(subdir).glob('*{0}'.format(suffix)))
-            allfiles += drs_path.recursive_path_glob(params, subdir,
-                                                     suffix=suffix)
+            else:
+                allfiles += drs_path.recursive_path_glob(params, subdir,
+                                                         suffix=suffix)
     # clear loading message
     TLOG(params, '', '')
     # -------------------------------------------------------------------------
@@ -2497,17 +3365,9 @@ def _get_files(params: ParamDict, path: Union[Path, str], block_kind: str,
     # last mod condition
     lmodcond = last_modified is not None
     # -------------------------------------------------------------------------
-    # convert last modified
-    if last_modified is not None:
-        lmod = dict(zip(excfiles, last_modified))
-    else:
-        lmod = dict()
-    # -------------------------------------------------------------------------
-    # make incfiles and exfiles sets (quicker than lists)
+    # make incfiles a set (quicker than a list)
     if incond:
         incfiles = set(incfiles)
-    if outcond:
-        excfiles = set(excfiles)
     # -------------------------------------------------------------------------
     # filter files
     for filename in allfiles:
@@ -2528,7 +3388,7 @@ def _get_files(params: ParamDict, path: Union[Path, str], block_kind: str,
                 # get last modified time
                 ftime = filename.stat().st_mtime
                 # only continue if ftime is equal to the one given
-                if ftime == lmod[strfilename]:
+                if ftime == last_modified[strfilename]:
                     continue
             # else if we do not have a last modified vector just skip
             #    this file
@@ -2542,6 +3402,124 @@ def _get_files(params: ParamDict, path: Union[Path, str], block_kind: str,
     return valid_files
 
 
+def _rewritten(abspath: str, last_modified: float) -> bool:
+    """
+    Check whether an indexed file has been re-written (its last modified time
+    on disk differs from the one in the index database)
+
+    :param abspath: str, the absolute path of the indexed file
+    :param last_modified: float, the last modified time in the index database
+
+    :return: bool, True if the file was re-written (False if the file is
+             unchanged or can no longer be accessed)
+    """
+    try:
+        return os.stat(abspath).st_mtime != last_modified
+    except OSError:
+        return False
+
+
+def _harvest_headers(params: ParamDict, files: List[Path], keys: List[str],
+                     nthreads: int = 1
+                     ) -> Iterator[Tuple[Path, Dict[str, Any],
+                                         Optional[Exception]]]:
+    """
+    Read header keys (see drs_fits.read_header_keys) from many files using
+    a pool of threads - results are yielded in the order of files as soon as
+    they are ready so the caller can process (e.g. add to a database) while
+    other headers are still being read
+
+    :param params: ParamDict, parameter dictionary of constants
+    :param files: list of Paths, the files to read (only .fits files are
+                  read, other files get no header keys)
+    :param keys: list of strings, the header keys to read
+    :param nthreads: int, the number of threads to read headers with (1 reads
+                     headers in this thread)
+
+    :return: iterator of tuples, the file, the dictionary of header key
+             values and the exception raised while reading (or None)
+    """
+
+    # read the header keys of a single file
+    def harvest(filename: Path) -> Tuple[Dict[str, Any], Optional[Exception]]:
+        # only fits files have headers
+        if not str(filename).endswith('.fits'):
+            return dict(), None
+        # noinspection PyBroadException
+        try:
+            return drs_fits.read_header_keys(params, str(filename), keys), None
+        except Exception as e:
+            return dict(), e
+
+    # deal with not using threads
+    if nthreads <= 1:
+        for filename in files:
+            yield (filename,) + harvest(filename)
+        return
+    # use a pool of threads (limit the number of files waiting to be used)
+    max_waiting = 4 * nthreads
+    with ThreadPoolExecutor(max_workers=nthreads) as executor:
+        waiting = deque()
+        for filename in files:
+            waiting.append((filename, executor.submit(harvest, filename)))
+            # yield the oldest result once enough files are waiting
+            if len(waiting) >= max_waiting:
+                filename0, future = waiting.popleft()
+                yield (filename0,) + future.result()
+        # yield the remaining results
+        while len(waiting) > 0:
+            filename0, future = waiting.popleft()
+            yield (filename0,) + future.result()
+
+
+def _scan_dir(block_kind: str, top_dir: str, suffix: str, scan_time: float
+              ) -> Tuple[List[Path], List[list]]:
+    """
+    Recursively get all files in a directory with a specific suffix (as
+    drs_path.recursive_path_glob) and the manifest row of each directory
+    found (used to skip the directory next time if it has not changed)
+
+    :param block_kind: str, the block kind (raw/tmp/red etc)
+    :param top_dir: str, the directory to scan
+    :param suffix: str, the suffix which all files returns must have
+    :param scan_time: float, the unix time the scan started (must be before
+                      any directory is listed)
+
+    :return: tuple, 1. the sorted list of files, 2. the manifest rows
+             (BLOCK_KIND, TOP_DIR, DIRNAME, DIR_MTIME, NFILES, MAX_MTIME,
+             SCAN_TIME)
+    """
+    files, rows = [], []
+    # use os walk to loop around directories
+    for root, _, filenames in os.walk(top_dir):
+        # get the directory last modified time (a change after the scan
+        #   started is never trusted - see FileIndexDatabase.unchanged_dirs)
+        try:
+            dir_mtime = os.stat(root).st_mtime
+        except OSError:
+            dir_mtime = scan_time
+        # count files and find the newest one
+        nfiles, max_mtime = 0, 0.0
+        for filename in filenames:
+            # check file suffix
+            if not filename.endswith(suffix):
+                continue
+            # get the full path
+            abspath = os.path.join(root, filename)
+            files.append(Path(abspath))
+            nfiles += 1
+            # get the newest last modified time
+            try:
+                max_mtime = max(max_mtime, os.stat(abspath).st_mtime)
+            except OSError:
+                max_mtime = scan_time
+        # add the manifest row
+        rows.append([block_kind, top_dir, root, dir_mtime, nfiles, max_mtime,
+                     scan_time])
+    # return the sorted files and the manifest rows
+    return sorted(files), rows
+
+
 # =============================================================================
 # Define Log database
 # =============================================================================
@@ -2568,16 +3546,408 @@ class LogDatabase(DatabaseManager):
         # set path
         self.set_path(kind=self.kind, check=check)
 
-    def remove_pids(self, pid: str):
+    def remove_pids(self, pid: Union[str, List[str]]):
         """
-        Remove rows with this pid
-        :param pid:
-        :return:
+        Remove rows with this pid (or any of a list of pids)
+
+        :param pid: str or list of str, the pid(s) to remove
+
+        :return: None
         """
-        # set up condition
-        condition = 'PID="{0}"'.format(pid)
-        # delete rows that match this criteria
-        self.database.delete_rows(condition=condition)
+        # deal with a single pid
+        if isinstance(pid, str):
+            pids = [pid]
+        else:
+            pids = list(pid)
+        # one key per pid
+        keys = [(str(_pid),) for _pid in pids]
+        # delete rows that match these pids
+        self.database.delete_keys(['PID'], keys)
+        # delete the database timing rows of these pids
+        ttable = self.dbtime_table()
+        if ttable in self.database.tables:
+            self.database.delete_keys(['PID'], keys, table=ttable)
+        # delete the archived rows of these pids
+        atable = self.archive_table()
+        if atable in self.database.tables:
+            self.database.delete_keys(['PID'], keys, table=atable)
+        # delete the memory rows of these pids
+        mtable = self.memory_table()
+        if mtable in self.database.tables:
+            self.database.delete_keys(['PID'], keys, table=mtable)
+        # delete the fingerprints of these pids
+        ftable = self.fprint_table()
+        if ftable in self.database.tables:
+            self.database.delete_keys(['PID'], keys, table=ftable)
+
+    def dbtime_table(self) -> str:
+        """
+        The name of the database timing table (stored in the log database
+        next to the log table)
+
+        :return: str, the timing table name
+        """
+        # deal with no database loaded
+        if self.database is None:
+            self.load_db()
+        return '{0}{1}'.format(self.database.tname, DBTIME_SUFFIX).lower()
+
+    def add_db_timing(self, pid: str, sname: str, rows: List[List[Any]]):
+        """
+        Add the database timing summary of a recipe run (creating the timing
+        table if it does not exist)
+
+        :param pid: str, the recipe process id
+        :param sname: str, the recipe shortname
+        :param rows: list of lists, the query summary rows (database kind,
+                     func, kind, number of queries, total time, max time,
+                     number of rows) see drs_db.QueryStats.stop
+
+        :return: None - updates the timing table
+        """
+        # deal with no instrument set
+        if self.instrument == 'None':
+            return
+        # deal with no rows
+        if len(rows) == 0:
+            return
+        # deal with no database loaded
+        if self.database is None:
+            self.load_db()
+        # get the timing table and columns
+        ttable = self.dbtime_table()
+        tcols = self.pconst.LOG_DB_TIMING_COLUMNS()
+        # create the table if it does not exist
+        if ttable not in self.database.tables:
+            self.database.add_table(ttable, list(tcols.names),
+                                    list(tcols.datatypes))
+        # add the pid, shortname and time to each row
+        unixtime = Time.now().unix
+        trows = []
+        for row in rows:
+            trows.append([str(pid), str(sname), unixtime] + list(row))
+        # add the rows
+        self.database.add_rows(trows, table=ttable, columns=list(tcols.names))
+
+    def get_db_timing(self, condition: Optional[str] = None
+                      ) -> pd.DataFrame:
+        """
+        Get the database timing summary rows (see add_db_timing)
+
+        :param condition: str or None, if set the SQL condition
+
+        :return: pandas dataframe, the timing rows (empty if there is no
+                 timing table)
+        """
+        # get the timing columns
+        tcols = self.pconst.LOG_DB_TIMING_COLUMNS()
+        # deal with no instrument set
+        if self.instrument == 'None':
+            return pd.DataFrame(columns=list(tcols.names))
+        # deal with no database loaded
+        if self.database is None:
+            self.load_db()
+        # deal with no timing table
+        ttable = self.dbtime_table()
+        if ttable not in self.database.tables:
+            return pd.DataFrame(columns=list(tcols.names))
+        # get the rows
+        return self.database.get('*', table=ttable, condition=condition,
+                                 return_pandas=True)
+
+    def memory_table(self) -> str:
+        """
+        The name of the memory table (stored in the log database next to
+        the log table)
+
+        :return: str, the memory table name
+        """
+        # deal with no database loaded
+        if self.database is None:
+            self.load_db()
+        return '{0}{1}'.format(self.database.tname, MEMORY_SUFFIX).lower()
+
+    def add_run_memory(self, pid: str, sname: str, peak_rss: float):
+        """
+        Add the peak memory of a recipe run (creating the memory table if
+        it does not exist)
+
+        :param pid: str, the recipe process id
+        :param sname: str, the recipe shortname
+        :param peak_rss: float, the peak resident memory of the run in GB
+
+        :return: None - updates the memory table
+        """
+        # deal with no instrument set
+        if self.instrument == 'None':
+            return
+        # deal with no database loaded
+        if self.database is None:
+            self.load_db()
+        # get the memory table and columns
+        mtable = self.memory_table()
+        mcols = self.pconst.LOG_DB_MEMORY_COLUMNS()
+        # create the table if it does not exist
+        if mtable not in self.database.tables:
+            self.database.add_table(mtable, list(mcols.names),
+                                    list(mcols.datatypes))
+        # add the row
+        row = [str(pid), str(sname), Time.now().unix, float(peak_rss)]
+        self.database.add_rows([row], table=mtable,
+                               columns=list(mcols.names))
+
+    def get_run_memory(self, condition: Optional[str] = None
+                       ) -> pd.DataFrame:
+        """
+        Get the peak memory rows (see add_run_memory)
+
+        :param condition: str or None, if set the SQL condition
+
+        :return: pandas dataframe, the memory rows (empty if there is no
+                 memory table)
+        """
+        # get the memory columns
+        mcols = self.pconst.LOG_DB_MEMORY_COLUMNS()
+        # deal with no instrument set
+        if self.instrument == 'None':
+            return pd.DataFrame(columns=list(mcols.names))
+        # deal with no database loaded
+        if self.database is None:
+            self.load_db()
+        # deal with no memory table
+        mtable = self.memory_table()
+        if mtable not in self.database.tables:
+            return pd.DataFrame(columns=list(mcols.names))
+        # get the rows
+        return self.database.get('*', table=mtable, condition=condition,
+                                 return_pandas=True)
+
+    def fprint_table(self) -> str:
+        """
+        The name of the fingerprint table (stored in the log database next
+        to the log table)
+
+        :return: str, the fingerprint table name
+        """
+        # deal with no database loaded
+        if self.database is None:
+            self.load_db()
+        return '{0}{1}'.format(self.database.tname, FPRINT_SUFFIX).lower()
+
+    def add_fingerprint(self, runkey: str, fingerprint: str, pid: str,
+                        sname: str, inputs: str, calibs: str, queries: str,
+                        outputs: str):
+        """
+        Add the fingerprint of a run (replacing any previous fingerprint of
+        the same run key and creating the fingerprint table if it does not
+        exist)
+
+        :param runkey: str, the hash of the recipe and cleaned run string
+        :param fingerprint: str, the fingerprint of the run
+        :param pid: str, the recipe process id
+        :param sname: str, the recipe shortname
+        :param inputs: str, the input files (json)
+        :param calibs: str, the calibration and telluric files used (json)
+        :param queries: str, the calibration and telluric queries and the
+                        files they resolved (json)
+        :param outputs: str, the output files (json)
+
+        :return: None - updates the fingerprint table
+        """
+        # deal with no instrument set
+        if self.instrument == 'None':
+            return
+        # deal with no database loaded
+        if self.database is None:
+            self.load_db()
+        # get the fingerprint table and columns
+        ftable = self.fprint_table()
+        fcols = self.pconst.LOG_DB_FPRINT_COLUMNS()
+        # create the table if it does not exist (indexed by run key)
+        if ftable not in self.database.tables:
+            self.database.add_table(ftable, list(fcols.names),
+                                    list(fcols.datatypes),
+                                    index_cols=list(fcols.index_cols))
+        # remove the previous fingerprint of this run key
+        self.database.delete_keys(['RUNKEY'], [(str(runkey),)],
+                                  table=ftable)
+        # add the fingerprint
+        row = [str(runkey), str(fingerprint), str(pid), str(sname),
+               Time.now().unix, inputs, calibs, queries, outputs]
+        self.database.add_rows([row], table=ftable,
+                               columns=list(fcols.names))
+
+    def get_fingerprints(self, condition: Optional[str] = None
+                         ) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the fingerprint of every run key (see add_fingerprint)
+
+        :param condition: str or None, if set the SQL condition
+
+        :return: dict, the fingerprint rows (as dictionaries) by run key
+                 (empty if there is no fingerprint table)
+        """
+        # deal with no instrument set
+        if self.instrument == 'None':
+            return dict()
+        # deal with no database loaded
+        if self.database is None:
+            self.load_db()
+        # deal with no fingerprint table
+        ftable = self.fprint_table()
+        if ftable not in self.database.tables:
+            return dict()
+        # get the rows (a hash table by run key)
+        fcols = list(self.pconst.LOG_DB_FPRINT_COLUMNS().names)
+        fingerprints = dict()
+        for row in self.database.get(', '.join(fcols), table=ftable,
+                                     condition=condition):
+            fingerprints[row[0]] = dict(zip(fcols, row))
+        return fingerprints
+
+    def archive_table(self) -> str:
+        """
+        The name of the log archive table (stored in the log database next
+        to the log table) - rows moved here by archive_entries are only
+        queried when asked for (get_entries(include_archive=True))
+
+        :return: str, the archive table name
+        """
+        # deal with no database loaded
+        if self.database is None:
+            self.load_db()
+        return '{0}{1}'.format(self.database.tname, ARCHIVE_SUFFIX).lower()
+
+    def _entries_table(self, include_archive: bool = False) -> str:
+        """
+        The table (or table expression) get_entries reads from
+
+        :param include_archive: bool, if True the archive table rows are
+                                included (if the archive table exists)
+
+        :return: str, the table name or a sub-query of the log table and the
+                 archive table
+        """
+        # get the archive table
+        atable = self.archive_table()
+        # deal with not including the archive (or no archive)
+        if not include_archive or atable not in self.database.tables:
+            return self.database.tname
+        # list the columns explicitly (so the union does not depend on the
+        #   order the columns were created in)
+        cols = ', '.join(self.pconst.LOG_DB_COLUMNS().names)
+        # construct the sub-query
+        targs = [cols, self.database.tname, atable]
+        table = ('(SELECT {0} FROM {1} UNION ALL SELECT {0} FROM {2}) '
+                 'AS logall'.format(*targs))
+        return table
+
+    def archive_entries(self, max_age: Optional[float] = None,
+                        superseded: bool = True,
+                        chunk_size: Optional[int] = None) -> int:
+        """
+        Move recipe runs out of the log table into the archive table
+        (creating the archive table if it does not exist). Runs are moved
+        as a whole (all rows with the same PID) if:
+
+        - superseded: a newer run of the same RECIPE and RUNSTRING ended
+        - max_age: the run is older than max_age days
+
+        The latest ended run of each RECIPE and RUNSTRING is never archived
+        so the skip checks (which only read the log table) are unaffected.
+
+        :param max_age: float or None, the age in days after which runs are
+                        archived (None or <= 0 to not archive by age)
+        :param superseded: bool, if True archive superseded runs
+        :param chunk_size: int or None, the number of rows read at once
+                           when finding runs to archive
+
+        :return: int, the number of runs archived
+        """
+        # deal with no instrument set
+        if self.instrument == 'None':
+            return 0
+        # deal with no database loaded
+        if self.database is None:
+            self.load_db()
+        # get the table names
+        tname = self.database.tname
+        atable = self.archive_table()
+        # ---------------------------------------------------------------------
+        # find the key, last time and ended state of every run (streamed so
+        #   the full table is never loaded)
+        runs = dict()
+        command = ('SELECT PID, RECIPE, RUNSTRING, UNIXTIME, ENDED '
+                   'FROM {0}'.format(tname))
+        for df in self.database.iter_pandas(command, chunk_size=chunk_size):
+            for pid, group in df.groupby('PID', sort=False):
+                # get the run key (recipe and runstring) from any row
+                keys = group[['RECIPE', 'RUNSTRING']].dropna()
+                key = None
+                if len(keys) > 0:
+                    key = tuple(keys.iloc[0])
+                # get the last time and whether the run ended
+                utime = np.nanmax(np.array(group['UNIXTIME'], dtype=float))
+                ended = bool(np.any(np.array(group['ENDED']) == 1))
+                # combine with previous chunks
+                if pid in runs:
+                    pkey, ptime, pended = runs[pid]
+                    key = pkey if pkey is not None else key
+                    utime = np.nanmax([ptime, utime])
+                    ended |= pended
+                runs[pid] = (key, utime, ended)
+        # ---------------------------------------------------------------------
+        # find the latest ended run for each key
+        latest = dict()
+        for pid, (key, utime, ended) in runs.items():
+            if key is None or not ended:
+                continue
+            if key not in latest or utime > latest[key][0]:
+                latest[key] = (utime, pid)
+        # get the cut off time for archiving by age
+        if max_age is not None and max_age > 0:
+            cutoff = Time.now().unix - max_age * 24 * 3600
+        else:
+            cutoff = None
+        # find the runs to archive
+        pids = []
+        for pid, (key, utime, ended) in runs.items():
+            # never archive the latest ended run of a key
+            if key in latest and latest[key][1] == pid:
+                continue
+            # archive runs with a newer ended run
+            if superseded and key in latest and utime < latest[key][0]:
+                pids.append(pid)
+            # archive old runs
+            elif cutoff is not None and utime < cutoff:
+                pids.append(pid)
+        # deal with nothing to archive
+        if len(pids) == 0:
+            return 0
+        # ---------------------------------------------------------------------
+        # create the archive table (if it does not exist)
+        ldb_cols = self.pconst.LOG_DB_COLUMNS()
+        if atable not in self.database.tables:
+            # index names are per database (use add_index names)
+            index_groups = [[col] for col in ldb_cols.index_cols]
+            if ldb_cols.get_index_groups() is not None:
+                index_groups += ldb_cols.get_index_groups()
+            self.database.add_table(atable, list(ldb_cols.names),
+                                    list(ldb_cols.datatypes),
+                                    index_groups=index_groups)
+        # move the runs (one transaction per chunk of runs)
+        cols = ', '.join(ldb_cols.names)
+        holder = self.database.placeholder
+        cargs = [atable, cols, tname, holder]
+        insert_cmd = ('INSERT INTO {0} ({1}) SELECT {1} FROM {2} '
+                      'WHERE PID = {3}'.format(*cargs))
+        delete_cmd = 'DELETE FROM {0} WHERE PID = {1}'.format(tname, holder)
+        for start in range(0, len(pids), ARCHIVE_CHUNK_SIZE):
+            rows = [(pid,) for pid in pids[start:start + ARCHIVE_CHUNK_SIZE]]
+            self.database.transaction([(insert_cmd, rows),
+                                       (delete_cmd, rows)])
+        # return the number of runs archived
+        return len(pids)
 
     def add_entries(self, recipe: Union[str, None] = None,
                     sname: Union[str, None] = None,
@@ -2625,7 +3995,9 @@ class LogDatabase(DatabaseManager):
                     cpu_usage_end: Union[float, None] = None,
                     cpu_num: Union[int, None] = None,
                     log_start: Union[str, None] = None,
-                    log_end: Union[str, None] = None):
+                    log_end: Union[str, None] = None,
+                    return_values: bool = False
+                    ) -> Union[List[Any], None]:
         """
         Add a log entry to database
 
@@ -2689,8 +4061,11 @@ class LogDatabase(DatabaseManager):
         :param cpu_num: int, number of CPUs at start
         :param log_start: str, the human time log sub-level started
         :param log_end: str, the human time log sub-level ended
+        :param return_values: bool, if True the row values are returned
+                              instead of being added to the database (see
+                              upsert_entries)
 
-        :return: None - updates database
+        :return: None - updates database (unless return_values is True)
         """
         # need to clean error to put into database
         clean_error = _clean_error(errors)
@@ -2724,15 +4099,126 @@ class LogDatabase(DatabaseManager):
                     values.append(dtype(keys[it]))
                 except Exception as _:
                     values.append('None')
+        # return the values instead of adding them
+        if return_values:
+            return values
         # add row to database
         self.database.add_row(values)
 
+    def upsert_entries(self, rows: List[List[Any]],
+                       delete_rows: Optional[List[List[Any]]] = None):
+        """
+        Replace (or add) log entries identified by PID, LEVEL, SUBLEVEL and
+        LEVELCRIT (in a single transaction)
+
+        :param rows: list of lists, the row values (from
+                     add_entries(..., return_values=True))
+        :param delete_rows: list of lists or None, row values (as rows) of
+                            entries that should just be removed
+
+        :return: None - updates database
+        """
+        # deal with no database loaded
+        if self.database is None:
+            self.load_db()
+        # the columns that identify a log entry (LEVELCRIT is required as
+        #   SUBLEVEL is only unique within the parent level)
+        key_columns = ['PID', 'LEVEL', 'SUBLEVEL', 'LEVELCRIT']
+        # replace the rows
+        self.database.upsert_rows(rows, key_columns, delete_rows=delete_rows)
+
+    def _entries_condition(self,
+                           include_obs_dirs: Union[List[str], None] = None,
+                           exclude_obs_dirs: Union[List[str], None] = None,
+                           condition: Union[str, None] = None) -> str:
+        """
+        Construct the SQL condition for get_entries / iter_entries
+
+        :param include_obs_dirs: list of strings - if set a list of allowed
+                                 directories
+        :param exclude_obs_dirs: list of strings - if set a list of disallowed
+                                 directories
+        :param condition: str or None, if set the SQL query to add
+
+        :return: str, the SQL condition
+        """
+        # condition for used
+        econd = 'USED = 1'
+        # ------------------------------------------------------------------
+        if condition is not None:
+            econd += ' AND {0}'.format(condition)
+        # ------------------------------------------------------------------
+        # deal with whitelist directory set
+        if include_obs_dirs is not None:
+            # define a subcondition
+            subconditions = []
+            # loop around white listed nights and only keep these
+            for obs_dir in include_obs_dirs:
+                # add subcondition
+                subcondition = 'OBS_DIR="{0}"'.format(obs_dir)
+                subconditions.append(subcondition)
+            # must include "other" for OBS_DIR
+            subconditions.append('OBS_DIR="other"')
+            # add to conditions
+            econd += ' AND ({0})'.format(' OR '.join(subconditions))
+        # ------------------------------------------------------------------
+        # deal with blacklist directory set
+        if exclude_obs_dirs is not None:
+            for obs_dir in exclude_obs_dirs:
+                # add to condition
+                econd += ' AND (OBS_DIR!="{0}")'.format(obs_dir)
+        # return the condition
+        return econd
+
+    def iter_entries(self, columns: str = '*',
+                     include_obs_dirs: Union[List[str], None] = None,
+                     exclude_obs_dirs: Union[List[str], None] = None,
+                     condition: Union[str, None] = None,
+                     include_archive: bool = False,
+                     sort_by: Union[str, None] = 'UNIXTIME',
+                     chunk_size: Union[int, None] = None
+                     ) -> Iterator[pd.DataFrame]:
+        """
+        Get entries from the log database as get_entries does but streamed
+        as pandas tables of at most chunk_size rows (the full result is never
+        held in memory)
+
+        :param columns: str, the columns to return ('*' for all)
+        :param include_obs_dirs: list of strings - if set a list of allowed
+                                 directories
+        :param exclude_obs_dirs: list of strings - if set a list of disallowed
+                                 directories
+        :param condition: str or None, if set the SQL query to add
+        :param include_archive: bool, if True also get entries that were moved
+                                to the archive table (see archive_entries)
+        :param sort_by: str or None, the column(s) to sort by (descending)
+        :param chunk_size: int or None, the number of rows per chunk
+
+        :return: iterator of pandas tables
+        """
+        # deal with no instrument set
+        if self.instrument == 'None':
+            return
+        # deal with no database loaded
+        if self.database is None:
+            self.load_db()
+        # get the condition and table
+        econd = self._entries_condition(include_obs_dirs, exclude_obs_dirs,
+                                        condition)
+        table = self._entries_table(include_archive)
+        # stream the entries
+        for chunk in self.database.get_iter(columns, table=table,
+                                            condition=econd, sort_by=sort_by,
+                                            chunk_size=chunk_size):
+            yield chunk
+
     def get_entries(self, columns: str = '*',
                     include_obs_dirs: Union[List[str], None] = None,
                     exclude_obs_dirs: Union[List[str], None] = None,
                     nentries: Union[int, None] = None,
                     condition: Union[str, None] = None,
                     groupby: Union[str, None] = None,
+                    include_archive: bool = False
                     ) -> Union[None, list, tuple, np.ndarray, pd.DataFrame]:
         """
         Get an entry from the index database (can set columns to return, or
@@ -2747,6 +4233,8 @@ class LogDatabase(DatabaseManager):
                          back - sorted newest to oldest
         :param condition: str or None, if set the SQL query to add
         :param groupby: str or None, if set the SQL group by column
+        :param include_archive: bool, if True also get entries that were moved
+                                to the archive table (see archive_entries)
 
         :return: the entries of columns, if nentries = 1 returns either that
                  entry (as a tuple) or None, if len(columns) = 1, returns
@@ -2770,31 +4258,12 @@ class LogDatabase(DatabaseManager):
         sql['sort_descending'] = True
         # sort by last modified
         sql['sort_by'] = 'UNIXTIME'
-        # condition for used
-        sql['condition'] = 'USED = 1'
-        # ------------------------------------------------------------------
-        if condition is not None:
-            sql['condition'] += ' AND {0}'.format(condition)
-        # ------------------------------------------------------------------
-        # deal with whitelist directory set
-        if include_obs_dirs is not None:
-            # define a subcondition
-            subconditions = []
-            # loop around white listed nights and only keep these
-            for obs_dir in include_obs_dirs:
-                # add subcondition
-                subcondition = 'OBS_DIR="{0}"'.format(obs_dir)
-                subconditions.append(subcondition)
-            # must include "other" for OBS_DIR
-            subconditions.append('OBS_DIR="other"')
-            # add to conditions
-            sql['condition'] += ' AND ({0})'.format(' OR '.join(subconditions))
-        # ------------------------------------------------------------------
-        # deal with blacklist directory set
-        if exclude_obs_dirs is not None:
-            for obs_dir in exclude_obs_dirs:
-                # add to condition
-                sql['condition'] += ' AND (OBS_DIR!="{0}")'.format(obs_dir)
+        # condition for used (and the filters)
+        sql['condition'] = self._entries_condition(include_obs_dirs,
+                                                   exclude_obs_dirs,
+                                                   condition)
+        # get the table (with the archive if requested)
+        sql['table'] = self._entries_table(include_archive)
         # ------------------------------------------------------------------
         # add a group by argument
         if groupby is not None:
@@ -2858,6 +4327,10 @@ class LogDatabase(DatabaseManager):
             self.load_db()
         # remove entries
         self.database.delete_rows(condition=condition)
+        # remove archived entries
+        atable = self.archive_table()
+        if atable in self.database.tables:
+            self.database.delete_rows(table=atable, condition=condition)
 
 
 def _clean_error(errors: Union[str, None]) -> Union[str, None]:
@@ -2981,7 +4454,7 @@ class RejectDatabase(DatabaseManager):
         if self.database is None:
             self.load_db()
         # deal with having the possibility of more than one column
-        colnames = self.database.colnames(columns)
+        colnames = self.reader.colnames(columns)
         # ------------------------------------------------------------------
         # set up kwargs from database query
         sql = dict()
@@ -3000,7 +4473,7 @@ class RejectDatabase(DatabaseManager):
         # if we have one entry just get the tuple back
         if nentries == 1:
             # do sql query
-            entries = self.database.get(columns, **sql)
+            entries = self.reader.get(columns, **sql)
             # return filename
             if len(entries) == 1:
                 if len(colnames) == 1:
@@ -3011,13 +4484,13 @@ class RejectDatabase(DatabaseManager):
                 return None
         # ------------------------------------------------------------------
         # deal with having the possibility of more than one column
-        colnames = self.database.colnames(columns)
+        colnames = self.reader.colnames(columns)
         # if we have one column return a list
         if len(colnames) == 1:
             # return array for ease
             sql['return_array'] = True
             # do sql query
-            entries = self.database.get(columns, **sql)
+            entries = self.reader.get(columns, **sql)
             # return one list
             if len(entries) == 0:
                 return []
@@ -3028,7 +4501,7 @@ class RejectDatabase(DatabaseManager):
             # return as pandas table
             sql['return_pandas'] = True
             # do sql query
-            entries = self.database.get(columns, **sql)
+            entries = self.reader.get(columns, **sql)
             # return pandas table
             return entries
 
@@ -3146,101 +4619,6 @@ class PandasDBStorage:
                 FILEDBS = dict()
 
 
-class PandasLikeDatabase:
-    def __init__(self, data: pd.DataFrame):
-        """
-        Construct a database just using a pandas dataframe stored in the memory
-
-        can be used instead of a database (when we have a static database
-        loading from a dataframe is more efficient and avoids extra reads of
-        the database)
-
-        :param data: pandas.DataFrame, the pandas dataframe - usually taken
-                     from a call to a database
-        """
-        self.namespace = dict(data=data)
-        self.tablename = 'data'
-
-    def execute(self, command: str) -> pd.DataFrame:
-        """
-        How we run an sql query on a pandas database
-
-        Note the table has to be in self.namespace
-
-        i.e. "SELECT * FROM data" requires self.namespace['data'] = self.data
-
-        :param command: str, the sql command to run
-        :return:
-        """
-        return sqldf(command, self.namespace)
-
-    def count(self, condition: str = None) -> int:
-        """
-        Proxy for the drs_database.database count method
-
-        :param condition: Filter results using a SQL conditions string
-                       -- see examples, and possibly this
-                       useful tutorial:
-                           https://www.sqlitetutorial.net/sqlite-where/.
-                       If None, no results will be filtered out.
-
-        :return: int, the count
-        """
-        # construct basic command SELECT COUNT(*) FROM {TABLE}
-        command = "SELECT COUNT(*) FROM {}".format(self.tablename)
-        # deal with condition
-        if condition is not None:
-            command += " WHERE {} ".format(condition)
-        # run command
-        df = self.execute(command)
-        # return result
-        return int(df.iloc[0])
-
-    def get_index_entries(self, columns: str, condition: Optional[str] = None):
-        """
-        Proxy for index database get_entries method
-
-        Currently only supports a columns and condition argument
-
-        :param columns: str, the columns to return ('*' for all)
-        :param condition: str or None, if set the SQL query to add
-        :return:
-        """
-        # construct basic command SELECT {COLUMNS} FROM {TABLE}
-        command = 'SELECT {0} FROM {1}'.format(columns, self.tablename)
-        # deal with condition
-        if condition is not None:
-            command += " WHERE {} ".format(condition)
-        # run command
-        df = self.execute(command)
-        # return the data frame
-        return df
-
-    def colnames(self, columns: str = '*') -> List[str]:
-        """
-        Return the list of column names
-
-        Proxy for database.colnames
-
-        :return: List of strings (the column names)
-        """
-        cnames = list(self.namespace['data'].columns)
-        # if user requested all columns, return all columns
-        if columns == '*':
-            return cnames
-        # deal with specifying columns (return just columns in database
-        #   that match "columns"
-        else:
-            requested_columns = columns.split(',')
-            # loop around requested columns and search for them in all columns
-            outcolumns = []
-            for rcol in requested_columns:
-                if rcol.strip() in cnames:
-                    outcolumns.append(rcol.strip())
-            # return the output columns
-            return outcolumns
-
-
 # =============================================================================
 # Define other database functionality
 # =============================================================================
@@ -3303,6 +4681,90 @@ def get_google_sheet(params: ParamDict, sheet_id: str, worksheet: int = 0,
     return table
 
 
+def _record_query(kind: str, filedir: Union[str, Path], filenames: Any,
+                  filetime: Union[Time, None] = None, **query):
+    """
+    Record a calibration or telluric database query and the files it
+    resolved (in RESOLVED_QUERIES - see resolve_query)
+
+    :param kind: str, the database kind ('calibration' or 'telluric')
+    :param filedir: str or Path, the database file directory
+    :param filenames: str or list of str, the filenames the query resolved
+    :param filetime: astropy.Time or None, the time of the query
+    :param query: the other arguments of the query (get_calib_entry or
+                  get_tellu_entry)
+
+    :return: None, updates RESOLVED_QUERIES
+    """
+    # deal with no filename and a single filename
+    if filenames is None:
+        filenames = []
+    elif isinstance(filenames, str):
+        filenames = [filenames]
+    # make the query arguments json serializable
+    for name in query:
+        if isinstance(query[name], tuple):
+            query[name] = [float(value) for value in query[name]]
+        elif isinstance(query[name], np.generic):
+            query[name] = query[name].item()
+    # the query time (unix)
+    if hasattr(filetime, 'unix'):
+        query['unixtime'] = float(filetime.unix)
+    else:
+        query['unixtime'] = None
+    # the files resolved (absolute paths)
+    files = [str(Path(filedir).joinpath(filename).absolute())
+             for filename in filenames]
+    RESOLVED_QUERIES.append(dict(kind=kind, query=query, files=files))
+
+
+def resolve_query(params: ParamDict, record: Dict[str, Any]) -> List[str]:
+    """
+    Run a recorded calibration or telluric database query again (see
+    _record_query) - i.e. get the files the same query resolves now
+
+    :param params: ParamDict, the parameter dictionary of constants
+    :param record: dict, the recorded query
+
+    :return: list of str, the files resolved (absolute paths)
+    """
+    kind = record['kind']
+    query = dict(record['query'])
+    # get the database (loaded once per process)
+    if kind not in RESOLVE_DATABASES:
+        if kind == 'telluric':
+            dbm = TelluricDatabase(params)
+        else:
+            dbm = CalibrationDatabase(params)
+        dbm.load_db()
+        RESOLVE_DATABASES[kind] = dbm
+    dbm = RESOLVE_DATABASES[kind]
+    # get the query time
+    unixtime = query.pop('unixtime')
+    if unixtime is None:
+        filetime = None
+    else:
+        filetime = Time(unixtime, format='unix')
+    # run the query
+    if kind == 'telluric':
+        for tau in ['tau_water', 'tau_others']:
+            if query[tau] is not None:
+                query[tau] = tuple(query[tau])
+        filenames = dbm.get_tellu_entry('FILENAME', filetime=filetime,
+                                        **query)
+    else:
+        filenames = dbm.get_calib_entry('FILENAME', filetime=filetime,
+                                        **query)
+    # deal with no files and a single file
+    if filenames is None:
+        filenames = []
+    elif isinstance(filenames, str):
+        filenames = [filenames]
+    # return the absolute paths
+    return [str(Path(dbm.filedir).joinpath(filename).absolute())
+            for filename in filenames]
+
+
 # =============================================================================
 # Start of code
 # =============================================================================
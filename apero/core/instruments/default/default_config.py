@@ -37,7 +37,12 @@ __all__ = [  # global settings
     'DRS_PDB_RC_FILE', 'IPYTHON_RETURN', 'ALLOW_BREAKPOINTS',
     'DRS_RESET_RUN_PATH', 'DRS_INSTRUMENTS', 'DRS_PDB_RC_FILENAME',
     # DATABASE SETTINGS
-    'DATABASE_DIR', 'CALIB_DB_MATCH', 'TELLU_DB_MATCH',
+    'DATABASE_DIR', 'CALIB_DB_MATCH', 'TELLU_DB_MATCH', 'DB_BULK_CHUNK_SIZE',
+    'DB_TIMELINE_INDEX', 'DB_INDEX_MANIFEST', 'DB_HEADER_THREADS',
+    'DB_QUERY_CACHE', 'DB_QUERY_CACHE_SIZE', 'DB_QUERY_STATS',
+    'DB_SLOW_QUERY_TIME', 'DB_SLOW_QUERY_FILE', 'DB_EXPORT_CHUNK_SIZE',
+    'LOG_ARCHIVE_AGE', 'LOG_ARCHIVE_SUPERSEDED', 'DB_WRITER',
+    'DB_WRITER_SYNC_KINDS', 'DB_SNAPSHOT', 'DB_SNAPSHOT_KINDS',
     # DISPLAY/LOGGING SETTINGS
     'DRS_PRINT_LEVEL', 'DRS_LOG_LEVEL', 'DRS_COLOURED_LOG', 'DRS_THEME',
     'DRS_MAX_IO_DISPLAY_LIMIT', 'DRS_HEADER', 'DRS_LOG_CAUGHT_WARNINGS',
@@ -477,6 +482,169 @@ TELLU_DB_MATCH = Const('TELLU_DB_MATCH', dtype=str, source=__NAME__,
                                     'time the key lower in the calibDB file '
                                     'will be used'))
 
+# Define the number of rows sent to the database in one bulk insert
+#    (one transaction per chunk of rows)
+DB_BULK_CHUNK_SIZE = Const('DB_BULK_CHUNK_SIZE', dtype=int, value=1000,
+                           minimum=1, source=__NAME__, group=cgroup,
+                           description=('Define the number of rows sent to the '
+                                        'database in one bulk insert (one '
+                                        'transaction per chunk of rows)'),
+                           output=False)
+
+# Define whether calibration and telluric database time queries are answered
+#    from an in-memory (per process) index instead of an SQL sort (both
+#    give the same rows in the same order)
+DB_TIMELINE_INDEX = Const('DB_TIMELINE_INDEX', dtype=bool, value=False,
+                          source=__NAME__, group=cgroup,
+                          description=('Define whether calibration and '
+                                       'telluric database time queries are '
+                                       'answered from an in-memory index '
+                                       'instead of an SQL sort'),
+                          output=False)
+
+# Define whether the file index database skips directories that have not
+#    changed since they were last scanned (using the directory manifest) -
+#    a full rescan can always be forced with --full_rescan
+DB_INDEX_MANIFEST = Const('DB_INDEX_MANIFEST', dtype=bool, value=True,
+                          source=__NAME__, group=cgroup,
+                          description=('Define whether the file index '
+                                       'database skips directories that have '
+                                       'not changed since they were last '
+                                       'scanned (using the directory '
+                                       'manifest)'),
+                          output=False)
+
+# Define the number of threads used to read file headers when updating the
+#    file index database (1 reads headers one at a time)
+DB_HEADER_THREADS = Const('DB_HEADER_THREADS', dtype=int, value=8,
+                          minimum=1, source=__NAME__, group=cgroup,
+                          description=('Define the number of threads used to '
+                                       'read file headers when updating the '
+                                       'file index database'),
+                          output=False)
+
+# Define whether database query results (get and count) are cached in memory
+#    (per process) - cached results are invalidated by any write to the
+#    tables they were read from
+DB_QUERY_CACHE = Const('DB_QUERY_CACHE', dtype=bool, value=False,
+                       source=__NAME__, group=cgroup,
+                       description=('Define whether database query results '
+                                    'are cached in memory (invalidated by '
+                                    'any write to the tables they were read '
+                                    'from)'),
+                       output=False)
+
+# Define the maximum memory (in MB) used by cached query results per database
+#    (the least recently used results are evicted first)
+DB_QUERY_CACHE_SIZE = Const('DB_QUERY_CACHE_SIZE', dtype=float, value=256.0,
+                            minimum=0.0, source=__NAME__, group=cgroup,
+                            description=('Define the maximum memory (in MB) '
+                                         'used by cached query results per '
+                                         'database'),
+                            output=False)
+
+# Define whether the time spent in the databases by each recipe run is
+#    stored in the log database (used by apero_stats --mode=DBTIME)
+DB_QUERY_STATS = Const('DB_QUERY_STATS', dtype=bool, value=True,
+                       source=__NAME__, group=cgroup,
+                       description=('Define whether the time spent in the '
+                                    'databases by each recipe run is stored '
+                                    'in the log database'),
+                       output=False)
+
+# Define the time in seconds above which a database query is written to the
+#    slow query log (next to the recipe log file)
+DB_SLOW_QUERY_TIME = Const('DB_SLOW_QUERY_TIME', dtype=float, value=1.0,
+                           minimum=0.0, source=__NAME__, group=cgroup,
+                           description=('Define the time in seconds above '
+                                        'which a database query is written '
+                                        'to the slow query log'),
+                           output=False)
+
+# Define the slow query log file name (stored in the same directory as the
+#    recipe log files)
+DB_SLOW_QUERY_FILE = Const('DB_SLOW_QUERY_FILE', dtype=str,
+                           value='apero_slow_queries.log',
+                           source=__NAME__, group=cgroup,
+                           description=('Define the slow query log file name '
+                                        '(stored in the same directory as the '
+                                        'recipe log files)'),
+                           output=False)
+
+# Define the number of rows per chunk (and per parquet part file) when
+#    streaming a database to/from parquet with apero_database.py
+DB_EXPORT_CHUNK_SIZE = Const('DB_EXPORT_CHUNK_SIZE', dtype=int, value=100000,
+                             minimum=1, source=__NAME__, group=cgroup,
+                             description=('Define the number of rows per '
+                                          'chunk (and per parquet part file) '
+                                          'when streaming a database to/from '
+                                          'parquet'),
+                             output=False)
+
+# Define the age (in days) after which recipe runs are moved from the log
+#    database to the log archive table by apero_database.py --archive_log
+#    (0 to only archive superseded runs)
+LOG_ARCHIVE_AGE = Const('LOG_ARCHIVE_AGE', dtype=float, value=30.0,
+                        minimum=0.0, source=__NAME__, group=cgroup,
+                        description=('Define the age (in days) after which '
+                                     'recipe runs are moved from the log '
+                                     'database to the log archive table '
+                                     '(0 to only archive superseded runs)'),
+                        output=False)
+
+# Define whether recipe runs superseded by a newer run (same recipe and run
+#    string) are moved to the log archive table by
+#    apero_database.py --archive_log
+LOG_ARCHIVE_SUPERSEDED = Const('LOG_ARCHIVE_SUPERSEDED', dtype=bool,
+                               value=True, source=__NAME__, group=cgroup,
+                               description=('Define whether recipe runs '
+                                            'superseded by a newer run are '
+                                            'moved to the log archive table'),
+                               output=False)
+
+# Define whether database inserts/updates from parallel recipe runs
+#    (REPROCESS_MP_TYPE = pool or process) are sent to a single writer
+#    process (which applies them in batched transactions) instead of each
+#    worker writing to the database itself
+DB_WRITER = Const('DB_WRITER', dtype=bool, value=False, source=__NAME__,
+                  group=cgroup,
+                  description=('Define whether database writes from parallel '
+                               'recipe runs are sent to a single writer '
+                               'process'),
+                  output=False)
+
+# Define the database kinds where a worker waits for the writer process to
+#    apply each write (where ordering matters, i.e. a calibration must be in
+#    the database before the next recipe uses it), other writes are
+#    batched (comma separated list)
+DB_WRITER_SYNC_KINDS = Const('DB_WRITER_SYNC_KINDS', dtype=str,
+                             value='calib, tellu', source=__NAME__,
+                             group=cgroup,
+                             description=('Define the database kinds where '
+                                          'a worker waits for the writer '
+                                          'process to apply each write'),
+                             output=False)
+
+# Define whether parallel recipe runs (REPROCESS_MP_TYPE = pool or process)
+#    read from a read-only snapshot of some databases (written once per
+#    group of runs into shared memory) instead of querying the databases
+#    (writes still go to the databases)
+DB_SNAPSHOT = Const('DB_SNAPSHOT', dtype=bool, value=False, source=__NAME__,
+                    group=cgroup,
+                    description=('Define whether parallel recipe runs read '
+                                 'from a read-only snapshot of some '
+                                 'databases'),
+                    output=False)
+
+# Define the database kinds in the read-only snapshot (comma separated list,
+#    only calib, tellu, astrom and reject are supported)
+DB_SNAPSHOT_KINDS = Const('DB_SNAPSHOT_KINDS', dtype=str,
+                          value='calib, tellu, astrom, reject',
+                          source=__NAME__, group=cgroup,
+                          description=('Define the database kinds in the '
+                                       'read-only snapshot'),
+                          output=False)
+
 # =============================================================================
 # DISPLAY/LOGGING SETTINGS
 # =============================================================================
@@ -374,6 +374,10 @@ __all__ = [
     'SUMMARY_LATEX_PDF', 'EXPMETER_MIN_LAMBDA', 'EXPMETER_MAX_LAMBDA',
     'EXPMETER_TELLU_THRES', 'REPROCESS_PINAMECOL', 'DRIFT_DPRTYPES',
     'DRIFT_DPR_FIBER_TYPE', 'REPROCESS_MP_TYPE', 'REPROCESS_MP_TYPE_VAL',
+    'REPROCESS_SCHEDULER', 'REPROCESS_WORKER_MAX_RUNS',
+    'REPROCESS_WORKER_MAX_RSS', 'REPROCESS_COST_MODEL',
+    'REPROCESS_COST_DEFAULT', 'REPROCESS_MEM_GOVERNOR',
+    'REPROCESS_MEM_BUDGET', 'REPROCESS_MEM_DEFAULT', 'REPROCESS_SKIP_MODE',
     'REPROCESS_REINDEX_BLOCKS', 'REPROCESS_OBJECT_TYPES'
 ]
 
@@ -5491,6 +5495,97 @@ REPROCESS_MP_TYPE_VAL = Const('REPROCESS_MP_TYPE_VAL', value=None, dtype=str,
                                       '"pool" or "process" or use "linear" '
                                       'mode when validating recipes')
 
+# Define how runs are scheduled when parallelising recipes with "pool" or
+#     "process": "dag" starts each run as soon as the runs it depends on
+#     (via its input files and the calibration/telluric databases) have
+#     finished, "group" waits for each group of runs of the same recipe
+REPROCESS_SCHEDULER = Const('REPROCESS_SCHEDULER', value='dag', dtype=str,
+                            source=__NAME__, group=cgroup,
+                            options=['dag', 'group'],
+                            description='Define how runs are scheduled when '
+                                        'parallelising recipes with "pool" '
+                                        'or "process" (dag or group)')
+
+# Define the maximum number of runs a parallel worker process runs before it
+#     is replaced by a new process ("pool" and "process" modes, 0 for no
+#     limit, 1 starts a new process for every run)
+REPROCESS_WORKER_MAX_RUNS = Const('REPROCESS_WORKER_MAX_RUNS', value=50,
+                                  dtype=int, minimum=0, source=__NAME__,
+                                  group=cgroup,
+                                  description='Define the maximum number of '
+                                              'runs a parallel worker process '
+                                              'runs before it is replaced by '
+                                              'a new process (0 for no '
+                                              'limit)')
+
+# Define the memory (resident set size in GB) above which a parallel worker
+#     process is replaced by a new process after a run ("pool" and "process"
+#     modes, 0 for no limit)
+REPROCESS_WORKER_MAX_RSS = Const('REPROCESS_WORKER_MAX_RSS', value=8.0,
+                                 dtype=float, minimum=0.0, source=__NAME__,
+                                 group=cgroup,
+                                 description='Define the memory (resident set '
+                                             'size in GB) above which a '
+                                             'parallel worker process is '
+                                             'replaced by a new process '
+                                             'after a run (0 for no limit)')
+
+# Define whether to predict the run time of each run from previous runs (in
+#     the log database) and start the longest runs first
+REPROCESS_COST_MODEL = Const('REPROCESS_COST_MODEL', value=True, dtype=bool,
+                             source=__NAME__, group=cgroup,
+                             description='Define whether to predict the run '
+                                         'time of each run from previous '
+                                         'runs and start the longest runs '
+                                         'first')
+
+# Define the predicted run time (in seconds per input file) of recipes with
+#     no previous runs in the log database
+REPROCESS_COST_DEFAULT = Const('REPROCESS_COST_DEFAULT', value=60.0,
+                               dtype=float, minimum=0.0, source=__NAME__,
+                               group=cgroup,
+                               description='Define the predicted run time '
+                                           '(in seconds per input file) of '
+                                           'recipes with no previous runs')
+
+# Define whether to only start parallel runs ("pool" and "process" modes)
+#     when their predicted memory (from previous runs in the log database)
+#     fits in the memory budget and the memory available
+REPROCESS_MEM_GOVERNOR = Const('REPROCESS_MEM_GOVERNOR', value=True,
+                               dtype=bool, source=__NAME__, group=cgroup,
+                               description='Define whether to only start '
+                                           'parallel runs when their '
+                                           'predicted memory fits in the '
+                                           'memory budget')
+
+# Define the memory budget (in GB) for all parallel runs running at once
+#     (0 to use 80% of the total memory)
+REPROCESS_MEM_BUDGET = Const('REPROCESS_MEM_BUDGET', value=0.0, dtype=float,
+                             minimum=0.0, source=__NAME__, group=cgroup,
+                             description='Define the memory budget (in GB) '
+                                         'for all parallel runs running at '
+                                         'once (0 to use 80% of the total '
+                                         'memory)')
+
+# Define the predicted memory (in GB) of recipes with no previous runs in the
+#     log database
+REPROCESS_MEM_DEFAULT = Const('REPROCESS_MEM_DEFAULT', value=2.0, dtype=float,
+                              minimum=0.0, source=__NAME__, group=cgroup,
+                              description='Define the predicted memory (in '
+                                          'GB) of recipes with no previous '
+                                          'runs')
+
+# Define how runs are skipped (when SKIP_ flags are set): "runstring" skips
+#     a run if a run with the same arguments is in the log database,
+#     "content" skips a run only if its inputs, calibration files, version
+#     and constants are unchanged since its last run (the fingerprint) and
+#     every output exists with a matching fingerprint
+REPROCESS_SKIP_MODE = Const('REPROCESS_SKIP_MODE', value='runstring',
+                            dtype=str, source=__NAME__, group=cgroup,
+                            options=['runstring', 'content'],
+                            description='Define how runs are skipped '
+                                        '(runstring or content)')
+
 # Key for use in run files
 REPROCESS_RUN_KEY = Const('REPROCESS_RUN_KEY', value=None, dtype=str,
                           source=__NAME__, group=cgroup,
@@ -34,7 +34,8 @@ __all__ = [  # input keys
     'KW_DRS_EPOCH', 'KW_DRS_TEFF', 'KW_DRS_TEFF_S', 'KW_DRS_SPTYPE',
     'KW_DRS_SPTYPE_S', 'KW_DRS_DSOURCE', 'KW_DRS_DDATE',
     # general output keys
-    'KW_VERSION', 'KW_PPVERSION', 'KW_DPRTYPE', 'KW_PID', 'KW_DRS_MODE',
+    'KW_VERSION', 'KW_PPVERSION', 'KW_DPRTYPE', 'KW_PID', 'KW_FPRINT',
+    'KW_DRS_MODE',
     'KW_INFILE1', 'KW_INFILE2', 'KW_INFILE3', 'KW_DRS_MODE',
     'KW_DRS_QC', 'KW_DRS_QC_VAL', 'KW_DRS_QC_NAME', 'KW_DRS_QC_LOGIC',
     'KW_DRS_QC_PASS', 'KW_DATE_OBS', 'KW_OUTPUT',
@@ -542,6 +543,12 @@ KW_PPVERSION = Keyword('KW_PPVERSION', key='NULL', dtype=str, source=__NAME__,
 KW_PID = Keyword('KW_PID', key='NULL', dtype=str, source=__NAME__,
                  description='DRS process ID')
 
+# Fingerprint of the inputs of the run that outputted this file (inputs,
+#   calibrations, version and constants - see REPROCESS_SKIP_MODE)
+KW_FPRINT = Keyword('KW_FPRINT', key='NULL', dtype=str, source=__NAME__,
+                    description='Fingerprint of the inputs of the run that '
+                                'outputted this file')
+
 # Processed date keyword
 KW_DRS_DATE_NOW = Keyword('KW_DRS_DATE_NOW', key='NULL', dtype=str,
                           source=__NAME__,
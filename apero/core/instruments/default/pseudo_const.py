@@ -1142,6 +1142,9 @@ class DefaultPseudoConstants:
         calib_columns.add(name='PID', datatype='VARCHAR(80)', is_index=True)
         calib_columns.add(name='PDATE', datatype='VARCHAR(50)')
         calib_columns.add(name='USED', datatype='INT')
+        # manage index groups (key lookups filter on these and sort by time)
+        calib_columns.index_groups.append(['KEYNAME', 'FIBER', 'USED',
+                                           'UNIXTIME'])
         # return columns
         self.calibration_cols = calib_columns
         return calib_columns
@@ -1175,6 +1178,9 @@ class DefaultPseudoConstants:
         tellu_columns.add(name='PID', datatype='VARCHAR(80)', is_index=True)
         tellu_columns.add(name='PDATE', datatype='VARCHAR(50)')
         tellu_columns.add(name='USED', datatype='INT')
+        # manage index groups (key lookups filter on these and sort by time)
+        tellu_columns.index_groups.append(['KEYNAME', 'FIBER', 'USED',
+                                           'OBJECT', 'UNIXTIME'])
         # return columns and ctypes
         self.telluric_cols = tellu_columns
         return tellu_columns
@@ -1229,6 +1235,38 @@ class DefaultPseudoConstants:
         self.index_cols = index_cols
         return index_cols
 
+    def FILEINDEX_MANIFEST_COLUMNS(self) -> DatabaseColumns:
+        """
+        Define the columns used in the file index manifest table (one row
+        per directory scanned by the file index database - used to skip
+        directories that have not changed since the last scan)
+
+        :return: DatabaseColumns, the manifest columns
+        """
+        # set function name
+        # _ = display_func('FILEINDEX_MANIFEST_COLUMNS', __NAME__,
+        #                  self.class_name)
+        # column definitions
+        manifest_cols = DatabaseColumns()
+        manifest_cols.add(name='BLOCK_KIND', datatype='VARCHAR(20)',
+                          comment='Block kind of the directory')
+        manifest_cols.add(name='TOP_DIR', datatype='TEXT',
+                          comment='Directory the scan started from '
+                                  '(observation directory or block path)')
+        manifest_cols.add(name='DIRNAME', datatype='TEXT',
+                          comment='Absolute path of the directory')
+        manifest_cols.add(name='DIR_MTIME', datatype='DOUBLE',
+                          comment='Last modified time of the directory')
+        manifest_cols.add(name='NFILES', datatype='INT',
+                          comment='Number of files in the directory')
+        manifest_cols.add(name='MAX_MTIME', datatype='DOUBLE',
+                          comment='Newest last modified time of the files '
+                                  'in the directory')
+        manifest_cols.add(name='SCAN_TIME', datatype='DOUBLE',
+                          comment='Unix time the directory was scanned')
+        # return columns
+        return manifest_cols
+
     def REJECT_DB_COLUMNS(self) -> DatabaseColumns:
         """
         Define the columns use in the reject database
@@ -1371,11 +1409,110 @@ class DefaultPseudoConstants:
         log_columns.add(name='LOG_END', datatype='VARCHAR(25)',
                         comment='Log sub-level end time '
                                 'YYYY-mm-dd HH:MM:SS.SSS')
-
+        # manage index groups (log rows are replaced by these key columns)
+        log_columns.index_groups.append(['PID', 'LEVEL', 'SUBLEVEL'])
         # return columns and ctypes
         self.logdb_cols = log_columns
         return log_columns
 
+    def LOG_DB_TIMING_COLUMNS(self) -> DatabaseColumns:
+        """
+        Define the columns used in the log database timing table (one row
+        per recipe run, database and query function - the time spent in the
+        databases by each recipe run)
+
+        :return: DatabaseColumns, the timing columns
+        """
+        # set function name
+        # _ = display_func('LOG_DB_TIMING_COLUMNS', __NAME__,
+        #                  self.class_name)
+        # column definitions
+        timing_cols = DatabaseColumns()
+        timing_cols.add(name='PID', datatype='VARCHAR(80)',
+                        comment='Recipe process id')
+        timing_cols.add(name='SHORTNAME', datatype='VARCHAR(20)',
+                        comment='Recipe shortname')
+        timing_cols.add(name='UNIXTIME', datatype='DOUBLE',
+                        comment='Unix time the recipe run ended')
+        timing_cols.add(name='DB_KIND', datatype='VARCHAR(20)',
+                        comment='Database kind (CALIB/TELLU/FINDEX etc)')
+        timing_cols.add(name='FUNC', datatype='VARCHAR(200)',
+                        comment='Database function that ran the queries')
+        timing_cols.add(name='QUERY_KIND', datatype='VARCHAR(80)',
+                        comment='Kind of query')
+        timing_cols.add(name='NQUERIES', datatype='INT',
+                        comment='Number of queries')
+        timing_cols.add(name='TOTAL_TIME', datatype='DOUBLE',
+                        comment='Total wall time of the queries in seconds')
+        timing_cols.add(name='MAX_TIME', datatype='DOUBLE',
+                        comment='Longest wall time of a query in seconds')
+        timing_cols.add(name='NROWS', datatype='INT',
+                        comment='Number of rows returned or written')
+        # return columns
+        return timing_cols
+
+    def LOG_DB_MEMORY_COLUMNS(self) -> DatabaseColumns:
+        """
+        Define the columns used in the log database memory table (one row
+        per recipe run made by the processing - the peak memory of the run)
+
+        :return: DatabaseColumns, the memory columns
+        """
+        # set function name
+        # _ = display_func('LOG_DB_MEMORY_COLUMNS', __NAME__,
+        #                  self.class_name)
+        # column definitions
+        memory_cols = DatabaseColumns()
+        memory_cols.add(name='PID', datatype='VARCHAR(80)',
+                        comment='Recipe process id')
+        memory_cols.add(name='SHORTNAME', datatype='VARCHAR(20)',
+                        comment='Recipe shortname')
+        memory_cols.add(name='UNIXTIME', datatype='DOUBLE',
+                        comment='Unix time the recipe run ended')
+        memory_cols.add(name='PEAK_RSS', datatype='DOUBLE',
+                        comment='Peak resident memory of the run in GB')
+        # return columns
+        return memory_cols
+
+    def LOG_DB_FPRINT_COLUMNS(self) -> DatabaseColumns:
+        """
+        Define the columns used in the log database fingerprint table (one
+        row per run key - the last successful run of a recipe with the same
+        cleaned run string - see REPROCESS_SKIP_MODE)
+
+        :return: DatabaseColumns, the fingerprint columns
+        """
+        # set function name
+        # _ = display_func('LOG_DB_FPRINT_COLUMNS', __NAME__,
+        #                  self.class_name)
+        # column definitions
+        fprint_cols = DatabaseColumns()
+        fprint_cols.add(name='RUNKEY', datatype='VARCHAR(64)',
+                        is_index=True,
+                        comment='Hash of the recipe and cleaned run string')
+        fprint_cols.add(name='FINGERPRINT', datatype='VARCHAR(64)',
+                        comment='Hash of the inputs, calibrations, version '
+                                'and constants of the run')
+        fprint_cols.add(name='PID', datatype='VARCHAR(80)',
+                        comment='Recipe process id')
+        fprint_cols.add(name='SHORTNAME', datatype='VARCHAR(20)',
+                        comment='Recipe shortname')
+        fprint_cols.add(name='UNIXTIME', datatype='DOUBLE',
+                        comment='Unix time the recipe run ended')
+        fprint_cols.add(name='INPUTS', datatype='TEXT',
+                        comment='Input files (json: path, size, mtime, '
+                                'checksum)')
+        fprint_cols.add(name='CALIBS', datatype='TEXT',
+                        comment='Calibration and telluric files used (json: '
+                                'path, size, mtime, checksum)')
+        fprint_cols.add(name='QUERIES', datatype='TEXT',
+                        comment='Calibration and telluric queries and the '
+                                'files they resolved (json)')
+        fprint_cols.add(name='OUTPUTS', datatype='TEXT',
+                        comment='Output files (json: paths)')
+        # return columns
+        return fprint_cols
+
     def ASTROMETRIC_DB_COLUMNS(self) -> DatabaseColumns:
         """
         Define the columns use in the object database
@@ -172,6 +172,15 @@ database_mgr.set_kwarg(name='--join', dtype='options', default='replace',
                        helpstr=textentry('DBMGR_JOIN_HELP'))
 database_mgr.set_kwarg(name='--delete', dtype='switch', default=False,
                        helpstr=textentry('DBMGR_DELETE_HELP'))
+database_mgr.set_kwarg(name='--full_rescan', dtype='switch', default=False,
+                       helpstr=textentry('DBMGR_FULL_RESCAN_HELP'))
+database_mgr.set_kwarg(name='--index_advisor', dtype='switch', default=False,
+                       helpstr=textentry('DBMGR_INDEX_ADVISOR_HELP'))
+database_mgr.set_kwarg(name='--create_indexes', dtype='switch',
+                       default=False,
+                       helpstr=textentry('DBMGR_CREATE_INDEXES_HELP'))
+database_mgr.set_kwarg(name='--archive_log', dtype='switch', default=False,
+                       helpstr=textentry('DBMGR_ARCHIVE_LOG_HELP'))
 
 database_mgr.description_file = 'apero_database.rst'
 
@@ -367,6 +376,8 @@ stats.set_kwarg(name='--limit', dtype=int, default=0,
                 helpstr='Limit the number of entries in memory plot '
                         '(any recipe with more than this limit is left '
                         'out of stats)')
+stats.set_kwarg(name='--include_archive', dtype='switch', default=False,
+                helpstr=textentry('LOGSTAT_INCLUDE_ARCHIVE_HELP'))
 stats.description_file = 'apero_stats.rst'
 
 # -----------------------------------------------------------------------------
@@ -418,6 +429,8 @@ precheck.set_kwarg(name='--no_file_check', dtype='switch', default=False,
                    helpstr=textentry('PRECHECK_NOFILECHECK_HELP'))
 precheck.set_kwarg(name='--no_obj_check', dtype='switch', default=False,
                    helpstr=textentry('PRECHECK_NOOBJCHECK_HELP'))
+precheck.set_kwarg(name='--full_rescan', dtype='switch', default=False,
+                   helpstr=textentry('PROCESS_FULL_RESCAN_HELP'))
 precheck.description_file = 'apero_precheck.rst'
 
 # -----------------------------------------------------------------------------
@@ -452,6 +465,8 @@ processing.set_kwarg(name='--telluric_targets', dtype=str, default='None',
                      helpstr=textentry('PROCESS_TELLU_TARGETS'))
 processing.set_kwarg(name='--update_objdb', dtype=str, default='None',
                      helpstr=textentry('PROCESS_UPDATE_OBJDB'))
+processing.set_kwarg(name='--full_rescan', dtype='switch', default=False,
+                     helpstr=textentry('PROCESS_FULL_RESCAN_HELP'))
 processing.description_file = 'apero_processing.rst'
 
 # -----------------------------------------------------------------------------
@@ -380,6 +380,11 @@ KW_PID = KW_PID.copy(__NAME__)
 KW_PID.set(key='DRSPID', comment='The process ID that outputted this file.',
            post_exclude=True, group='pp')
 
+# Fingerprint of the inputs of the run that outputted this file
+KW_FPRINT = KW_FPRINT.copy(__NAME__)
+KW_FPRINT.set(key='DRSFPRNT', comment='Fingerprint of the run inputs',
+              post_exclude=True, group='pp')
+
 # Processed date keyword
 KW_DRS_DATE_NOW = KW_DRS_DATE_NOW.copy(__NAME__)
 KW_DRS_DATE_NOW.set(key='DRSPDATE', comment='DRS Processed date',
@@ -385,6 +385,12 @@ def setup(name: str = 'None', instrument: str = 'None',
         # add log file to log (only used to save where the log is)
         logfile = drs_log.get_logfilepath(WLOG, params)
         recipe.log.set_log_file(logfile)
+        # write slow database queries next to the log file
+        slow_path = os.path.join(os.path.dirname(logfile),
+                                 params['DB_SLOW_QUERY_FILE'])
+        slabel = '{0}[{1}]'.format(recipe.shortname, params['PID'])
+        drs_db.QUERY_STATS.configure(params['DB_SLOW_QUERY_TIME'],
+                                     slow_path, label=slabel)
         recipe.log.block_kind = str(recipe.out_block_str)
         recipe.log.recipe_kind = str(recipe.recipe_kind)
         # add user input parameters to log
@@ -661,6 +667,10 @@ def end_main(params: ParamDict, llmain: Union[Dict[str, Any], None],
         # ---------------------------------------------------------------------
         # deal with clearing warnings
         drs_exceptions.clear_warnings()
+    # make sure buffered recipe log rows are written (end() writes them
+    #   when end is True)
+    elif recipe.log is not None:
+        recipe.log.flush_logfile()
     # -------------------------------------------------------------------------
     # deal with closing graphs
     # -------------------------------------------------------------------------
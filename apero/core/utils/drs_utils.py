@@ -16,6 +16,7 @@ import numpy as np
 import pandas as pd
 
 from apero.base import base
+from apero.base import drs_db
 from apero.core import constants
 from apero.core.core import drs_base_classes as base_class
 from apero.core.core import drs_database
@@ -82,6 +83,11 @@ class RecipeLog:
         self.class_name = 'RecipeLog'
         # set function name
         _ = drs_misc.display_func('__init__', __NAME__, self.class_name)
+        # start recording the database queries of this run (root log only)
+        if level == 0:
+            self.db_stats = drs_db.QUERY_STATS.start()
+        else:
+            self.db_stats = None
         # get a database instance
         if isinstance(database, LogDatabase):
             self.logdbm = database
@@ -186,6 +192,11 @@ class RecipeLog:
         self.cpu_usage_start = stats['cpu_percent']
         self.cpu_usage_end = -1
         self.cpu_num = stats['cpu_total']
+        # log rows (key --> row values) already in the database, waiting to
+        #   be written and waiting to be removed (shared with all children)
+        self.written_rows = dict()
+        self.dirty_rows = dict()
+        self.stale_rows = dict()
 
     def __getstate__(self) -> dict:
         """
@@ -305,9 +316,9 @@ class RecipeLog:
                     child.set_plot_dir(params, location, write=False)
         else:
             self.plot_dir = 'None'
-        # whether to write (update) recipe log file
+        # whether to write (update) recipe log file (written at the next flush)
         if write:
-            self.write_logfile()
+            self.write_logfile(flush=False)
 
     def add_level(self, params: ParamDict, key: str, value: Any,
                   write: bool = True) -> 'RecipeLog':
@@ -341,6 +352,13 @@ class RecipeLog:
                            flags=self.flags)
         # copy from parent
         newlog.copy(self)
+        # share the log rows with the parent
+        newlog.written_rows = self.written_rows
+        newlog.dirty_rows = self.dirty_rows
+        newlog.stale_rows = self.stale_rows
+        # once we have children we no longer have our own row
+        if len(self.set) == 0:
+            self._remove_row()
         # set log start time
         newlog.log_start = str(Time.now().iso)
         # record level criteria
@@ -350,9 +368,9 @@ class RecipeLog:
         # add newlog to set
         self.set.append(newlog)
         # ---------------------------------------------------------------------
-        # whether to write (update) recipe log file
+        # whether to write (update) recipe log file (written at the next flush)
         if write:
-            self.write_logfile()
+            self.write_logfile(flush=False)
         # return newlog (for use)
         return newlog
 
@@ -401,9 +419,9 @@ class RecipeLog:
             self.qc_logic += '{0}||'.format(qc_logic[it])
             self.qc_pass += '{0}||'.format(qc_pass[it])
 
-        # whether to write (update) recipe log file
+        # whether to write (update) recipe log file (written at the next flush)
         if write:
-            self.write_logfile()
+            self.write_logfile(flush=False)
 
     def no_qc(self, write: bool = True):
         """
@@ -421,9 +439,9 @@ class RecipeLog:
         # loop around instances
         for inst in instances:
             inst.passed_qc = True
-        # whether to write (update) recipe log file
+        # whether to write (update) recipe log file (written at the next flush)
         if write:
-            self.write_logfile()
+            self.write_logfile(flush=False)
 
     def add_error(self, errortype: Union[Exception, str],
                   errormsg: str, write: bool = True):
@@ -494,13 +512,46 @@ class RecipeLog:
         self.cpu_usage_end = stats['cpu_percent']
         # whether to write (update) recipe log file
         if write:
+            # store the time spent in the databases by this run
+            self.write_db_stats()
             self.write_logfile()
 
-    def write_logfile(self):
+    def write_db_stats(self):
+        """
+        Stop recording the database queries of this run and store the
+        summary (time spent per database and query function) in the log
+        database timing table
+
+        :return: None
+        """
+        # set function name
+        _ = drs_misc.display_func('write_db_stats', __NAME__,
+                                  self.class_name)
+        # only the root log records the database queries
+        if self.db_stats is None:
+            return
+        # stop recording
+        rows = drs_db.QUERY_STATS.stop(self.db_stats)
+        self.db_stats = None
+        # do not write if we have the no log flag (or stats are turned off)
+        if self.no_log or not self.params.get('DB_QUERY_STATS', True):
+            return
+        # add the summary to the log database
+        self.logdbm.add_db_timing(self.pid, self.sname, rows)
+
+    def write_logfile(self, flush: bool = True):
         """
         Write to the log database
 
-        :return: None, unless return_values is True
+        Only rows that have changed since they were last written are written
+        and they are replaced (keyed by PID, LEVEL, SUBLEVEL and LEVELCRIT)
+        rather than removing and re-adding every row of this pid
+
+        :param flush: bool, if True write changed rows to the database now,
+                      otherwise they are buffered until the next flush
+                      (flush_logfile, i.e. at level end or on error)
+
+        :return: None
         """
         # set function name
         _ = drs_misc.display_func('write_logfile', __NAME__,
@@ -509,9 +560,6 @@ class RecipeLog:
         if self.no_log:
             return
         # ---------------------------------------------------------------------
-        # remove all entries with this pid
-        self.logdbm.remove_pids(self.pid)
-        # ---------------------------------------------------------------------
         # add instances (if we have a set use the set otherwise just add
         #    your self)
         instances = self.get_children()
@@ -521,50 +569,109 @@ class RecipeLog:
             utime = float(Time(inst.htime).unix)
             # convert flags before writing
             inst.convert_flags()
-            # add entries
-            self.logdbm.add_entries(recipe=inst.name, sname=inst.sname,
-                                    block_kind=inst.block_kind,
-                                    recipe_type=inst.recipe_type,
-                                    recipe_kind=inst.recipe_kind,
-                                    program_name=inst.program_name,
-                                    pid=inst.pid, htime=inst.htime,
-                                    unixtime=utime, group=inst.group,
-                                    level=inst.level,
-                                    sublevel=inst.level_iteration,
-                                    levelcrit=inst.level_criteria,
-                                    inpath=inst.inputdir,
-                                    outpath=inst.outputdir,
-                                    obs_dir=inst.obs_dir,
-                                    logfile=inst.log_file,
-                                    plotdir=inst.plot_dir,
-                                    runstring=inst.runstring, args=inst.args,
-                                    kwargs=inst.kwargs, skwargs=inst.skwargs,
-                                    start_time=inst.start_time,
-                                    # end time has to be taken from parent
-                                    end_time=self.end_time,
-                                    started=inst.started,
-                                    passed_all_qc=inst.passed_qc,
-                                    qc_string=inst.qc_string,
-                                    qc_names=inst.qc_name,
-                                    qc_values=inst.qc_value,
-                                    qc_logic=inst.qc_logic,
-                                    qc_pass=inst.qc_pass,
-                                    errors=inst.errors,
-                                    ended=int(inst.flags['ENDED']),
-                                    flagnum=inst.flagnum,
-                                    flagstr=inst.flagstr,
-                                    used=1,
-                                    ram_usage_start=inst.ram_usage_start,
-                                    ram_usage_end=inst.ram_usage_end,
-                                    ram_total=inst.ram_total,
-                                    swap_usage_start=inst.swap_usage_start,
-                                    swap_usage_end=inst.swap_usage_end,
-                                    swap_total=inst.swap_total,
-                                    cpu_usage_start=inst.cpu_usage_start,
-                                    cpu_usage_end=inst.cpu_usage_end,
-                                    cpu_num=inst.cpu_num,
-                                    log_start=inst.log_start,
-                                    log_end=inst.log_end)
+            # get the row values
+            values = self.logdbm.add_entries(
+                recipe=inst.name,
+                sname=inst.sname,
+                block_kind=inst.block_kind,
+                recipe_type=inst.recipe_type,
+                recipe_kind=inst.recipe_kind,
+                program_name=inst.program_name,
+                pid=inst.pid, htime=inst.htime,
+                unixtime=utime, group=inst.group,
+                level=inst.level,
+                sublevel=inst.level_iteration,
+                levelcrit=inst.level_criteria,
+                inpath=inst.inputdir,
+                outpath=inst.outputdir,
+                obs_dir=inst.obs_dir,
+                logfile=inst.log_file,
+                plotdir=inst.plot_dir,
+                runstring=inst.runstring, args=inst.args,
+                kwargs=inst.kwargs, skwargs=inst.skwargs,
+                start_time=inst.start_time,
+                # end time has to be taken from parent
+                end_time=self.end_time,
+                started=inst.started,
+                passed_all_qc=inst.passed_qc,
+                qc_string=inst.qc_string,
+                qc_names=inst.qc_name,
+                qc_values=inst.qc_value,
+                qc_logic=inst.qc_logic,
+                qc_pass=inst.qc_pass,
+                errors=inst.errors,
+                ended=int(inst.flags['ENDED']),
+                flagnum=inst.flagnum,
+                flagstr=inst.flagstr,
+                used=1,
+                ram_usage_start=inst.ram_usage_start,
+                ram_usage_end=inst.ram_usage_end,
+                ram_total=inst.ram_total,
+                swap_usage_start=inst.swap_usage_start,
+                swap_usage_end=inst.swap_usage_end,
+                swap_total=inst.swap_total,
+                cpu_usage_start=inst.cpu_usage_start,
+                cpu_usage_end=inst.cpu_usage_end,
+                cpu_num=inst.cpu_num,
+                log_start=inst.log_start,
+                log_end=inst.log_end,
+                return_values=True)
+            # only rows that have changed need to be written
+            key = inst._row_key()
+            if self.written_rows.get(key) != values:
+                self.dirty_rows[key] = values
+        # write the changed rows now
+        if flush:
+            self.flush_logfile()
+
+    def flush_logfile(self):
+        """
+        Write all changed log rows (of this log and any other log in the same
+        tree) to the log database in a single transaction
+
+        :return: None
+        """
+        # set function name
+        _ = drs_misc.display_func('flush_logfile', __NAME__,
+                                  self.class_name)
+        # do not write log if we have the no log flag
+        if self.no_log:
+            return
+        # deal with nothing to write
+        if len(self.dirty_rows) == 0 and len(self.stale_rows) == 0:
+            return
+        # replace changed rows and remove stale rows
+        self.logdbm.upsert_entries(list(self.dirty_rows.values()),
+                                   delete_rows=list(self.stale_rows.values()))
+        # these rows are now in the database (update in place - the
+        #   dictionaries are shared with the rest of the tree)
+        self.written_rows.update(self.dirty_rows)
+        self.dirty_rows.clear()
+        self.stale_rows.clear()
+
+    def _row_key(self) -> Tuple[str, int, int, str]:
+        """
+        The key of this log's row (same columns used to identify the row in
+        the log database)
+
+        :return: tuple, the pid, level, sublevel and level criteria
+        """
+        return self.pid, self.level, self.level_iteration, self.level_criteria
+
+    def _remove_row(self):
+        """
+        Remove this log's own row (when it gets children only the children
+        have rows)
+
+        :return: None
+        """
+        key = self._row_key()
+        # nothing to write for this row
+        self.dirty_rows.pop(key, None)
+        # if already in the database it needs to be removed
+        if key in self.written_rows:
+            self.stale_rows[key] = self.written_rows.pop(key)
+
 
     def _make_row(self) -> OrderedDict:
         """
@@ -643,8 +750,8 @@ class RecipeLog:
             self.flags[kwarg] = bool(kwargs[kwarg])
         # convert flags for logging
         self.convert_flags()
-        # whether to write (update) recipe log file
-        self.write_logfile()
+        # whether to write (update) recipe log file (written at the next flush)
+        self.write_logfile(flush=False)
 
     def convert_flags(self):
         """
@@ -821,11 +928,17 @@ def update_index_db(params: ParamDict, block_kind: str,
     else:
         exclude_dirs = list(excludelist)
     # -------------------------------------------------------------------------
+    # deal with forcing a full rescan (ignore the directory manifest)
+    full_rescan = False
+    if 'INPUTS' in params:
+        full_rescan = bool(params['INPUTS'].get('FULL_RESCAN', False))
+    # -------------------------------------------------------------------------
     # update index database with raw files
     findexdbm.update_entries(block_kind=block_kind,
                              exclude_directories=exclude_dirs,
                              include_directories=include_dirs,
-                             filename=filename, suffix=suffix)
+                             filename=filename, suffix=suffix,
+                             full_rescan=full_rescan)
     # -------------------------------------------------------------------------
     # we need to reset some globally stored variables - these should be
     #   recalculated when used
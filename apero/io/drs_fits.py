@@ -24,7 +24,7 @@ import traceback
 import warnings
 from copy import deepcopy
 from pathlib import Path
-from typing import Any, List, Optional, Tuple, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 from astropy.io import fits
@@ -69,6 +69,12 @@ AnySimple = Union[int, float, str, bool]
 HeaderCommentCards = fits.header._HeaderCommentaryCards
 # filter verify warnings
 warnings.filterwarnings('ignore', category=VerifyWarning)
+# fits header blocks and cards (bytes)
+FITS_BLOCK_SIZE = 2880
+FITS_CARD_SIZE = 80
+# maximum number of header blocks read by read_header_keys before giving up
+#    (and reading the header with astropy)
+FITS_MAX_HEADER_BLOCKS = 1000
 
 
 # =============================================================================
@@ -499,6 +505,114 @@ def read_header(params: ParamDict, filename: str, ext: Union[int, None] = None,
         return header
 
 
+def read_header_keys(params: ParamDict, filename: str, keys: List[str]
+                     ) -> Dict[str, Any]:
+    """
+    Read only some keys from the primary header of a fits file at 'filename'
+
+    The header blocks are read directly (stopping at the END card) and only
+    the cards of the requested keys are parsed (with astropy) - this is much
+    faster than parsing the full header. Falls back to read_header (the full
+    primary header) if the header cannot be read this way.
+
+    :param params: ParamDict, parameter dictionary of constants
+    :param filename: str, the filename to read the header keys from
+    :param keys: list of strings, the header keys to get (HIERARCH keys may
+                 be given with or without the HIERARCH prefix)
+
+    :return: dict, the value of each key found in the header (keys not in
+             the header are not in the dictionary)
+    :raises: any exception raised by astropy.io.fits if the header cannot be
+             read
+    """
+    # set function name
+    # _ = display_func('read_header_keys', __NAME__)
+    # normalise the requested keys (as astropy would look them up)
+    wanted = dict()
+    for key in keys:
+        wanted.setdefault(_norm_header_key(key), []).append(key)
+    # storage for the card images of each requested key
+    images = dict()
+    # the key we are collecting CONTINUE cards for
+    continue_key = None
+    # noinspection PyBroadException
+    try:
+        found_end = False
+        with open(filename, 'rb') as fitsfile:
+            for block_it in range(FITS_MAX_HEADER_BLOCKS):
+                block = fitsfile.read(FITS_BLOCK_SIZE)
+                # a fits file is always a whole number of blocks
+                if len(block) != FITS_BLOCK_SIZE:
+                    break
+                # the first card must be SIMPLE
+                if block_it == 0 and not block.startswith(b'SIMPLE  '):
+                    break
+                # loop around the cards in this block
+                text = block.decode('ascii')
+                for start in range(0, FITS_BLOCK_SIZE, FITS_CARD_SIZE):
+                    image = text[start:start + FITS_CARD_SIZE]
+                    keyword = image[:8].rstrip()
+                    # end of the header
+                    if keyword == 'END':
+                        found_end = True
+                        break
+                    # deal with long strings (CONTINUE cards)
+                    if keyword == 'CONTINUE':
+                        if continue_key is not None:
+                            images[continue_key] += image
+                        continue
+                    continue_key = None
+                    # get the keyword of value cards (including HIERARCH)
+                    if image[8:10] == '= ':
+                        pass
+                    elif keyword == 'HIERARCH' and '=' in image:
+                        keyword = image[8:image.index('=')]
+                    else:
+                        continue
+                    keyword = _norm_header_key(keyword)
+                    # store the first card of each requested key
+                    if keyword in wanted and keyword not in images:
+                        images[keyword] = image
+                        continue_key = keyword
+                if found_end:
+                    break
+        # parse the requested cards
+        if found_end:
+            values = dict()
+            for keyword in images:
+                value = fits.Card.fromstring(images[keyword]).value
+                # undefined values are None (as header[key] returns)
+                if isinstance(value, fits.card.Undefined):
+                    value = None
+                for key in wanted[keyword]:
+                    values[key] = value
+            return values
+    except Exception as _:
+        pass
+    # fall back to reading the full header
+    header = read_header(params, filename, log=False)
+    values = dict()
+    for key in keys:
+        if key in header:
+            values[key] = header[key]
+    return values
+
+
+def _norm_header_key(key: str) -> str:
+    """
+    Normalise a header key for comparing header keys (upper case, single
+    spaces and no HIERARCH prefix)
+
+    :param key: str, the header key
+
+    :return: str, the normalised header key
+    """
+    key = ' '.join(key.upper().split())
+    if key.startswith('HIERARCH '):
+        key = key[len('HIERARCH '):]
+    return key
+
+
 # define complex typing for _read_fitsmulti
 DataHdrListType = Union[Tuple[List[np.ndarray], List[fits.Header], List[str]],
                         Tuple[List[np.ndarray], List[str]],
@@ -1079,6 +1193,32 @@ def _write_fits(params: ParamDict, filename: str, data: ListImageTable,
     drs_log.warninglogger(params, w1)
 
 
+def update_header_keys(params: ParamDict, filename: str,
+                       keys: Dict[str, Tuple[Any, str]]):
+    """
+    Update (or add) some keys in the primary header of an existing fits file
+    in place (the data are not rewritten unless the header no longer fits
+    in its blocks)
+
+    :param params: ParamDict, the parameter dictionary of constants
+    :param filename: str, the filename to update
+    :param keys: dict, the (value, comment) of each header key to set
+
+    :return: None, updates the primary header of filename
+    """
+    # set function name
+    func_name = display_func('update_header_keys', __NAME__)
+    # update the primary header
+    with warnings.catch_warnings(record=True) as _:
+        try:
+            with fits.open(filename, mode='update') as hdulist:
+                for key in keys:
+                    hdulist[0].header[key] = keys[key]
+        except Exception as e:
+            eargs = [os.path.basename(filename), type(e), e, func_name]
+            WLOG(params, 'error', textentry('01-001-00005', args=eargs))
+
+
 def update_extension(params: ParamDict, filename: str, extension: int,
                      data: Union[np.ndarray, Table, None] = None,
                      header: Union[Header, None] = None, fmt: str = 'image'):
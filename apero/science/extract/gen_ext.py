@@ -89,7 +89,7 @@ def order_profiles(params, recipe, infile, fibertypes, sprops,
     # load database
     if database is None:
         calibdbm = drs_database.CalibrationDatabase(params)
-        calibdbm.load_db()
+        calibdbm.load_db(read_only=True)
     else:
         calibdbm = database
     # ------------------------------------------------------------------------
@@ -94,11 +94,11 @@ def correct_sky_with_ref(params: ParamDict, recipe: DrsRecipe,
     # deal with no calibration database
     if calibdbm is None:
         calibdbm = CalibrationDatabase(params)
-        calibdbm.load_db()
+        calibdbm.load_db(read_only=True)
     # deal with no telluric database
     if telludbm is None:
         telludbm = TelluricDatabase(params)
-        telludbm.load_db()
+        telludbm.load_db(read_only=True)
     # -------------------------------------------------------------------------
     # load psuedo constants
     pconst = constants.pload()
@@ -257,11 +257,11 @@ def correct_sky_no_ref(params: ParamDict, recipe: DrsRecipe,
     # deal with no calibration database
     if calibdbm is None:
         calibdbm = CalibrationDatabase(params)
-        calibdbm.load_db()
+        calibdbm.load_db(read_only=True)
     # deal with no telluric database
     if telludbm is None:
         telludbm = TelluricDatabase(params)
-        telludbm.load_db()
+        telludbm.load_db(read_only=True)
     # -------------------------------------------------------------------------
     # load psuedo constants
     pconst = constants.pload()
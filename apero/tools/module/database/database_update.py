@@ -317,11 +317,8 @@ def log_update(params: ParamDict, pconst: PseudoConstants):
             # append to pids
             log_pids.append(lpid)
         # ---------------------------------------------------------------------
-        # loop around unique pids and remove them from log database (we are
-        #    updating them now)
-        for pid in np.unique(log_pids):
-            # remove pids
-            logdbm.remove_pids(pid)
+        # remove the unique pids from log database (we are updating them now)
+        logdbm.remove_pids(list(np.unique(log_pids)))
         # ---------------------------------------------------------------------
         # add unique entries to log database
         for lcode in logentries:
@@ -7,9 +7,12 @@ Created on 2020-08-2020-08-18 17:13
 
 @author: cook
 """
+import glob
+import json
 import os
-from typing import Dict, List, Union
+from typing import Any, Dict, List, Union
 
+import duckdb
 import numpy as np
 import pandas as pd
 from astropy.table import Table, vstack, MaskedColumn
@@ -77,6 +80,66 @@ REJECT_DATA_TYPES['TEL'] = int
 REJECT_DATA_TYPES['RV'] = int
 REJECT_DATA_TYPES['USED'] = int
 REJECT_DATA_TYPES['COMMENT'] = str
+# parquet exports are directories of part files plus a manifest
+PARQUET_EXT = '.parquet'
+PARQUET_MANIFEST = 'manifest.json'
+PARQUET_PROGRESS = 'import_progress.json'
+PARQUET_PART = 'part-{0:06d}.parquet'
+# the LIMIT needed to use an OFFSET without a limit (SQLite and MySQL)
+SQL_MAX_ROWS = 2 ** 63 - 1
+# the query templates recipes run most often (per database) - used by the
+#    index advisor to find full table scans ({table} is the table name)
+INDEX_QUERIES = dict()
+# the calibration/telluric templates are the SQL get_calib_entry and
+#   get_tellu_entry emit (per time mode)
+CALIB_WHERE = 'WHERE KEYNAME = "X" AND USED = 1 AND FIBER = "A"'
+TELLU_WHERE = CALIB_WHERE + ' AND OBJECT = "X"'
+# the ORDER BY of calibration / telluric time queries (see _time_sort)
+TIME_ORDER = ('ORDER BY abs(UNIXTIME - 1600000000.0) ASC, UNIXTIME ASC, '
+              'FILENAME ASC, FIBER ASC, REFCAL ASC')
+KEY_ORDER = 'ORDER BY UNIXTIME DESC, FILENAME ASC, FIBER ASC, REFCAL ASC'
+INDEX_QUERIES['calib'] = [
+    ('calib key lookup',
+     'SELECT * FROM {table} ' + CALIB_WHERE + ' ' + KEY_ORDER + ' LIMIT 1'),
+    ('calib older in time',
+     'SELECT * FROM {table} ' + CALIB_WHERE + ' AND UNIXTIME - 1600000000.0 '
+     '< 0 ' + TIME_ORDER + ' LIMIT 1'),
+    ('calib newer in time',
+     'SELECT * FROM {table} ' + CALIB_WHERE + ' AND UNIXTIME - 1600000000.0 '
+     '> 0 ' + TIME_ORDER + ' LIMIT 1'),
+    ('calib closest in time',
+     'SELECT * FROM {table} ' + CALIB_WHERE + ' ' + TIME_ORDER + ' LIMIT 1'),
+    ('calib pid lookup', 'SELECT * FROM {table} WHERE PID = "X"')]
+INDEX_QUERIES['tellu'] = [
+    ('tellu key lookup',
+     'SELECT * FROM {table} ' + TELLU_WHERE + ' ' + KEY_ORDER),
+    ('tellu older in time',
+     'SELECT * FROM {table} ' + TELLU_WHERE + ' AND UNIXTIME - 1600000000.0 '
+     '< 0 ' + TIME_ORDER),
+    ('tellu closest in time',
+     'SELECT * FROM {table} ' + TELLU_WHERE + ' ' + TIME_ORDER),
+    ('tellu pid lookup', 'SELECT * FROM {table} WHERE PID = "X"')]
+INDEX_QUERIES['findex'] = [
+    ('findex file exists',
+     'SELECT COUNT(*) FROM {table} WHERE (OBS_DIR = "X") AND '
+     '(BLOCK_KIND = "raw") AND (FILENAME = "X")'),
+    ('findex directory files',
+     'SELECT * FROM {table} WHERE USED = 1 AND BLOCK_KIND = "raw" AND '
+     'OBS_DIR = "X" ORDER BY LAST_MODIFIED DESC')]
+INDEX_QUERIES['log'] = [
+    ('log pid lookup', 'SELECT * FROM {table} WHERE PID = "X"'),
+    ('log pid level lookup',
+     'SELECT * FROM {table} WHERE PID = "X" AND LEVEL = 0 AND SUBLEVEL = 0 '
+     'AND LEVELCRIT = "X"'),
+    ('log obs_dir entries',
+     'SELECT * FROM {table} WHERE USED = 1 AND OBS_DIR = "X" '
+     'ORDER BY UNIXTIME')]
+INDEX_QUERIES['astrom'] = [
+    ('astrom object lookup',
+     'SELECT * FROM {table} WHERE USED = 1 AND OBJNAME = "X"')]
+INDEX_QUERIES['reject'] = [
+    ('reject identifier lookup',
+     'SELECT * FROM {table} WHERE USED = 1 AND IDENTIFIER = "X"')]
 
 
 # =============================================================================
@@ -187,6 +250,12 @@ def export_database(params: ParamDict, database_name: str,
         eargs = [database_name]
         WLOG(params, 'error', textentry('09-506-00002', args=eargs))
     # -------------------------------------------------------------------
+    # stream parquet exports in chunks (never loading the full table)
+    if str(outfilename).endswith(PARQUET_EXT):
+        export_parquet(params, db.database, database_name, str(outfilename),
+                       chunk_size=params['DB_EXPORT_CHUNK_SIZE'])
+        return
+    # -------------------------------------------------------------------
     # get all rows as a pandas data frame
     df = db.database.get('*', return_pandas=True)
     # -------------------------------------------------------------------
@@ -248,22 +317,28 @@ def import_database(params: ParamDict, database_name: str,
         # load database
         db.load_db()
     # -------------------------------------------------------------------
-    # load csv file
-    # -------------------------------------------------------------------
-    # print that we are saving csv file
-    WLOG(params, '', textentry('40-507-00002', args=[infilename]))
-    # load csv file into pandas table
-    df = pd.read_csv(infilename)
-    # -------------------------------------------------------------------
     # get unique columns
-    dbcol = pconst.GET_DB_COLS(db.database.tname)
+    dbcol = pconst.GET_DB_COLS(database_name)
     # deal with database column
     if dbcol is not None:
-        ucols = dbcol.unique_cols
+        ucols = list(dbcol().unique_cols)
     # else we assume ucols is None
     else:
         ucols = None
     # -------------------------------------------------------------------
+    # stream parquet imports in chunks (never loading the full table)
+    if str(infilename).endswith(PARQUET_EXT):
+        import_parquet(params, db.database, str(infilename), joinmode,
+                       unique_cols=ucols)
+        return
+    # -------------------------------------------------------------------
+    # load csv file
+    # -------------------------------------------------------------------
+    # print that we are saving csv file
+    WLOG(params, '', textentry('40-507-00002', args=[infilename]))
+    # load csv file into pandas table
+    df = pd.read_csv(infilename)
+    # -------------------------------------------------------------------
     # Push into database
     # -------------------------------------------------------------------
     # print log
@@ -277,6 +352,185 @@ def import_database(params: ParamDict, database_name: str,
     db.database.add_from_pandas(df, if_exists=joinmode, unique_cols=ucols)
 
 
+def export_parquet(params: ParamDict, database: Database,
+                   database_name: str, outpath: str,
+                   chunk_size: int = 100000):
+    """
+    Stream a database table into a parquet dataset (a directory of part
+    files, one per chunk of rows, plus a manifest). The rows are read with
+    a single cursor (fetchmany) so memory use is set by chunk_size.
+
+    An unfinished export of the same (unchanged) table is resumed from the
+    last part written; a finished (or stale) export is replaced.
+
+    :param params: ParamDict, parameter dictionary of constants
+    :param database: Database, the loaded database
+    :param database_name: str, the database name (calib, tellu, findex etc)
+    :param outpath: str, the output directory (ending in .parquet)
+    :param chunk_size: int, the number of rows per part file
+
+    :return: None, writes parquet files to outpath
+    """
+    # get the manifest path
+    manifest_file = os.path.join(outpath, PARQUET_MANIFEST)
+    manifest = _read_json(manifest_file)
+    # the table must not have changed since the export started
+    generation = database.generation()
+    # work out whether we can resume an unfinished export
+    resume = manifest is not None and not manifest['complete']
+    if resume:
+        resume &= manifest['table'] == database.tname
+        resume &= manifest['chunk_size'] == chunk_size
+        resume &= generation is not None
+        resume &= manifest['generation'] == generation
+    # start a new export
+    if not resume:
+        # remove part files from any previous export
+        if os.path.exists(outpath):
+            for part in glob.glob(os.path.join(outpath, PARQUET_PART[:5] +
+                                               '*' + PARQUET_EXT)):
+                os.remove(part)
+        else:
+            os.makedirs(outpath)
+        manifest = dict(database=database_name, table=database.tname,
+                        chunk_size=chunk_size, generation=generation,
+                        nparts=0, nrows=0, complete=False)
+        _write_json(manifest_file, manifest)
+        msg = 'Exporting {0} database to parquet: {1}'
+        WLOG(params, '', msg.format(database_name, outpath))
+    else:
+        msg = 'Resuming export to {0} from part {1} ({2} rows)'
+        margs = [outpath, manifest['nparts'], manifest['nrows']]
+        WLOG(params, '', msg.format(*margs))
+    # construct the command (in a stable order so the rows already exported
+    #   can be skipped when resuming)
+    command = 'SELECT * FROM {0} ORDER BY {1}'.format(database.tname,
+                                                      _export_order(database))
+    if manifest['nrows'] > 0:
+        command += ' LIMIT {0} OFFSET {1}'.format(SQL_MAX_ROWS,
+                                                  manifest['nrows'])
+    # write each chunk as a part file
+    conn = duckdb.connect()
+    try:
+        for df in database.iter_pandas(command, chunk_size=chunk_size):
+            partname = PARQUET_PART.format(manifest['nparts'])
+            _write_parquet(conn, df, os.path.join(outpath, partname))
+            # update the manifest (after the part file exists)
+            manifest['nparts'] += 1
+            manifest['nrows'] += len(df)
+            _write_json(manifest_file, manifest)
+            msg = '\tExported {0} ({1} rows total)'
+            WLOG(params, '', msg.format(partname, manifest['nrows']))
+    finally:
+        conn.close()
+    # flag the export as complete
+    manifest['complete'] = True
+    _write_json(manifest_file, manifest)
+    msg = 'Exported {0} rows to {1} ({2} parts)'
+    WLOG(params, '', msg.format(manifest['nrows'], outpath,
+                                manifest['nparts']))
+
+
+def _export_order(database: Database) -> str:
+    """
+    Get a stable order for the rows of a table (so a chunked export gives
+    the same rows in each part when it is resumed): the unique hash column
+    if the table has one, else the sqlite rowid, else all the columns
+
+    :param database: Database, the loaded database
+
+    :return: str, the ORDER BY columns
+    """
+    colnames = database.colnames('*', table=database.tname)
+    if drs_db.UHASH_COL in colnames:
+        return drs_db.UHASH_COL
+    elif isinstance(database, drs_db.SQLiteDatabase):
+        return 'rowid'
+    else:
+        return ', '.join(colnames)
+
+
+def import_parquet(params: ParamDict, database: Database, inpath: str,
+                   joinmode: str = 'replace',
+                   unique_cols: Union[List[str], None] = None):
+    """
+    Stream a parquet dataset (written by export_parquet) into a database
+    table one part file at a time. Each part is added with the bulk insert
+    path in a single transaction (keeping the UHASH unique constraint) and
+    the parts done are recorded so an interrupted import can be resumed.
+
+    :param params: ParamDict, parameter dictionary of constants
+    :param database: Database, the loaded database
+    :param inpath: str, the input directory (ending in .parquet)
+    :param joinmode: str, the way to join current database and input files
+                     - if 'replace' the current rows are deleted first,
+                     - if 'append' adds the rows to the current database
+    :param unique_cols: list of strings or None, the columns that form the
+                        unique hash (only used if UHASH was not exported)
+
+    :return: None, writes to database
+    """
+    # set function name
+    func_name = __NAME__ + '.import_parquet()'
+    # get the manifest (the export must be complete)
+    manifest = _read_json(os.path.join(inpath, PARQUET_MANIFEST))
+    if manifest is None or not manifest['complete']:
+        emsg = 'Parquet export {0} is missing or incomplete (func={1})'
+        WLOG(params, 'error', emsg.format(inpath, func_name))
+        return
+    # print that we are loading the parquet files
+    WLOG(params, '', 'Reading parquet files: {0}'.format(inpath))
+    # the import is resumed if it was interrupted for the same target
+    progress_file = os.path.join(inpath, PARQUET_PROGRESS)
+    progress = _read_json(progress_file)
+    target = dict(path=str(database.path), table=database.tname,
+                  joinmode=joinmode)
+    if progress is not None and progress['target'] == target:
+        start = progress['nparts']
+        msg = 'Resuming import from {0} at part {1}'
+        WLOG(params, '', msg.format(inpath, start))
+    else:
+        start = 0
+        progress = dict(target=target, nparts=0)
+        # print log
+        if joinmode == 'replace':
+            WLOG(params, '', 'Replacing database rows with parquet data')
+            # remove the current rows (keeping the table and its indexes)
+            if database.tname.lower() in database.tables:
+                database.delete_rows(database.tname, condition='1=1')
+        else:
+            WLOG(params, '', 'Appending parquet data to database')
+        _write_json(progress_file, progress)
+    # add each part in turn
+    conn = duckdb.connect()
+    try:
+        for it in range(start, manifest['nparts']):
+            partname = PARQUET_PART.format(it)
+            df = _read_parquet(conn, os.path.join(inpath, partname))
+            # one transaction per part (so a part is never half added)
+            try:
+                database.add_from_pandas(df, if_exists='append',
+                                         unique_cols=unique_cols,
+                                         chunk_size=max(len(df), 1))
+            except drs_db.DatabaseError as e:
+                emsg = ('Could not add parquet part {0} (i.e. rows already in '
+                        'the database - use joinmode="replace" or remove the '
+                        'rows): {1} (func={2})')
+                WLOG(params, 'error', emsg.format(partname, e, func_name))
+                return
+            # record the part as done
+            progress['nparts'] = it + 1
+            _write_json(progress_file, progress)
+            msg = '\tImported {0} ({1} rows)'
+            WLOG(params, '', msg.format(partname, len(df)))
+    finally:
+        conn.close()
+    # the import is complete - a new import starts from scratch
+    os.remove(progress_file)
+    msg = 'Imported {0} rows from {1}'
+    WLOG(params, '', msg.format(manifest['nrows'], inpath))
+
+
 def list_databases(params: ParamDict) -> Dict[str, DatabaseM]:
     # set up storage
     databases = dict()
@@ -350,6 +604,105 @@ def install_databases(params: ParamDict, skip: Union[List[str], None] = None,
         _ = create_lang_database(params, databases, verbose=verbose)
 
 
+def index_advisor(params: ParamDict, dbkind: Union[str, List[str]] = 'all',
+                  create: bool = False) -> Dict[str, Dict[str, list]]:
+    """
+    Explain the query templates each recipe runs (INDEX_QUERIES) against the
+    existing databases, report any full table scans and report (and
+    optionally create) the indexes the database columns definitions expect
+    but the installed tables do not have (i.e. without a full reset)
+
+    :param params: ParamDict, the parameter dictionary of constants
+    :param dbkind: str or list of str, the databases to check ('all' for
+                   all databases that have query templates)
+    :param create: bool, if True create the missing indexes
+
+    :return: dict, for each database a dict of 'scans' (query names that
+             still use a full table scan) and 'missing' (the missing index
+             groups before any were created)
+    """
+    # deal with dbkind == 'all'
+    if dbkind == 'all':
+        runs = list(INDEX_QUERIES.keys())
+    elif isinstance(dbkind, str):
+        runs = [dbkind]
+    else:
+        runs = dbkind
+    # get database managers
+    databases = list_databases(params)
+    # load pseudo constants
+    pconst = constants.pload()
+    # map each database to its column definitions
+    db_columns = dict()
+    db_columns['calib'] = pconst.CALIBRATION_DB_COLUMNS
+    db_columns['tellu'] = pconst.TELLURIC_DB_COLUMNS
+    db_columns['findex'] = pconst.FILEINDEX_DB_COLUMNS
+    db_columns['log'] = pconst.LOG_DB_COLUMNS
+    db_columns['astrom'] = pconst.ASTROMETRIC_DB_COLUMNS
+    db_columns['reject'] = pconst.REJECT_DB_COLUMNS
+    # storage for the report
+    report = dict()
+    # loop around databases
+    for run in runs:
+        # only databases with query templates can be checked
+        if run not in INDEX_QUERIES:
+            wmsg = 'Index advisor: no query templates for database {0}'
+            WLOG(params, 'warning', wmsg.format(run), sublevel=2)
+            continue
+        # load the database
+        dbm = databases[run]
+        dbm.load_db()
+        database = dbm.database
+        table = database.tname
+        # skip databases that have not been installed
+        if table.lower() not in database.tables:
+            wmsg = 'Index advisor: table {0} does not exist (skipping {1})'
+            WLOG(params, 'warning', wmsg.format(table, run), sublevel=2)
+            continue
+        WLOG(params, 'info', 'Index advisor: {0} ({1})'.format(run, table))
+        # the indexes expected from the column definitions
+        dbcols = db_columns[run]()
+        expected = [[col] for col in dbcols.index_cols]
+        if dbcols.get_index_groups() is not None:
+            expected += dbcols.get_index_groups()
+        # find the missing indexes
+        missing = database.missing_indexes(expected, table)
+        for columns in missing:
+            wmsg = '\tMissing index: ({0})'
+            WLOG(params, '', wmsg.format(', '.join(columns)))
+        # create the missing indexes (if requested)
+        if create:
+            for columns in missing:
+                name = database.add_index(columns, table)
+                WLOG(params, '', '\tCreated index: {0}'.format(name))
+        # explain each query template
+        scans = []
+        for name, template in INDEX_QUERIES[run]:
+            plan = database.explain(template.format(table=table))
+            # get any steps that use a full scan
+            full = [step for step, is_scan in plan if is_scan]
+            if len(full) > 0:
+                scans.append(name)
+                wmsg = '\tFull scan: {0} [{1}]'
+                WLOG(params, 'warning', wmsg.format(name, '; '.join(full)),
+                     sublevel=2)
+            else:
+                WLOG(params, '', '\tIndexed: {0}'.format(name))
+        # add to report
+        report[run] = dict(scans=scans, missing=missing)
+    # print a summary
+    nmissing = np.sum([len(report[run]['missing']) for run in report])
+    nscans = np.sum([len(report[run]['scans']) for run in report])
+    if create:
+        msg = 'Index advisor: {0} index(es) created, {1} full scan(s) remain'
+    else:
+        msg = ('Index advisor: {0} index(es) missing, {1} full scan(s) '
+               '(use --create_indexes to add missing indexes)')
+    WLOG(params, 'info', msg.format(nmissing, nscans))
+    # return the report
+    return report
+
+
 # =============================================================================
 # Define calibration database functions
 # =============================================================================
@@ -391,7 +744,8 @@ def create_calibration_database(params: ParamDict, pconst: PseudoConst,
             WLOG(params, '', 'Deleted calibration database')
     # add main table
     calibdb.add_table(calibdb.tname, columns, ctypes, index_cols=cicols,
-                      unique_cols=cuniques)
+                      unique_cols=cuniques,
+                      index_groups=cdb_cols.get_index_groups())
     if verbose:
         WLOG(params, '', 'Created calibration database')
     # ---------------------------------------------------------------------
@@ -446,7 +800,8 @@ def create_telluric_database(params: ParamDict, pconst: PseudoConst,
             WLOG(params, '', 'Deleted telluric database')
     # add main table
     telludb.add_table(telludb.tname, columns, ctypes, index_cols=cicols,
-                      unique_cols=cuniques)
+                      unique_cols=cuniques,
+                      index_groups=tdb_cols.get_index_groups())
     if verbose:
         WLOG(params, '', 'Created telluric database')
     # ---------------------------------------------------------------------
@@ -499,6 +854,10 @@ def create_fileindex_database(params: ParamDict, pconst: PseudoConst,
         indexdb.delete_table(indexdb.tname)
         if verbose:
             WLOG(params, '', 'Deleted file index database')
+    # remove the directory manifest (all directories must be rescanned)
+    mtable = '{0}{1}'.format(indexdb.tname, drs_database.MANIFEST_SUFFIX)
+    if mtable.lower() in indexdb.tables:
+        indexdb.delete_table(mtable.lower())
     # add main table
     indexdb.add_table(indexdb.tname, columns, ctypes, unique_cols=cuniques,
                       index_cols=cicols, index_groups=cigroups)
@@ -542,14 +901,51 @@ def create_log_database(params: ParamDict, pconst: PseudoConst,
         logdb.delete_table(logdb.tname)
         if verbose:
             WLOG(params, '', 'Deleted recipe log database')
+    # remove the database timing table (it refers to the removed log rows)
+    ttable = '{0}{1}'.format(logdb.tname, drs_database.DBTIME_SUFFIX)
+    if ttable.lower() in logdb.tables:
+        logdb.delete_table(ttable.lower())
+    # remove the log archive table
+    atable = '{0}{1}'.format(logdb.tname, drs_database.ARCHIVE_SUFFIX)
+    if atable.lower() in logdb.tables:
+        logdb.delete_table(atable.lower())
     # add main table
-    logdb.add_table(logdb.tname, columns, ctypes, index_cols=cicols)
+    logdb.add_table(logdb.tname, columns, ctypes, index_cols=cicols,
+                    index_groups=ldb_cols.get_index_groups())
     if verbose:
         WLOG(params, '', 'Created recipe log database')
     # -------------------------------------------------------------------------
     return logdb
 
 
+def archive_log_database(params: ParamDict) -> int:
+    """
+    Move old and superseded recipe runs from the log database to the log
+    archive table (see LogDatabase.archive_entries) using LOG_ARCHIVE_AGE
+    and LOG_ARCHIVE_SUPERSEDED
+
+    :param params: ParamDict, parameter dictionary of constants
+
+    :return: int, the number of runs archived
+    """
+    # load the log database
+    logdbm = drs_database.LogDatabase(params)
+    logdbm.load_db()
+    # log that we are archiving
+    msg = 'Archiving log database runs (age > {0} days, superseded={1})'
+    margs = [params['LOG_ARCHIVE_AGE'], params['LOG_ARCHIVE_SUPERSEDED']]
+    WLOG(params, 'info', msg.format(*margs))
+    # archive the runs
+    narchived = logdbm.archive_entries(
+        max_age=params['LOG_ARCHIVE_AGE'],
+        superseded=params['LOG_ARCHIVE_SUPERSEDED'])
+    # log how many runs were archived
+    msg = 'Moved {0} run(s) to {1}'
+    WLOG(params, '', msg.format(narchived, logdbm.archive_table()))
+    # return the number of runs archived
+    return narchived
+
+
 # =============================================================================
 # Define object database functions
 # =============================================================================
@@ -981,6 +1377,70 @@ def create_lang_database(params: Union[None, ParamDict],
 # =============================================================================
 # Define misc functions
 # =============================================================================
+def _read_json(filename: str) -> Union[Dict[str, Any], None]:
+    """
+    Read a json file (returns None if the file does not exist)
+
+    :param filename: str, the json file path
+
+    :return: dict or None, the json contents
+    """
+    if not os.path.exists(filename):
+        return None
+    with open(filename, 'r') as jfile:
+        return json.load(jfile)
+
+
+def _write_json(filename: str, data: Dict[str, Any]):
+    """
+    Write a json file (written to a temporary file first so the file is
+    never left half written)
+
+    :param filename: str, the json file path
+    :param data: dict, the json contents
+
+    :return: None, writes filename
+    """
+    tmpfile = filename + '.tmp'
+    with open(tmpfile, 'w') as jfile:
+        json.dump(data, jfile, indent=2)
+    os.replace(tmpfile, filename)
+
+
+def _write_parquet(conn: Any, df: pd.DataFrame, filename: str):
+    """
+    Write a pandas dataframe to a parquet file with duckdb (written to a
+    temporary file first so a part file is never left half written)
+
+    :param conn: duckdb connection
+    :param df: pandas dataframe, the rows to write
+    :param filename: str, the parquet file path
+
+    :return: None, writes filename
+    """
+    tmpfile = filename + '.tmp'
+    conn.register('chunk', df)
+    try:
+        conn.execute("COPY chunk TO '{0}' (FORMAT PARQUET)".format(tmpfile))
+    finally:
+        conn.unregister('chunk')
+    os.replace(tmpfile, filename)
+
+
+def _read_parquet(conn: Any, filename: str) -> pd.DataFrame:
+    """
+    Read a parquet file with duckdb (missing values are returned as None
+    so they are stored as NULL)
+
+    :param conn: duckdb connection
+    :param filename: str, the parquet file path
+
+    :return: pandas dataframe, the rows
+    """
+    df = conn.execute('SELECT * FROM read_parquet(?)', [filename]).df()
+    return df.astype(object).where(df.notna(), None)
+
+
 def _force_column_dtypes(table: Table, coltype: Dict[str, type]) -> Table:
     """
     Force a table to have specific data types
@@ -92,15 +92,15 @@ def basic_filter(params: ParamDict, kw_objnames: List[str],
     # load index database
     WLOG(params, '', textentry('40-509-00001', args='file index'))
     findexdb = drs_database.FileIndexDatabase(params)
-    findexdb.load_db()
+    findexdb.load_db(read_only=True)
     # load object database
     WLOG(params, '', textentry('40-509-00001', args='astrometric'))
     objdbm = drs_database.AstrometricDatabase(params)
-    objdbm.load_db()
+    objdbm.load_db(read_only=True)
     # load log database
     WLOG(params, '', textentry('40-509-00001', args='log'))
     logdbm = drs_database.LogDatabase(params)
-    logdbm.load_db()
+    logdbm.load_db(read_only=True)
     # -------------------------------------------------------------------------
     # deal with tar file name
     if tarfilename is not None:
@@ -12,7 +12,6 @@ Created on 2021-11-08
 from typing import Dict, List, Optional, Tuple
 
 import numpy as np
-from tqdm import tqdm
 
 from apero import lang
 from apero.base import base
@@ -734,29 +733,51 @@ def obj_check(params: ParamDict, findexdbm: Optional[FileIndexDatabase] = None):
     last_obs_date = []
     # Print progress: Finding all original names for each unfound object
     WLOG(params, 'info', textentry('40-503-00058'))
+    # storage for the original names and the most recent raw file (runid,
+    #   piname and obs date) of each unfound object
+    unfound_set = set(unfound_objects)
+    orig_name_dict = dict()
+    last_obj_dict = dict()
+    # stream the raw files once (instead of two queries per object)
+    columns = ('KW_OBJNAME,KW_OBJECTNAME,KW_RUN_ID,KW_PI_NAME,OBS_DIR,'
+               'KW_MID_OBS_TIME')
+    if len(unfound_objects) > 0:
+        chunks = findexdbm.database.get_iter(columns,
+                                             condition='BLOCK_KIND="raw"')
+    else:
+        chunks = []
+    for chunk in chunks:
+        # only keep the unfound objects
+        chunk = chunk[chunk['KW_OBJNAME'].isin(unfound_set)]
+        for row in chunk.itertuples(index=False):
+            objname = row.KW_OBJNAME
+            # get all original names for this target
+            if row.KW_OBJECTNAME is not None:
+                orig_name_dict.setdefault(objname, set())
+                orig_name_dict[objname].add(row.KW_OBJECTNAME)
+            # keep the most recent raw file with this object name
+            obs_time = row.KW_MID_OBS_TIME
+            if obs_time is None or not np.isfinite(obs_time):
+                obs_time = -np.inf
+            if objname not in last_obj_dict:
+                last_obj_dict[objname] = (obs_time, row)
+            elif obs_time > last_obj_dict[objname][0]:
+                last_obj_dict[objname] = (obs_time, row)
     # loop around
-    for unfound_object in tqdm(unfound_objects):
-        # condition for this target
-        condition = 'KW_OBJNAME="{0}" AND BLOCK_KIND="raw"'
-        condition = condition.format(unfound_object)
-        # get all original names for this target
-        orig_name = findexdbm.get_unique('KW_OBJECTNAME', condition=condition)
+    for unfound_object in unfound_objects:
         # append to list
-        orig_names.append(list(orig_name))
-        # -----------------------------------------------------------------
-        # get the runid, piname and obs date for the most recent raw file with
-        #   this name
-        # define the columns to get from the file index database
-        columns = 'KW_RUN_ID,KW_PI_NAME,OBS_DIR'
-        # get the most recent raw file with this object name
-        last_obj = findexdbm.database.get(columns, condition=condition,
-                                          sort_by='KW_MID_OBS_TIME',
-                                          sort_descending=True,
-                                          max_rows=1)
+        orig_names.append(list(orig_name_dict.get(unfound_object, [])))
+        # deal with no raw file under this name
+        if unfound_object not in last_obj_dict:
+            last_runid.append(None)
+            last_pi_name.append(None)
+            last_obs_date.append(None)
+            continue
         # push into the last_runid, last_pi_name and last_obs_date lists
-        last_runid.append(last_obj[0][0])
-        last_pi_name.append(last_obj[0][1])
-        last_obs_date.append(last_obj[0][2])
+        _, last_obj = last_obj_dict[unfound_object]
+        last_runid.append(last_obj.KW_RUN_ID)
+        last_pi_name.append(last_obj.KW_PI_NAME)
+        last_obs_date.append(last_obj.OBS_DIR)
 
     # ---------------------------------------------------------------------
     # print any remaining objects
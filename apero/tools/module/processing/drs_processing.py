@@ -12,8 +12,14 @@ Created on 2019-08-06 at 11:57
 
 
 """
+import atexit
+import hashlib
+import heapq
 import itertools
+import json
 import os
+import pickle
+import queue
 import sys
 import time
 import warnings
@@ -22,10 +28,13 @@ from copy import deepcopy
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 import numpy as np
+import pandas as pd
+import psutil
 from astropy.table import Table
 
 from apero import lang
 from apero.base import base
+from apero.base import drs_db
 from apero.core import constants
 from apero.core.core import drs_argument
 from apero.core.core import drs_base_classes as base_class
@@ -38,6 +47,7 @@ from apero.core.core import drs_text
 from apero.core.utils import drs_recipe
 from apero.core.utils import drs_startup
 from apero.core.utils import drs_utils
+from apero.io import drs_fits
 from apero.io import drs_lock
 from apero.io import drs_table
 from apero.science import preprocessing as prep
@@ -87,6 +97,40 @@ SKIP_REMOVE_ARGS = ['--skip', '--program', '--prog', '--debug',
                     '--crunfile', '--nosave']
 # keep a global copy of plt
 PLT_MOD = None
+# the databases whose entries create dependencies between runs
+RUN_DEPENDENCY_DBS = ['calibration', 'telluric']
+# the resource every run produces (required by runs whose inputs are unknown)
+RUN_ALL_KEY = ('all',)
+# the minimum number of previous runs of a recipe to fit its run time
+#   against its inputs (see RunCostModel)
+COST_MIN_RUNS = 5
+# the percentile of the memory used by previous runs of a recipe used as
+#   its predicted memory (see RunCostModel)
+COST_MEM_PERCENTILE = 90
+# the fraction of the total memory used as the memory budget when
+#   REPROCESS_MEM_BUDGET is zero (see MemoryGovernor)
+MEM_BUDGET_FRACTION = 0.8
+# storage for reporting the predicted schedule (see display_timing)
+SCHEDULE_REPORT = dict()
+# the persistent worker pool used by parallel runs (see get_worker_pool)
+WORKER_POOL = None
+# how often (in seconds) to check that busy worker processes are alive
+WORKER_POLL = 1.0
+# how long (in seconds) to wait for a worker process to stop
+WORKER_TIMEOUT = 60.0
+# the size (in bytes) of the chunks read when checksumming files for run
+#   fingerprints (see run_fingerprint)
+FPRINT_CHUNK_SIZE = 2 ** 20
+# the constant groups that do not change the outputs of a run (not part of
+#   run fingerprints)
+FPRINT_EXCLUDE_GROUPS = ['GLOBAL SETTINGS', 'PATH SETTINGS',
+                         'INTERNAL: General properites',
+                         'INTERNAL: DRS SETTINGS', 'DRS INTERNAL PATHS',
+                         'DATABASE SETTINGS', 'DISPLAY/LOGGING SETTINGS',
+                         'PLOT SETTINGS', 'DEBUG MODES', 'DEBUG PLOT SETTINGS',
+                         'TOOLS SETTING']
+# storage for the hash of the constants (by instrument - see _constants_hash)
+FPRINT_CONSTANTS = dict()
 
 
 # =============================================================================
@@ -121,6 +165,11 @@ class Run:
         # set parameters
         self.block_kind = None
         self.obs_dir = None
+        # the hash of the cleaned runstring (see REPROCESS_SKIP_MODE)
+        self.runkey = None
+        # the file records of the inputs and calibrations (path, size,
+        #    mtime, checksum) found by the skip check
+        self.fprint_records = dict()
         # update parameters given runstring
         self.update()
         # pickle recipe name (only used for pickling)
@@ -297,6 +346,7 @@ class Run:
         self.shortname = self.recipe.shortname
         self.runname = 'RUN_{0}'.format(self.shortname)
         self.skipname = 'SKIP_{0}'.format(self.shortname)
+        self.runkey = skip_run_key(self.runstring)
         # get properties
         self.get_recipe_kind()
         self.get_obs_dir()
@@ -394,6 +444,41 @@ class Run:
         # if all have passed we return True
         return True
 
+    def input_files(self) -> List[str]:
+        """
+        Get the absolute paths of the input files of this run (as checked
+        by prerun_test)
+
+        :return: list of strings, the input file absolute paths
+        """
+        # get the input directory
+        path_inst = drs_file.DrsPath(self.params,
+                                     block_kind=self.recipe.in_block_str)
+        input_dir = path_inst.abspath
+        # if we have a directory add it to the input dir
+        if 'obs_dir' in self.kwargs:
+            input_dir = os.path.join(input_dir, self.kwargs['obs_dir'])
+        # storage for the input files
+        abspaths = []
+        # loop around positional and optional arguments
+        for args in [self.recipe.args, self.recipe.kwargs]:
+            for argname in args:
+                # skip if not present in kwargs
+                if argname not in self.kwargs:
+                    continue
+                # only do this for arguments with filetype 'files' or 'file'
+                if args[argname].dtype not in ['files', 'file']:
+                    continue
+                files = self.kwargs[argname]
+                # make sure we have a list of files
+                if not isinstance(files, list):
+                    files = [files]
+                # construct the paths
+                for filename in files:
+                    abspaths.append(os.path.join(input_dir, filename))
+        # return the input files
+        return abspaths
+
     def __str__(self):
         return self.__repr__()
 
@@ -450,6 +535,630 @@ class Run:
         self.recipemod = self.recipe.main
 
 
+class RunGraph:
+    """
+    The dependency graph of a run list (used to schedule runs in parallel)
+
+    Each run produces and requires "resources":
+        - the files it writes: (block kind, obs_dir) of its outputs
+        - its obs_dir: runs read products of earlier runs of the same obs_dir
+          that are not in their input block (calibrations, telluric
+          products) so they wait for every earlier run of the same obs_dir
+        - the databases it adds entries to (calibration/telluric)
+        - the databases it reads (so later writers wait for earlier readers)
+        - every run produces RUN_ALL_KEY (runs without input files and
+          post-processing runs require this - i.e. they wait for all earlier
+          runs)
+
+    A run can start once every run earlier in the run list (before its
+    group of consecutive runs of the same recipe, which can always run
+    together) that produces a resource it requires has finished. Runs that
+    can start are given out longest first (if predicted run times are
+    given) and then in order of priority (the sequence order)
+    """
+
+    def __init__(self, runlist: List[Run],
+                 costs: Optional[Dict[int, float]] = None):
+        """
+        Construct the dependency graph
+
+        :param runlist: list of Run instances (in sequence order)
+        :param costs: dict or None, the predicted run time of each run (by
+                      priority) see RunCostModel
+        """
+        self.runlist = list(runlist)
+        # the order ready runs are given out in (longest first, then by
+        #   priority)
+        self.rank = []
+        for run_item in self.runlist:
+            if costs is None:
+                self.rank.append((run_item.priority,))
+            else:
+                cost = costs.get(run_item.priority, 0.0)
+                self.rank.append((-cost, run_item.priority))
+        # storage for the resources of each run
+        self.produces, self.requires, self.bounds = [], [], []
+        # the runs that produce each resource (in run list order)
+        self.producers = dict()
+        # loop around runs
+        start = 0
+        for it, run_item in enumerate(self.runlist):
+            # runs only depend on runs before their recipe group
+            if it > 0 and run_item.shortname != runlist[it - 1].shortname:
+                start = it
+            self.bounds.append(start)
+            # get the resources of this run
+            produces, requires = _run_resources(run_item)
+            self.produces.append(produces)
+            self.requires.append(requires)
+            for key in produces:
+                self.producers.setdefault(key, []).append(it)
+        # which runs have finished
+        self.finished = [False] * len(self.runlist)
+        # position (in producers) of the first unfinished producer
+        self.pointer = dict()
+        # runs waiting on a resource (heap of bound, run)
+        self.waiting = dict()
+        # runs that can start (heap of rank, run)
+        self.ready = []
+        # find the runs that can start now
+        for it in range(len(self.runlist)):
+            self._check(it)
+
+    def __len__(self) -> int:
+        """
+        The number of runs that can start now
+
+        :return: int, the number of ready runs
+        """
+        return len(self.ready)
+
+    def peek(self) -> int:
+        """
+        Get the next run to start without removing it (see RunGraph.pop)
+
+        :return: int, the position of the run in the run list
+        """
+        return self.ready[0][1]
+
+    def pop(self) -> int:
+        """
+        Get the next run to start (the longest ready run, or the ready run
+        with the lowest priority)
+
+        :return: int, the position of the run in the run list
+        """
+        return heapq.heappop(self.ready)[1]
+
+    def finish(self, it: int):
+        """
+        Mark a run as finished (and find the runs that can now start)
+
+        :param it: int, the position of the run in the run list
+
+        :return: None
+        """
+        self.finished[it] = True
+        # loop around the resources this run produced
+        for key in self.produces[it]:
+            # the first run producing this resource that has not finished
+            first = self._first_unfinished(key)
+            # release the runs that were waiting for this resource
+            heap = self.waiting.get(key, [])
+            while len(heap) > 0 and heap[0][0] <= first:
+                _, jt = heapq.heappop(heap)
+                self._check(jt)
+
+    def _first_unfinished(self, key: Tuple[str, ...]) -> int:
+        """
+        The position of the first run producing a resource that has not
+        finished yet
+
+        :param key: tuple, the resource
+
+        :return: int, the run position (the run list length if all finished)
+        """
+        producers = self.producers.get(key, [])
+        pos = self.pointer.get(key, 0)
+        # skip the finished producers
+        while pos < len(producers) and self.finished[producers[pos]]:
+            pos += 1
+        self.pointer[key] = pos
+        # deal with all producers finished
+        if pos == len(producers):
+            return len(self.runlist)
+        return producers[pos]
+
+    def _check(self, it: int):
+        """
+        Add a run to the ready runs or wait on the first resource that is
+        not yet available
+
+        :param it: int, the position of the run in the run list
+
+        :return: None
+        """
+        for key in self.requires[it]:
+            if self._first_unfinished(key) < self.bounds[it]:
+                heap = self.waiting.setdefault(key, [])
+                heapq.heappush(heap, (self.bounds[it], it))
+                return
+        heapq.heappush(self.ready, (self.rank[it], it))
+
+
+class RunCostModel:
+    """
+    Predict the run time of each run from the timings of previous runs of
+    the same recipe in the log database (START_TIME to END_TIME).
+
+    For each recipe the run time is fit as a linear function of the number
+    of input files and the size of the observation directory (the number of
+    raw files in it). Predictions are kept within the range of run times
+    seen. Recipes with fewer than COST_MIN_RUNS previous runs use the median
+    run time and recipes with no previous runs use REPROCESS_COST_DEFAULT
+    seconds per input file.
+
+    The memory of each run is predicted from the peak memory of previous
+    runs of the same recipe made by the processing (the log database memory
+    table, the COST_MEM_PERCENTILE percentile) or is REPROCESS_MEM_DEFAULT
+    GB for recipes with no previous runs
+    """
+
+    def __init__(self, params: ParamDict,
+                 findexdbm: Optional[FileIndexDatabase] = None):
+        """
+        Set up the cost model (the model is fit with RunCostModel.fit)
+
+        :param params: ParamDict, parameter dictionary of constants
+        :param findexdbm: FileIndexDatabase or None, the index database (to
+                          find the size of each observation directory)
+        """
+        self.params = params
+        self.findexdbm = findexdbm
+        # the predicted run time per input file for recipes without history
+        self.default = float(params['REPROCESS_COST_DEFAULT'])
+        # the predicted memory (GB) for recipes without history
+        self.default_memory = float(params['REPROCESS_MEM_DEFAULT'])
+        # the fit of each recipe (coefficients, min time, max time)
+        self.models = dict()
+        # the predicted memory (GB) of each recipe
+        self.memory = dict()
+        # the number of raw files in each observation directory
+        self.dirsize = dict()
+
+    def fit(self, shortnames: List[str]):
+        """
+        Fit the run times of previous runs of these recipes
+
+        :param shortnames: list of str, the recipe shortnames
+
+        :return: None
+        """
+        # get the unique recipes
+        shortnames = sorted(set(shortnames))
+        # deal with no recipes
+        if len(shortnames) == 0:
+            return
+        # get the size of each observation directory
+        if self.findexdbm is not None:
+            self.findexdbm.load_db()
+            condition = 'BLOCK_KIND="raw"'
+            dtable = self.findexdbm.database.get('OBS_DIR, COUNT(*)',
+                                                 condition=condition,
+                                                 groupby='OBS_DIR')
+            for row in dtable:
+                self.dirsize[str(row[0])] = int(row[1])
+        # get the peak memory of previous runs of these recipes
+        logdbm = drs_database.LogDatabase(self.params)
+        logdbm.load_db()
+        snames = ', '.join(['"{0}"'.format(sname) for sname in shortnames])
+        condition = 'SHORTNAME IN ({0})'.format(snames)
+        mtable = logdbm.get_run_memory(condition=condition)
+        for shortname, group in mtable.groupby('SHORTNAME'):
+            peak_rss = pd.to_numeric(group['PEAK_RSS'], errors='coerce')
+            peak_rss = np.array(peak_rss, dtype=float)
+            peak_rss = peak_rss[np.isfinite(peak_rss)]
+            if len(peak_rss) > 0:
+                ram = np.percentile(peak_rss, COST_MEM_PERCENTILE)
+                self.memory[str(shortname)] = float(ram)
+        # get the previous runs of these recipes
+        condition = ('RECIPE_TYPE LIKE "%recipe%" AND ENDED=1 '
+                     'AND SHORTNAME IN ({0})'.format(snames))
+        columns = 'SHORTNAME, OBS_DIR, RUNSTRING, START_TIME, END_TIME'
+        ltable = logdbm.get_entries(columns, condition=condition,
+                                    groupby='PID')
+        # deal with no previous runs
+        if ltable is None or len(ltable) == 0:
+            return
+        # get the run time of each run
+        starttime = pd.to_datetime(ltable['START_TIME'], errors='coerce')
+        endtime = pd.to_datetime(ltable['END_TIME'], errors='coerce')
+        ltable['DURATION'] = (endtime - starttime).dt.total_seconds()
+        ltable = ltable[ltable['DURATION'] > 0]
+        # fit each recipe
+        for shortname, group in ltable.groupby('SHORTNAME'):
+            durations = np.array(group['DURATION'], dtype=float)
+            # use the median for recipes with few runs
+            if len(durations) < COST_MIN_RUNS:
+                coeffs = np.array([np.median(durations), 0.0, 0.0])
+            # else fit against the number of files and directory size
+            else:
+                xvalues = [self._features(obs_dir, runstring)
+                           for obs_dir, runstring in
+                           zip(group['OBS_DIR'], group['RUNSTRING'])]
+                coeffs = np.linalg.lstsq(np.array(xvalues), durations,
+                                         rcond=None)[0]
+            self.models[str(shortname)] = (coeffs, np.min(durations),
+                                           np.max(durations))
+
+    def predict(self, run_item: Run) -> float:
+        """
+        Predict the run time of a run
+
+        :param run_item: Run, the run instance
+
+        :return: float, the predicted run time in seconds
+        """
+        xvalues = self._features(run_item.obs_dir, run_item.runstring)
+        # deal with recipes with no previous runs
+        if run_item.shortname not in self.models:
+            return self.default * max(xvalues[1], 1)
+        # use the fit (within the run times seen)
+        coeffs, low, high = self.models[run_item.shortname]
+        return float(np.clip(np.dot(coeffs, xvalues), low, high))
+
+    def predict_memory(self, run_item: Run) -> float:
+        """
+        Predict the memory used by a run
+
+        :param run_item: Run, the run instance
+
+        :return: float, the predicted memory in GB
+        """
+        return self.memory.get(run_item.shortname, self.default_memory)
+
+    def predict_all(self, runlist: List[Run]
+                    ) -> Tuple[Dict[int, float], Dict[int, float]]:
+        """
+        Fit the model to the recipes in a run list and predict every run
+
+        :param runlist: list of Run instances
+
+        :return: tuple, 1. the predicted run time of each run (seconds),
+                 2. the predicted memory of each run (GB) - both by
+                 priority
+        """
+        self.fit([run_item.shortname for run_item in runlist])
+        costs, memory = dict(), dict()
+        for run_item in runlist:
+            costs[run_item.priority] = self.predict(run_item)
+            memory[run_item.priority] = self.predict_memory(run_item)
+        return costs, memory
+
+    def _features(self, obs_dir: Any, runstring: Any) -> List[float]:
+        """
+        The values the run time is fit against (constant, number of input
+        files, number of raw files in the observation directory)
+
+        :param obs_dir: str, the observation directory
+        :param runstring: str, the run string (to count the input files)
+
+        :return: list of floats, the values
+        """
+        nfiles = 0
+        if isinstance(runstring, str):
+            for item in runstring.split():
+                if '.fits' in item:
+                    nfiles += 1
+        return [1.0, float(nfiles), float(self.dirsize.get(str(obs_dir), 0))]
+
+
+class MemoryGovernor:
+    """
+    Only start a run when its predicted memory fits: the predicted memory of
+    the running runs plus the new run must be within the memory budget
+    (REPROCESS_MEM_BUDGET GB, or MEM_BUDGET_FRACTION of the total memory)
+    and the new run must fit in the memory currently available. A run is
+    always started when nothing is running (so every run gets to run).
+
+    This lowers the number of runs running at once for memory heavy recipes
+    """
+
+    def __init__(self, params: ParamDict, memory: Dict[int, float]):
+        """
+        Set up the memory governor
+
+        :param params: ParamDict, parameter dictionary of constants
+        :param memory: dict, the predicted memory (GB) of each run (by
+                       priority) see RunCostModel
+        """
+        self.params = params
+        self.memory = memory
+        # get the memory budget (GB)
+        self.budget = float(params['REPROCESS_MEM_BUDGET'])
+        if self.budget <= 0:
+            total = psutil.virtual_memory().total / 2 ** 30
+            self.budget = MEM_BUDGET_FRACTION * total
+        # the predicted memory of the running runs (by priority)
+        self.running = dict()
+        # the runs we have logged as waiting for memory
+        self.waiting = set()
+
+    def admit(self, priority: int) -> bool:
+        """
+        Whether a run can start now
+
+        :param priority: int, the priority of the run
+
+        :return: bool, True if the run can start
+        """
+        # always start a run when nothing is running
+        if len(self.running) == 0:
+            return True
+        # the predicted memory of this run
+        memory = self.memory.get(priority, 0.0)
+        # the predicted memory of all running runs (with this run)
+        total = sum(self.running.values()) + memory
+        # the memory available now
+        available = psutil.virtual_memory().available / 2 ** 30
+        # check we are within the budget and the memory available
+        if total <= self.budget and memory <= available:
+            return True
+        # log that this run is waiting for memory (once)
+        if priority not in self.waiting:
+            self.waiting.add(priority)
+            wmsg = ('ID{0:05d} waiting for memory (predicted: {1:.2f} GB '
+                    'running: {2:.2f} GB budget: {3:.2f} GB available: '
+                    '{4:.2f} GB)')
+            wargs = [priority, memory, total - memory, self.budget,
+                     available]
+            WLOG(self.params, 'debug', wmsg.format(*wargs))
+        return False
+
+    def start(self, priority: int):
+        """
+        Add a run to the running runs
+
+        :param priority: int, the priority of the run
+
+        :return: None
+        """
+        self.running[priority] = self.memory.get(priority, 0.0)
+
+    def finish(self, priority: int):
+        """
+        Remove a run from the running runs
+
+        :param priority: int, the priority of the run
+
+        :return: None
+        """
+        self.running.pop(priority, None)
+
+
+class WorkerError(Exception):
+    """
+    The result of a run whose worker process failed (or exited) before the
+    run could return
+    """
+    pass
+
+
+class WorkerPool:
+    """
+    Long-lived worker processes for parallel recipe runs. Each worker
+    imports apero and loads the constants and recipe definitions once and
+    then runs many recipe runs (instead of one new process per run).
+
+    A worker is replaced by a new process after REPROCESS_WORKER_MAX_RUNS
+    runs or when (after a run) it uses more than REPROCESS_WORKER_MAX_RSS
+    GB of memory (protection against memory leaks)
+    """
+
+    def __init__(self, params: ParamDict, cores: int, mp_type: str = 'pool'):
+        """
+        Set up the worker pool (workers are started by WorkerPool.submit)
+
+        :param params: ParamDict, parameter dictionary of constants
+        :param cores: int, the number of worker processes
+        :param mp_type: str, "pool" starts workers from a fork server
+                        (or spawns them), "process" uses the default start
+                        method
+        """
+        # deal with multiprocessing imports
+        import multiprocessing
+        # the instrument (to load the constants in the workers)
+        self.instrument = params['INSTRUMENT']
+        # the number of worker processes
+        self.cores = cores
+        # the limits before a worker is replaced
+        self.max_runs = int(params['REPROCESS_WORKER_MAX_RUNS'])
+        self.max_rss = float(params['REPROCESS_WORKER_MAX_RSS'])
+        # the settings this pool was made with (see get_worker_pool)
+        self.key = self.pool_key(params, cores, mp_type)
+        # "pool" starts workers from a fork server that has already
+        #   imported apero (else spawns them), "process" uses the default
+        #   start method
+        if mp_type != 'pool':
+            self.context = multiprocessing.get_context()
+        elif 'forkserver' in multiprocessing.get_all_start_methods():
+            self.context = multiprocessing.get_context('forkserver')
+            self.context.set_forkserver_preload([__name__])
+        else:
+            self.context = multiprocessing.get_context('spawn')
+        # "process" workers are not daemonic (as the processes they replace)
+        #   so recipes can start their own child processes
+        self.daemon = mp_type == 'pool'
+        # the queue workers put their results in
+        self.results = self.context.Queue()
+        # the worker processes and their task queues (by core number)
+        self.workers = dict()
+        # the tag of the run each busy worker is running (by core number)
+        self.running = dict()
+
+    @staticmethod
+    def pool_key(params: ParamDict, cores: int, mp_type: str) -> tuple:
+        """
+        The settings a worker pool is made with (a pool is only reused for
+        the same settings)
+
+        :param params: ParamDict, parameter dictionary of constants
+        :param cores: int, the number of worker processes
+        :param mp_type: str, the multiprocessing type
+
+        :return: tuple, the settings
+        """
+        return (params['INSTRUMENT'], cores, mp_type,
+                int(params['REPROCESS_WORKER_MAX_RUNS']),
+                float(params['REPROCESS_WORKER_MAX_RSS']))
+
+    def submit(self, core: int, tag: Any, args: List[Any]):
+        """
+        Run _linear_process with these arguments on a worker
+
+        :param core: int, the core number (1 to cores) of the worker to use
+                     (must not be running anything)
+        :param tag: the tag returned with the result (by WorkerPool.get)
+        :param args: list, the arguments for _linear_process
+
+        :return: None
+        """
+        # start the worker if needed
+        if core not in self.workers:
+            self._start(core)
+        # we pickle the arguments here so the worker can deal with errors
+        #   loading them (and the current database writer and snapshot
+        #   settings, as these may change while the worker is running)
+        task = (tag, drs_db.worker_environment(), pickle.dumps(args))
+        self.workers[core][1].put(task)
+        self.running[core] = tag
+
+    def get(self) -> Tuple[int, Any, Any]:
+        """
+        Wait for a run to finish
+
+        :return: tuple, 1. the core number, 2. the tag of the run, 3. the
+                 result of _linear_process (or a WorkerError)
+        """
+        # workers that were not running last time we checked
+        dead = set()
+        # loop until a run finishes
+        while True:
+            try:
+                msg = self.results.get(timeout=WORKER_POLL)
+            except queue.Empty:
+                # check for workers that have stopped while running (only
+                #   after checking twice - the result may still be on its
+                #   way)
+                for core in list(self.running.keys()):
+                    if self.workers[core][0].is_alive():
+                        continue
+                    if core not in dead:
+                        dead.add(core)
+                        continue
+                    # the run failed - start a new worker for this core
+                    tag = self.running.pop(core)
+                    exitcode = self.workers[core][0].exitcode
+                    self._replace(core)
+                    emsg = 'Worker process C{0:02d} exited (exit code {1})'
+                    return core, tag, WorkerError(emsg.format(core, exitcode))
+                continue
+            # this worker is no longer running
+            core, tag, result, retire = msg
+            self.running.pop(core, None)
+            # replace workers that reached their limits
+            if retire:
+                self._replace(core)
+            return core, tag, result
+
+    def map(self, arglist: List[List[Any]],
+            governor: Optional[MemoryGovernor] = None) -> List[Any]:
+        """
+        Run _linear_process with each set of arguments
+
+        :param arglist: list of lists, the arguments for each run
+        :param governor: MemoryGovernor or None, if set runs are only
+                         started when their memory fits
+
+        :return: list, the results (in the same order as arglist)
+        """
+        results = [None] * len(arglist)
+        free_cores = list(range(self.cores, 0, -1))
+        position = 0
+        # loop until every run has finished
+        while position < len(arglist) or len(self.running) > 0:
+            # start as many runs as we have free cores (and memory for)
+            while position < len(arglist) and len(free_cores) > 0:
+                priority = arglist[position][1][0].priority
+                if governor is not None:
+                    if not governor.admit(priority):
+                        break
+                    governor.start(priority)
+                self.submit(free_cores.pop(), position, arglist[position])
+                position += 1
+            # wait for a run to finish
+            core, tag, result = self.get()
+            free_cores.append(core)
+            results[tag] = result
+            if governor is not None:
+                governor.finish(arglist[tag][1][0].priority)
+        return results
+
+    def stop(self, wait: bool = True):
+        """
+        Stop all worker processes
+
+        :param wait: bool, if True wait for the workers to finish their
+                     current run, else terminate them
+
+        :return: None
+        """
+        # tell the workers to stop
+        for core in self.workers:
+            if wait:
+                self.workers[core][1].put(None)
+            else:
+                self.workers[core][0].terminate()
+        # wait for them to stop
+        for core in self.workers:
+            process = self.workers[core][0]
+            process.join(timeout=WORKER_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+        self.workers = dict()
+        self.running = dict()
+
+    def _start(self, core: int):
+        """
+        Start the worker process for a core
+
+        :param core: int, the core number
+
+        :return: None
+        """
+        tasks = self.context.Queue()
+        args = (core, self.instrument, tasks, self.results, self.max_runs,
+                self.max_rss)
+        process = self.context.Process(target=_worker_main, args=args,
+                                       daemon=self.daemon)
+        process.start()
+        self.workers[core] = (process, tasks)
+
+    def _replace(self, core: int):
+        """
+        Start a new worker process for a core (once the old one has stopped)
+
+        :param core: int, the core number
+
+        :return: None
+        """
+        process = self.workers[core][0]
+        process.join(timeout=WORKER_TIMEOUT)
+        if process.is_alive():
+            process.terminate()
+        self._start(core)
+
+
 # =============================================================================
 # Define pickle functions
 # =============================================================================
@@ -531,9 +1240,24 @@ def generate_skip_table(params):
     # deal with obs_dir set (take precedences over white list)
     if not drs_text.null_text(params['RUN_OBS_DIR'], ['', 'None', 'All']):
         include_list = [params['RUN_OBS_DIR']]
+    # in content skip mode only the fingerprints are needed (a hash table
+    #   by run key - see skip_fingerprint)
+    if params['REPROCESS_SKIP_MODE'] == 'content':
+        fingerprints = logdbm.get_fingerprints()
+        # deal with nothing to skip
+        if len(fingerprints) == 0:
+            return None
+        # push into skip table
+        skip_table = Table()
+        skip_table.meta['FINGERPRINTS'] = fingerprints
+        # log number of runs found
+        WLOG(params, '', textentry('90-503-00018', args=[len(fingerprints)]))
+        # return skip table
+        return skip_table
     # need to remove those that didn't end
     condition = 'ENDED = 1'
-    # get runstrings
+    # get runstrings (the log archive never holds the latest ended run of
+    #   a run string so it is not needed here)
     table = logdbm.get_entries('RECIPE, RUNSTRING',
                                include_obs_dirs=include_list,
                                exclude_obs_dirs=exclude_list,
@@ -597,6 +1321,19 @@ def skip_clean_arguments(runstring: str,
     return clean_runstring
 
 
+def skip_run_key(runstring: str) -> str:
+    """
+    Get the run key of a run string: the hash of the cleaned run string
+    (the same for otherwise identical runs - see skip_clean_arguments)
+
+    :param runstring: str, the run string for this recipe run
+
+    :return: str, the run key
+    """
+    clean_runstring = skip_clean_arguments(runstring).strip()
+    return hashlib.sha1(clean_runstring.encode('utf-8')).hexdigest()
+
+
 def skip_remove_non_required_args(runstrings, runobj):
     """
     remove any non-required arguments from runstrings (for skip comparison)
@@ -949,39 +1686,104 @@ def process_run_list(params: ParamDict, runlist, group=None,
     process_start = time.time()
     # get number of cores
     cores = _get_cores(params)
-    # pipe to correct module
-    # do not use parallelization
-    if cores == 1 or params['REPROCESS_MP_TYPE'].lower() == 'linear':
-        # log process: Running with 1 core
-        WLOG(params, 'info', textentry('40-503-00016'))
-        # run as linear process
-        rdict = _linear_process(params, runlist, group=group)
-    # use pathos to multiprocess
-    elif params['REPROCESS_MP_TYPE'].lower() == 'pathos':
-        # log process: Running with N cores
-        WLOG(params, 'info', textentry('40-503-00017', args=[cores]))
-        # run as multiple processes
-        rdict = _multi_process_pathos(params, runlist, cores=cores,
-                                      groupname=group, findexdbm=findexdbm)
-    # use pool to continue parallelization
-    elif params['REPROCESS_MP_TYPE'].lower() == 'pool':
-        # log process: Running with N cores
-        WLOG(params, 'info', textentry('40-503-00017', args=[cores]))
-        # run as multiple processes
-        rdict = _multi_process_pool(params, runlist, cores=cores,
-                                    groupname=group, findexdbm=findexdbm)
-    # use Process to continue parallelization
-    elif params['REPROCESS_MP_TYPE'].lower() == 'process':
-        # log process: Running with N cores
-        WLOG(params, 'info', textentry('40-503-00017', args=[cores]))
-        # run as multiple processes
-        rdict = _multi_process_process(params, runlist, cores=cores,
-                                       groupname=group, findexdbm=findexdbm)
-    else:
-        # log process: Running with 1 core
-        WLOG(params, 'info', textentry('40-503-00016'))
-        # run as linear process
-        rdict = _linear_process(params, runlist, group=group)
+    # start the database writer process (workers send their database
+    #   writes to it instead of writing to the database themselves)
+    writer = None
+    mp_type = params['REPROCESS_MP_TYPE'].lower()
+    if params['DB_WRITER'] and cores > 1 and mp_type in ['pool', 'process']:
+        sync_kinds = params.listp('DB_WRITER_SYNC_KINDS', dtype=str)
+        writer = drs_db.DatabaseWriter(sync_kinds=sync_kinds)
+        writer.start()
+        WLOG(params, 'info', 'Database writes sent to a single writer process')
+    # set up the read-only database snapshots (workers read from these
+    #   instead of querying the databases)
+    snapshot = None
+    if params['DB_SNAPSHOT'] and cores > 1 and mp_type in ['pool', 'process']:
+        snapshot = drs_db.DatabaseSnapshot(_snapshot_databases(params))
+    # predict the run time of each run from previous runs (longer runs are
+    #   started first) and the memory each run uses (runs only start when
+    #   their memory fits)
+    costs, governor = None, None
+    use_governor = params['REPROCESS_MEM_GOVERNOR'] and cores > 1
+    use_governor &= mp_type in ['pool', 'process']
+    if params['REPROCESS_COST_MODEL'] or use_governor:
+        costs, memory = RunCostModel(params, findexdbm).predict_all(runlist)
+        if use_governor:
+            governor = MemoryGovernor(params, memory)
+        if not params['REPROCESS_COST_MODEL']:
+            costs = None
+    # store the predicted schedule (for display_timing)
+    _schedule_report(params, runlist, costs, cores, governor)
+    # always stop the writer and remove the snapshots (even if a run
+    #   raises an exception)
+    try:
+        # pipe to correct module
+        # do not use parallelization
+        if cores == 1 or params['REPROCESS_MP_TYPE'].lower() == 'linear':
+            # log process: Running with 1 core
+            WLOG(params, 'info', textentry('40-503-00016'))
+            # run as linear process
+            rdict = _linear_process(params, runlist, group=group)
+        # use pathos to multiprocess
+        elif params['REPROCESS_MP_TYPE'].lower() == 'pathos':
+            # log process: Running with N cores
+            WLOG(params, 'info', textentry('40-503-00017', args=[cores]))
+            # run as multiple processes
+            rdict = _multi_process_pathos(params, runlist, cores=cores,
+                                          groupname=group,
+                                          findexdbm=findexdbm)
+        # use pool to continue parallelization
+        elif params['REPROCESS_MP_TYPE'].lower() == 'pool':
+            # log process: Running with N cores
+            WLOG(params, 'info', textentry('40-503-00017', args=[cores]))
+            # start each run once the runs it depends on have finished
+            if params['REPROCESS_SCHEDULER'].lower() == 'dag':
+                rdict = _multi_process_dag(params, runlist, cores=cores,
+                                           groupname=group,
+                                           findexdbm=findexdbm,
+                                           snapshot=snapshot, mp_type='pool',
+                                           costs=costs, governor=governor)
+            # else wait for each group of runs of the same recipe
+            else:
+                rdict = _multi_process_pool(params, runlist, cores=cores,
+                                            groupname=group,
+                                            findexdbm=findexdbm,
+                                            snapshot=snapshot, costs=costs,
+                                            governor=governor)
+        # use Process to continue parallelization
+        elif params['REPROCESS_MP_TYPE'].lower() == 'process':
+            # log process: Running with N cores
+            WLOG(params, 'info', textentry('40-503-00017', args=[cores]))
+            # start each run once the runs it depends on have finished
+            if params['REPROCESS_SCHEDULER'].lower() == 'dag':
+                rdict = _multi_process_dag(params, runlist, cores=cores,
+                                           groupname=group,
+                                           findexdbm=findexdbm,
+                                           snapshot=snapshot,
+                                           mp_type='process', costs=costs,
+                                           governor=governor)
+            # else wait for each group of runs of the same recipe
+            else:
+                rdict = _multi_process_process(params, runlist, cores=cores,
+                                               groupname=group,
+                                               findexdbm=findexdbm,
+                                               snapshot=snapshot,
+                                               costs=costs,
+                                               governor=governor)
+        else:
+            # log process: Running with 1 core
+            WLOG(params, 'info', textentry('40-503-00016'))
+            # run as linear process
+            rdict = _linear_process(params, runlist, group=group)
+    finally:
+        try:
+            # stop the database writer process (once all writes are applied)
+            if writer is not None:
+                writer.stop()
+        finally:
+            # remove the database snapshots
+            if snapshot is not None:
+                snapshot.stop()
     # end a timer
     process_end = time.time()
     # remove lock files
@@ -1039,6 +1841,27 @@ def display_timing(params, outlist, ptime):
     WLOG(params, 'info', textentry('40-503-00025', args=[tot_time]))
     WLOG(params, 'info', textentry('40-503-00033', args=[ptime]))
     WLOG(params, 'info', textentry('40-503-00034', args=[speed_up, cores]))
+    # add the predicted schedule (see RunCostModel)
+    if len(SCHEDULE_REPORT) > 0:
+        costs = SCHEDULE_REPORT['COSTS']
+        # the predicted time of the runs we have actual times for
+        pred_time = 0.0
+        for key in keys:
+            cond1 = len(outlist[key]['ERROR']) == 0
+            cond2 = outlist[key]['TIMING'] is not None
+            if cond1 and cond2:
+                pred_time += costs.get(key, 0.0)
+        # the predicted makespan for the order the runs were started in
+        wargs = [SCHEDULE_REPORT['MAKESPAN'], SCHEDULE_REPORT['MODE'], cores]
+        wmsg = 'Predicted makespan ({1} order, {2} cores): {0:.2f} s'
+        # a test run only has the predicted makespan
+        if params['TEST_RUN']:
+            WLOG(params, 'info', wmsg.format(*wargs))
+        else:
+            wmsg += ' (actual: {3:.2f} s)'
+            WLOG(params, 'info', wmsg.format(*wargs, ptime))
+            wmsg = 'Predicted total run time: {0:.2f} s (actual: {1:.2f} s)'
+            WLOG(params, 'info', wmsg.format(pred_time, tot_time))
     WLOG(params, '', params['DRS_HEADER'])
     WLOG(params, '', '')
 
@@ -1708,8 +2531,12 @@ def skip_run_object(params, runobj, skiptable, skip_storage):
     # ----------------------------------------------------------------------
     # check if the user wants to skip
     if runobj.skipname in params:
+        # if user wants to skip (content skip mode)
+        if params[runobj.skipname] and 'FINGERPRINTS' in skiptable.meta:
+            return skip_fingerprint(params, runobj,
+                                    skiptable.meta['FINGERPRINTS'])
         # if user wants to skip
-        if params[runobj.skipname]:
+        elif params[runobj.skipname]:
             # clean run string
             clean_runstring = skip_clean_arguments(runobj.runstring)
             # check for recipe in skip storage
@@ -1752,6 +2579,222 @@ def skip_run_object(params, runobj, skiptable, skip_storage):
         return False, '{0} not present'.format(runobj.skipname)
 
 
+def skip_fingerprint(params: ParamDict, runobj: Run,
+                     fingerprints: Dict[str, Dict[str, Any]]
+                     ) -> Tuple[bool, Union[str, None]]:
+    """
+    Content skip mode: skip a run only if its fingerprint (inputs,
+    calibrations, version and constants) is the same as the fingerprint of
+    its last run and every output of its last run exists with this
+    fingerprint in its header. The calibration and telluric queries of the
+    last run are run again (one lookup each) so a run whose queries now
+    resolve different files (e.g. a closer calibration was added) is not
+    skipped
+
+    :param params: ParamDict, the parameter dictionary of constants
+    :param runobj: Run, the run to check
+    :param fingerprints: dict, the fingerprint rows by run key (from
+                         LogDatabase.get_fingerprints)
+
+    :return: tuple, 1. whether to skip the run, 2. the reason (or None)
+    """
+    # get the last fingerprint of this run (hash table lookup)
+    row = fingerprints.get(runobj.runkey, None)
+    # deal with no previous run
+    if row is None:
+        return False, None
+    # get the files used by the last run
+    prev_inputs = json.loads(row['INPUTS'])
+    prev_calibs = json.loads(row['CALIBS'])
+    queries = json.loads(row['QUERIES'])
+    # the inputs must be the same files
+    inputs = runobj.input_files()
+    if sorted(inputs) != sorted([record[0] for record in prev_inputs]):
+        return False, None
+    # the calibration and telluric queries must resolve the same files
+    for query in queries:
+        # noinspection PyBroadException
+        try:
+            files = drs_database.resolve_query(params, query)
+        except Exception as _:
+            return False, None
+        if sorted(files) != sorted(query['files']):
+            return False, None
+    # get the file records (reusing the checksums of unchanged files)
+    previous = dict()
+    for record in prev_inputs + prev_calibs:
+        previous[record[0]] = record
+    try:
+        in_records = _file_records(inputs, previous)
+        cal_records = _file_records([record[0] for record in prev_calibs],
+                                    previous)
+    except OSError:
+        return False, None
+    # keep the records (so the run does not checksum them again)
+    for record in in_records + cal_records:
+        runobj.fprint_records[record[0]] = record
+    # the fingerprint must be the same
+    fingerprint = run_fingerprint(params, runobj.runkey, in_records,
+                                  cal_records, queries)
+    if fingerprint != row['FINGERPRINT']:
+        return False, None
+    # every output must exist with the same fingerprint
+    fkey = params['KW_FPRINT'][0]
+    for outfile in json.loads(row['OUTPUTS']):
+        if not os.path.exists(outfile):
+            return False, None
+        # only fits files have a fingerprint in their header
+        if not outfile.endswith('.fits'):
+            continue
+        # noinspection PyBroadException
+        try:
+            hkeys = drs_fits.read_header_keys(params, outfile, [fkey])
+        except Exception as _:
+            return False, None
+        if hkeys.get(fkey, None) != fingerprint:
+            return False, None
+    # all inputs and outputs are unchanged - so we skip
+    return True, 'Fingerprint unchanged ({0})'.format(fingerprint[:12])
+
+
+def save_fingerprint(params: ParamDict, run_item: Run, pid: str,
+                     outputs: Dict[str, Dict[str, Any]]):
+    """
+    Save the fingerprint of a successful run: in the header of its fits
+    outputs and in the log database (see skip_fingerprint)
+
+    :param params: ParamDict, the parameter dictionary of constants
+    :param run_item: Run, the run that finished
+    :param pid: str, the recipe process id
+    :param outputs: dict, the output files of the run (from
+                    DrsRecipe.output_files)
+
+    :return: None, updates the output headers and the log database
+    """
+    # get the file records (reusing the checksums found by the skip check)
+    previous = run_item.fprint_records
+    in_records = _file_records(run_item.input_files(), previous)
+    # get the calibration and telluric queries of the run (each once)
+    queries = dict()
+    for query in drs_database.RESOLVED_QUERIES:
+        queries[json.dumps(query, sort_keys=True)] = query
+    queries = [queries[qkey] for qkey in sorted(queries)]
+    # get the records of the files the queries resolved
+    calibs = set()
+    for query in queries:
+        calibs.update(query['files'])
+    cal_records = _file_records(sorted(calibs), previous)
+    # get the fingerprint
+    fingerprint = run_fingerprint(params, run_item.runkey, in_records,
+                                  cal_records, queries)
+    # add the fingerprint to the fits outputs
+    outfiles = []
+    fkey, _, fcomment = params['KW_FPRINT']
+    for okey in outputs:
+        outfile = str(outputs[okey]['ABSPATH'])
+        if outfile.endswith('.fits') and os.path.exists(outfile):
+            drs_fits.update_header_keys(params, outfile,
+                                        {fkey: (fingerprint, fcomment)})
+        outfiles.append(outfile)
+    # add the fingerprint to the log database
+    logdbm = drs_database.LogDatabase(params)
+    logdbm.load_db()
+    logdbm.add_fingerprint(run_item.runkey, fingerprint, pid,
+                           run_item.shortname, json.dumps(in_records),
+                           json.dumps(cal_records), json.dumps(queries),
+                           json.dumps(outfiles))
+
+
+def run_fingerprint(params: ParamDict, runkey: str,
+                    inputs: List[List[Any]], calibs: List[List[Any]],
+                    queries: List[Dict[str, Any]]) -> str:
+    """
+    Get the fingerprint of a run: the hash of its run key, the size and
+    checksum of its input and calibration files, its calibration and
+    telluric queries, the version and the constants (the modified times are
+    only used to reuse checksums)
+
+    :param params: ParamDict, the parameter dictionary of constants
+    :param runkey: str, the run key (see skip_run_key)
+    :param inputs: list of file records (path, size, mtime, checksum)
+    :param calibs: list of file records (path, size, mtime, checksum)
+    :param queries: list of dicts, the calibration and telluric queries
+                    (see drs_database.resolve_query)
+
+    :return: str, the fingerprint
+    """
+    content = dict(runkey=runkey, version=__version__,
+                   constants=_constants_hash(params),
+                   inputs=[[r[0], r[1], r[3]] for r in inputs],
+                   calibs=[[r[0], r[1], r[3]] for r in calibs],
+                   queries=queries)
+    content = json.dumps(content, sort_keys=True)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def _file_records(paths: List[str], previous: Dict[str, List[Any]]
+                  ) -> List[List[Any]]:
+    """
+    Get the record (path, size, mtime, checksum) of some files, reusing the
+    checksum of a previous record when the size and mtime are unchanged
+
+    :param paths: list of strings, the absolute paths of the files
+    :param previous: dict, the previous file records by path
+
+    :return: list of file records
+    :raises: OSError if a file does not exist
+    """
+    records = []
+    for path in paths:
+        stat = os.stat(path)
+        size, mtime = int(stat.st_size), float(stat.st_mtime)
+        # reuse the previous checksum if the file is unchanged
+        if path in previous:
+            _, psize, pmtime, checksum = previous[path]
+            if psize == size and pmtime == mtime:
+                records.append([path, size, mtime, checksum])
+                continue
+        # else checksum the file
+        checksum = hashlib.blake2b()
+        with open(path, 'rb') as infile:
+            for chunk in iter(lambda: infile.read(FPRINT_CHUNK_SIZE), b''):
+                checksum.update(chunk)
+        records.append([path, size, mtime, checksum.hexdigest()])
+    return records
+
+
+def _constants_hash(params: ParamDict) -> str:
+    """
+    Get the hash of the constants that can change the outputs of a run
+    (not in FPRINT_EXCLUDE_GROUPS), cached per instrument
+
+    :param params: ParamDict, the parameter dictionary of constants
+
+    :return: str, the hash of the constants
+    """
+    # use the cached hash
+    instrument = params['INSTRUMENT']
+    if instrument in FPRINT_CONSTANTS:
+        return FPRINT_CONSTANTS[instrument]
+    # only constants (not run time parameters) have instances
+    values = dict()
+    for key in params:
+        instance = params.instances.get(key, None)
+        if instance is None or instance.group in FPRINT_EXCLUDE_GROUPS:
+            continue
+        # the run file switches do not change the outputs
+        if key.startswith('RUN_') or key.startswith('SKIP_'):
+            continue
+        # only use simple values
+        value = params[key]
+        if isinstance(value, (str, int, float, bool, list, tuple)):
+            values[key] = value
+    content = json.dumps(values, sort_keys=True, default=str)
+    FPRINT_CONSTANTS[instrument] = hashlib.sha256(content.encode('utf-8')
+                                                  ).hexdigest()
+    return FPRINT_CONSTANTS[instrument]
+
+
 def _remove_py(innames):
     if isinstance(innames, str):
         names = [innames]
@@ -2299,6 +3342,8 @@ def _linear_process(params, runlist, number=0, cores=1, event=None,
     # deal with empty return_dict
     if return_dict is None:
         return_dict = dict()
+    # fingerprints are only saved in content skip mode
+    save_fprint = params['REPROCESS_SKIP_MODE'] == 'content'
     # loop around runlist
     for run_item in runlist:
         # get parameters from params
@@ -2398,6 +3443,10 @@ def _linear_process(params, runlist, number=0, cores=1, event=None,
             # --------------------------------------------------------------
             # start time
             starttime = time.time()
+            # reset the calibration and telluric queries of this run
+            del drs_database.RESOLVED_QUERIES[:]
+            # reset the peak memory of this process (to measure this run)
+            peak_reset = _reset_peak_memory()
             # try to run the main function
             # noinspection PyBroadException
             try:
@@ -2420,6 +3469,7 @@ def _linear_process(params, runlist, number=0, cores=1, event=None,
                 pp['SUCCESS'] = bool(ll_item.get('success', False))
                 pp['PASSED'] = bool(ll_item.get('passed', False))
                 pp['STATE'] = 'RETURN'
+                pp['PEAK_RSS'] = _peak_memory(peak_reset)
                 # delete ll_item
                 del llparams
                 del ll_item
@@ -2530,6 +3580,38 @@ def _linear_process(params, runlist, number=0, cores=1, event=None,
             endtime = time.time()
             # add timing to pp
             pp['TIMING'] = endtime - starttime
+            # --------------------------------------------------------------
+            # save the fingerprint of a successful run (content skip mode)
+            if save_fprint and pp['SUCCESS']:
+                # noinspection PyBroadException
+                try:
+                    save_fingerprint(params, run_item, pp['PID'],
+                                     pp['OUTPUTS'])
+                except Exception as e:
+                    wmsg = 'Could not save fingerprint for ID{0:05d}: {1}'
+                    WLOG(params, 'warning', wmsg.format(priority, e),
+                         sublevel=4)
+            # --------------------------------------------------------------
+            # save the peak memory of the run (see RunCostModel)
+            if 'PEAK_RSS' in pp and pp['PID'] is not None:
+                # noinspection PyBroadException
+                try:
+                    logdbm = drs_database.LogDatabase(params)
+                    logdbm.load_db()
+                    logdbm.add_run_memory(pp['PID'], run_item.shortname,
+                                          pp['PEAK_RSS'])
+                except Exception as e:
+                    wmsg = 'Could not save peak memory for ID{0:05d}: {1}'
+                    WLOG(params, 'warning', wmsg.format(priority, e),
+                         sublevel=4)
+        # ------------------------------------------------------------------
+        # wait for this runs database writes to be applied (only when
+        #   sending writes to the database writer process)
+        try:
+            drs_db.flush_writes()
+        except (drs_db.DatabaseException, drs_db.UniqueEntryException) as e:
+            pp['ERROR'] = list(pp.get('ERROR', [])) + [str(e)]
+            finished = False
         # ------------------------------------------------------------------
         # set finished flag
         pp['FINISHED'] = finished
@@ -2548,21 +3630,52 @@ def _linear_process(params, runlist, number=0, cores=1, event=None,
     return return_dict
 
 
+def _snapshot_databases(params: ParamDict) -> List[drs_db.Database]:
+    """
+    Load the databases to put in the read-only snapshot used by parallel
+    recipe runs (DB_SNAPSHOT_KINDS)
+
+    :param params: ParamDict, parameter dictionary of constants
+
+    :return: list of Database instances
+    """
+    # the database managers that can read from a snapshot
+    managers = dict(calib=drs_database.CalibrationDatabase,
+                    tellu=drs_database.TelluricDatabase,
+                    astrom=drs_database.AstrometricDatabase,
+                    reject=drs_database.RejectDatabase)
+    # load each database
+    databases = []
+    for kind in params.listp('DB_SNAPSHOT_KINDS', dtype=str):
+        kind = kind.strip().lower()
+        # skip kinds that cannot read from a snapshot
+        if kind not in managers:
+            continue
+        dbm = managers[kind](params)
+        dbm.load_db()
+        databases.append(dbm.database)
+    return databases
+
+
 def _multi_process_process(params, runlist, cores, groupname=None,
-                           findexdbm: Optional[FileIndexDatabase] = None):
+                           findexdbm: Optional[FileIndexDatabase] = None,
+                           snapshot: Optional[drs_db.DatabaseSnapshot] = None,
+                           costs: Optional[Dict[int, float]] = None,
+                           governor: Optional[MemoryGovernor] = None):
+    # start the longest runs of each recipe first
+    if costs is not None:
+        runlist = _longest_first_blocks(runlist, costs)
     # first try to group tasks
     grouplist, groupnames = _group_tasks1(runlist, cores)
     # import multiprocessing
-    from multiprocessing import Process, Manager, Event
+    from multiprocessing import Manager
     # start process manager
     manager = Manager()
-    event = Event()
-    return_dict = manager.dict()
+    event = manager.Event()
+    return_dict = dict()
     # loop around groups
     #   - each group is a unique recipe
     for g_it, group in enumerate(grouplist):
-        # process storage
-        jobs = []
         # log progress
         _group_progress(params, g_it, grouplist, groupnames[g_it])
         # skip groups if event is set
@@ -2570,22 +3683,33 @@ def _multi_process_process(params, runlist, cores, groupname=None,
             # Log warnings: Skipping group
             WLOG(params, 'warning', textentry('10-503-00017'), sublevel=6)
             continue
-        # loop around sub groups
+        # snapshot the databases (with the outputs of the previous groups)
+        if snapshot is not None:
+            snapshot.update()
+        # list of params for each sub group
         #    - each sub group is a set of runs of the same recipe
         #    - there are "number of cores" number of these subgroups
+        params_per_process = []
         for r_it, runlist_group in enumerate(group):
-            # get args
-            args = (params, runlist_group, r_it + 1,
-                    cores, event, groupname, return_dict)
-            # get parallel process
-            process = Process(target=_linear_process, args=args)
-            process.start()
-            jobs.append(process)
-        # do not continue until finished
-        for pit, proc in enumerate(jobs):
-            # debug log: MULTIPROCESS - joining job {0}
-            WLOG(params, 'debug', textentry('90-503-00021', args=[pit]))
-            proc.join()
+            args = [params, runlist_group, r_it + 1, cores, event, groupname]
+            params_per_process.append(args)
+        # start parallel jobs (on the persistent worker processes)
+        pool = get_worker_pool(params, cores, 'process')
+        try:
+            results = pool.map(params_per_process, governor=governor)
+        except BaseException as e:
+            stop_worker_pool(wait=False)
+            raise e
+        # fudge back into return dictionary
+        for row in range(len(results)):
+            # deal with the worker failing (not the recipe)
+            if isinstance(results[row], WorkerError):
+                pargs = params_per_process[row]
+                results[row] = _worker_error_result(pargs[1][0], pargs[2],
+                                                    cores, groupname,
+                                                    results[row])
+            for key in results[row]:
+                return_dict[key] = results[row][key]
         # ---------------------------------------------------------------------
         # update the index database (taking into account include/exclude lists)
         #    we have to loop around block kinds to prevent recipe from updating
@@ -2601,12 +3725,14 @@ def _multi_process_process(params, runlist, cores, groupname=None,
 
 
 def _multi_process_pool(params, runlist, cores, groupname=None,
-                        findexdbm: Optional[FileIndexDatabase] = None):
+                        findexdbm: Optional[FileIndexDatabase] = None,
+                        snapshot: Optional[drs_db.DatabaseSnapshot] = None,
+                        costs: Optional[Dict[int, float]] = None,
+                        governor: Optional[MemoryGovernor] = None):
     # first try to group tasks (now just by recipe)
     grouplist, groupnames = _group_tasks2(runlist)
     # deal with Pool specific imports
     from multiprocessing import Manager
-    from multiprocessing import get_context
     from multiprocessing import set_start_method
     try:
         set_start_method("spawn")
@@ -2629,6 +3755,9 @@ def _multi_process_pool(params, runlist, cores, groupname=None,
             # log that we are skipping group
             WLOG(params, 'warning', textentry('10-000-00001'), sublevel=6)
             continue
+        # start the longest runs first
+        if costs is not None:
+            group = _longest_first(group, costs)
         # list of params for each entry
         params_per_process = []
         # populate params for each sub group
@@ -2636,11 +3765,24 @@ def _multi_process_pool(params, runlist, cores, groupname=None,
             args = [params, [runlist_group], r_it + 1,
                     cores, event, groupname]
             params_per_process.append(args)
-        # start parellel jobs
-        with get_context('spawn').Pool(cores, maxtasksperchild=1) as pool:
-            results = pool.starmap(_linear_process, params_per_process)
+        # snapshot the databases (with the outputs of the previous groups)
+        if snapshot is not None:
+            snapshot.update()
+        # start parellel jobs (on the persistent worker processes)
+        pool = get_worker_pool(params, cores, 'pool')
+        try:
+            results = pool.map(params_per_process, governor=governor)
+        except BaseException as e:
+            stop_worker_pool(wait=False)
+            raise e
         # fudge back into return dictionary
         for row in range(len(results)):
+            # deal with the worker failing (not the recipe)
+            if isinstance(results[row], WorkerError):
+                pargs = params_per_process[row]
+                results[row] = _worker_error_result(pargs[1][0], pargs[2],
+                                                    cores, groupname,
+                                                    results[row])
             for key in results[row]:
                 return_dict[key] = results[row][key]
         # ---------------------------------------------------------------------
@@ -2657,6 +3799,516 @@ def _multi_process_pool(params, runlist, cores, groupname=None,
     return dict(return_dict)
 
 
+def _multi_process_dag(params, runlist, cores, groupname=None,
+                       findexdbm: Optional[FileIndexDatabase] = None,
+                       snapshot: Optional[drs_db.DatabaseSnapshot] = None,
+                       mp_type: str = 'pool',
+                       costs: Optional[Dict[int, float]] = None,
+                       governor: Optional[MemoryGovernor] = None):
+    # work out the dependencies between runs
+    graph = RunGraph(runlist, costs)
+    # deal with multiprocessing imports
+    from multiprocessing import Manager
+    # start process manager
+    manager = Manager()
+    event = manager.Event()
+    return_dict = dict()
+    # get the (persistent) worker processes
+    pool = get_worker_pool(params, cores, mp_type)
+    # the free core numbers and the number of running runs
+    free_cores = list(range(cores, 0, -1))
+    running = 0
+    # the recipe groups (consecutive runs of the same recipe) and the groups
+    #   we have started runs from
+    groups = sorted(set(graph.bounds))
+    started = set()
+    # whether any run finished since the index database was last updated
+    changed = False
+    # the resources produced by runs that finished since the index database
+    #   (and snapshots) were last updated (resource --> first producer)
+    pending = dict()
+    # stop the worker pool if we stop early (it may still be running runs)
+    try:
+        # loop until no run is running or can be started
+        while running > 0 or len(graph) > 0:
+            # start as many ready runs as we have free cores
+            while len(graph) > 0 and running < cores:
+                # skip remaining runs if event is set
+                if event.is_set():
+                    break
+                # wait until the next run fits in memory
+                priority = graph.runlist[graph.peek()].priority
+                if governor is not None and not governor.admit(priority):
+                    break
+                it = graph.pop()
+                run_item = graph.runlist[it]
+                # log progress (first run of a group)
+                if graph.bounds[it] not in started:
+                    _group_progress(params, len(started), groups,
+                                    run_item.shortname)
+                    started.add(graph.bounds[it])
+                # if this run requires something a run (before its group)
+                #   produced since the last update: update the index database
+                #   and snapshots with the outputs of the finished runs (as
+                #   done between groups by the group scheduler)
+                stale = False
+                for key in graph.requires[it]:
+                    if pending.get(key, graph.bounds[it]) < graph.bounds[it]:
+                        stale = True
+                        break
+                if stale:
+                    if not params['TEST_RUN']:
+                        update_index_db(params, findexdbm=findexdbm)
+                    if snapshot is not None:
+                        snapshot.update()
+                    pending = dict()
+                    changed = False
+                # start this run
+                core = free_cores.pop()
+                args = [params, [run_item], core, cores, event, groupname]
+                pool.submit(core, it, args)
+                running += 1
+                if governor is not None:
+                    governor.start(run_item.priority)
+            # stop if nothing is running (event set)
+            if running == 0:
+                # log that we are skipping the remaining runs
+                if event.is_set():
+                    WLOG(params, 'warning', textentry('10-000-00001'),
+                         sublevel=6)
+                break
+            # wait for a run to finish
+            core, it, result = pool.get()
+            running -= 1
+            free_cores.append(core)
+            # deal with the worker failing (not the recipe)
+            if isinstance(result, WorkerError):
+                result = _worker_error_result(graph.runlist[it], core, cores,
+                                              groupname, result)
+            # add to return dictionary
+            return_dict.update(result)
+            # remember what this run produced (for the next update)
+            for key in graph.produces[it]:
+                pending[key] = min(pending.get(key, it), it)
+            # this runs dependants may now start
+            graph.finish(it)
+            if governor is not None:
+                governor.finish(graph.runlist[it].priority)
+            changed = True
+    except BaseException as e:
+        stop_worker_pool(wait=False)
+        raise e
+    # update the index database with the outputs of the last runs
+    if changed and not params['TEST_RUN']:
+        update_index_db(params, findexdbm=findexdbm)
+    # return return_dict
+    return return_dict
+
+
+def get_worker_pool(params: ParamDict, cores: int,
+                    mp_type: str = 'pool') -> WorkerPool:
+    """
+    Get the persistent worker pool (kept between calls to process_run_list
+    and only replaced if the number of cores or settings change)
+
+    :param params: ParamDict, parameter dictionary of constants
+    :param cores: int, the number of worker processes
+    :param mp_type: str, the multiprocessing type ("pool" or "process")
+
+    :return: WorkerPool, the worker pool
+    """
+    global WORKER_POOL
+    # reuse the current pool if it has the same settings
+    key = WorkerPool.pool_key(params, cores, mp_type)
+    if WORKER_POOL is not None and WORKER_POOL.key == key:
+        return WORKER_POOL
+    # else stop the current pool
+    stop_worker_pool()
+    # and start a new one (stopped at exit - registered only once)
+    WORKER_POOL = WorkerPool(params, cores, mp_type)
+    atexit.unregister(stop_worker_pool)
+    atexit.register(stop_worker_pool)
+    return WORKER_POOL
+
+
+def stop_worker_pool(wait: bool = True):
+    """
+    Stop the persistent worker pool (if there is one)
+
+    :param wait: bool, if True wait for the workers to finish their current
+                 run, else terminate them
+
+    :return: None
+    """
+    global WORKER_POOL
+    if WORKER_POOL is not None:
+        WORKER_POOL.stop(wait=wait)
+        WORKER_POOL = None
+
+
+def _worker_main(core: int, instrument: str, tasks: Any, results: Any,
+                 max_runs: int, max_rss: float):
+    """
+    A persistent worker process: load apero once then run _linear_process
+    for every task until told to stop (or a limit is reached)
+
+    :param core: int, the core number of this worker
+    :param instrument: str, the instrument (to load the constants)
+    :param tasks: Queue, the tasks for this worker (None to stop)
+    :param results: Queue, where results are put (core, tag, result,
+                    whether this worker is stopping)
+    :param max_runs: int, the number of runs before stopping (0 for no
+                     limit)
+    :param max_rss: float, the memory (in GB) above which we stop after a
+                    run (0 for no limit)
+
+    :return: None
+    """
+    # load the constants and recipe definitions once for all runs
+    _worker_preload(instrument)
+    # count the runs
+    runs = 0
+    # loop until told to stop
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        tag, environment, payload = task
+        # noinspection PyBroadException
+        try:
+            # use the current database writer / snapshots
+            drs_db.set_worker_environment(environment)
+            # run
+            result = _linear_process(*pickle.loads(payload))
+        except Exception as _:
+            import traceback
+            result = WorkerError(traceback.format_exc())
+        runs += 1
+        # check whether we have reached a limit
+        retire = max_runs > 0 and runs >= max_runs
+        if max_rss > 0:
+            rss = psutil.Process().memory_info().rss / 2 ** 30
+            retire |= rss > max_rss
+        # return the result
+        results.put((core, tag, result, retire))
+        # stop if we have reached a limit (we are replaced by a new worker)
+        if retire:
+            break
+    # close our database connections
+    drs_db.close_connection_pools()
+
+
+def _worker_preload(instrument: str):
+    """
+    Load the constants, pseudo constants and recipe definitions (these are
+    cached by each process, so every run on this worker reuses them)
+
+    :param instrument: str, the instrument
+
+    :return: None
+    """
+    # noinspection PyBroadException
+    try:
+        constants.load(instrument)
+        pconst = constants.pload(instrument)
+        pconst.RECIPEMOD().get()
+    # any error here will happen again (and be reported) in the run
+    except Exception as _:
+        pass
+
+
+def _worker_error_result(run_item: Run, core: int, cores: int,
+                         groupname: Optional[str], error: WorkerError
+                         ) -> Dict[int, dict]:
+    """
+    The return dictionary entry for a run whose worker process failed
+
+    :param run_item: Run, the run instance
+    :param core: int, the core number the run was on
+    :param cores: int, the total number of cores
+    :param groupname: str, the group name of this set of runs
+    :param error: WorkerError, the error
+
+    :return: dict, the return dictionary entry (priority as key)
+    """
+    pp = dict()
+    pp['RECIPE'] = str(run_item.recipename)
+    pp['OBS_DIR'] = str(run_item.obs_dir)
+    pp['ARGS'] = run_item.kwargs
+    pp['RUNSTRING'] = str(run_item.runstring)
+    pp['COREUSED'] = core
+    pp['CORETOT'] = cores
+    pp['GROUP'] = groupname
+    pp['PID'] = None
+    pp['ERROR'] = [str(error)]
+    pp['WARNING'] = []
+    pp['OUTPUTS'] = dict()
+    pp['TIMING'] = None
+    pp['TRACEBACK'] = str(error)
+    pp['SUCCESS'] = False
+    pp['PASSED'] = False
+    pp['STATE'] = 'EXCEPTION:WORKER'
+    pp['FINISHED'] = False
+    return {run_item.priority: pp}
+
+
+def _reset_peak_memory() -> bool:
+    """
+    Reset the peak resident memory of this process (linux only), so the
+    peak memory of each run can be measured in a long-lived process
+
+    :return: bool, True if the peak memory was reset
+    """
+    # noinspection PyBroadException
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+        return True
+    except Exception as _:
+        return False
+
+
+def _peak_memory(reset: bool) -> float:
+    """
+    Get the peak resident memory of this process since the last reset
+    (see _reset_peak_memory) - if the peak could not be reset this is the
+    peak memory of the whole life of the process (an upper limit)
+
+    :param reset: bool, whether the peak memory was reset
+
+    :return: float, the peak memory in GB
+    """
+    # read the peak since the reset (VmHWM in kB)
+    if reset:
+        # noinspection PyBroadException
+        try:
+            with open('/proc/self/status') as status:
+                for line in status:
+                    if line.startswith('VmHWM:'):
+                        return int(line.split()[1]) / 2 ** 20
+        except Exception as _:
+            pass
+    # else use the peak of the whole process (kB on linux, bytes on mac)
+    import resource
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return maxrss / 2 ** 30
+    return maxrss / 2 ** 20
+
+
+def _longest_first(runs: List[Run], costs: Dict[int, float]) -> List[Run]:
+    """
+    Sort runs by predicted run time (longest first, then by priority)
+
+    :param runs: list of Run instances
+    :param costs: dict, the predicted run time of each run (by priority)
+
+    :return: list of Run instances, the sorted runs
+    """
+    def sort_key(run_item: Run) -> Tuple[float, int]:
+        return -costs.get(run_item.priority, 0.0), run_item.priority
+    return sorted(runs, key=sort_key)
+
+
+def _longest_first_blocks(runlist: List[Run], costs: Dict[int, float]
+                          ) -> List[Run]:
+    """
+    Sort each block of consecutive runs of the same recipe by predicted run
+    time (longest first - see _longest_first), keeping the order of the
+    blocks
+
+    :param runlist: list of Run instances
+    :param costs: dict, the predicted run time of each run (by priority)
+
+    :return: list of Run instances, the sorted runs
+    """
+    sorted_runs = []
+    for _, block in itertools.groupby(runlist, lambda r: r.shortname):
+        sorted_runs += _longest_first(list(block), costs)
+    return sorted_runs
+
+
+def _schedule_report(params: ParamDict, runlist: List[Run],
+                     costs: Optional[Dict[int, float]], cores: int,
+                     governor: Optional[MemoryGovernor] = None):
+    """
+    Store the predicted run times and makespan of a run list (reported by
+    display_timing)
+
+    :param params: ParamDict, parameter dictionary of constants
+    :param runlist: list of Run instances
+    :param costs: dict or None, the predicted run time of each run (by
+                  priority) - None to not report a predicted schedule
+    :param cores: int, the number of cores
+    :param governor: MemoryGovernor or None, if set runs only start when
+                     their predicted memory fits in its budget
+
+    :return: None - updates SCHEDULE_REPORT
+    """
+    SCHEDULE_REPORT.clear()
+    # deal with no predicted run times
+    if costs is None:
+        return
+    # work out how the runs will be scheduled (as in process_run_list)
+    mp_type = params['REPROCESS_MP_TYPE'].lower()
+    if cores == 1 or mp_type not in ['pool', 'process', 'pathos']:
+        mode = 'linear'
+    elif mp_type == 'pathos':
+        mode = 'group'
+    elif params['REPROCESS_SCHEDULER'].lower() == 'dag':
+        mode = 'dag'
+    elif mp_type == 'process':
+        mode = 'batch'
+    else:
+        mode = 'group'
+    # pathos does not start the longest runs first
+    ordered = mp_type != 'pathos'
+    # store the report
+    SCHEDULE_REPORT['COSTS'] = costs
+    SCHEDULE_REPORT['MODE'] = mode
+    SCHEDULE_REPORT['MAKESPAN'] = _predict_makespan(runlist, costs, cores,
+                                                    mode, ordered, governor)
+
+
+def _predict_makespan(runlist: List[Run], costs: Dict[int, float],
+                      cores: int, mode: str, ordered: bool = True,
+                      governor: Optional[MemoryGovernor] = None) -> float:
+    """
+    Predict the wall time of a run list (by simulating the scheduler with
+    the predicted run times)
+
+    :param runlist: list of Run instances
+    :param costs: dict, the predicted run time of each run (by priority)
+    :param cores: int, the number of cores
+    :param mode: str, the scheduler: "linear" (one run at a time), "dag"
+                 (see RunGraph), "group" (each group of runs of the same
+                 recipe waits for the previous group) or "batch" (each
+                 batch of "cores" runs of the same recipe waits for the
+                 previous batch)
+    :param ordered: bool, if True the group and batch schedulers start the
+                    longest runs first (else in run list order)
+    :param governor: MemoryGovernor or None, if set a run only starts when
+                     the predicted memory of the running runs and the run
+                     fits in the memory budget (see MemoryGovernor.admit)
+
+    :return: float, the predicted makespan in seconds
+    """
+    # linear: one run after another
+    if mode == 'linear':
+        return float(sum([costs.get(run_item.priority, 0.0)
+                          for run_item in runlist]))
+    # the memory of each run and the memory budget
+    if governor is None:
+        memory, budget = dict(), np.inf
+    else:
+        memory, budget = governor.memory, governor.budget
+    # dag: start ready runs (longest first) whenever a core (and memory) is
+    #   free
+    if mode == 'dag':
+        graph = RunGraph(runlist, costs)
+        now, running, used = 0.0, [], 0.0
+        while len(graph) > 0 or len(running) > 0:
+            while len(graph) > 0 and len(running) < cores:
+                priority = graph.runlist[graph.peek()].priority
+                mem = memory.get(priority, 0.0)
+                if len(running) > 0 and used + mem > budget:
+                    break
+                it = graph.pop()
+                used += mem
+                heapq.heappush(running, (now + costs.get(priority, 0.0),
+                                         it, mem))
+            now, it, mem = heapq.heappop(running)
+            used -= mem
+            graph.finish(it)
+        return now
+    # group / batch: each group starts when the previous group has finished
+    if mode == 'batch':
+        if ordered:
+            runlist = _longest_first_blocks(runlist, costs)
+        groups = []
+        for _, block in itertools.groupby(runlist, lambda r: r.shortname):
+            block = list(block)
+            for it in range(0, len(block), cores):
+                groups.append(block[it:it + cores])
+    else:
+        grouplist, _ = _group_tasks2(runlist)
+        groups = [grouplist[groupnum] for groupnum in grouplist]
+        if ordered:
+            groups = [_longest_first(group, costs) for group in groups]
+    makespan = 0.0
+    for group in groups:
+        # each run starts (in order) once a core and its memory are free
+        now, running, used = makespan, [], 0.0
+        for run_item in group:
+            mem = memory.get(run_item.priority, 0.0)
+            while len(running) >= cores or (len(running) > 0 and
+                                            used + mem > budget):
+                end, rmem = heapq.heappop(running)
+                now, used = max(now, end), used - rmem
+            used += mem
+            heapq.heappush(running, (now + costs.get(run_item.priority, 0.0),
+                                     mem))
+        makespan = max([now] + [end for end, _ in running])
+    return makespan
+
+
+def _run_resources(run_item: Run) -> Tuple[set, set]:
+    """
+    Work out the resources a run produces and requires (see RunGraph)
+
+    :param run_item: Run, the run instance
+
+    :return: tuple, 1. the set of resources produced, 2. the set of
+             resources required
+    """
+    recipe = run_item.recipe
+    obs_dir = str(run_item.obs_dir)
+    # every run writes files to its output block (for this obs_dir)
+    produces = {RUN_ALL_KEY, ('block', str(recipe.out_block_str), obs_dir)}
+    requires = set()
+    # runs read products of earlier runs of the same obs_dir that are not in
+    #   their input block (e.g. the calibrations of the night) so they wait
+    #   for every earlier run of the same obs_dir
+    if obs_dir != '':
+        produces.add(('obs_dir', obs_dir))
+        requires.add(('obs_dir', obs_dir))
+    # the databases this run adds entries to
+    for output in recipe.outputs.values():
+        dbname = getattr(output, 'dbname', None)
+        if dbname in RUN_DEPENDENCY_DBS:
+            produces.add(('db', dbname))
+            # must not add entries before earlier runs have read them
+            requires.add(('dbread', dbname))
+    # the databases this run reads (from the files its arguments accept)
+    arguments = list(recipe.args.values()) + list(recipe.kwargs.values())
+    for argument in arguments:
+        if argument.dtype not in ['file', 'files']:
+            continue
+        for drsfile in argument.files:
+            dbname = getattr(drsfile, 'dbname', None)
+            if dbname in RUN_DEPENDENCY_DBS:
+                requires.add(('db', dbname))
+                produces.add(('dbread', dbname))
+    # the files this run reads (from its input block for this obs_dir)
+    has_files = False
+    for argname in recipe.args:
+        if recipe.args[argname].dtype not in ['file', 'files']:
+            continue
+        if len(run_item.kwargs.get(argname, [])) > 0:
+            has_files = True
+    if has_files:
+        requires.add(('block', str(recipe.in_block_str), obs_dir))
+    # we do not know what a run without input files reads - so it waits for
+    #   all earlier runs
+    else:
+        requires.add(RUN_ALL_KEY)
+    # post-processing runs collect the products of every recipe (not only
+    #   their input block) - so they wait for all earlier runs
+    if str(recipe.recipe_kind).startswith('post'):
+        requires.add(RUN_ALL_KEY)
+    return produces, requires
+
+
 def _multi_process_pathos(params, runlist, cores, groupname=None,
                           findexdbm: Optional[FileIndexDatabase] = None):
     # first try to group tasks (now just by recipe)
@@ -3612,7 +5264,7 @@ def _get_filters(params: ParamDict, srecipe: DrsRecipe,
     pconst = constants.pload()
     # need to load object database
     objdbm = drs_database.AstrometricDatabase(params)
-    objdbm.load_db()
+    objdbm.load_db(read_only=True)
     # set up filter storage
     filters = dict()
     # -------------------------------------------------------------------------
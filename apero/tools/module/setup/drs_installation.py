@@ -1690,6 +1690,10 @@ def update_db_settings(aparams: ParamDict) -> ParamDict:
     aparams['SQLITE']['USER'] = dparams['SQLITE3']['USER']
     aparams['SQLITE']['PASSWD'] = dparams['SQLITE3']['PASSWD']
     aparams['SQLITE']['DATABASE'] = dparams['SQLITE3']['DATABASE']
+    aparams['SQLITE']['USE_POOL'] = dparams['SQLITE3'].get('USE_POOL', True)
+    aparams['SQLITE']['WAL'] = dparams['SQLITE3'].get('WAL', False)
+    aparams['SQLITE']['BUSY_TIMEOUT'] = dparams['SQLITE3'].get('BUSY_TIMEOUT',
+                                                               20.0)
     # add database parameters
     # loop around databases
     for dbname in base.DATABASE_NAMES:
@@ -1715,6 +1719,8 @@ def update_db_settings(aparams: ParamDict) -> ParamDict:
     aparams['MYSQL']['USER'] = dparams['MYSQL']['USER']
     aparams['MYSQL']['PASSWD'] = dparams['MYSQL']['PASSWD']
     aparams['MYSQL']['DATABASE'] = dparams['MYSQL']['DATABASE']
+    aparams['MYSQL']['USE_POOL'] = dparams['MYSQL'].get('USE_POOL', True)
+    aparams['MYSQL']['POOL_SIZE'] = dparams['MYSQL'].get('POOL_SIZE', 5)
     # add database parameters
     # loop around databases
     for dbname in base.DATABASE_NAMES:
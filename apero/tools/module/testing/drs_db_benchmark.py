@@ -0,0 +1,383 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+APERO database benchmarks
+
+Measures the query rate (queries per second) of the low level database
+(apero.base.drs_db) for the common query types, with and without the
+persistent connection pool
+
+Also contains a multi-process SQLite stress test (writer processes adding
+rows while read-only reader processes query) run with the default
+(rollback) journal and with write-ahead logging
+
+Run directly:
+    python drs_db_benchmark.py [sqlite/mysql] [number of queries]
+    python drs_db_benchmark.py stress [readers] [writers] [duration]
+
+Created on 2026-10-17
+
+@author: cook
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from apero.base import base
+from apero.base import drs_db
+
+# =============================================================================
+# Define variables
+# =============================================================================
+__NAME__ = 'tools.module.testing.drs_db_benchmark.py'
+__INSTRUMENT__ = 'None'
+__PACKAGE__ = base.__PACKAGE__
+__version__ = base.__version__
+__author__ = base.__author__
+__date__ = base.__date__
+__release__ = base.__release__
+# the table used for benchmarking
+BENCH_TABLE = 'benchmark'
+# the columns of the benchmark table
+BENCH_COLS = ['KEYNAME', 'FIBER', 'FILENAME', 'UNIXTIME', 'USED']
+BENCH_TYPES = ['VARCHAR(20)', 'VARCHAR(5)', 'VARCHAR(200)', 'DOUBLE', 'INT']
+# the unique columns of the benchmark table
+BENCH_UCOLS = ['KEYNAME', 'FIBER', 'FILENAME']
+# number of rows added to the table before benchmarking
+BENCH_NROWS = 1000
+# number of queries to run per benchmark
+BENCH_NQUERIES = 500
+# stress test: number of reader / writer processes and duration in seconds
+STRESS_READERS = 4
+STRESS_WRITERS = 2
+STRESS_DURATION = 10.0
+
+
+# =============================================================================
+# Define functions
+# =============================================================================
+def make_database(kind: str, path: str, **kwargs) -> drs_db.Database:
+    """
+    Create a database for benchmarking
+
+    :param kind: str, either 'sqlite' or 'mysql' (mysql uses the settings in
+                 the database yaml file)
+    :param path: str, the path to the sqlite database file
+    :param kwargs: passed to SQLiteDatabase / MySQLDatabase
+
+    :return: Database, the database instance
+    """
+    if kind == 'mysql':
+        sparams = base.DPARAMS['MYSQL']
+        return drs_db.MySQLDatabase(path=path, host=sparams['HOST'],
+                                    user=sparams['USER'],
+                                    passwd=sparams['PASSWD'],
+                                    database=sparams['DATABASE'],
+                                    tablename=BENCH_TABLE,
+                                    absolute_table_name=True, **kwargs)
+    else:
+        return drs_db.SQLiteDatabase(path, **kwargs)
+
+
+def setup_table(database: drs_db.Database, nrows: int = BENCH_NROWS):
+    """
+    (Re)create the benchmark table and fill it with nrows rows
+
+    :param database: Database, the database to add the table to
+    :param nrows: int, the number of rows to add
+
+    :return: None
+    """
+    if BENCH_TABLE in database.tables:
+        database.delete_table(BENCH_TABLE)
+    database.add_table(BENCH_TABLE, BENCH_COLS, BENCH_TYPES,
+                       unique_cols=BENCH_UCOLS, index_cols=['KEYNAME'])
+    database.tname = BENCH_TABLE
+    for row in range(nrows):
+        values = _row_values(row)
+        database.add_row(values, table=BENCH_TABLE, columns=list(BENCH_COLS),
+                         unique_cols=BENCH_UCOLS)
+
+
+def time_queries(func: Callable[[int], Any], nqueries: int) -> float:
+    """
+    Time a query function
+
+    :param func: function taking the iteration number
+    :param nqueries: int, the number of times to call func
+
+    :return: float, the number of queries per second
+    """
+    start = time.perf_counter()
+    for it in range(nqueries):
+        func(it)
+    duration = time.perf_counter() - start
+    return nqueries / max(duration, 1e-9)
+
+
+def benchmark(database: drs_db.Database, nqueries: int = BENCH_NQUERIES,
+              offset: int = BENCH_NROWS) -> Dict[str, float]:
+    """
+    Benchmark the get, count and add_row methods of a database
+
+    :param database: Database, the database (with the benchmark table)
+    :param nqueries: int, the number of queries per method
+    :param offset: int, the row number to start adding new rows at
+
+    :return: dict, the queries per second for each method
+    """
+    rates = dict()
+
+    def _get(it: int):
+        condition = 'KEYNAME="KEY{0}" AND FIBER="AB"'.format(it % 10)
+        database.get('FILENAME', table=BENCH_TABLE, condition=condition,
+                     sort_by='UNIXTIME', max_rows=1)
+
+    def _count(it: int):
+        condition = 'KEYNAME="KEY{0}"'.format(it % 10)
+        database.count(table=BENCH_TABLE, condition=condition)
+
+    def _add_row(it: int):
+        database.add_row(_row_values(offset + it), table=BENCH_TABLE,
+                         columns=list(BENCH_COLS), unique_cols=BENCH_UCOLS)
+
+    rates['get'] = time_queries(_get, nqueries)
+    rates['count'] = time_queries(_count, nqueries)
+    rates['add_row'] = time_queries(_add_row, nqueries)
+    return rates
+
+
+def run_benchmarks(kind: str = 'sqlite', nqueries: int = BENCH_NQUERIES,
+                   nrows: int = BENCH_NROWS
+                   ) -> Dict[str, Dict[str, float]]:
+    """
+    Run the benchmarks without (before) and with (after) connection pooling
+    (and with the query cache) and print the queries per second
+
+    :param kind: str, either 'sqlite' or 'mysql'
+    :param nqueries: int, the number of queries per method
+    :param nrows: int, the number of rows in the table before benchmarking
+
+    :return: dict, the rates for 'no pool', 'pool' and 'pool+cache'
+    """
+    results = dict()
+    cache_stats = dict()
+    runs = [('no pool', False, False), ('pool', True, False),
+            ('pool+cache', True, True)]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'benchmark.db')
+        for name, use_pool, use_cache in runs:
+            database = make_database(kind, path, use_pool=use_pool)
+            setup_table(database, nrows)
+            if use_cache:
+                database.enable_cache()
+            results[name] = benchmark(database, nqueries, nrows)
+            if use_cache:
+                cache_stats = database.cache_stats()
+                database.clear_cache()
+                database.disable_cache()
+            database.delete_table(BENCH_TABLE)
+            database.close_pool()
+    print_results(kind, results)
+    # print the query cache counters
+    if len(cache_stats) > 0:
+        print('Query cache: {hits} hits, {misses} misses '
+              '({invalidations} invalidated), {evictions} evictions, '
+              '{entries} entries [{nbytes} bytes]'.format(**cache_stats))
+    return results
+
+
+def print_results(kind: str, results: Dict[str, Dict[str, float]]):
+    """
+    Print the benchmark results
+
+    :param kind: str, the database kind benchmarked
+    :param results: dict, the output of run_benchmarks
+
+    :return: None
+    """
+    names = list(results.keys())
+    methods: List[str] = list(results[names[0]].keys())
+    print('Database benchmark ({0}) [queries/s]'.format(kind))
+    print('\t{0:10s}'.format('') + ''.join(['{0:>12s}'.format(n)
+                                            for n in names]) + '   speed-up')
+    for method in methods:
+        rates = [results[name][method] for name in names]
+        line = '\t{0:10s}'.format(method)
+        line += ''.join(['{0:12.1f}'.format(rate) for rate in rates])
+        line += '{0:10.2f}x'.format(rates[-1] / rates[0])
+        print(line)
+
+
+def stress_test(path: str, wal: bool, nreaders: int = STRESS_READERS,
+                nwriters: int = STRESS_WRITERS,
+                duration: float = STRESS_DURATION) -> Dict[str, float]:
+    """
+    Run writer processes (adding rows one transaction at a time) and
+    read-only reader processes (querying) against the same SQLite file
+    at the same time
+
+    :param path: str, the sqlite database file (created here)
+    :param wal: bool, if True use write-ahead logging
+    :param nreaders: int, the number of reader processes
+    :param nwriters: int, the number of writer processes
+    :param duration: float, how long each process runs for (seconds)
+
+    :return: dict, the reader query rate and latencies and the writer rate
+    """
+    # set up the table (this also sets the journal mode)
+    database = drs_db.SQLiteDatabase(path, wal=wal)
+    setup_table(database)
+    # start the processes
+    queue = multiprocessing.Queue()
+    processes = []
+    for it in range(nwriters):
+        offset = BENCH_NROWS + (it + 1) * 10 ** 7
+        pargs = [path, wal, duration, offset, queue]
+        processes.append(multiprocessing.Process(target=_stress_writer,
+                                                 args=pargs))
+    for it in range(nreaders):
+        pargs = [path, duration, queue]
+        processes.append(multiprocessing.Process(target=_stress_reader,
+                                                 args=pargs))
+    for process in processes:
+        process.start()
+    # collect results (before joining so the queue does not block)
+    results = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+    # combine the results
+    reads = [result for result in results if result[0] == 'reader']
+    writes = [result for result in results if result[0] == 'writer']
+    latencies = []
+    for read in reads:
+        latencies += read[1]
+    latencies = sorted(latencies)
+    nwritten = sum([write[1] for write in writes])
+    stats = dict()
+    stats['reads/s'] = len(latencies) / duration
+    stats['read p50 [ms]'] = 1e3 * latencies[len(latencies) // 2]
+    stats['read p99 [ms]'] = 1e3 * latencies[int(0.99 * (len(latencies) - 1))]
+    stats['read max [ms]'] = 1e3 * latencies[-1]
+    stats['writes/s'] = nwritten / duration
+    return stats
+
+
+def run_stress_tests(nreaders: int = STRESS_READERS,
+                     nwriters: int = STRESS_WRITERS,
+                     duration: float = STRESS_DURATION
+                     ) -> Dict[str, Dict[str, float]]:
+    """
+    Run the stress test with the default journal and with write-ahead
+    logging and print the results
+
+    :param nreaders: int, the number of reader processes
+    :param nwriters: int, the number of writer processes
+    :param duration: float, how long each process runs for (seconds)
+
+    :return: dict, the stats for 'rollback' and 'wal'
+    """
+    results = dict()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, wal in [('rollback', False), ('wal', True)]:
+            path = os.path.join(tmpdir, 'stress_{0}.db'.format(name))
+            results[name] = stress_test(path, wal, nreaders, nwriters,
+                                        duration)
+    # print results
+    print('SQLite stress test ({0} readers, {1} writers, {2} s)'
+          ''.format(nreaders, nwriters, duration))
+    names = list(results.keys())
+    print('\t{0:15s}'.format('') + ''.join(['{0:>12s}'.format(n)
+                                            for n in names]))
+    for stat in results[names[0]]:
+        line = '\t{0:15s}'.format(stat)
+        line += ''.join(['{0:12.1f}'.format(results[n][stat]) for n in names])
+        print(line)
+    return results
+
+
+def _stress_writer(path: str, wal: bool, duration: float, offset: int,
+                   queue: Any):
+    """
+    Stress test writer process: add rows (one transaction each) for
+    duration seconds
+
+    :param path: str, the sqlite database file
+    :param wal: bool, if True use write-ahead logging
+    :param duration: float, how long to write for (seconds)
+    :param offset: int, the first row number to add
+    :param queue: multiprocessing.Queue, where the result is put
+
+    :return: None
+    """
+    database = drs_db.SQLiteDatabase(path, wal=wal, use_pool=True)
+    nrows = 0
+    start = time.time()
+    while time.time() - start < duration:
+        database.add_row(_row_values(offset + nrows), table=BENCH_TABLE,
+                         columns=list(BENCH_COLS), unique_cols=BENCH_UCOLS)
+        nrows += 1
+    database.close_pool()
+    queue.put(('writer', nrows))
+
+
+def _stress_reader(path: str, duration: float, queue: Any):
+    """
+    Stress test reader process: query a read-only connection for duration
+    seconds recording the latency of every query
+
+    :param path: str, the sqlite database file
+    :param duration: float, how long to read for (seconds)
+    :param queue: multiprocessing.Queue, where the result is put
+
+    :return: None
+    """
+    database = drs_db.SQLiteDatabase(path, use_pool=True, read_only=True)
+    latencies = []
+    start = time.time()
+    while time.time() - start < duration:
+        condition = 'KEYNAME="KEY{0}" AND FIBER="AB"'.format(
+            len(latencies) % 10)
+        qstart = time.perf_counter()
+        database.get('FILENAME', table=BENCH_TABLE, condition=condition,
+                     sort_by='UNIXTIME', max_rows=1)
+        latencies.append(time.perf_counter() - qstart)
+    database.close_pool()
+    queue.put(('reader', latencies))
+
+
+def _row_values(row: int) -> List[Any]:
+    """
+    The values of a benchmark table row
+
+    :param row: int, the row number
+
+    :return: list, the row values
+    """
+    return ['KEY{0}'.format(row % 10), 'AB', 'file_{0:08d}.fits'.format(row),
+            1.6e9 + row, 1]
+
+
+# =============================================================================
+# Start of code
+# =============================================================================
+if __name__ == "__main__":
+    # get arguments
+    _kind = 'sqlite' if len(sys.argv) < 2 else sys.argv[1]
+    # run the stress test
+    if _kind == 'stress':
+        _nreaders = STRESS_READERS if len(sys.argv) < 3 else int(sys.argv[2])
+        _nwriters = STRESS_WRITERS if len(sys.argv) < 4 else int(sys.argv[3])
+        _duration = STRESS_DURATION if len(sys.argv) < 5 else float(sys.argv[4])
+        run_stress_tests(_nreaders, _nwriters, _duration)
+    # run benchmarks
+    else:
+        _nqueries = BENCH_NQUERIES if len(sys.argv) < 3 else int(sys.argv[2])
+        run_benchmarks(_kind, _nqueries)
+
+# =============================================================================
+# End of code
+# =============================================================================
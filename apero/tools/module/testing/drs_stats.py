@@ -302,8 +302,6 @@ def get_log_entries(params: ParamDict,
         condition = None
     else:
         condition = params['INPUTS']['SQL']
-    # get all entries from database
-    dataframe = logdbm.get_entries('*', condition=condition)
     # get the index database
     if mode == 'index':
         WLOG(params, '', 'Obtaining full index database. Please wait...')
@@ -313,16 +311,57 @@ def get_log_entries(params: ParamDict,
     else:
         idataframe = pd.DataFrame()
     # -------------------------------------------------------------------------
-    # get unique pids
-    upids = np.unique(dataframe['PID'])
     # storage for log entries
     log_entries = []
+    # the rows of the last pid of a chunk (may continue in the next chunk)
+    remainder = None
     # print progress
-    WLOG(params, '', 'Sorting {0} log entries'.format(len(upids)))
+    WLOG(params, '', 'Sorting log entries')
+    # stream all entries from database (and the archive if requested) -
+    #   sorted by PID so the rows of a pid are together
+    include_archive = params['INPUTS'].get('INCLUDE_ARCHIVE', False)
+    chunks = logdbm.iter_entries('*', condition=condition,
+                                 include_archive=include_archive,
+                                 sort_by='PID, UNIXTIME')
+    for chunk in chunks:
+        # add the rows carried over from the last chunk
+        if remainder is not None:
+            chunk = pd.concat([remainder, chunk], ignore_index=True)
+        # the last pid may continue into the next chunk
+        last_pid = chunk['PID'].iloc[-1]
+        last_mask = np.array(chunk['PID'] == last_pid)
+        remainder = chunk[last_mask]
+        # make log entries for all complete pids
+        log_entries += _make_log_entries(params, chunk[~last_mask], mode,
+                                         idataframe)
+    # make the log entries for the last pid
+    if remainder is not None:
+        log_entries += _make_log_entries(params, remainder, mode,
+                                         idataframe)
+    # print progress
+    WLOG(params, '', 'Found {0} valid log entries'.format(len(log_entries)))
+    # return list of log entries
+    return log_entries
+
+
+def _make_log_entries(params: ParamDict, dataframe: pd.DataFrame, mode: str,
+                      idataframe: pd.DataFrame) -> List[LogEntry]:
+    """
+    Make the log entries for all pids in a log database table
+
+    :param params: ParamDict, parameter dictionary of constants
+    :param dataframe: pandas dataframe, the log database rows
+    :param mode: str, the stats mode (timing, qc, index etc)
+    :param idataframe: pandas dataframe, the index database (mode=index)
+
+    :return: list of valid log entries
+    """
+    # storage for log entries
+    log_entries = []
     # loop around pids
-    for upid in tqdm(upids):
+    for upid, pid_data in dataframe.groupby('PID', sort=True):
         # get a log entry
-        log_entry = LogEntry(upid, dataframe)
+        log_entry = LogEntry(upid, pid_data)
         log_entry.get_attributes(params, mode=mode, idataframe=idataframe)
         # deal with valid data
         cond = log_entry.is_valid
@@ -1402,10 +1441,13 @@ def memory_stats(params: ParamDict, recipe: DrsRecipe):
         limit = None
     # -------------------------------------------------------------------------
     # get columns from log dbm
+    include_archive = params['INPUTS'].get('INCLUDE_ARCHIVE', False)
     ltable = logdbm.get_entries(columns, condition=condition,
-                                groupby='PID')
-    # find start and end points for each recipe
-    shortnames = logdbm.database.unique('SHORTNAME', condition=condition)
+                                groupby='PID',
+                                include_archive=include_archive)
+    # find start and end points for each recipe (from the entries so the
+    #   archive is included if requested)
+    shortnames = np.unique(ltable['SHORTNAME'].dropna().astype(str))
     # -------------------------------------------------------------------------
     # deal with limit
     if limit is not None:
@@ -1764,6 +1806,112 @@ def file_index_stats(params: ParamDict) -> ParamDict:
     return outputs
 
 
+# =============================================================================
+# Define database timing stats functions
+# =============================================================================
+def db_time_stats(params: ParamDict) -> ParamDict:
+    """
+    Print the time spent in each database by each recipe (from the log
+    database timing table - see RecipeLog.write_db_stats)
+
+    :param params: ParamDict, the parameter dictionary of constants
+
+    :return: ParamDict, the param dictionary for outputs
+    """
+    # set function name
+    func_name = __NAME__ + '.db_time_stats()'
+    # print progress
+    WLOG(params, 'info', 'Running database timing code')
+    # -------------------------------------------------------------------------
+    # construct report directory
+    report_dir = os.path.join(params['DRS_DATA_MSG'], 'report')
+    # deal with report directory not existing
+    if not os.path.exists(report_dir):
+        os.makedirs(report_dir)
+    # -------------------------------------------------------------------------
+    # load log database
+    logdbm = drs_database.LogDatabase(params)
+    logdbm.load_db()
+    # get all timing rows
+    dataframe = logdbm.get_db_timing()
+    # save outputs to return
+    outputs = ParamDict()
+    # deal with no timing rows
+    if len(dataframe) == 0:
+        WLOG(params, 'warning', 'No database timing entries found',
+             sublevel=2)
+        return outputs
+    # -------------------------------------------------------------------------
+    # sum the timing for each run and database kind
+    gcols = ['SHORTNAME', 'PID', 'DB_KIND']
+    runs = dataframe.groupby(gcols, as_index=False).agg(
+        NQUERIES=('NQUERIES', 'sum'), TOTAL_TIME=('TOTAL_TIME', 'sum'),
+        MAX_TIME=('MAX_TIME', 'max'), NROWS=('NROWS', 'sum'))
+    # construct report file absolute path
+    report_file = os.path.join(report_dir, 'apero_stats_dbtime.fits')
+    # print progress
+    WLOG(params, '', 'Writing database timing file: {0}'.format(report_file))
+    # write to disk
+    Table.from_pandas(runs).write(report_file, overwrite=True)
+    # -------------------------------------------------------------------------
+    # loop around recipes and print stats
+    for recipe_name in np.unique(runs['SHORTNAME']):
+        # get the runs for this recipe
+        rruns = runs[runs['SHORTNAME'] == recipe_name]
+        # total database time per run
+        run_times = rruns.groupby('PID')['TOTAL_TIME'].sum()
+        # total database time per database kind
+        kind_times = rruns.groupby('DB_KIND').agg(
+            NQUERIES=('NQUERIES', 'sum'), TOTAL_TIME=('TOTAL_TIME', 'sum'),
+            MAX_TIME=('MAX_TIME', 'max'))
+        # print stats
+        print_db_time_stats(params, recipe_name, run_times, kind_times)
+        # add outputs
+        sprop = StatProperty(f'{recipe_name}_DB_TIME', 'varying')
+        sprop.add(outputs, float(np.sum(run_times)), func_name)
+    # return outputs
+    return outputs
+
+
+def print_db_time_stats(params: ParamDict, recipe: str,
+                        run_times: pd.Series, kind_times: pd.DataFrame):
+    """
+    Print the database timing stats for one recipe
+
+    :param params: ParamDict, the parameter dictionary of constants
+    :param recipe: str, the recipe shortname
+    :param run_times: pandas Series, the total database time of each run
+    :param kind_times: pandas DataFrame, the number of queries, total time
+                       and max time for each database kind
+
+    :return: None, prints to screen
+    """
+    WLOG(params, 'info', '=' * 50)
+    WLOG(params, 'info', '\t{0}'.format(recipe))
+    WLOG(params, 'info', '=' * 50)
+    # total database time
+    total = np.sum(run_times)
+    # print stats for all databases
+    statstr = ('\n\tNruns: {0}'
+               '\n\tMean DB time per run: {1:.3f} s'
+               '\n\tMax DB time per run: {2:.3f} s'
+               '\n\tTotal DB time: {3:.3f} s')
+    sargs = [len(run_times), np.mean(run_times), np.max(run_times), total]
+    statstr = statstr.format(*sargs)
+    # print stats for each database kind (slowest first)
+    kind_times = kind_times.sort_values('TOTAL_TIME', ascending=False)
+    for db_kind, row in kind_times.iterrows():
+        if total > 0:
+            frac = 100 * row['TOTAL_TIME'] / total
+        else:
+            frac = 0.0
+        kstr = ('\n\t\t{0}: {1:.3f} s ({2:.1f}%) {3} queries '
+                '(slowest {4:.3f} s)')
+        statstr += kstr.format(db_kind, row['TOTAL_TIME'], frac,
+                               int(row['NQUERIES']), row['MAX_TIME'])
+    WLOG(params, '', statstr + '\n')
+
+
 # =============================================================================
 # Define combine stats functions
 # =============================================================================
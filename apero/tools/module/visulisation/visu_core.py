@@ -166,7 +166,7 @@ def get_file(block_kind: str,  obs_dir: str, identifier: str,
 
     # get database
     findexdbm = drs_database.FileIndexDatabase(PARAMS)
-    findexdbm.load_db()
+    findexdbm.load_db(read_only=True)
     # find file in database
     condition = 'BLOCK_KIND="{0}" AND OBS_DIR="{1}" AND KW_IDENTIFIER="{2}"'
     condition += ' AND KW_OUTPUT="{3}" AND KW_FIBER="{4}"'
@@ -103,6 +103,26 @@ def __main__(recipe: DrsRecipe, params: ParamDict) -> Dict[str, Any]:
         # ------------------------------------------------------------------
         return locals()
     # ----------------------------------------------------------------------
+    # deal with the index advisor
+    # ----------------------------------------------------------------------
+    if params['INPUTS']['INDEX_ADVISOR']:
+        create = params['INPUTS']['CREATE_INDEXES']
+        report = manage_databases.index_advisor(params, dbkind=dbkind,
+                                                create=create)
+        # ------------------------------------------------------------------
+        # End of main code
+        # ------------------------------------------------------------------
+        return locals()
+    # ----------------------------------------------------------------------
+    # deal with archiving the log database
+    # ----------------------------------------------------------------------
+    if params['INPUTS']['ARCHIVE_LOG']:
+        narchived = manage_databases.archive_log_database(params)
+        # ------------------------------------------------------------------
+        # End of main code
+        # ------------------------------------------------------------------
+        return locals()
+    # ----------------------------------------------------------------------
     # deal with resetting databasee
     # ----------------------------------------------------------------------
     if reset:
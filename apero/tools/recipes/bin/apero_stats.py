@@ -90,6 +90,7 @@ def __main__(recipe: DrsRecipe, params: ParamDict):
     recipe.plot.set_location()
     # set output to None initially
     tout, qout, eout, mout, fout = None, None, None, None, None
+    dout = None
     # ----------------------------------------------------------------------
     # run the timing stats
     if 'TIMING' in mode or 'ALL' in mode:
@@ -120,9 +121,14 @@ def __main__(recipe: DrsRecipe, params: ParamDict):
         # do the file index stats
         fout = drs_stats.file_index_stats(params)
     # ----------------------------------------------------------------------
+    # run the database timing stats
+    if 'DBTIME' in mode or 'ALL' in mode:
+        # do the database timing stats
+        dout = drs_stats.db_time_stats(params)
+    # ----------------------------------------------------------------------
     # combine all outputs into a single file that can be compared between
     #   runs
-    drs_stats.combine_stats(params, [tout, qout, eout, mout, fout])
+    drs_stats.combine_stats(params, [tout, qout, eout, mout, fout, dout])
     # ----------------------------------------------------------------------
     # End of main code
     # ----------------------------------------------------------------------